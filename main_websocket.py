@@ -77,6 +77,7 @@ from memory import WebSocketEnhancedMemoryManager, MemoryManager
 from memory.memory_fixes import apply_memory_fixes
 from websocket import CodaWebSocketServer, CodaWebSocketIntegration
 from websocket.perf_integration import WebSocketPerfIntegration
+from utils.model_registry import ModelRegistry
 
 # Type definitions for conversation history
 Message = Dict[str, str]
@@ -176,6 +177,12 @@ class CodaAssistant:
         # Send system information
         self.perf.send_system_info()
 
+        # Load heavy models (Whisper, sentence embeddings) in parallel on background threads;
+        # only the first call that needs a model waits for it
+        self.models = None
+        if config.get("models.background_loading", True):
+            self.models = ModelRegistry(websocket_integration=self.ws)
+
         # Initialize STT module with WebSocket integration
         logger.info("Initializing Speech-to-Text module with WebSocket integration...")
 
@@ -190,7 +197,8 @@ class CodaAssistant:
             device=config.get("stt.device", "cpu"),  # Use CPU to avoid CUDA issues
             compute_type=config.get("stt.compute_type", "float32"),  # Use float32 for CPU
             language=config.get("stt.language", "en"),
-            vad_filter=True
+            vad_filter=True,
+            model_registry=self.models
         )
 
         # Initialize LLM module with WebSocket integration
@@ -264,7 +272,9 @@ class CodaAssistant:
             logger.info("Using enhanced memory manager with long-term memory and WebSocket integration")
             self.memory = WebSocketEnhancedMemoryManager(
                 websocket_integration=self.ws,
-                config=config.get_all()
+                config=config.get_all(),
+                model_registry=self.models,
+                perf_tracker=self.perf.get_tracker()
             )
 
             # Add test memories using the proper methods
@@ -1085,6 +1095,10 @@ class CodaAssistant:
                 self.memory.close()
                 logger.info("Closed memory manager")
 
+        # Stop the model loader threads
+        if getattr(self, 'models', None):
+            self.models.shutdown()
+
         logger.info("Cleanup complete")
 
 def signal_handler(sig, _):
@@ -5,6 +5,7 @@ This module provides functionality for active recall and self-testing of memorie
 implementing spaced repetition and memory reinforcement through recall.
 """
 
+import os
 import logging
 import time
 import random
@@ -12,6 +13,10 @@ import math
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple, Set, Callable
 
+from .metadata_journal import set_op, delete_op
+from .review_schedule import ReviewSchedule
+from .integrity_index import IntegrityIndex
+
 logger = logging.getLogger("coda.memory.active_recall")
 
 class ActiveRecallSystem:
@@ -49,8 +54,11 @@ class ActiveRecallSystem:
         self.low_importance_threshold = self.config.get("memory", {}).get("low_importance_threshold", 0.3)
         
         # Review tracking
-        self.review_history = {}  # memory_id -> list of review timestamps and results
-        self.scheduled_reviews = {}  # memory_id -> next review timestamp
+        self.scheduled_reviews = ReviewSchedule(  # memory_id -> next review timestamp, in a due-time heap
+            self._review_store_path(),
+            compaction_threshold=self.config.get("memory", {}).get("metadata_compaction_threshold", 500)
+        )
+        self.review_history = self.scheduled_reviews.history  # memory_id -> list of review timestamps and results
         self.last_review_time = datetime.now()
         
         # Memory verification settings
@@ -61,67 +69,91 @@ class ActiveRecallSystem:
         # Load review history if available
         self._load_review_history()
         
+        # Drop the reviews of memories that are deleted or pruned
+        long_term = getattr(self.memory_manager, "long_term", None)
+        if long_term is not None and hasattr(long_term, "add_deletion_listener"):
+            long_term.add_deletion_listener(self._on_memories_deleted)
+        
         logger.info("ActiveRecallSystem initialized")
     
+    def _review_store_path(self) -> Optional[str]:
+        """Get the path of the review store next to the long-term memory (None if it has no storage path)."""
+        storage_path = getattr(getattr(self.memory_manager, "long_term", None), "storage_path", None)
+        if not isinstance(storage_path, str):
+            return None
+        return os.path.join(storage_path, "reviews.json")
+    
     def _load_review_history(self) -> None:
         """
         Load review history from storage.
+        
+        Review state kept in the long-term memory's metadata by earlier versions
+        is moved into the review store the first time it is created.
         """
         try:
-            # Try to get review history from memory manager's metadata
-            if hasattr(self.memory_manager, "long_term") and hasattr(self.memory_manager.long_term, "metadata"):
-                review_history = self.memory_manager.long_term.metadata.get("review_history", {})
-                scheduled_reviews = self.memory_manager.long_term.metadata.get("scheduled_reviews", {})
-                
-                # Convert string timestamps to datetime objects
-                for memory_id, reviews in review_history.items():
-                    for review in reviews:
-                        if isinstance(review["timestamp"], str):
-                            review["timestamp"] = datetime.fromisoformat(review["timestamp"])
-                
-                for memory_id, timestamp in scheduled_reviews.items():
-                    if isinstance(timestamp, str):
-                        scheduled_reviews[memory_id] = datetime.fromisoformat(timestamp)
-                
-                self.review_history = review_history
-                self.scheduled_reviews = scheduled_reviews
-                
-                logger.info(f"Loaded review history for {len(review_history)} memories")
+            legacy_state = {}
+            long_term = getattr(self.memory_manager, "long_term", None)
+            if long_term is not None and hasattr(long_term, "metadata"):
+                legacy_state = {
+                    "review_history": long_term.metadata.get("review_history", {}),
+                    "scheduled_reviews": long_term.metadata.get("scheduled_reviews", {})
+                }
+            
+            self.scheduled_reviews.load(legacy_state)
+            
+            if self.scheduled_reviews.persistent and any(legacy_state.values()):
+                long_term._save_metadata(changes=[delete_op(["review_history"]), delete_op(["scheduled_reviews"])])
+                logger.info("Moved review history from the memory metadata into the review store")
         except Exception as e:
             logger.error(f"Error loading review history: {e}")
     
-    def _save_review_history(self) -> None:
+    def _save_review_history(self, memory_id: Optional[str] = None) -> None:
         """
-        Save review history to storage.
+        Save review history to the long-term memory's metadata.
+        
+        Only used when there is no review store; otherwise every schedule and
+        review change is appended to the review store as it happens.
+        
+        Args:
+            memory_id: If provided, only this memory's review entries are saved
         """
+        if self.scheduled_reviews.persistent:
+            return
+        
         try:
-            # Convert datetime objects to strings for serialization
-            serializable_history = {}
-            for memory_id, reviews in self.review_history.items():
-                serializable_history[memory_id] = []
-                for review in reviews:
-                    serializable_review = review.copy()
-                    if isinstance(review["timestamp"], datetime):
-                        serializable_review["timestamp"] = review["timestamp"].isoformat()
-                    serializable_history[memory_id].append(serializable_review)
+            memory_ids = [memory_id] if memory_id is not None else None
+            state = self.scheduled_reviews.serialize(memory_ids)
+            if memory_ids is None:
+                memory_ids = set(state["scheduled_reviews"]) | set(state["review_history"])
             
-            serializable_scheduled = {}
-            for memory_id, timestamp in self.scheduled_reviews.items():
-                if isinstance(timestamp, datetime):
-                    serializable_scheduled[memory_id] = timestamp.isoformat()
+            changes = []
+            for changed_id in memory_ids:
+                if changed_id in state["review_history"]:
+                    changes.append(set_op(["review_history", changed_id], state["review_history"][changed_id]))
+                if changed_id in state["scheduled_reviews"]:
+                    changes.append(set_op(["scheduled_reviews", changed_id], state["scheduled_reviews"][changed_id]))
                 else:
-                    serializable_scheduled[memory_id] = timestamp
+                    changes.append(delete_op(["scheduled_reviews", changed_id]))
             
-            # Save to memory manager's metadata
+            # Append the changes to the long-term memory's metadata journal
             if hasattr(self.memory_manager, "long_term") and hasattr(self.memory_manager.long_term, "metadata"):
-                self.memory_manager.long_term.metadata["review_history"] = serializable_history
-                self.memory_manager.long_term.metadata["scheduled_reviews"] = serializable_scheduled
-                self.memory_manager.long_term._save_metadata()
+                self.memory_manager.long_term._save_metadata(changes=changes)
                 
-                logger.info(f"Saved review history for {len(serializable_history)} memories")
+                logger.info(f"Saved review history for {len(memory_ids)} memories")
         except Exception as e:
             logger.error(f"Error saving review history: {e}")
     
+    def _on_memories_deleted(self, memory_ids: List[str]) -> None:
+        """
+        Unschedule the reviews of deleted memories.
+        
+        Args:
+            memory_ids: IDs of the deleted memories
+        """
+        for memory_id in memory_ids:
+            if self.scheduled_reviews.unschedule(memory_id):
+                self._save_review_history(memory_id)
+    
     def schedule_review(self, memory_id: str, importance: float, force_schedule: bool = False) -> datetime:
         """
         Schedule a memory for review based on its importance.
@@ -145,10 +177,10 @@ class ActiveRecallSystem:
         next_review = datetime.now() + timedelta(days=interval)
         
         # Store in scheduled reviews
-        self.scheduled_reviews[memory_id] = next_review
+        self.scheduled_reviews.schedule(memory_id, next_review)
         
         # Save review history
-        self._save_review_history()
+        self._save_review_history(memory_id)
         
         logger.debug(f"Scheduled review for memory {memory_id} at {next_review.isoformat()}")
         
@@ -211,22 +243,17 @@ class ActiveRecallSystem:
         Returns:
             List of memories due for review
         """
-        now = datetime.now()
-        due_memories = []
-        
-        # Find memories due for review
-        for memory_id, review_time in self.scheduled_reviews.items():
-            if review_time <= now:
-                # Get the memory
-                memory = self.memory_manager.long_term.get_memory_by_id(memory_id)
-                if memory:
-                    due_memories.append(memory)
+        # Take the most overdue reviews of existing memories from the heap and fetch them in one batch
+        long_term = self.memory_manager.long_term
+        due_ids = self.scheduled_reviews.due_ids(
+            datetime.now(), limit, include=lambda memory_id: memory_id in long_term.metadata["memories"]
+        )
+        due_memories = long_term.get_memories_by_ids(due_ids)
         
         # Sort by importance (highest first)
         due_memories.sort(key=lambda m: m.get("importance", 0), reverse=True)
         
-        # Return up to the limit
-        return due_memories[:limit]
+        return due_memories
     
     def record_review(self, memory_id: str, success: bool, interval: Optional[float] = None) -> None:
         """
@@ -248,9 +275,7 @@ class ActiveRecallSystem:
         }
         
         # Add to review history
-        if memory_id not in self.review_history:
-            self.review_history[memory_id] = []
-        self.review_history[memory_id].append(review)
+        self.scheduled_reviews.record(memory_id, review)
         
         # Update last review time
         self.last_review_time = now
@@ -264,9 +289,9 @@ class ActiveRecallSystem:
         if memory:
             importance = memory.get("importance", 0.5)
             self.schedule_review(memory_id, importance, force_schedule=True)
-        
-        # Save review history
-        self._save_review_history()
+        else:
+            # Save review history
+            self._save_review_history(memory_id)
         
         logger.info(f"Recorded review for memory {memory_id}: success={success}")
     
@@ -309,6 +334,9 @@ class ActiveRecallSystem:
         """
         Verify the integrity of memories by checking for inconsistencies.
         
+        When the long-term memory keeps an integrity index, only memories changed
+        since their last verification are sampled; otherwise any memory can be.
+        
         Args:
             batch_size: Number of memories to verify (default: self.verification_batch_size)
             
@@ -336,6 +364,9 @@ class ActiveRecallSystem:
             }
         
         # Select a random sample
+        integrity_index = getattr(self.memory_manager.long_term, "integrity_index", None)
+        if isinstance(integrity_index, IntegrityIndex):
+            all_memory_ids = list(integrity_index.dirty_ids())
         sample_size = min(batch_size, len(all_memory_ids))
         sample_ids = random.sample(all_memory_ids, sample_size)
         
@@ -347,9 +378,14 @@ class ActiveRecallSystem:
             "issues": []
         }
         
+        # Get the sampled memories in one batch
+        memories = {
+            memory["id"]: memory
+            for memory in self.memory_manager.long_term.get_memories_by_ids(sample_ids)
+        }
+        
         for memory_id in sample_ids:
-            # Get the memory
-            memory = self.memory_manager.long_term.get_memory_by_id(memory_id)
+            memory = memories.get(memory_id)
             
             # Check if memory exists
             if not memory:
@@ -422,13 +458,11 @@ class ActiveRecallSystem:
         
         # Schedule reviews for memories that don't have a scheduled review
         all_memory_ids = list(self.memory_manager.long_term.metadata.get("memories", {}).keys())
-        for memory_id in all_memory_ids:
-            if memory_id not in self.scheduled_reviews:
-                memory = self.memory_manager.long_term.get_memory_by_id(memory_id)
-                if memory:
-                    importance = memory.get("importance", 0.5)
-                    self.schedule_review(memory_id, importance)
-                    results["reviews_scheduled"] += 1
+        unscheduled_ids = [memory_id for memory_id in all_memory_ids if memory_id not in self.scheduled_reviews]
+        for memory in self.memory_manager.long_term.get_memories_by_ids(unscheduled_ids):
+            importance = memory.get("importance", 0.5)
+            self.schedule_review(memory["id"], importance)
+            results["reviews_scheduled"] += 1
         
         return results
     
@@ -444,28 +478,13 @@ class ActiveRecallSystem:
         # Count memories by review status
         total_memories = len(self.memory_manager.long_term.metadata.get("memories", {}))
         scheduled_count = len(self.scheduled_reviews)
-        due_count = sum(1 for review_time in self.scheduled_reviews.values() if review_time <= now)
+        due_count = self.scheduled_reviews.due_count(now)
         
-        # Calculate review success rate
-        success_count = 0
-        review_count = 0
-        for reviews in self.review_history.values():
-            for review in reviews:
-                review_count += 1
-                if review.get("success", False):
-                    success_count += 1
-        
-        success_rate = success_count / max(1, review_count)
-        
-        # Calculate average review interval
-        intervals = []
-        for reviews in self.review_history.values():
-            for review in reviews:
-                interval = review.get("interval")
-                if interval is not None:
-                    intervals.append(interval)
-        
-        avg_interval = sum(intervals) / max(1, len(intervals)) if intervals else 0
+        # Review success rate and average interval from the running review totals
+        review_count = self.review_history.review_count
+        success_rate = self.review_history.success_count / max(1, review_count)
+        interval_count = self.review_history.interval_count
+        avg_interval = self.review_history.interval_total / interval_count if interval_count else 0
         
         return {
             "total_memories": total_memories,
@@ -478,3 +497,10 @@ class ActiveRecallSystem:
             "last_review": self.last_review_time.isoformat(),
             "timestamp": now.isoformat()
         }
+    
+    def close(self) -> None:
+        """Fold the review journal into a final review store snapshot."""
+        long_term = getattr(self.memory_manager, "long_term", None)
+        if long_term is not None and hasattr(long_term, "remove_deletion_listener"):
+            long_term.remove_deletion_listener(self._on_memories_deleted)
+        self.scheduled_reviews.close()
@@ -0,0 +1,429 @@
+"""
+Approximate nearest-neighbour index for Coda Lite's long-term memory.
+
+This module provides an IVF (inverted file) index built on the contiguous
+VectorIndex matrix: embeddings are partitioned into clusters with spherical
+k-means, and a query only scores the members of the ``nprobe`` clusters whose
+centroids are closest to it. ``nprobe`` is the recall/latency knob.
+"""
+
+import os
+import logging
+from itertools import chain
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .vector_index import VectorIndex
+
+logger = logging.getLogger("coda.memory.ann_index")
+
+# Supported values for the "vector_index" setting
+VECTOR_INDEX_TYPES = ("exact", "ivf")
+
+
+class IVFVectorIndex(VectorIndex):
+    """
+    Inverted-file approximate nearest-neighbour index.
+
+    Responsibilities:
+    - Partition embeddings into clusters with spherical k-means
+    - Keep cluster membership up to date on incremental inserts and deletes
+    - Answer top-k queries by scoring only the members of the nearest clusters
+    - Persist centroids and assignments so restarts do not retrain
+    - Measure recall@k against exact search
+
+    Until the index holds ``min_train_size`` embeddings and has been trained,
+    queries fall back to exact search. Searches never modify the index: training
+    happens in maintain(), which the owner calls under its write lock, and is
+    repeated when the index has grown ``retrain_growth`` times past the size it
+    was trained at (searches are exact until then).
+    """
+
+    def __init__(self,
+                 dimension: Optional[int] = None,
+                 initial_capacity: int = 256,
+                 nlist: int = 0,
+                 nprobe: int = 8,
+                 min_train_size: int = 1024,
+                 kmeans_iterations: int = 10,
+                 retrain_growth: float = 4.0,
+                 seed: int = 0,
+                 precision: str = "float32",
+                 rescore_factor: int = 4):
+        """
+        Initialize the IVF index.
+
+        Args:
+            dimension: Embedding dimension (inferred from the first vector if None)
+            initial_capacity: Number of rows to preallocate
+            nlist: Number of clusters (0 chooses sqrt(n) at training time)
+            nprobe: Number of clusters scored per query (higher = better recall, slower)
+            min_train_size: Minimum number of embeddings before clustering is used
+            kmeans_iterations: Number of k-means iterations when training
+            retrain_growth: Retrain once the index is this many times its trained size
+            seed: Random seed for k-means initialization and sampling
+            precision: Storage precision of the matrix ("float32", "float16" or "int8")
+            rescore_factor: Candidate multiplier for rescoring reduced-precision results
+        """
+        super().__init__(
+            dimension=dimension,
+            initial_capacity=initial_capacity,
+            precision=precision,
+            rescore_factor=rescore_factor
+        )
+        self.nlist = nlist
+        self.nprobe = max(1, nprobe)
+        self.min_train_size = max(1, min_train_size)
+        self.kmeans_iterations = max(1, kmeans_iterations)
+        self.retrain_growth = retrain_growth
+        self.rng = np.random.default_rng(seed)
+
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.lists: List[Set[int]] = []
+        self.trained_size = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def add_encoded_batch(self,
+                          memory_ids: List[str],
+                          codes: np.ndarray,
+                          scales: Optional[np.ndarray] = None) -> None:
+        """
+        Add rows that are already normalized and in the storage precision.
+
+        Args:
+            memory_ids: Memory IDs
+            codes: 2-D array of rows in the index dtype
+            scales: Per-row scales (required for int8)
+        """
+        if not memory_ids:
+            return
+
+        # Detach replaced rows from their old clusters before they are overwritten
+        if self.is_trained:
+            for memory_id in memory_ids:
+                position = self.positions.get(memory_id)
+                if position is not None:
+                    self.lists[self.assignments[position]].discard(position)
+
+        super().add_encoded_batch(memory_ids, codes, scales)
+        self._ensure_assignment_capacity()
+
+        if self.is_trained:
+            positions = np.array([self.positions[memory_id] for memory_id in dict.fromkeys(memory_ids)], dtype=np.int64)
+            self._assign(positions)
+
+    def remove(self, memory_id: str) -> bool:
+        """
+        Remove a memory from the index.
+
+        Args:
+            memory_id: Memory ID
+
+        Returns:
+            True if removed, False if not found
+        """
+        position = self.positions.get(memory_id)
+        if position is None:
+            return False
+
+        if self.is_trained:
+            last_position = len(self.ids) - 1
+            self.lists[self.assignments[position]].discard(position)
+            if position != last_position:
+                # The base class moves the last row into the freed slot
+                cluster = self.assignments[last_position]
+                self.lists[cluster].discard(last_position)
+                self.lists[cluster].add(position)
+                self.assignments[position] = cluster
+
+        return super().remove(memory_id)
+
+    def clear(self) -> None:
+        """Remove all embeddings and clusters from the index."""
+        super().clear()
+        self.centroids = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.lists = []
+        self.trained_size = 0
+
+    def _ensure_assignment_capacity(self) -> None:
+        capacity = self.matrix.shape[0] if self.matrix is not None else 0
+        if self.assignments.shape[0] < capacity:
+            grown = np.zeros(capacity, dtype=np.int32)
+            grown[:self.assignments.shape[0]] = self.assignments
+            self.assignments = grown
+
+    def _assign(self, positions: np.ndarray, chunk_size: int = 65536) -> None:
+        """Assign rows to their nearest centroid and record them in the inverted lists."""
+        for start in range(0, positions.size, chunk_size):
+            chunk = positions[start:start + chunk_size]
+            clusters = np.argmax(self.rows(chunk) @ self.centroids.T, axis=1).astype(np.int32)
+            self.assignments[chunk] = clusters
+            for position, cluster in zip(chunk.tolist(), clusters.tolist()):
+                self.lists[cluster].add(position)
+
+    def train(self) -> bool:
+        """
+        Cluster the current embeddings and rebuild the inverted lists.
+
+        Returns:
+            True if the index was trained, False if there are too few embeddings
+        """
+        count = len(self.ids)
+        if count < self.min_train_size:
+            return False
+
+        nlist = self.nlist or int(round(np.sqrt(count)))
+        nlist = max(1, min(nlist, count))
+
+        # Train on a sample; k-means quality saturates well before the full set
+        sample_size = min(count, max(nlist * 64, 10000))
+        sample = self.rows(self.rng.choice(count, size=sample_size, replace=False))
+
+        centroids = sample[self.rng.choice(sample_size, size=nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+
+            # Re-seed empty clusters with random sample points
+            empty = np.flatnonzero(counts == 0)
+            if empty.size:
+                sums[empty] = sample[self.rng.choice(sample_size, size=empty.size, replace=False)]
+
+            centroids = self.normalize(sums)
+
+        self.centroids = centroids
+        self.lists = [set() for _ in range(nlist)]
+        self._ensure_assignment_capacity()
+        self._assign(np.arange(count, dtype=np.int64))
+        self.trained_size = count
+
+        logger.info(f"Trained IVF index with {nlist} clusters over {count} embeddings")
+        return True
+
+    @property
+    def needs_maintenance(self) -> bool:
+        """Whether the clusters are due to be trained or retrained."""
+        if not self.is_trained:
+            return len(self.ids) >= self.min_train_size
+        return len(self.ids) > self.trained_size * self.retrain_growth
+
+    def maintain(self) -> None:
+        """Train or retrain the clusters once the index has grown enough."""
+        if self.needs_maintenance:
+            self.train()
+
+    def search(self,
+               query_embedding: np.ndarray,
+               limit: int = 5,
+               min_similarity: float = -1.0,
+               predicate: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Find approximately the most similar memories to a query embedding.
+
+        Args:
+            query_embedding: Query embedding
+            limit: Maximum number of results
+            min_similarity: Minimum cosine similarity to include
+            predicate: Optional filter called with a memory ID; only IDs for which it
+                returns True are included
+
+        Returns:
+            List of (memory_id, similarity) tuples sorted by similarity (descending)
+        """
+        if limit <= 0 or not self.ids:
+            return []
+
+        # Training is left to maintain(); stale or missing clusters are searched exactly
+        if self.needs_maintenance or not self.is_trained:
+            return self.exact_search(query_embedding, limit, min_similarity, predicate)
+
+        query = self.normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+
+        # Probe the clusters whose centroids are closest to the query
+        centroid_scores = self.centroids @ query
+        nprobe = min(self.nprobe, len(self.lists))
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        positions = np.fromiter(chain.from_iterable(self.lists[cluster] for cluster in probe), dtype=np.int64)
+        if positions.size == 0:
+            return []
+
+        scores = self.rows(positions) @ query
+        results = self._top_k(positions, scores, limit, min_similarity, predicate, query_embedding)
+
+        if predicate is not None and len(results) < limit:
+            # A selective filter can empty the probed clusters; fall back to exact search
+            return self.exact_search(query_embedding, limit, min_similarity, predicate)
+
+        return results
+
+    def exact_search(self,
+                     query_embedding: np.ndarray,
+                     limit: int = 5,
+                     min_similarity: float = -1.0,
+                     predicate: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Find the most similar memories by scoring every embedding.
+
+        Args:
+            query_embedding: Query embedding
+            limit: Maximum number of results
+            min_similarity: Minimum cosine similarity to include
+            predicate: Optional filter called with a memory ID
+
+        Returns:
+            List of (memory_id, similarity) tuples sorted by similarity (descending)
+        """
+        return super().search(query_embedding, limit, min_similarity, predicate)
+
+    def measure_recall(self, queries: np.ndarray, k: int = 10) -> float:
+        """
+        Measure recall@k of the approximate search against exact search.
+
+        Args:
+            queries: 2-D array of query embeddings
+            k: Number of neighbours compared per query
+
+        Returns:
+            Mean fraction of the exact top-k found by the approximate search
+        """
+        return measure_recall(self, queries, k)
+
+    def save(self, path: str) -> bool:
+        """
+        Persist the centroids and cluster assignments.
+
+        Args:
+            path: File path for the index state (.npz)
+
+        Returns:
+            True if state was written, False otherwise
+        """
+        if not self.is_trained:
+            return False
+
+        count = len(self.ids)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    ids=np.array(self.ids, dtype=str),
+                    assignments=self.assignments[:count],
+                    centroids=self.centroids,
+                    trained_size=np.array(self.trained_size)
+                )
+            os.replace(tmp_path, path)
+            logger.info(f"Saved IVF index state for {count} embeddings to {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving IVF index state: {e}")
+            return False
+
+    def load(self, path: str) -> bool:
+        """
+        Restore centroids and assignments saved by save().
+
+        Embeddings must already be in the index. Saved assignments are reused for
+        known IDs; embeddings added since the save are assigned to their nearest
+        centroid.
+
+        Args:
+            path: File path for the index state (.npz)
+
+        Returns:
+            True if state was restored, False otherwise
+        """
+        if not os.path.exists(path) or self.matrix is None:
+            return False
+
+        try:
+            with np.load(path) as state:
+                centroids = state["centroids"].astype(np.float32)
+                saved_ids = state["ids"].tolist()
+                saved_assignments = state["assignments"]
+                trained_size = int(state["trained_size"])
+        except Exception as e:
+            logger.error(f"Error loading IVF index state: {e}")
+            return False
+
+        if centroids.ndim != 2 or centroids.shape[1] != self.dimension:
+            logger.warning("IVF index state does not match the embedding dimension; retraining")
+            return False
+
+        self.centroids = centroids
+        self.lists = [set() for _ in range(centroids.shape[0])]
+        self.trained_size = trained_size
+        self._ensure_assignment_capacity()
+
+        for memory_id, cluster in zip(saved_ids, saved_assignments.tolist()):
+            position = self.positions.get(memory_id)
+            if position is None or cluster >= len(self.lists):
+                continue
+            self.assignments[position] = cluster
+            self.lists[cluster].add(position)
+
+        assigned = set(chain.from_iterable(self.lists))
+        unassigned = [position for position in range(len(self.ids)) if position not in assigned]
+        if unassigned:
+            self._assign(np.array(unassigned, dtype=np.int64))
+
+        logger.info(f"Loaded IVF index state with {len(self.lists)} clusters ({len(unassigned)} new embeddings assigned)")
+        return True
+
+
+def measure_recall(index: VectorIndex, queries: np.ndarray, k: int = 10) -> float:
+    """
+    Measure recall@k of an index against exact search over the same embeddings.
+
+    Args:
+        index: Index to evaluate
+        queries: 2-D array of query embeddings
+        k: Number of neighbours compared per query
+
+    Returns:
+        Mean fraction of the exact top-k found by the index (1.0 for exact indexes)
+    """
+    queries = np.asarray(queries, dtype=np.float32).reshape(-1, index.dimension or queries.shape[-1])
+    if queries.shape[0] == 0 or len(index) == 0:
+        return 1.0
+
+    recalls = []
+    for query in queries:
+        exact = {memory_id for memory_id, _ in VectorIndex.search(index, query, limit=k)}
+        approximate = {memory_id for memory_id, _ in index.search(query, limit=k)}
+        recalls.append(len(exact & approximate) / max(1, len(exact)))
+
+    return float(np.mean(recalls))
+
+
+def create_vector_index(index_type: str = "exact",
+                        precision: str = "float32",
+                        rescore_factor: int = 4,
+                        **options: Any) -> VectorIndex:
+    """
+    Create a vector index.
+
+    Args:
+        index_type: "exact" for brute-force search or "ivf" for approximate search
+        precision: Storage precision of the index matrix ("float32", "float16" or "int8")
+        rescore_factor: Candidate multiplier for rescoring reduced-precision results
+        **options: IVF options (nlist, nprobe, min_train_size, kmeans_iterations, ...)
+
+    Returns:
+        Vector index instance
+    """
+    if index_type == "ivf":
+        return IVFVectorIndex(precision=precision, rescore_factor=rescore_factor, **options)
+
+    if index_type != "exact":
+        logger.warning(f"Unknown vector index type {index_type}, falling back to exact")
+    return VectorIndex(precision=precision, rescore_factor=rescore_factor)
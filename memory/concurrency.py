@@ -0,0 +1,201 @@
+"""
+Concurrency primitives for Coda Lite's long-term memory.
+
+This module provides a reader-writer lock for the in-process memory indexes and
+a pool of per-thread read-only SQLite connections. Retrievals from the request
+thread, the dashboard's WebSocket handlers and maintenance code hold the read
+side and run in parallel, while writes hold the write side one at a time on the
+single writer connection. In WAL mode, readers on their own connections see the
+last committed state and never block the writer.
+"""
+
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import sqlite3
+    SQLITE_AVAILABLE = True
+except ImportError:
+    SQLITE_AVAILABLE = False
+
+logger = logging.getLogger("coda.memory.concurrency")
+
+
+class ReadWriteLock:
+    """
+    Writer-preferring reader-writer lock.
+
+    Responsibilities:
+    - Let any number of threads hold the read side at once
+    - Give the write side to one thread at a time, reentrantly; a waiting writer
+      keeps new readers out so writes are not starved
+    - Let the writing thread take the read side (reads inside writes) and a
+      reading thread re-enter the read side while a writer waits
+    """
+
+    def __init__(self):
+        """Initialize an unlocked lock."""
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()
+
+    def acquire_read(self) -> None:
+        """Take the read side (blocks while another thread writes or waits to write)."""
+        depth = getattr(self._local, "read_depth", 0)
+        if depth == 0:
+            me = threading.get_ident()
+            with self._cond:
+                # A thread inside a write reads without counting as a reader
+                counted = self._writer != me
+                if counted:
+                    while self._writer is not None or self._writers_waiting:
+                        self._cond.wait()
+                    self._readers += 1
+            self._local.counted = counted
+        self._local.read_depth = depth + 1
+
+    def release_read(self) -> None:
+        """Release the read side."""
+        self._local.read_depth -= 1
+        if self._local.read_depth == 0 and self._local.counted:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        """
+        Take the write side (blocks while other threads read or write).
+
+        Raises:
+            RuntimeError: If the thread holds only the read side (upgrades would deadlock)
+        """
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if getattr(self._local, "read_depth", 0):
+                raise RuntimeError("Cannot take the write lock while holding the read lock")
+
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self) -> None:
+        """Release the write side."""
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @property
+    def write_held(self) -> bool:
+        """Whether the current thread holds the write side."""
+        return self._writer == threading.get_ident()
+
+    @contextmanager
+    def read_locked(self) -> Iterator[None]:
+        """Context manager holding the read side."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self) -> Iterator[None]:
+        """Context manager holding the write side."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def reads(method: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorator for methods that run under ``self.lock``'s read side."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read_locked():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def writes(method: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorator for methods that run under ``self.lock``'s write side."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.write_locked():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class SQLiteReaderPool:
+    """
+    Per-thread read-only SQLite connections.
+
+    Responsibilities:
+    - Open one query-only connection per reading thread, on first use
+    - Close the connections of threads that have exited whenever a new one is opened,
+      so short-lived reader threads do not leak connections
+    - Close every connection it opened
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the pool.
+
+        Args:
+            db_path: Path of the SQLite database (in WAL mode)
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections: Dict[threading.Thread, "sqlite3.Connection"] = {}
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def connection(self) -> "sqlite3.Connection":
+        """Get the calling thread's read connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.closed:
+                raise RuntimeError("SQLite reader pool is closed")
+            # Connections are only used by their thread; close() runs once readers are done
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            with self._lock:
+                self._close_dead()
+                self._connections[threading.current_thread()] = conn
+            self._local.conn = conn
+            logger.debug(f"Opened SQLite reader connection for {threading.current_thread().name}")
+        return conn
+
+    def _close_dead(self) -> None:
+        """Close the connections of threads that have exited (called with the lock held)."""
+        for thread in [thread for thread in self._connections if not thread.is_alive()]:
+            self._connections.pop(thread).close()
+            logger.debug(f"Closed SQLite reader connection of exited thread {thread.name}")
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def close(self) -> None:
+        """Close every reader connection."""
+        with self._lock:
+            self.closed = True
+            for conn in self._connections.values():
+                conn.close()
+            self._connections = {}
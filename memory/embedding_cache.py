@@ -0,0 +1,274 @@
+"""
+Embedding cache for Coda Lite's long-term memory.
+
+This module provides an EmbeddingCache class that sits in front of the
+sentence-transformers encoder. Embeddings are keyed by the model name and a hash
+of the normalized text, kept in a bounded in-RAM LRU, and optionally persisted to
+an SQLite file so repeated texts and restarts do not pay the encoder cost again.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+try:
+    import sqlite3
+    SQLITE_AVAILABLE = True
+except ImportError:
+    SQLITE_AVAILABLE = False
+
+logger = logging.getLogger("coda.memory.embedding_cache")
+
+# Component name used for PerfTracker counters and timings
+PERF_COMPONENT = "embedding_cache"
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of text embeddings.
+
+    Responsibilities:
+    - Key embeddings by (model name, hash of whitespace-normalized text)
+    - Keep recently used embeddings in a bounded in-RAM LRU
+    - Optionally persist embeddings to an SQLite file that survives restarts
+    - Encode only the cache misses, in a single batched call
+    - Report hits, misses and encoder time through a PerfTracker
+    """
+
+    def __init__(self,
+                 encode_fn: Callable[[Any], np.ndarray],
+                 model_name: str,
+                 max_entries: int = 10000,
+                 persist_path: Optional[str] = None,
+                 perf_tracker=None):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            encode_fn: Encoder called with a list of texts; must return a 2-D array
+            model_name: Name of the embedding model (part of every cache key)
+            max_entries: Maximum number of embeddings kept in memory (0 disables the LRU)
+            persist_path: Path of the SQLite file for the on-disk tier (None disables it)
+            perf_tracker: Optional PerfTracker that receives hit/miss counters
+        """
+        self.encode_fn = encode_fn
+        self.model_name = model_name
+        self.max_entries = max(0, max_entries)
+        self.persist_path = persist_path
+        self.perf_tracker = perf_tracker
+
+        self.entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+        self.conn = None
+        if persist_path and SQLITE_AVAILABLE:
+            self._init_disk_tier()
+        elif persist_path:
+            logger.warning("sqlite3 not available, embedding cache will not be persisted")
+
+    def _init_disk_tier(self) -> None:
+        """Open (or create) the SQLite file backing the on-disk tier."""
+        directory = os.path.dirname(self.persist_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        try:
+            self.conn = sqlite3.connect(self.persist_path, check_same_thread=False)
+            self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                dtype TEXT NOT NULL,
+                vector BLOB NOT NULL
+            )
+            ''')
+            self.conn.commit()
+            logger.info(f"Embedding cache persisted at {self.persist_path}")
+        except Exception as e:
+            logger.error(f"Error opening embedding cache at {self.persist_path}: {e}")
+            self.conn = None
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Collapse whitespace so trivially different spellings share a cache entry."""
+        return " ".join(text.split())
+
+    def make_key(self, text: str) -> str:
+        """
+        Build the cache key for a text.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Hex digest of the model name and normalized text
+        """
+        digest = hashlib.sha1()
+        digest.update(self.model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(self.normalize_text(text).encode("utf-8"))
+        return digest.hexdigest()
+
+    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """
+        Embed one or more texts, encoding only those not already cached.
+
+        Args:
+            texts: A single text or a list of texts
+
+        Returns:
+            A 1-D embedding for a single text, or a 2-D array with one row per text
+        """
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        keys = [self.make_key(text) for text in texts]
+        found = self._lookup(keys)
+
+        # Encode each distinct missing text once
+        missing_keys = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing_keys:
+            missing_texts = [texts[keys.index(key)] for key in missing_keys]
+            self._mark("encode", True)
+            encoded = np.asarray(self.encode_fn(missing_texts), dtype=np.float32).reshape(len(missing_texts), -1)
+            self._mark("encode", False)
+            new_entries = dict(zip(missing_keys, encoded))
+            self._store(new_entries)
+            found.update(new_entries)
+
+        if single:
+            return found[keys[0]]
+        return np.vstack([found[key] for key in keys])
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Look keys up in the LRU, then the disk tier; records hit/miss counters."""
+        found = {}
+        with self.lock:
+            for key in keys:
+                embedding = self.entries.get(key)
+                if embedding is not None:
+                    self.entries.move_to_end(key)
+                    found[key] = embedding
+
+            disk_keys = [key for key in dict.fromkeys(keys) if key not in found]
+            disk_found = self._read_disk(disk_keys) if disk_keys else {}
+            for key, embedding in disk_found.items():
+                self._remember(key, embedding)
+            found.update(disk_found)
+
+            memory_hits = sum(1 for key in keys if key in found and key not in disk_found)
+            disk_hits = sum(1 for key in keys if key in disk_found)
+            misses = len(keys) - memory_hits - disk_hits
+            self.hits += memory_hits + disk_hits
+            self.disk_hits += disk_hits
+            self.misses += misses
+
+        self._count("hits", memory_hits + disk_hits)
+        self._count("disk_hits", disk_hits)
+        self._count("misses", misses)
+        return found
+
+    def _store(self, entries: Dict[str, np.ndarray]) -> None:
+        """Add freshly encoded embeddings to both tiers."""
+        with self.lock:
+            for key, embedding in entries.items():
+                self._remember(key, embedding)
+            self._write_disk(entries)
+
+    def _remember(self, key: str, embedding: np.ndarray) -> None:
+        """Insert into the LRU, evicting the least recently used entries."""
+        if self.max_entries == 0:
+            return
+
+        # Cached arrays are shared between callers, so keep them read-only
+        embedding.flags.writeable = False
+        self.entries[key] = embedding
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if self.conn is None:
+            return {}
+
+        found = {}
+        try:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 900):
+                chunk = keys[start:start + 900]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for key, dtype, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=dtype).astype(np.float32)
+        except Exception as e:
+            logger.error(f"Error reading embedding cache: {e}")
+        return found
+
+    def _write_disk(self, entries: Dict[str, np.ndarray]) -> None:
+        if self.conn is None or not entries:
+            return
+
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                    [(key, str(embedding.dtype), embedding.tobytes()) for key, embedding in entries.items()]
+                )
+        except Exception as e:
+            logger.error(f"Error writing embedding cache: {e}")
+
+    def _count(self, counter: str, amount: int) -> None:
+        if self.perf_tracker is not None and amount:
+            self.perf_tracker.increment_counter(PERF_COMPONENT, counter, amount)
+
+    def _mark(self, operation: str, start: bool) -> None:
+        if self.perf_tracker is not None:
+            self.perf_tracker.mark_component(PERF_COMPONENT, operation, start)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with entry count, hits, misses and hit rate
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "persistent": self.conn is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def clear(self) -> None:
+        """Remove all cached embeddings from both tiers."""
+        with self.lock:
+            self.entries.clear()
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute("DELETE FROM embeddings")
+
+    def close(self) -> None:
+        """Close the on-disk tier."""
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,274 @@
+"""
+Embedding-space clustering for Coda Lite's long-term memory.
+
+This module provides an EmbeddingClusters class that groups memories with
+spherical mini-batch k-means over their embeddings. Centroids are updated a
+batch at a time as memories arrive (per-centroid learning rates, as in Sculley's
+web-scale k-means), each new memory is assigned in O(k), and the centroids and
+assignments are persisted so restarts do not retrain.
+"""
+
+import os
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .vector_index import VectorIndex
+
+logger = logging.getLogger("coda.memory.embedding_clusters")
+
+
+class EmbeddingClusters:
+    """
+    Incrementally trained embedding clusters.
+
+    Responsibilities:
+    - Seed centroids once ``n_clusters`` memories have been seen
+    - Move the centroids with vectorized mini-batch updates as memories arrive
+    - Keep the cluster of every memory up to date on inserts, updates and deletes
+    - Persist centroids, update counts and assignments
+
+    Assignments made earlier are not revisited when centroids drift; fit()
+    retrains from scratch and reassigns every memory.
+    """
+
+    def __init__(self, n_clusters: int = 8, batch_size: int = 256, seed: int = 0):
+        """
+        Initialize the clusters.
+
+        Args:
+            n_clusters: Number of clusters (k)
+            batch_size: Number of embeddings per mini-batch update
+            seed: Random seed for centroid seeding and shuffling
+        """
+        self.n_clusters = max(1, n_clusters)
+        self.batch_size = max(1, batch_size)
+        self.rng = np.random.default_rng(seed)
+
+        self.centroids: Optional[np.ndarray] = None
+        self.counts = np.zeros(self.n_clusters, dtype=np.float64)
+        self.assignments: Dict[str, int] = {}
+        self.members: List[Dict[str, None]] = [{} for _ in range(self.n_clusters)]
+        self.version = 0
+
+        # Embeddings seen before there are enough to seed the centroids
+        self.seed_ids: List[str] = []
+        self.seed_vectors: List[np.ndarray] = []
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return len(self.assignments) + len(self.seed_ids)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self.assignments or memory_id in self.seed_ids
+
+    def partial_fit(self, memory_ids: List[str], embeddings: np.ndarray) -> None:
+        """
+        Update the centroids with new or changed memories and assign them.
+
+        Args:
+            memory_ids: Memory IDs
+            embeddings: 2-D array with one embedding per ID
+        """
+        if not memory_ids:
+            return
+
+        vectors = VectorIndex.normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(memory_ids), -1))
+        for memory_id in memory_ids:
+            self.remove(memory_id)
+
+        if not self.is_trained:
+            self.seed_ids.extend(memory_ids)
+            self.seed_vectors.extend(vectors)
+            if len(self.seed_ids) < self.n_clusters:
+                return
+            memory_ids, vectors = self.seed_ids, np.vstack(self.seed_vectors)
+            self.seed_ids, self.seed_vectors = [], []
+            self._seed_centroids(vectors)
+
+        for start in range(0, len(memory_ids), self.batch_size):
+            batch_ids = memory_ids[start:start + self.batch_size]
+            batch = vectors[start:start + self.batch_size]
+            self._update_centroids(batch)
+            self._set_labels(batch_ids, np.argmax(batch @ self.centroids.T, axis=1))
+
+    def _seed_centroids(self, vectors: np.ndarray) -> None:
+        """Pick initial centroids with k-means++ seeding."""
+        chosen = [int(self.rng.integers(len(vectors)))]
+        distances = 1.0 - vectors @ vectors[chosen[0]]
+        for _ in range(1, self.n_clusters):
+            weights = np.clip(distances, 0.0, None)
+            total = weights.sum()
+            index = int(self.rng.choice(len(vectors), p=weights / total)) if total > 0 else int(self.rng.integers(len(vectors)))
+            chosen.append(index)
+            distances = np.minimum(distances, 1.0 - vectors @ vectors[index])
+
+        self.centroids = vectors[chosen].copy()
+        self.counts = np.zeros(self.n_clusters, dtype=np.float64)
+
+    def _update_centroids(self, batch: np.ndarray) -> None:
+        """Move each centroid towards the mean of its batch members."""
+        labels = np.argmax(batch @ self.centroids.T, axis=1)
+        batch_counts = np.bincount(labels, minlength=self.n_clusters)
+        sums = np.zeros_like(self.centroids)
+        np.add.at(sums, labels, batch)
+
+        hit = np.flatnonzero(batch_counts)
+        self.counts[hit] += batch_counts[hit]
+        rates = (batch_counts[hit] / self.counts[hit]).astype(np.float32)[:, None]
+        means = sums[hit] / batch_counts[hit][:, None]
+        self.centroids[hit] = VectorIndex.normalize((1.0 - rates) * self.centroids[hit] + rates * means)
+
+    def _set_labels(self, memory_ids: List[str], labels: np.ndarray) -> None:
+        for memory_id, cluster in zip(memory_ids, labels.tolist()):
+            self.assignments[memory_id] = cluster
+            self.members[cluster][memory_id] = None
+        self.version += 1
+
+    def assign(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Find the nearest centroid of each embedding without updating the clusters.
+
+        Args:
+            embeddings: 2-D array of embeddings
+
+        Returns:
+            Cluster number of each embedding
+        """
+        if not self.is_trained:
+            raise ValueError("Embedding clusters are not trained")
+        vectors = VectorIndex.normalize(np.asarray(embeddings, dtype=np.float32).reshape(-1, self.centroids.shape[1]))
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def fit(self, memory_ids: List[str], embeddings: np.ndarray, epochs: int = 3) -> None:
+        """
+        Retrain from scratch and assign every memory.
+
+        Args:
+            memory_ids: Memory IDs
+            embeddings: 2-D array with one embedding per ID
+            epochs: Number of shuffled mini-batch passes
+        """
+        self.clear()
+        if len(memory_ids) < self.n_clusters:
+            self.seed_ids = list(memory_ids)
+            self.seed_vectors = list(VectorIndex.normalize(np.asarray(embeddings, dtype=np.float32)))
+            return
+
+        vectors = VectorIndex.normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(memory_ids), -1))
+        self._seed_centroids(vectors)
+        for _ in range(max(1, epochs)):
+            order = self.rng.permutation(len(vectors))
+            for start in range(0, len(order), self.batch_size):
+                self._update_centroids(vectors[order[start:start + self.batch_size]])
+
+        self._set_labels(list(memory_ids), np.argmax(vectors @ self.centroids.T, axis=1))
+        logger.info(f"Fitted {self.n_clusters} embedding clusters over {len(memory_ids)} memories")
+
+    def remove(self, memory_id: str) -> bool:
+        """
+        Remove a memory from its cluster (centroids are left as they are).
+
+        Args:
+            memory_id: Memory ID
+
+        Returns:
+            True if removed, False if not clustered
+        """
+        cluster = self.assignments.pop(memory_id, None)
+        if cluster is not None:
+            del self.members[cluster][memory_id]
+            self.version += 1
+            return True
+
+        if memory_id in self.seed_ids:
+            index = self.seed_ids.index(memory_id)
+            del self.seed_ids[index]
+            del self.seed_vectors[index]
+            return True
+        return False
+
+    def clear(self) -> None:
+        """Forget the centroids and every assignment."""
+        self.centroids = None
+        self.counts = np.zeros(self.n_clusters, dtype=np.float64)
+        self.assignments = {}
+        self.members = [{} for _ in range(self.n_clusters)]
+        self.seed_ids, self.seed_vectors = [], []
+        self.version += 1
+
+    def clusters(self) -> List[List[str]]:
+        """
+        Get the memories of each cluster.
+
+        Returns:
+            Memory IDs of each non-empty cluster, largest cluster first
+        """
+        return sorted((list(members) for members in self.members if members), key=len, reverse=True)
+
+    def save(self, path: str) -> bool:
+        """
+        Persist the centroids, update counts and assignments.
+
+        Args:
+            path: File path for the cluster state (.npz)
+
+        Returns:
+            True if state was written, False otherwise
+        """
+        if not self.is_trained:
+            return False
+
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    centroids=self.centroids,
+                    counts=self.counts,
+                    ids=np.array(list(self.assignments), dtype=str),
+                    labels=np.array(list(self.assignments.values()), dtype=np.int32)
+                )
+            os.replace(tmp_path, path)
+            logger.info(f"Saved {self.n_clusters} embedding clusters to {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving embedding clusters: {e}")
+            return False
+
+    def load(self, path: str) -> bool:
+        """
+        Restore state saved by save().
+
+        Args:
+            path: File path for the cluster state (.npz)
+
+        Returns:
+            True if state was restored, False otherwise
+        """
+        if not os.path.exists(path):
+            return False
+
+        try:
+            with np.load(path) as state:
+                centroids = state["centroids"].astype(np.float32)
+                counts = state["counts"].astype(np.float64)
+                memory_ids = state["ids"].tolist()
+                labels = state["labels"]
+        except Exception as e:
+            logger.error(f"Error loading embedding clusters: {e}")
+            return False
+
+        if centroids.shape[0] != self.n_clusters:
+            logger.warning(f"Saved embedding clusters have k={centroids.shape[0]}, expected {self.n_clusters}; retraining")
+            return False
+
+        self.clear()
+        self.centroids = centroids
+        self.counts = counts
+        self._set_labels(memory_ids, labels)
+        return True
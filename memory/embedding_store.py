@@ -0,0 +1,366 @@
+"""
+Memory-mapped embedding store for Coda Lite's long-term memory.
+
+This module provides a MemmapVectorIndex that keeps normalized float32
+embeddings in a ``.npy`` file opened with ``numpy.memmap`` and memory IDs in a
+side-car ``.ids.npy`` file. Opening the store maps the files instead of reading
+them, so startup costs the same for ten memories as for a million, and every
+process that opens the store (assistant, dashboard, offline tools) shares the
+same page-cache pages instead of holding its own copy.
+
+Files for a store at ``<path>``:
+- ``<path>.npy``: embedding rows (capacity x dimension, float32)
+- ``<path>.ids.npy``: memory ID of each row (fixed-width bytes)
+- ``<path>.live.npy``: 1 for live rows, 0 for tombstones
+- ``<path>.json``: header with the row count, tombstone count, dimension and the
+  revision of the source database the rows reflect
+
+Deletes only clear the row's live flag; ``compact()`` rewrites the files without
+tombstoned rows.
+"""
+
+import os
+import json
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from .vector_index import VectorIndex
+
+logger = logging.getLogger("coda.memory.embedding_store")
+
+# Format version written to the header
+STORE_VERSION = 1
+
+# Maximum length of a memory ID in bytes (UUIDs use 36)
+ID_BYTES = 64
+
+
+class _IdView:
+    """Read-only sequence view of the memory IDs in the side-car file."""
+
+    def __init__(self, index: "MemmapVectorIndex"):
+        self.index = index
+
+    def __len__(self) -> int:
+        return self.index.count
+
+    def __bool__(self) -> bool:
+        return self.index.count > 0
+
+    def __getitem__(self, position: int) -> str:
+        return self.index.id_array[position].decode("utf-8")
+
+    def __iter__(self):
+        for position in range(self.index.count):
+            yield self[position]
+
+
+class MemmapVectorIndex(VectorIndex):
+    """
+    Exact cosine-similarity index stored in memory-mapped files.
+
+    Responsibilities:
+    - Keep normalized embeddings and their IDs in memory-mapped ``.npy`` files
+    - Open an existing store without reading it (zero-copy, O(1) startup)
+    - Mark deleted rows with tombstones and drop them in an explicit compact()
+    - Let other processes open the same files read-only and pick up changes with refresh()
+
+    Rows are append-only: unlike VectorIndex, removing an ID leaves a tombstone,
+    so ``matrix[:count]`` may contain dead rows that searches skip.
+    """
+
+    def __init__(self,
+                 path: str,
+                 dimension: Optional[int] = None,
+                 initial_capacity: int = 1024,
+                 read_only: bool = False):
+        """
+        Open or create a memory-mapped store.
+
+        Args:
+            path: Path of the store without extension (e.g. "data/memory/long_term/embeddings")
+            dimension: Embedding dimension (inferred from the first vector if None)
+            initial_capacity: Number of rows to preallocate when the store is created
+            read_only: Open the files read-only (for processes that only search)
+        """
+        self.path = path
+        self.matrix_path = f"{path}.npy"
+        self.ids_path = f"{path}.ids.npy"
+        self.live_path = f"{path}.live.npy"
+        self.header_path = f"{path}.json"
+        self.read_only = read_only
+        self.count = 0
+        self.deleted = 0
+        self.id_array: Optional[np.ndarray] = None
+        self.live: Optional[np.ndarray] = None
+        # Revision of the database the rows were last saved from (set by the owner)
+        self.source_revision: Optional[int] = None
+
+        # Rows are allocated as files on the first add, so the base class gets no dimension
+        super().__init__(initial_capacity=initial_capacity, precision="float32", rescore_factor=1)
+        self.dimension = dimension
+
+        if os.path.exists(self.header_path):
+            self._open()
+        elif read_only:
+            raise FileNotFoundError(f"No embedding store at {path}")
+
+    def _reset_ids(self) -> None:
+        """Drop the ID -> row map; the IDs themselves live in the side-car file."""
+        self._positions: Optional[Dict[str, int]] = None
+
+    @property
+    def ids(self) -> _IdView:
+        return _IdView(self)
+
+    @property
+    def positions(self) -> Dict[str, int]:
+        """Map of live memory ID to row, built on first use."""
+        if self._positions is None:
+            live_rows = np.flatnonzero(self.live[:self.count]) if self.count else []
+            self._positions = {self.id_array[row].decode("utf-8"): int(row) for row in live_rows}
+        return self._positions
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self.matrix is None else self.matrix.shape[0]
+
+    def __len__(self) -> int:
+        return self.count - self.deleted
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self.positions
+
+    def _open(self) -> None:
+        """Map the store's files (no data is read)."""
+        with open(self.header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+
+        mode = "r" if self.read_only else "r+"
+        self.matrix = open_memmap(self.matrix_path, mode=mode)
+        self.id_array = open_memmap(self.ids_path, mode=mode)
+        self.live = open_memmap(self.live_path, mode=mode)
+        self.dimension = header["dimension"]
+        self.count = header["count"]
+        self.deleted = header["deleted"]
+        self.source_revision = header.get("source_revision")
+        self._positions = None
+
+    def _write_header(self) -> None:
+        """Atomically record the row and tombstone counts."""
+        for array in (self.matrix, self.id_array, self.live):
+            if array is not None:
+                array.flush()
+
+        header = {
+            "version": STORE_VERSION,
+            "dimension": self.dimension,
+            "count": self.count,
+            "deleted": self.deleted,
+            "source_revision": self.source_revision
+        }
+        temp_path = f"{self.header_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(header, f)
+        os.replace(temp_path, self.header_path)
+
+    def _create_files(self, capacity: int, dimension: int, suffix: str = "") -> List[np.ndarray]:
+        """Create empty store files (optionally with a temporary suffix) and map them."""
+        return [
+            open_memmap(self.matrix_path + suffix, mode="w+", dtype=np.float32, shape=(capacity, dimension)),
+            open_memmap(self.ids_path + suffix, mode="w+", dtype=f"S{ID_BYTES}", shape=(capacity,)),
+            open_memmap(self.live_path + suffix, mode="w+", dtype=np.uint8, shape=(capacity,))
+        ]
+
+    def _rewrite(self, rows: np.ndarray, capacity: int) -> None:
+        """
+        Write the given rows into new files and swap them in atomically.
+
+        Processes that still map the old files keep a consistent view until they refresh().
+        """
+        new_arrays = self._create_files(capacity, self.dimension, suffix=".tmp")
+        for new_array, array in zip(new_arrays, (self.matrix, self.id_array, self.live)):
+            new_array[:len(rows)] = array[rows]
+            new_array.flush()
+
+        # Unmap both generations before renaming (required on Windows)
+        live_count = int(np.count_nonzero(new_arrays[2][:len(rows)]))
+        del new_arrays, new_array, array
+        self.matrix = self.id_array = self.live = None
+
+        for target in (self.matrix_path, self.ids_path, self.live_path):
+            os.replace(target + ".tmp", target)
+
+        self.count = len(rows)
+        self.deleted = self.count - live_count
+        self._write_header()
+        self._open()
+
+    def _allocate(self, capacity: int, dimension: int) -> None:
+        """Create an empty store."""
+        if self.read_only:
+            raise PermissionError(f"Embedding store {self.path} is read-only")
+        self.dimension = dimension
+        self.matrix, self.id_array, self.live = self._create_files(capacity, dimension)
+        self.count = 0
+        self.deleted = 0
+        self._positions = {}
+        self._write_header()
+
+    def _ensure_capacity(self, required_rows: int, dimension: int) -> None:
+        """Grow the store files so they can hold at least required_rows rows."""
+        if self.matrix is None:
+            self._allocate(max(self.initial_capacity, required_rows), dimension)
+            return
+
+        if dimension != self.dimension:
+            raise ValueError(f"Embedding dimension {dimension} does not match index dimension {self.dimension}")
+
+        capacity = self.capacity
+        if required_rows <= capacity:
+            return
+
+        while capacity < required_rows:
+            capacity *= 2
+
+        self._rewrite(np.arange(self.count), capacity)
+
+    def add_encoded_batch(self,
+                          memory_ids: List[str],
+                          codes: np.ndarray,
+                          scales: Optional[np.ndarray] = None) -> None:
+        """
+        Add or replace normalized float32 rows.
+
+        Args:
+            memory_ids: Memory IDs
+            codes: 2-D array of normalized embeddings
+            scales: Unused (the store is always float32)
+        """
+        if not memory_ids:
+            return
+
+        positions = self.positions if self.matrix is not None else {}
+        new_ids = [memory_id for memory_id in dict.fromkeys(memory_ids) if memory_id not in positions]
+        self._ensure_capacity(self.count + len(new_ids), codes.shape[1])
+        positions = self.positions
+
+        for row, memory_id in enumerate(memory_ids):
+            position = positions.get(memory_id)
+            if position is None:
+                encoded_id = memory_id.encode("utf-8")
+                if len(encoded_id) > ID_BYTES:
+                    raise ValueError(f"Memory ID {memory_id} is longer than {ID_BYTES} bytes")
+                position = self.count
+                self.count += 1
+                self.id_array[position] = encoded_id
+                self.live[position] = 1
+                positions[memory_id] = position
+            self.matrix[position] = codes[row]
+
+        self._write_header()
+
+    def remove(self, memory_id: str) -> bool:
+        """
+        Tombstone a memory's row.
+
+        Args:
+            memory_id: Memory ID
+
+        Returns:
+            True if removed, False if not found
+        """
+        return self.remove_batch([memory_id]) == 1
+
+    def remove_batch(self, memory_ids: Iterable[str]) -> int:
+        """
+        Tombstone several memories' rows with one header write.
+
+        Args:
+            memory_ids: Memory IDs
+
+        Returns:
+            Number of memories removed
+        """
+        if self.matrix is None:
+            return 0
+
+        removed = 0
+        positions = self.positions
+        for memory_id in memory_ids:
+            position = positions.pop(memory_id, None)
+            if position is None:
+                continue
+            self.live[position] = 0
+            removed += 1
+
+        if removed:
+            self.deleted += removed
+            self._write_header()
+        return removed
+
+    def clear(self) -> None:
+        """Remove all embeddings from the store."""
+        if self.dimension is not None and not self.read_only:
+            self._allocate(self.initial_capacity, self.dimension)
+
+    def similarities(self, query_embedding: np.ndarray) -> np.ndarray:
+        """
+        Compute cosine similarities between a query and every row.
+
+        Tombstoned rows score -inf so they are never selected.
+
+        Args:
+            query_embedding: Query embedding
+
+        Returns:
+            Array of similarities aligned with row positions
+        """
+        if not self.count:
+            return np.zeros(0, dtype=np.float32)
+
+        query = self.normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+        scores = self.matrix[:self.count] @ query
+        if self.deleted:
+            scores[self.live[:self.count] == 0] = -np.inf
+        return scores
+
+    def compact(self) -> int:
+        """
+        Rewrite the store without tombstoned rows.
+
+        Returns:
+            Number of rows dropped
+        """
+        if self.read_only or not self.deleted:
+            return 0
+
+        dropped = self.deleted
+        live_rows = np.flatnonzero(self.live[:self.count])
+        self._rewrite(live_rows, max(self.initial_capacity, len(live_rows)))
+
+        logger.info(f"Compacted embedding store {self.path}: dropped {dropped} tombstoned rows")
+        return dropped
+
+    def refresh(self) -> None:
+        """Re-map the files to pick up changes made by another process."""
+        if os.path.exists(self.header_path):
+            self._open()
+
+    def save(self, path: str) -> bool:
+        """
+        Flush the mapped files to disk.
+
+        Args:
+            path: Ignored (the store writes to its own files)
+
+        Returns:
+            True if the store was flushed
+        """
+        if self.matrix is None or self.read_only:
+            return False
+        self._write_header()
+        return True
@@ -7,6 +7,7 @@ This module provides an EnhancedMemoryManager class that integrates short-term a
 import os
 import json
 import logging
+import threading
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Union, Tuple
 
@@ -18,6 +19,8 @@ from .temporal_weighting import TemporalWeightingSystem
 from .active_recall import ActiveRecallSystem
 from .self_testing import MemorySelfTestingFramework
 from .summarization import MemorySummarizationSystem
+from .write_pipeline import MemoryWritePipeline, after_pending_writes, reads_after_pending_writes
+from .retrieval_cache import RetrievalCache
 
 logger = logging.getLogger("coda.memory.enhanced")
 
@@ -35,7 +38,9 @@ class EnhancedMemoryManager:
     def __init__(self,
                  config: Dict[str, Any],
                  short_term_memory: Optional[ShortTermMemory] = None,
-                 long_term_memory: Optional[LongTermMemory] = None):
+                 long_term_memory: Optional[LongTermMemory] = None,
+                 model_registry=None,
+                 perf_tracker=None):
         """
         Initialize the enhanced memory manager.
 
@@ -43,6 +48,10 @@ class EnhancedMemoryManager:
             config: Configuration dictionary
             short_term_memory: Optional existing short-term memory instance
             long_term_memory: Optional existing long-term memory instance
+            model_registry: Optional ModelRegistry used to load the embedding model
+                in the background
+            perf_tracker: Optional PerfTracker that receives the embedding and
+                retrieval cache hit/miss counters
         """
         self.config = config
 
@@ -56,19 +65,57 @@ class EnhancedMemoryManager:
         # Initialize long-term memory
         if long_term_memory:
             self.long_term = long_term_memory
+            embedding_cache = getattr(self.long_term, "embedding_cache", None)
+            if embedding_cache is not None and embedding_cache.perf_tracker is None:
+                embedding_cache.perf_tracker = perf_tracker
         else:
             storage_path = config.get("memory", {}).get("long_term_path", "data/memory/long_term")
             embedding_model = config.get("memory", {}).get("embedding_model", "all-MiniLM-L6-v2")
             vector_db_type = config.get("memory", {}).get("vector_db", "chroma")
             max_memories = config.get("memory", {}).get("max_memories", 1000)
             device = config.get("memory", {}).get("device", "cpu")
+            metadata_compaction_threshold = config.get("memory", {}).get("metadata_compaction_threshold", 500)
+            embedding_cache_size = config.get("memory", {}).get("embedding_cache_size", 10000)
+            embedding_cache_persist = config.get("memory", {}).get("embedding_cache_persist", False)
+            vector_index_type = config.get("memory", {}).get("vector_index", "exact")
+            embedding_precision = config.get("memory", {}).get("embedding_precision", "float32")
+            rescore_factor = config.get("memory", {}).get("rescore_factor", 4)
+            embedding_store = config.get("memory", {}).get("embedding_store", "memory")
+            retrieval_mode = config.get("memory", {}).get("retrieval_mode", "vector")
+            hybrid_lexical_weight = config.get("memory", {}).get("hybrid_lexical_weight", 0.3)
+            clustering_mode = config.get("memory", {}).get("clustering_mode", "topics")
+            embedding_clusters = config.get("memory", {}).get("embedding_cluster_count", 8) if clustering_mode == "embedding" else 0
+            integrity_shards = config.get("memory", {}).get("integrity_shards", 64)
+            prune_high_water = config.get("memory", {}).get("prune_high_water", 1.0)
+            prune_batch_size = config.get("memory", {}).get("prune_batch_size", 256)
+            vector_index_options = {
+                key: config["memory"][f"ann_{key}"]
+                for key in ("nlist", "nprobe", "min_train_size")
+                if f"ann_{key}" in config.get("memory", {})
+            }
 
             self.long_term = LongTermMemory(
                 storage_path=storage_path,
                 embedding_model=embedding_model,
                 vector_db_type=vector_db_type,
                 max_memories=max_memories,
-                device=device
+                device=device,
+                metadata_compaction_threshold=metadata_compaction_threshold,
+                embedding_cache_size=embedding_cache_size,
+                embedding_cache_persist=embedding_cache_persist,
+                vector_index_type=vector_index_type,
+                vector_index_options=vector_index_options,
+                model_registry=model_registry,
+                embedding_precision=embedding_precision,
+                rescore_factor=rescore_factor,
+                embedding_store=embedding_store,
+                retrieval_mode=retrieval_mode,
+                hybrid_lexical_weight=hybrid_lexical_weight,
+                embedding_clusters=embedding_clusters,
+                integrity_shards=integrity_shards,
+                prune_high_water=prune_high_water,
+                prune_batch_size=prune_batch_size,
+                perf_tracker=perf_tracker
             )
 
         # Initialize memory encoder
@@ -86,22 +133,35 @@ class EnhancedMemoryManager:
         snapshot_dir = config.get("memory", {}).get("snapshot_dir", "data/memory/snapshots")
         auto_snapshot = config.get("memory", {}).get("auto_snapshot", False)
         snapshot_interval = config.get("memory", {}).get("snapshot_interval", 10)
+        snapshot_format = config.get("memory", {}).get("snapshot_format", "json")
+        snapshot_compression = config.get("memory", {}).get("snapshot_compression", "gzip")
+        full_snapshot_interval = config.get("memory", {}).get("full_snapshot_interval", 20)
 
         self.snapshot_manager = MemorySnapshotManager(
             memory_manager=self,
             snapshot_dir=snapshot_dir,
             auto_snapshot=auto_snapshot,
-            snapshot_interval=snapshot_interval
+            snapshot_interval=snapshot_interval,
+            snapshot_format=snapshot_format,
+            snapshot_compression=snapshot_compression,
+            full_snapshot_interval=full_snapshot_interval
         )
 
         # Initialize temporal weighting system
         self.temporal_weighting = TemporalWeightingSystem(config)
 
+        # Cache of recent retrievals, invalidated by the long-term store's generation
+        self.retrieval_cache = RetrievalCache(
+            max_entries=config.get("memory", {}).get("retrieval_cache_size", 256),
+            perf_tracker=perf_tracker
+        )
+
         # Initialize active recall system
         self.active_recall = ActiveRecallSystem(memory_manager=self, config=config)
 
         # Initialize self-testing framework
         self.self_testing = MemorySelfTestingFramework(memory_manager=self, config=config)
+        self.integrity_check_background = config.get("memory", {}).get("integrity_check_background", False)
 
         # Initialize summarization system
         self.summarization = MemorySummarizationSystem(memory_manager=self, config=config)
@@ -114,6 +174,32 @@ class EnhancedMemoryManager:
         self.auto_persist = config.get("memory", {}).get("auto_persist", True)
         self.persist_interval = config.get("memory", {}).get("persist_interval", 5)
         self.turn_count_at_last_persist = 0
+        # Turn count up to which persistence is queued on the write pipeline
+        self.turn_count_at_last_queued_persist = 0
+        # Turns queued for the next background persist (kept across failed persists)
+        self.queued_persist_turns: List[Dict[str, Any]] = []
+        # Guards the persist counters, which the writer thread updates as persists finish
+        self.persist_lock = threading.Lock()
+
+        # Apply persistence and snapshot bookkeeping on a background writer
+        self.write_pipeline = None
+        if config.get("memory", {}).get("async_writes", False):
+            self.write_pipeline = MemoryWritePipeline(
+                max_pending=config.get("memory", {}).get("write_queue_size", 64)
+            )
+
+        # Prune in low-priority background batches instead of inside add_memories: on the
+        # writer with async_writes, otherwise on a pruning thread of its own
+        self.prune_pipeline = None
+        if self.write_pipeline is not None:
+            self.long_term.prune_scheduler = lambda job: self.write_pipeline.submit(
+                job, key="prune_memories", low_priority=True
+            )
+        elif config.get("memory", {}).get("background_pruning", True):
+            self.prune_pipeline = MemoryWritePipeline(max_pending=4, name="memory-pruner")
+            self.long_term.prune_scheduler = lambda job: self.prune_pipeline.submit(
+                job, key="prune_memories", low_priority=True
+            )
 
         logger.info("EnhancedMemoryManager initialized with active recall, self-testing, and summarization")
 
@@ -137,16 +223,80 @@ class EnhancedMemoryManager:
 
         # Check if we should persist to long-term memory
         if self.auto_persist and role == "assistant":
-            turns_since_persist = self.short_term.turn_count - self.turn_count_at_last_persist
+            with self.persist_lock:
+                turns_since_persist = self.short_term.turn_count - max(self.turn_count_at_last_persist,
+                                                                       self.turn_count_at_last_queued_persist)
             if turns_since_persist >= self.persist_interval:
-                self.persist_short_term_memory()
+                if self.write_pipeline is not None:
+                    self._queue_persist()
+                else:
+                    self.persist_short_term_memory()
 
         # Check if we should create an automatic snapshot
         if role == "assistant":
-            self.snapshot_manager.check_auto_snapshot()
+            if self.write_pipeline is not None:
+                if self.snapshot_manager.auto_snapshot:
+                    self.write_pipeline.submit(self.snapshot_manager.check_auto_snapshot, key="auto_snapshot")
+            else:
+                self.snapshot_manager.check_auto_snapshot()
 
         return turn
 
+    def _queue_persist(self) -> None:
+        """Queue persisting the turns added since the last queued persist on the write pipeline."""
+        turn_count = self.short_term.turn_count
+        with self.persist_lock:
+            first_turn_id = max(self.turn_count_at_last_persist, self.turn_count_at_last_queued_persist)
+            self.queued_persist_turns.extend(
+                turn for turn in self.short_term.turns if turn.get("turn_id", first_turn_id) >= first_turn_id
+            )
+            self.turn_count_at_last_queued_persist = turn_count
+
+        # A persist that is still queued picks up these turns too, so turns that scroll
+        # out of the short-term buffer before the writer gets to them are not lost
+        self.write_pipeline.submit(self._persist_queued_turns, key="persist_short_term", store_write=True)
+
+    def _persist_queued_turns(self) -> int:
+        """
+        Store the turns queued for background persistence.
+
+        Runs on the writer thread (or inline when the pipeline is closed). If storing
+        fails, the turns stay queued and are stored with the next persist.
+
+        Returns:
+            Number of memories stored
+        """
+        with self.persist_lock:
+            turns, self.queued_persist_turns = self.queued_persist_turns, []
+            turn_count = self.turn_count_at_last_queued_persist
+        if not turns:
+            return 0
+
+        try:
+            stored_count = self._store_turns(turns)
+        except Exception:
+            with self.persist_lock:
+                self.queued_persist_turns[:0] = turns
+            raise
+
+        with self.persist_lock:
+            self.turn_count_at_last_persist = max(self.turn_count_at_last_persist, turn_count)
+        return stored_count
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for queued background memory writes to be applied.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if every queued write was applied, False on timeout
+        """
+        if self.write_pipeline is None:
+            return True
+        return self.write_pipeline.flush(timeout)
+
     def get_context(self, max_tokens: int = 800) -> List[Dict[str, str]]:
         """
         Get conversation context from short-term memory.
@@ -159,6 +309,18 @@ class EnhancedMemoryManager:
         """
         return self.short_term.get_context(max_tokens=max_tokens)
 
+    def get_context_diff(self, max_tokens: int = 800) -> Dict[str, Any]:
+        """
+        Get conversation context from short-term memory and how it changed since the previous call.
+
+        Args:
+            max_tokens: Maximum number of tokens to include
+
+        Returns:
+            Dictionary with "context", "reset", "dropped" and "added" (see MemoryManager.get_context_diff)
+        """
+        return self.short_term.get_context_diff(max_tokens=max_tokens)
+
     def get_enhanced_context(self,
                             user_input: str,
                             max_tokens: int = 800,
@@ -249,19 +411,25 @@ class EnhancedMemoryManager:
 
         return context
 
+    @reads_after_pending_writes
     def retrieve_relevant_memories(self,
                                  query: str,
                                  limit: int = 5,  # Increased from 3 to 5
                                  min_similarity: float = 0.3,
-                                 apply_temporal_weighting: bool = True) -> List[Dict[str, Any]]:
+                                 apply_temporal_weighting: bool = True,
+                                 filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Retrieve relevant memories based on the query.
 
+        Results are cached per query and parameters until the long-term store
+        changes; temporal weighting is recomputed on every call.
+
         Args:
             query: The query text
             limit: Maximum number of memories to retrieve
             min_similarity: Minimum similarity score (lowered for better recall)
             apply_temporal_weighting: Whether to apply temporal weighting to the results
+            filter_criteria: Optional metadata filter criteria
 
         Returns:
             List of relevant memories
@@ -271,52 +439,17 @@ class EnhancedMemoryManager:
             # Retrieve more memories than needed for better filtering with temporal weighting
             retrieve_limit = limit * 2 if apply_temporal_weighting else limit
 
-            memories = self.long_term.retrieve_memories(
-                query=query,
-                limit=retrieve_limit,
-                min_similarity=min_similarity
+            # Reuse the candidates of an identical recent retrieval while the store is unchanged
+            cache_key = self.retrieval_cache.make_key(
+                query, limit, min_similarity, filter_criteria, apply_temporal_weighting
             )
-
-            # Log the results
-            if memories:
-                logger.info(f"Retrieved {len(memories)} memories for query: {query[:50]}...")
-                for i, memory in enumerate(memories):
-                    similarity = memory.get('similarity', 0)
-                    content_preview = memory.get('content', '')[:50] + '...'
-                    logger.debug(f"Memory {i+1}: similarity={similarity:.2f}, content={content_preview}")
+            generation = self.long_term.generation
+            memories = self.retrieval_cache.get(cache_key, generation)
+            if memories is None:
+                memories = self._retrieve_candidates(query, retrieve_limit, min_similarity, filter_criteria)
+                self.retrieval_cache.put(cache_key, generation, memories)
             else:
-                logger.info(f"No memories found for query: {query[:50]}...")
-
-                # If no memories found with semantic search, try keyword search
-                # This is a fallback mechanism to ensure we get some results
-                logger.debug("Attempting keyword-based fallback search")
-
-                # Extract keywords from the query (simple approach)
-                keywords = [word.lower() for word in query.split() if len(word) > 3]
-
-                if keywords:
-                    # Get all memories and filter manually
-                    all_memories = []
-                    for memory_id in self.long_term.metadata["memories"]:
-                        memory = self.long_term.get_memory_by_id(memory_id)
-                        if memory:
-                            all_memories.append(memory)
-
-                    # Score memories based on keyword matches
-                    scored_memories = []
-                    for memory in all_memories:
-                        content = memory.get('content', '').lower()
-                        score = sum(1 for keyword in keywords if keyword in content)
-                        if score > 0:
-                            memory['similarity'] = score / len(keywords)  # Normalize score
-                            scored_memories.append(memory)
-
-                    # Sort by score and take top results
-                    scored_memories.sort(key=lambda x: x.get('similarity', 0), reverse=True)
-                    memories = scored_memories[:retrieve_limit]
-
-                    if memories:
-                        logger.info(f"Found {len(memories)} memories using keyword search")
+                logger.info(f"Retrieval cache hit for query: {query[:50]}...")
 
             # Apply temporal weighting if requested and memories were found
             if apply_temporal_weighting and memories:
@@ -348,73 +481,168 @@ class EnhancedMemoryManager:
             logger.error(f"Error retrieving memories: {e}", exc_info=True)
             return []  # Return empty list on error
 
+    def _retrieve_candidates(self,
+                             query: str,
+                             limit: int,
+                             min_similarity: float,
+                             filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve candidate memories, falling back to keyword search.
+
+        Args:
+            query: The query text
+            limit: Maximum number of memories to retrieve
+            min_similarity: Minimum similarity score
+            filter_criteria: Optional metadata filter criteria
+
+        Returns:
+            Candidate memories before temporal weighting
+        """
+        memories = self.long_term.retrieve_memories(
+            query=query,
+            limit=limit,
+            min_similarity=min_similarity,
+            filter_criteria=filter_criteria
+        )
+
+        # Log the results
+        if memories:
+            logger.info(f"Retrieved {len(memories)} memories for query: {query[:50]}...")
+            for i, memory in enumerate(memories):
+                similarity = memory.get('similarity', 0)
+                content_preview = memory.get('content', '')[:50] + '...'
+                logger.debug(f"Memory {i+1}: similarity={similarity:.2f}, content={content_preview}")
+        else:
+            logger.info(f"No memories found for query: {query[:50]}...")
+
+            # If no memories found with semantic search, try keyword search
+            # This is a fallback mechanism to ensure we get some results
+            logger.debug("Attempting keyword-based fallback search")
+            memories = self.long_term.lexical_search(query, limit=limit, filter_criteria=filter_criteria)
+
+            if memories:
+                logger.info(f"Found {len(memories)} memories using keyword search")
+
+        return memories
+
+    @after_pending_writes
     def persist_short_term_memory(self) -> int:
         """
         Persist short-term memory to long-term storage.
 
+        Returns:
+            Number of memories stored
+        """
+        # Get all turns from short-term memory
+        turns = list(self.short_term.turns)
+
+        # Skip if no turns
+        if not turns:
+            logger.info("No turns to persist")
+            return 0
+
+        # Skip if we've already persisted these turns
+        with self.persist_lock:
+            already_persisted = self.turn_count_at_last_persist >= self.short_term.turn_count
+        if already_persisted:
+            logger.info("Turns already persisted")
+            return 0
+
+        return self._persist_turns(turns, self.short_term.turn_count)
+
+    def _persist_turns(self, turns: List[Dict[str, Any]], turn_count: int) -> int:
+        """
+        Encode conversation turns and store them in long-term memory.
+
+        Args:
+            turns: Turns to persist
+            turn_count: Short-term turn count at the time the turns were taken
+
         Returns:
             Number of memories stored
         """
         try:
-            # Get all turns from short-term memory
-            turns = list(self.short_term.turns)
+            stored_count = self._store_turns(turns)
+        except Exception as e:
+            logger.error(f"Error persisting short-term memory: {e}", exc_info=True)
+            return 0
 
-            # Skip if no turns
-            if not turns:
-                logger.info("No turns to persist")
-                return 0
+        # Update last persist turn count
+        with self.persist_lock:
+            self.turn_count_at_last_persist = max(self.turn_count_at_last_persist, turn_count)
+        return stored_count
 
-            # Skip if we've already persisted these turns
-            if self.turn_count_at_last_persist >= self.short_term.turn_count:
-                logger.info("Turns already persisted")
-                return 0
+    def _store_turns(self, turns: List[Dict[str, Any]]) -> int:
+        """
+        Encode conversation turns and add them to long-term memory.
+
+        Args:
+            turns: Turns to persist
 
-            # Log the turns we're about to persist
-            logger.debug(f"Persisting {len(turns)} turns from short-term memory")
-            for i, turn in enumerate(turns):
-                role = turn.get('role', 'unknown')
-                content_preview = turn.get('content', '')[:50] + '...' if len(turn.get('content', '')) > 50 else turn.get('content', '')
-                logger.debug(f"Turn {i+1}: role={role}, content={content_preview}")
+        Returns:
+            Number of memories stored
 
-            # Encode conversation into memory chunks
-            memories = self.encoder.encode_conversation(turns)
-            logger.debug(f"Encoded {len(memories)} memory chunks from {len(turns)} turns")
+        Raises:
+            Exception: If encoding or storing fails
+        """
+        # Log the turns we're about to persist
+        logger.debug(f"Persisting {len(turns)} turns from short-term memory")
+        for i, turn in enumerate(turns):
+            role = turn.get('role', 'unknown')
+            content_preview = turn.get('content', '')[:50] + '...' if len(turn.get('content', '')) > 50 else turn.get('content', '')
+            logger.debug(f"Turn {i+1}: role={role}, content={content_preview}")
 
-            # Store memories
-            stored_count = 0
-            for memory in memories:
-                try:
-                    # Ensure memory has required fields
-                    if "content" not in memory:
-                        logger.warning(f"Skipping memory chunk without content: {memory}")
-                        continue
+        # Encode conversation into memory chunks
+        memories = self.encoder.encode_conversation(turns)
+        logger.debug(f"Encoded {len(memories)} memory chunks from {len(turns)} turns")
 
-                    # Add memory to long-term storage
-                    memory_id = self.long_term.add_memory(
-                        content=memory["content"],
-                        source_type=memory.get("source_type", "conversation"),
-                        importance=memory.get("importance", 0.5),
-                        metadata=memory.get("metadata", {})
-                    )
+        # Store all chunks in one batch (one encode call, one insert, one metadata write)
+        memory_ids = self.add_memories(memories)
+        if memories and not memory_ids:
+            # add_memories logs and swallows storage errors
+            raise RuntimeError(f"Failed to store {len(memories)} memory chunks")
+        stored_count = len(memory_ids)
 
-                    # Log the persisted memory
-                    content_preview = memory["content"][:50] + '...' if len(memory["content"]) > 50 else memory["content"]
-                    logger.debug(f"Persisted memory {memory_id}: {content_preview}")
+        logger.info(f"Persisted {stored_count} memories from short-term memory")
+        return stored_count
 
-                    stored_count += 1
-                except Exception as e:
-                    logger.error(f"Error persisting memory chunk: {e}", exc_info=True)
+    @after_pending_writes
+    def add_memories(self, memories: List[Dict[str, Any]]) -> List[str]:
+        """
+        Add several memories to long-term memory in one batch.
 
-            # Update last persist turn count
-            self.turn_count_at_last_persist = self.short_term.turn_count
+        Args:
+            memories: Memories to store, each a dictionary with "content" and optional
+                "source_type", "importance" and "metadata" keys
+
+        Returns:
+            IDs of the stored memories
+        """
+        # Ensure memories have required fields
+        valid_memories = []
+        for memory in memories:
+            if "content" not in memory:
+                logger.warning(f"Skipping memory chunk without content: {memory}")
+                continue
+            valid_memories.append(memory)
 
-            logger.info(f"Persisted {stored_count} memories from short-term memory")
-            return stored_count
+        if not valid_memories:
+            return []
 
+        try:
+            memory_ids = self.long_term.add_memories(valid_memories)
         except Exception as e:
-            logger.error(f"Error persisting short-term memory: {e}", exc_info=True)
-            return 0
+            logger.error(f"Error adding memories: {e}", exc_info=True)
+            return []
+
+        # Log the persisted memories
+        for memory_id, memory in zip(memory_ids, valid_memories):
+            content_preview = memory["content"][:50] + '...' if len(memory["content"]) > 50 else memory["content"]
+            logger.debug(f"Persisted memory {memory_id}: {content_preview}")
 
+        return memory_ids
+
+    @after_pending_writes
     def add_fact(self,
                 fact: str,
                 source: str = "user",
@@ -449,6 +677,7 @@ class EnhancedMemoryManager:
 
         return memory_id
 
+    @after_pending_writes
     def add_preference(self,
                       preference: str,
                       metadata: Optional[Dict[str, Any]] = None) -> str:
@@ -477,6 +706,7 @@ class EnhancedMemoryManager:
 
         return memory_id
 
+    @after_pending_writes
     def add_feedback(self,
                     feedback: Dict[str, Any]) -> str:
         """
@@ -559,19 +789,6 @@ class EnhancedMemoryManager:
 
         return preferences
 
-    def search_memories(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """
-        Search for relevant memories based on a query.
-
-        Args:
-            query: The search query
-            limit: Maximum number of results to return
-
-        Returns:
-            List of memory dictionaries
-        """
-        return self.long_term.retrieve_memories(query, limit=limit)
-
     def _extract_and_update_topics(self, text: str) -> List[str]:
         """
         Extract topics from text and update recent topics.
@@ -660,6 +877,7 @@ class EnhancedMemoryManager:
 
         return self.short_term.reset()
 
+    @reads_after_pending_writes
     def get_memory_stats(self) -> Dict[str, Any]:
         """
         Get statistics about memory usage.
@@ -694,7 +912,8 @@ class EnhancedMemoryManager:
             "recent_topics": self.recent_topics,
             "last_tool_used": self.last_tool_used,
             "active_recall": active_recall_stats,
-            "self_testing": self_testing_stats
+            "self_testing": self_testing_stats,
+            "retrieval_cache": self.retrieval_cache.get_stats()
         }
 
     def get_day_summary(self) -> str:
@@ -784,6 +1003,7 @@ class EnhancedMemoryManager:
 
         return summary
 
+    @after_pending_writes
     def add_feedback(self, feedback: Dict[str, Any]) -> bool:
         """
         Add feedback to memory.
@@ -831,6 +1051,7 @@ class EnhancedMemoryManager:
             logger.error(f"Error adding feedback to memory: {e}")
             return False
 
+    @reads_after_pending_writes
     def get_feedback_memories(self, feedback_type: str = None, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Get feedback memories from long-term memory.
@@ -879,6 +1100,7 @@ class EnhancedMemoryManager:
             logger.error(f"Error getting feedback memories: {e}")
             return []
 
+    @after_pending_writes
     def create_snapshot(self, snapshot_id: Optional[str] = None) -> str:
         """
         Create a snapshot of the current memory state.
@@ -891,6 +1113,7 @@ class EnhancedMemoryManager:
         """
         return self.snapshot_manager.create_snapshot(snapshot_id)
 
+    @after_pending_writes
     def save_snapshot(self, snapshot_id: Optional[str] = None, filepath: Optional[str] = None) -> str:
         """
         Create and save a snapshot to disk.
@@ -921,6 +1144,7 @@ class EnhancedMemoryManager:
         """
         return self.snapshot_manager.load_snapshot(filepath)
 
+    @after_pending_writes
     def apply_snapshot(self, snapshot_id: str) -> bool:
         """
         Apply a snapshot to the memory system.
@@ -955,6 +1179,7 @@ class EnhancedMemoryManager:
         """Disable automatic snapshots."""
         self.snapshot_manager.disable_auto_snapshot()
 
+    @after_pending_writes
     def update_memory(self,
                       memory_id: str,
                       content: Optional[str] = None,
@@ -1009,6 +1234,7 @@ class EnhancedMemoryManager:
             logger.error(f"Error updating memory: {e}", exc_info=True)
             return False
 
+    @after_pending_writes
     def reinforce_memory(self,
                         memory_id: str,
                         reinforcement_strength: float = 1.0) -> bool:
@@ -1045,6 +1271,7 @@ class EnhancedMemoryManager:
             logger.error(f"Error reinforcing memory: {e}", exc_info=True)
             return False
 
+    @reads_after_pending_writes
     def search_memories(self,
                        query: str,
                        memory_type: Optional[str] = None,
@@ -1063,7 +1290,7 @@ class EnhancedMemoryManager:
             List of matching memories
         """
         try:
-            # First try semantic search
+            # Semantic search with keyword fallback, through the retrieval cache
             memories = self.retrieve_relevant_memories(
                 query=query,
                 limit=limit,
@@ -1071,32 +1298,6 @@ class EnhancedMemoryManager:
                 apply_temporal_weighting=True
             )
 
-            # If no results, try keyword search
-            if not memories:
-                # Extract keywords from the query
-                keywords = self._extract_keywords(query)
-
-                if keywords:
-                    # Get all memories and filter manually
-                    all_memories = []
-                    for memory_id in self.long_term.metadata["memories"]:
-                        memory = self.long_term.get_memory_by_id(memory_id)
-                        if memory:
-                            all_memories.append(memory)
-
-                    # Score memories based on keyword matches
-                    scored_memories = []
-                    for memory in all_memories:
-                        content = memory.get('content', '').lower()
-                        score = sum(1 for keyword in keywords if keyword in content)
-                        if score > 0:
-                            memory['similarity'] = score / len(keywords)  # Normalize score
-                            scored_memories.append(memory)
-
-                    # Sort by score and take top results
-                    scored_memories.sort(key=lambda x: x.get('similarity', 0), reverse=True)
-                    memories = scored_memories[:limit]
-
             # Filter by memory type and importance
             if memory_type or min_importance > 0:
                 filtered_memories = []
@@ -1119,6 +1320,7 @@ class EnhancedMemoryManager:
             logger.error(f"Error searching memories: {e}", exc_info=True)
             return []
 
+    @after_pending_writes
     def forget_memories(self, max_memories: Optional[int] = None) -> int:
         """
         Apply forgetting mechanism to remove less important memories.
@@ -1143,29 +1345,18 @@ class EnhancedMemoryManager:
                 logger.info(f"Memory count {memory_count} is under limit {max_memories}, no forgetting needed")
                 return 0
 
-            # Get all memories
-            memories = []
-            for memory_id, memory_data in self.long_term.metadata.get("memories", {}).items():
-                memory = self.long_term.get_memory_by_id(memory_id)
-                if memory:
-                    memory["id"] = memory_id
-                    memories.append(memory)
+            # Score every memory in one vectorized pass over the metadata entries
+            memory_items = list(self.long_term.metadata.get("memories", {}).items())
+            columns = self.temporal_weighting.build_columns([memory_data for _, memory_data in memory_items])
+            forget_rows = self.temporal_weighting.select_memories_to_forget(
+                columns,
+                current_memory_count=memory_count,
+                max_memories=max_memories
+            )
 
-            # Apply temporal weighting to determine which memories to forget
-            forgotten_count = 0
-            for memory in memories:
-                # Check if we should forget this memory
-                if self.temporal_weighting.should_forget_memory(
-                    memory=memory,
-                    current_memory_count=memory_count - forgotten_count,
-                    max_memories=max_memories
-                ):
-                    # Remove the memory
-                    memory_id = memory.get("id")
-                    if memory_id:
-                        self.long_term.remove_memory(memory_id)
-                        forgotten_count += 1
-                        logger.debug(f"Forgot memory {memory_id}: {memory.get('content', '')[:50]}...")
+            # Remove the selected memories in one batched delete
+            forget_ids = [memory_items[row][0] for row in forget_rows]
+            forgotten_count = self.long_term.delete_memories(forget_ids)
 
             logger.info(f"Forgot {forgotten_count} memories based on temporal weighting")
             return forgotten_count
@@ -1208,6 +1399,7 @@ class EnhancedMemoryManager:
         """
         self.active_recall.record_review(memory_id, success)
 
+    @after_pending_writes
     def run_memory_maintenance(self) -> Dict[str, Any]:
         """
         Run memory maintenance tasks.
@@ -1216,6 +1408,7 @@ class EnhancedMemoryManager:
         - Active recall scheduled tasks
         - Self-testing consistency checks
         - Memory forgetting mechanism
+        - Compaction of the memory-mapped embedding store
 
         Returns:
             Dictionary with maintenance results
@@ -1224,7 +1417,8 @@ class EnhancedMemoryManager:
             "timestamp": datetime.now().isoformat(),
             "active_recall": None,
             "self_testing": None,
-            "forgetting": None
+            "forgetting": None,
+            "compaction": None
         }
 
         # Run active recall tasks
@@ -1234,9 +1428,13 @@ class EnhancedMemoryManager:
             logger.error(f"Error running active recall tasks: {e}")
             results["active_recall"] = {"error": str(e)}
 
-        # Run self-testing tasks
+        # Run self-testing tasks (re-verifies memories changed since the last check)
         try:
-            results["self_testing"] = self.self_testing.run_consistency_check()
+            if self.integrity_check_background:
+                started = self.self_testing.start_background_check()
+                results["self_testing"] = {"status": "started" if started else "running"}
+            else:
+                results["self_testing"] = self.self_testing.run_consistency_check()
         except Exception as e:
             logger.error(f"Error running self-testing tasks: {e}")
             results["self_testing"] = {"error": str(e)}
@@ -1252,6 +1450,16 @@ class EnhancedMemoryManager:
             logger.error(f"Error running forgetting mechanism: {e}")
             results["forgetting"] = {"error": str(e)}
 
+        # Drop tombstoned embeddings once they make up a quarter of the store
+        try:
+            min_tombstone_ratio = self.config.get("memory", {}).get("embedding_compaction_ratio", 0.25)
+            results["compaction"] = {
+                "dropped_rows": self.long_term.compact_embeddings(min_tombstone_ratio)
+            }
+        except Exception as e:
+            logger.error(f"Error compacting embedding store: {e}")
+            results["compaction"] = {"error": str(e)}
+
         return results
 
     def test_memory_retrieval(self, query: str, expected_memory_ids: List[str]) -> Dict[str, Any]:
@@ -1276,6 +1484,19 @@ class EnhancedMemoryManager:
         """
         return self.self_testing.run_retrieval_test_suite()
 
+    def test_vector_index_recall(self, k: int = 10, sample_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Test the recall@k of the long-term vector index against exact search.
+
+        Args:
+            k: Number of neighbours compared per query
+            sample_size: Number of queries
+
+        Returns:
+            Dictionary with test results
+        """
+        return self.self_testing.test_vector_index_recall(k, sample_size)
+
     def cluster_memories_by_topic(self, force_update: bool = False) -> Dict[str, List[Dict[str, Any]]]:
         """
         Cluster memories by topic.
@@ -1349,6 +1570,16 @@ class EnhancedMemoryManager:
 
     def close(self) -> None:
         """Close memory manager and save state."""
+        # Apply queued background writes before the final snapshot and persist
+        if self.write_pipeline is not None:
+            self.write_pipeline.close()
+            # Retry turns whose background persist failed
+            if self.queued_persist_turns:
+                try:
+                    self._persist_queued_turns()
+                except Exception as e:
+                    logger.error(f"Error persisting queued turns on close: {e}")
+
         # Create final snapshot if auto-snapshot is enabled
         if self.snapshot_manager.auto_snapshot:
             self.create_snapshot("final_snapshot")
@@ -1357,6 +1588,16 @@ class EnhancedMemoryManager:
         if self.auto_persist:
             self.persist_short_term_memory()
 
+        # Finish queued pruning batches
+        if self.prune_pipeline is not None:
+            self.prune_pipeline.close()
+
+        # Persist the review schedule
+        self.active_recall.close()
+
+        # Let a background integrity check finish before the store closes
+        self.self_testing.wait_for_background_check()
+
         # Close long-term memory
         self.long_term.close()
 
@@ -0,0 +1,264 @@
+"""
+Integrity index for Coda Lite's long-term memory.
+
+This module provides an IntegrityIndex class that keeps a checksum of every
+verified memory record (content, metadata and an embedding digest), grouped
+into shards by memory ID. Each shard has a Merkle-style root over its sorted
+record checksums, and the shard roots roll up into a single store checksum.
+Writes only mark records dirty, so integrity checks re-verify the dirty records,
+a store with no dirty records is known clean by comparing O(shards) roots, and
+a full audit only drills into the shards whose recomputed root differs.
+"""
+
+import os
+import json
+import zlib
+import hashlib
+import logging
+import threading
+from itertools import count
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("coda.memory.integrity_index")
+
+
+def record_checksum(content: str, metadata: Dict[str, Any], embedding: Optional[np.ndarray]) -> str:
+    """
+    Checksum of a stored memory record.
+
+    Args:
+        content: Full memory content
+        metadata: Stored memory metadata
+        embedding: Stored embedding (None if the backend has none)
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha1()
+    digest.update(content.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(metadata, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    digest.update(b"\0")
+    if embedding is not None:
+        digest.update(hashlib.sha1(np.ascontiguousarray(embedding, dtype=np.float32).tobytes()).digest())
+    return digest.hexdigest()
+
+
+class IntegrityIndex:
+    """
+    Per-record checksums with per-shard rollups.
+
+    Responsibilities:
+    - Keep the checksum of each record as it was last verified, grouped into shards
+    - Track records changed since they were verified (dirty records); a record
+      that changes again while it is being verified stays dirty
+    - Compute shard roots lazily and roll them up into a store checksum
+    - Compare a shard against checksums recomputed from storage, root first
+    - Persist checksums between clean shutdowns
+    """
+
+    def __init__(self, n_shards: int = 64):
+        """
+        Initialize an empty index.
+
+        Args:
+            n_shards: Number of shards the memory IDs are hashed into
+        """
+        self.n_shards = max(1, n_shards)
+        self.shards: List[Dict[str, str]] = [{} for _ in range(self.n_shards)]
+        self.roots: List[Optional[str]] = [None] * self.n_shards
+        self.dirty: Dict[str, int] = {}  # memory ID -> change number when marked dirty
+        self._changes = count(1)
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def shard_of(self, memory_id: str) -> int:
+        """Get the shard number of a memory ID."""
+        return zlib.crc32(memory_id.encode("utf-8")) % self.n_shards
+
+    def checksum(self, memory_id: str) -> Optional[str]:
+        """Get the verified checksum of a record (None if not verified)."""
+        return self.shards[self.shard_of(memory_id)].get(memory_id)
+
+    def mark_dirty(self, memory_ids: Iterable[str]) -> None:
+        """
+        Mark records as changed since they were verified.
+
+        Args:
+            memory_ids: Memory IDs
+        """
+        with self.lock:
+            for memory_id in memory_ids:
+                self.dirty.pop(memory_id, None)
+                self.dirty[memory_id] = next(self._changes)
+
+    def dirty_ids(self, limit: Optional[int] = None) -> Dict[str, int]:
+        """
+        Get the records waiting for verification, least recently changed first.
+
+        Args:
+            limit: Maximum number of IDs (None for all)
+
+        Returns:
+            Memory ID -> change number, to pass back to update()
+        """
+        with self.lock:
+            if limit is None:
+                return dict(self.dirty)
+            return {memory_id: change for (memory_id, change), _ in zip(self.dirty.items(), range(limit))}
+
+    def update(self, memory_id: str, checksum: str, change: Optional[int] = None) -> bool:
+        """
+        Store the checksum of a verified record and clear its dirty flag.
+
+        Args:
+            memory_id: Memory ID
+            checksum: Record checksum (see record_checksum)
+            change: Change number from dirty_ids() when the record was read; if the
+                record was marked dirty again or removed since, nothing is stored
+
+        Returns:
+            True if the checksum was stored, False if the record changed meanwhile
+        """
+        with self.lock:
+            if change is not None and self.dirty.get(memory_id) != change:
+                return False
+            shard = self.shard_of(memory_id)
+            if self.shards[shard].get(memory_id) != checksum:
+                self.shards[shard][memory_id] = checksum
+                self.roots[shard] = None
+            self.dirty.pop(memory_id, None)
+            return True
+
+    def remove(self, memory_id: str) -> bool:
+        """
+        Forget a deleted record.
+
+        Args:
+            memory_id: Memory ID
+
+        Returns:
+            True if the record had a checksum, False otherwise
+        """
+        with self.lock:
+            self.dirty.pop(memory_id, None)
+            shard = self.shard_of(memory_id)
+            if self.shards[shard].pop(memory_id, None) is None:
+                return False
+            self.roots[shard] = None
+            return True
+
+    def clear(self) -> None:
+        """Forget every checksum."""
+        with self.lock:
+            self.shards = [{} for _ in range(self.n_shards)]
+            self.roots = [None] * self.n_shards
+            self.dirty = {}
+
+    @staticmethod
+    def _root(checksums: Dict[str, str]) -> str:
+        digest = hashlib.sha1()
+        for memory_id in sorted(checksums):
+            digest.update(f"{memory_id}:{checksums[memory_id]}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def root(self, shard: int) -> str:
+        """Get the root checksum of a shard (recomputed only after it changed)."""
+        with self.lock:
+            if self.roots[shard] is None:
+                self.roots[shard] = self._root(self.shards[shard])
+            return self.roots[shard]
+
+    def rollup(self) -> str:
+        """Get the checksum of the whole store from the shard roots."""
+        return hashlib.sha1("".join(self.root(shard) for shard in range(self.n_shards)).encode("utf-8")).hexdigest()
+
+    def is_clean(self) -> bool:
+        """Check that every record has been verified since it last changed."""
+        return not self.dirty
+
+    def diff_shard(self, shard: int, checksums: Dict[str, str]) -> List[str]:
+        """
+        Compare a shard with checksums recomputed from storage.
+
+        Args:
+            shard: Shard number
+            checksums: Memory ID -> recomputed checksum for every record of the shard
+
+        Returns:
+            IDs whose checksum differs, is missing or is unexpected (empty if the roots match)
+        """
+        if self._root(checksums) == self.root(shard):
+            return []
+        with self.lock:
+            verified = dict(self.shards[shard])
+        return sorted(
+            memory_id for memory_id in verified.keys() | checksums.keys()
+            if verified.get(memory_id) != checksums.get(memory_id)
+        )
+
+    def save(self, path: str) -> bool:
+        """
+        Persist the checksums, shard roots and dirty records.
+
+        Args:
+            path: File path for the index (.json)
+
+        Returns:
+            True if the index was written, False otherwise
+        """
+        with self.lock:
+            state = {
+                "n_shards": self.n_shards,
+                "shards": self.shards,
+                "roots": [self.root(shard) for shard in range(self.n_shards)],
+                "dirty": list(self.dirty)
+            }
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            logger.info(f"Saved integrity index for {len(self)} memories to {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving integrity index: {e}")
+            return False
+
+    def load(self, path: str) -> bool:
+        """
+        Restore an index saved by save(); shards whose root does not match are dropped.
+
+        Args:
+            path: File path for the index (.json)
+
+        Returns:
+            True if the index was restored, False otherwise
+        """
+        if not os.path.exists(path):
+            return False
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading integrity index: {e}")
+            return False
+
+        if state.get("n_shards") != self.n_shards:
+            logger.warning(f"Saved integrity index has {state.get('n_shards')} shards, expected {self.n_shards}")
+            return False
+
+        self.clear()
+        for shard, (checksums, root) in enumerate(zip(state["shards"], state["roots"])):
+            if self._root(checksums) == root:
+                self.shards[shard] = checksums
+                self.roots[shard] = root
+            else:
+                logger.warning(f"Integrity index shard {shard} is damaged; its records will be re-verified")
+        self.mark_dirty(state.get("dirty", []))
+        return True
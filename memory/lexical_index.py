@@ -0,0 +1,273 @@
+"""
+Lexical index for Coda Lite's long-term memory.
+
+This module provides a BM25Index class, an inverted index over memory content
+that is updated incrementally as memories are added, updated and deleted. A
+query only touches the posting lists of its own terms, so keyword search no
+longer loads and scans every memory.
+"""
+
+import os
+import re
+import json
+import math
+import logging
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("coda.memory.lexical_index")
+
+# Format version written by BM25Index.save
+LEXICAL_INDEX_VERSION = 1
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Very common words that carry no lexical signal
+STOPWORDS = frozenset("""
+a about an and are as at be but by can could did do does for from had has have he her his how i if in
+is it its me my of on or our she so than that the their them then there these they this to up was we
+were what when where which who why will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase index terms.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Terms in order of appearance (stopwords and single characters removed)
+    """
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+class BM25Index:
+    """
+    Incrementally maintained inverted index with BM25 scoring.
+
+    Responsibilities:
+    - Keep a posting list (memory ID -> term frequency) per term, and the
+      term counts of each document so it can be removed without a scan
+    - Add, replace and remove documents without rebuilding the index
+    - Score queries with Okapi BM25 over the posting lists of the query terms
+    - Persist the index next to the memory store and restore it at startup
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize an empty index.
+
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self.doc_lengths
+
+    @property
+    def average_length(self) -> float:
+        return self.total_length / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def add(self, memory_id: str, content: str) -> None:
+        """
+        Add or replace a document.
+
+        Args:
+            memory_id: Memory ID
+            content: Memory content
+        """
+        self.add_batch([memory_id], [content])
+
+    def add_batch(self, memory_ids: List[str], contents: List[str]) -> None:
+        """
+        Add or replace several documents.
+
+        Args:
+            memory_ids: Memory IDs
+            contents: Memory contents, one per ID
+        """
+        for memory_id, content in zip(memory_ids, contents):
+            self._add_terms(memory_id, Counter(tokenize(content)))
+
+    def _add_terms(self, memory_id: str, term_counts: Dict[str, int]) -> None:
+        """Index a document given its term counts."""
+        if memory_id in self.doc_lengths:
+            self.remove(memory_id)
+
+        for term, count in term_counts.items():
+            self.postings.setdefault(term, {})[memory_id] = count
+
+        length = sum(term_counts.values())
+        self.doc_terms[memory_id] = dict(term_counts)
+        self.doc_lengths[memory_id] = length
+        self.total_length += length
+
+    def remove(self, memory_id: str) -> bool:
+        """
+        Remove a document.
+
+        Args:
+            memory_id: Memory ID
+
+        Returns:
+            True if removed, False if not indexed
+        """
+        length = self.doc_lengths.pop(memory_id, None)
+        if length is None:
+            return False
+
+        self.total_length -= length
+        for term in self.doc_terms.pop(memory_id):
+            posting = self.postings[term]
+            del posting[memory_id]
+            if not posting:
+                del self.postings[term]
+        return True
+
+    def remove_batch(self, memory_ids: Iterable[str]) -> int:
+        """
+        Remove several documents.
+
+        Args:
+            memory_ids: Memory IDs
+
+        Returns:
+            Number of documents removed
+        """
+        return sum(1 for memory_id in memory_ids if self.remove(memory_id))
+
+    def clear(self) -> None:
+        """Remove every document."""
+        self.postings = {}
+        self.doc_lengths = {}
+        self.doc_terms = {}
+        self.total_length = 0
+
+    def idf(self, term: str) -> float:
+        """
+        Inverse document frequency of a term (BM25 variant, never negative).
+
+        Args:
+            term: Index term
+
+        Returns:
+            IDF weight (0.0 for unknown terms)
+        """
+        document_frequency = len(self.postings.get(term, ()))
+        if not document_frequency:
+            return 0.0
+        return math.log(1.0 + (len(self.doc_lengths) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def score(self, query: str) -> Dict[str, float]:
+        """
+        Score every document that contains at least one query term.
+
+        Args:
+            query: Query text
+
+        Returns:
+            Dictionary mapping memory ID to BM25 score
+        """
+        scores: Dict[str, float] = {}
+        average_length = self.average_length or 1.0
+
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self.idf(term)
+            for memory_id, frequency in posting.items():
+                length_norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[memory_id] / average_length)
+                scores[memory_id] = scores.get(memory_id, 0.0) + idf * frequency * (self.k1 + 1.0) / (frequency + length_norm)
+
+        return scores
+
+    def search(self,
+               query: str,
+               limit: int = 5,
+               predicate: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Find the best-matching documents for a query.
+
+        Args:
+            query: Query text
+            limit: Maximum number of results
+            predicate: Optional filter called with a memory ID
+
+        Returns:
+            List of (memory_id, BM25 score) tuples sorted by score (descending)
+        """
+        if limit <= 0:
+            return []
+
+        ranked = sorted(self.score(query).items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for memory_id, score in ranked:
+            if predicate is not None and not predicate(memory_id):
+                continue
+            results.append((memory_id, score))
+            if len(results) >= limit:
+                break
+        return results
+
+    def save(self, path: str) -> bool:
+        """
+        Write the index to a JSON file (atomically).
+
+        Args:
+            path: File path
+
+        Returns:
+            True if written, False on error
+        """
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": LEXICAL_INDEX_VERSION, "documents": self.doc_terms}, f)
+            os.replace(temp_path, path)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving lexical index to {path}: {e}")
+            return False
+
+    def load(self, path: str) -> bool:
+        """
+        Replace the index with one saved by save().
+
+        Args:
+            path: File path
+
+        Returns:
+            True if loaded, False if the file is missing or unreadable
+        """
+        if not os.path.exists(path):
+            return False
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != LEXICAL_INDEX_VERSION:
+                return False
+        except Exception as e:
+            logger.error(f"Error loading lexical index from {path}: {e}")
+            return False
+
+        self.clear()
+        for memory_id, term_counts in data["documents"].items():
+            self._add_terms(memory_id, term_counts)
+        return True
@@ -10,11 +10,25 @@ import logging
 import time
 import uuid
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Union, Tuple
+from typing import Callable, List, Dict, Any, Optional, Union, Tuple
 
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from .ann_index import create_vector_index
+from .vector_index import VectorIndex, quantize_int8
+from .embedding_store import MemmapVectorIndex
+from .lexical_index import BM25Index
+from .topic_index import TopicIndex
+from .integrity_index import IntegrityIndex, record_checksum
+from .retention_index import RetentionIndex
+from .memory_stats import MemoryStats, stats_contribution
+from .concurrency import ReadWriteLock, SQLiteReaderPool, reads, writes
+from .embedding_clusters import EmbeddingClusters
+from .embedding_cache import EmbeddingCache
+from .memory_filters import build_chroma_where, build_sql_filter, matches_filter, memory_topics, parse_search_query
+from .metadata_journal import MetadataJournal, set_op, delete_op, append_unique_op
+
 # Try to import different vector database options
 try:
     import chromadb
@@ -30,6 +44,21 @@ except ImportError:
 
 logger = logging.getLogger("coda.memory.long_term")
 
+# SQLite limits the number of bound parameters per statement
+SQLITE_MAX_VARIABLES = 900
+
+# Version of the SQLite schema, stored in PRAGMA user_version
+SQLITE_SCHEMA_VERSION = 3
+
+# Rows read per batch when loading or migrating embeddings
+SQLITE_EMBEDDING_BATCH = 10000
+
+# Candidates taken from each ranking per requested result in hybrid retrieval
+HYBRID_CANDIDATE_FACTOR = 4
+
+# Chroma results requested per wanted result when part of a filter is checked in Python
+CHROMA_FILTER_OVERFETCH = 4
+
 class LongTermMemory:
     """
     Manages long-term memory for Coda using vector embeddings.
@@ -39,6 +68,8 @@ class LongTermMemory:
     - Retrieve relevant memories based on semantic similarity
     - Maintain metadata about memories (time, importance, etc.)
     - Support time-based decay and relevance weighting
+    - Let retrievals run in parallel with each other while writes run one at a
+      time (reader-writer lock; WAL-mode SQLite with per-thread read connections)
 
     Features:
     - Vector-based semantic search
@@ -52,7 +83,23 @@ class LongTermMemory:
                  embedding_model: str = "all-MiniLM-L6-v2",
                  vector_db_type: str = "chroma",
                  max_memories: int = 1000,
-                 device: str = "cpu"):
+                 device: str = "cpu",
+                 metadata_compaction_threshold: int = 500,
+                 embedding_cache_size: int = 10000,
+                 embedding_cache_persist: bool = False,
+                 perf_tracker=None,
+                 vector_index_type: str = "exact",
+                 vector_index_options: Optional[Dict[str, Any]] = None,
+                 model_registry=None,
+                 embedding_precision: str = "float32",
+                 rescore_factor: int = 4,
+                 embedding_store: str = "memory",
+                 retrieval_mode: str = "vector",
+                 hybrid_lexical_weight: float = 0.3,
+                 embedding_clusters: int = 0,
+                 integrity_shards: int = 64,
+                 prune_high_water: float = 1.0,
+                 prune_batch_size: int = 256):
         """
         Initialize the long-term memory system.
 
@@ -62,24 +109,114 @@ class LongTermMemory:
             vector_db_type: Type of vector database to use ("chroma" or "sqlite")
             max_memories: Maximum number of memories to store
             device: Device to run the embedding model on ("cpu" or "cuda")
+            metadata_compaction_threshold: Number of metadata journal entries before
+                the journal is compacted into metadata.json
+            embedding_cache_size: Maximum number of embeddings cached in memory
+            embedding_cache_persist: Whether to persist cached embeddings to
+                embedding_cache.db so they survive restarts
+            perf_tracker: Optional PerfTracker that receives embedding cache metrics
+            vector_index_type: Vector index for the sqlite and in-memory backends
+                ("exact" or "ivf" for approximate nearest-neighbour search)
+            vector_index_options: Index options (e.g. nlist, nprobe, min_train_size for "ivf")
+            model_registry: Optional ModelRegistry that loads the embedding model in the
+                background; the first encode waits for it
+            embedding_precision: Precision of the resident vector index ("float32",
+                "float16" or "int8"); reduced precisions rescore their top candidates
+                against the full-precision embeddings stored in SQLite. Only the
+                sqlite backend saves resident memory: the in-memory backend keeps
+                its float32 embeddings as the rescoring source
+            rescore_factor: Number of first-pass candidates per requested result
+                when rescoring reduced-precision searches
+            embedding_store: Where the sqlite backend keeps its vector index: "memory"
+                (rebuilt from SQLite at startup) or "mmap" (memory-mapped
+                embeddings.npy store that is opened without reading it)
+            retrieval_mode: Default retrieval mode: "vector", "lexical" (BM25) or
+                "hybrid" (vector and BM25 scores fused)
+            hybrid_lexical_weight: Weight of the normalized BM25 score in hybrid mode
+            embedding_clusters: Number of mini-batch k-means clusters maintained over
+                the embeddings for summarization (0 disables embedding clustering)
+            integrity_shards: Number of shards of the per-record integrity checksums
+            prune_high_water: Pruning starts once the store holds more than
+                prune_high_water * max_memories memories, and removes memories
+                down to max_memories
+            prune_batch_size: Maximum number of memories removed per pruning batch
         """
         self.storage_path = storage_path
+        # Read side for retrievals, write side for every change to the store and its indexes
+        self.lock = ReadWriteLock()
         self.max_memories = max_memories
+        self.prune_high_water = max(1.0, prune_high_water)
+        self.prune_batch_size = max(1, prune_batch_size)
+        # Optional callable that runs pruning jobs in the background (set by the
+        # memory manager); without it, pruning runs inline in add_memories
+        self.prune_scheduler = None
         self.vector_db_type = vector_db_type
+        self.vector_index_type = vector_index_type
+        self.vector_index_options = vector_index_options or {}
+        self.embedding_precision = embedding_precision
+        self.rescore_factor = rescore_factor
+        self.embedding_store = embedding_store
+        self.retrieval_mode = retrieval_mode
+        self.hybrid_lexical_weight = hybrid_lexical_weight
+        self.lexical_index_path = os.path.join(storage_path, "lexical_index.json")
+
+        # Bumped by every change to the stored memories (see _save_metadata)
+        self.generation = 0
+        # Topic -> memory ID index, kept in step with the metadata by _save_metadata
+        self.topic_index = TopicIndex()
+        # Per-record checksums; _save_metadata marks changed memories for re-verification
+        self.integrity_index = IntegrityIndex(n_shards=integrity_shards)
+        self.integrity_index_path = os.path.join(storage_path, "integrity_index.json")
+        # Memories ordered by retention score, for pruning
+        self.retention_index = RetentionIndex()
+        # Running counts and sums behind get_memory_stats, kept in step by _save_metadata
+        self.memory_stats = MemoryStats()
+        self.memory_stats_path = os.path.join(storage_path, "memory_stats.json")
+        self.embedding_clusters = EmbeddingClusters(n_clusters=embedding_clusters) if embedding_clusters > 0 else None
+        self.embedding_clusters_path = os.path.join(storage_path, "embedding_clusters.npz")
+        # Called with the IDs of deleted or pruned memories (see add_deletion_listener)
+        self.deletion_listeners: List[Callable[[List[str]], None]] = []
+        self.vector_index_path = os.path.join(storage_path, "memories.ann.npz")
 
         # Create storage directory if it doesn't exist
         os.makedirs(storage_path, exist_ok=True)
 
         # Initialize embedding model
         logger.info(f"Initializing embedding model {embedding_model} on {device}")
-        self.embedding_model = SentenceTransformer(embedding_model, device=device)
+        if model_registry is not None:
+            self.embedding_model = model_registry.load(
+                f"sentence_transformer:{embedding_model}:{device}",
+                lambda: SentenceTransformer(embedding_model, device=device)
+            )
+        else:
+            self.embedding_model = SentenceTransformer(embedding_model, device=device)
+        self.embedding_cache = EmbeddingCache(
+            # Resolve encode on each call so a background-loading model is awaited lazily
+            encode_fn=lambda texts: self.embedding_model.encode(texts),
+            model_name=embedding_model,
+            max_entries=embedding_cache_size,
+            persist_path=os.path.join(storage_path, "embedding_cache.db") if embedding_cache_persist else None,
+            perf_tracker=perf_tracker
+        )
 
         # Initialize vector database
         self._init_vector_db()
 
         # Initialize memory metadata
         self.metadata_path = os.path.join(storage_path, "metadata.json")
+        self.metadata_journal = MetadataJournal(
+            self.metadata_path,
+            compaction_threshold=metadata_compaction_threshold
+        )
         self.metadata = self._load_metadata()
+        self._rebuild_topic_index()
+        self._load_integrity_index()
+        self._load_memory_stats()
+
+        # Initialize the BM25 index used for keyword and hybrid retrieval
+        self.lexical_index = BM25Index()
+        self._load_lexical_index()
+        self._load_embedding_clusters()
 
         logger.info(f"LongTermMemory initialized with {len(self.metadata['memories'])} memories")
 
@@ -95,14 +232,43 @@ class LongTermMemory:
         elif self.vector_db_type == "sqlite" and SQLITE_AVAILABLE:
             logger.info(f"Initializing SQLite vector database at {self.storage_path}")
             db_path = os.path.join(self.storage_path, "memories.db")
-            self.conn = sqlite3.connect(db_path)
+            # Writer connection; reads go through per-thread connections (see _reader)
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            self.readers = SQLiteReaderPool(db_path)
             self._init_sqlite_db()
+            self.vector_index = self._create_vector_index()
+            self.vector_index.full_precision_loader = self._fetch_sqlite_embeddings
+            self._load_vector_index()
         else:
             logger.warning(f"Vector database type {self.vector_db_type} not available, falling back to in-memory")
             self.vector_db_type = "in_memory"
             self.vectors = {}
             self.contents = {}
             self.vector_metadata = {}
+            self.vector_index = self._create_vector_index()
+            self.vector_index.full_precision_loader = lambda memory_ids: np.vstack(
+                [self.vectors[memory_id] for memory_id in memory_ids]
+            )
+            if self.embedding_precision != "float32":
+                logger.info(f"The in-memory backend keeps float32 embeddings for rescoring; "
+                            f"embedding_precision {self.embedding_precision} only speeds up its first pass")
+
+    def _create_vector_index(self) -> VectorIndex:
+        """Create the vector index for the sqlite and in-memory backends."""
+        if self.embedding_store == "mmap" and self.vector_db_type == "sqlite":
+            if self.vector_index_type != "exact" or self.embedding_precision != "float32":
+                logger.warning("The mmap embedding store is an exact float32 index; "
+                               "ignoring vector_index and embedding_precision")
+            return MemmapVectorIndex(os.path.join(self.storage_path, "embeddings"))
+
+        return create_vector_index(
+            self.vector_index_type,
+            precision=self.embedding_precision,
+            rescore_factor=self.rescore_factor,
+            **self.vector_index_options
+        )
 
     def _init_sqlite_db(self):
         """Initialize the SQLite database schema."""
@@ -118,47 +284,517 @@ class LongTermMemory:
         )
         ''')
         self.conn.commit()
+        self._migrate_sqlite_schema()
+
+    def _migrate_sqlite_schema(self) -> None:
+        """Upgrade the SQLite schema to SQLITE_SCHEMA_VERSION."""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SQLITE_SCHEMA_VERSION:
+            return
+
+        with self.conn:
+            if version < 1:
+                # Indexed columns for filter pushdown, backfilled from the metadata JSON
+                columns = {row[1] for row in self.conn.execute("PRAGMA table_info(memories)")}
+                if "source_type" not in columns:
+                    self.conn.execute("ALTER TABLE memories ADD COLUMN source_type TEXT")
+                self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS memory_topics (
+                    memory_id TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    PRIMARY KEY (memory_id, topic)
+                ) WITHOUT ROWID
+                ''')
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_source_type ON memories (source_type)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_timestamp ON memories (timestamp)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_importance ON memories (importance)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_memory_topics_topic ON memory_topics (topic)")
+
+                rows = self.conn.execute("SELECT id, metadata FROM memories").fetchall()
+                source_types = []
+                topic_rows = []
+                for memory_id, metadata_str in rows:
+                    metadata = json.loads(metadata_str)
+                    source_types.append((metadata.get("source_type"), memory_id))
+                    topic_rows.extend((memory_id, topic) for topic in memory_topics(metadata))
+                self.conn.executemany("UPDATE memories SET source_type = ? WHERE id = ?", source_types)
+                self.conn.executemany("INSERT OR IGNORE INTO memory_topics VALUES (?, ?)", topic_rows)
+                logger.info(f"Migrated {len(rows)} memories to SQLite schema version 1")
+
+            if version < 2:
+                # Int8 codes of the normalized embeddings, loaded instead of float32 in int8 mode
+                columns = {row[1] for row in self.conn.execute("PRAGMA table_info(memories)")}
+                if "embedding_int8" not in columns:
+                    self.conn.execute("ALTER TABLE memories ADD COLUMN embedding_int8 BLOB")
+                if "embedding_scale" not in columns:
+                    self.conn.execute("ALTER TABLE memories ADD COLUMN embedding_scale REAL")
+
+                # Page by rowid so rows are never updated under an open SELECT cursor
+                migrated = 0
+                last_rowid = -1
+                while True:
+                    rows = self.conn.execute(
+                        "SELECT rowid, id, embedding FROM memories WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                        (last_rowid, SQLITE_EMBEDDING_BATCH)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    embeddings = np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+                    self.conn.executemany(
+                        "UPDATE memories SET embedding_int8 = ?, embedding_scale = ? WHERE id = ?",
+                        [
+                            (codes, scale, row[1])
+                            for row, (codes, scale) in zip(rows, self._int8_columns(embeddings))
+                        ]
+                    )
+                    migrated += len(rows)
+                    last_rowid = rows[-1][0]
+                logger.info(f"Migrated {migrated} memories to SQLite schema version 2")
+
+            if version < 3:
+                # Counter bumped by every embedding change, however the database is written;
+                # the memory-mapped store records the value it reflects
+                self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS embedding_revision (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    revision INTEGER NOT NULL
+                )
+                ''')
+                self.conn.execute("INSERT OR IGNORE INTO embedding_revision VALUES (0, 0)")
+                for name, event in (("insert", "INSERT"), ("delete", "DELETE"), ("update", "UPDATE OF embedding")):
+                    self.conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS memories_{name}_embedding_revision AFTER {event} ON memories
+                    BEGIN
+                        UPDATE embedding_revision SET revision = revision + 1 WHERE id = 0;
+                    END
+                    ''')
+
+            self.conn.execute(f"PRAGMA user_version = {SQLITE_SCHEMA_VERSION}")
+
+    @staticmethod
+    def _int8_columns(embeddings: np.ndarray) -> List[Tuple[bytes, float]]:
+        """Quantize embeddings to the (embedding_int8, embedding_scale) column values."""
+        codes, scales = quantize_int8(VectorIndex.normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)))
+        return [(row.tobytes(), float(scale)) for row, scale in zip(codes, scales)]
+
+    def _reader(self) -> "sqlite3.Connection":
+        """Get the connection for reads: the writer's inside a write, the thread's own otherwise."""
+        if self.lock.write_held:
+            return self.conn
+        return self.readers.connection()
+
+    def _fetch_sqlite_embeddings(self, memory_ids: List[str]) -> np.ndarray:
+        """
+        Fetch full-precision embeddings for several memories.
+
+        Args:
+            memory_ids: Memory IDs
+
+        Returns:
+            2-D float32 array with one embedding per ID, in order
+        """
+        embeddings = {}
+        for start in range(0, len(memory_ids), SQLITE_MAX_VARIABLES):
+            chunk = memory_ids[start:start + SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            for memory_id, embedding_bytes in self._reader().execute(
+                f"SELECT id, embedding FROM memories WHERE id IN ({placeholders})",
+                chunk
+            ):
+                embeddings[memory_id] = np.frombuffer(embedding_bytes, dtype=np.float32)
+        return np.vstack([embeddings[memory_id] for memory_id in memory_ids])
+
+    def _select_sqlite_ids(self,
+                           filter_criteria: Dict[str, Any],
+                           order_by: Optional[str] = None,
+                           limit: Optional[int] = None) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Select the IDs of memories matching the indexed part of filter criteria.
+
+        Args:
+            filter_criteria: Filter criteria
+            order_by: Optional ORDER BY clause
+            limit: Optional maximum number of IDs (only applied when every criterion
+                was pushed into SQL)
+
+        Returns:
+            Tuple of (matching memory IDs, criteria that must still be checked in Python)
+        """
+        clauses, params, remaining = build_sql_filter(filter_criteria)
+        sql = "SELECT id FROM memories"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        if limit is not None and not remaining:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [row[0] for row in self._reader().execute(sql, params)], remaining
+
+    def _sqlite_topic_rows(self, memory_ids: List[str], metadatas: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """Build memory_topics rows for memories."""
+        return [
+            (memory_id, topic)
+            for memory_id, metadata in zip(memory_ids, metadatas)
+            for topic in memory_topics(metadata)
+        ]
+
+    def _load_vector_index(self) -> None:
+        """Build the in-process vector index from the embeddings stored in SQLite."""
+        if isinstance(self.vector_index, MemmapVectorIndex):
+            # The mapped store is used as is unless it has drifted from the database:
+            # a different row count, or embeddings written since it was last saved
+            row_count = self.conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+            revision = self._embedding_revision()
+            if len(self.vector_index) == row_count and self.vector_index.source_revision == revision:
+                logger.info(f"Opened memory-mapped embedding store with {row_count} embeddings")
+                return
+            logger.warning(f"Embedding store ({len(self.vector_index)} embeddings, revision "
+                           f"{self.vector_index.source_revision}) does not match memories.db ({row_count}, "
+                           f"revision {revision}); rebuilding it")
+            self.vector_index.clear()
+
+        # In int8 mode the stored codes are loaded directly; the float32 embedding is
+        # only read for rows that have no codes yet
+        use_int8_columns = self.vector_index.precision == "int8"
+        if use_int8_columns:
+            cursor = self.conn.execute(
+                "SELECT id, embedding_int8, embedding_scale, "
+                "CASE WHEN embedding_int8 IS NULL THEN embedding END FROM memories"
+            )
+        else:
+            cursor = self.conn.execute("SELECT id, NULL, NULL, embedding FROM memories")
+
+        # Load in batches so a full float32 copy of the store is never held at once
+        while True:
+            rows = cursor.fetchmany(SQLITE_EMBEDDING_BATCH)
+            if not rows:
+                break
+
+            encoded = [row for row in rows if row[1] is not None]
+            if encoded:
+                codes = np.vstack([np.frombuffer(row[1], dtype=np.int8) for row in encoded])
+                scales = np.array([row[2] for row in encoded], dtype=np.float32)
+                self.vector_index.add_encoded_batch([row[0] for row in encoded], codes, scales)
+
+            full_precision = [row for row in rows if row[1] is None]
+            if full_precision:
+                embeddings = np.vstack([np.frombuffer(row[3], dtype=np.float32) for row in full_precision])
+                self.vector_index.add_batch([row[0] for row in full_precision], embeddings)
+
+        # Reuse persisted ANN clusters instead of retraining
+        if len(self.vector_index) and self.vector_index.load(self.vector_index_path):
+            logger.info(f"Restored vector index state from {self.vector_index_path}")
+
+        logger.info(f"Loaded {len(self.vector_index)} embeddings into the vector index "
+                    f"({self.vector_index.precision})")
+
+    def _embedding_revision(self) -> int:
+        """Get the counter of embedding changes in memories.db."""
+        return self.conn.execute("SELECT revision FROM embedding_revision WHERE id = 0").fetchone()[0]
+
+    @writes
+    def compact_embeddings(self, min_tombstone_ratio: float = 0.0) -> int:
+        """
+        Drop deleted rows from the memory-mapped embedding store.
+
+        Args:
+            min_tombstone_ratio: Only compact when at least this fraction of the
+                store's rows are tombstones
+
+        Returns:
+            Number of rows dropped (0 for other vector indexes)
+        """
+        index = getattr(self, "vector_index", None)
+        if not isinstance(index, MemmapVectorIndex) or not index.deleted:
+            return 0
+        if index.deleted < min_tombstone_ratio * index.count:
+            return 0
+        return index.compact()
+
+    def _load_lexical_index(self) -> None:
+        """Restore the lexical index, rebuilding it if it does not match the stored memories."""
+        if self.lexical_index.load(self.lexical_index_path) and \
+                self.lexical_index.doc_lengths.keys() == self.metadata["memories"].keys():
+            # The saved index is only trusted until the next clean close
+            os.remove(self.lexical_index_path)
+            logger.info(f"Restored lexical index with {len(self.lexical_index)} memories")
+            return
+
+        self.lexical_index.clear()
+        if self.vector_db_type == "chroma":
+            results = self.collection.get(include=["documents"])
+            self.lexical_index.add_batch(results["ids"], results["documents"])
+        elif self.vector_db_type == "sqlite":
+            cursor = self.conn.execute("SELECT id, content FROM memories")
+            while True:
+                rows = cursor.fetchmany(SQLITE_EMBEDDING_BATCH)
+                if not rows:
+                    break
+                self.lexical_index.add_batch([row[0] for row in rows], [row[1] for row in rows])
+        else:  # in-memory
+            self.lexical_index.add_batch(list(self.contents), list(self.contents.values()))
+
+        logger.info(f"Built lexical index over {len(self.lexical_index)} memories")
+
+    def _load_embedding_clusters(self) -> None:
+        """Restore the embedding clusters and bring them in step with the store, or fit them."""
+        if self.embedding_clusters is None:
+            return
+
+        memory_ids = list(self.metadata["memories"])
+        try:
+            if self.embedding_clusters.load(self.embedding_clusters_path):
+                stale_ids = [memory_id for memory_id in self.embedding_clusters.assignments
+                             if memory_id not in self.metadata["memories"]]
+                for memory_id in stale_ids:
+                    self.embedding_clusters.remove(memory_id)
+                missing_ids = [memory_id for memory_id in memory_ids if memory_id not in self.embedding_clusters]
+                if missing_ids:
+                    self.embedding_clusters.partial_fit(missing_ids, self._fetch_embeddings(missing_ids))
+                logger.info(f"Restored embedding clusters ({len(missing_ids)} memories assigned, "
+                            f"{len(stale_ids)} dropped)")
+            elif memory_ids:
+                self.embedding_clusters.fit(memory_ids, self._fetch_embeddings(memory_ids))
+        except Exception as e:
+            logger.error(f"Error loading embedding clusters: {e}")
+            self.embedding_clusters.clear()
+
+    def _fetch_embeddings(self, memory_ids: List[str]) -> np.ndarray:
+        """
+        Fetch the stored embeddings of several memories from any backend.
+
+        Args:
+            memory_ids: Memory IDs (all must be stored)
+
+        Returns:
+            2-D float32 array with one embedding per ID, in order
+        """
+        if self.vector_db_type == "chroma":
+            results = self.collection.get(ids=memory_ids, include=["embeddings"])
+            embeddings = dict(zip(results["ids"], results["embeddings"]))
+            return np.array([embeddings[memory_id] for memory_id in memory_ids], dtype=np.float32)
+        elif self.vector_db_type == "sqlite":
+            return self._fetch_sqlite_embeddings(memory_ids)
+        else:  # in-memory
+            return np.vstack([self.vectors[memory_id] for memory_id in memory_ids])
+
+    def _fetch_sqlite_rows(self, memory_ids: List[str]) -> Dict[str, Tuple[str, str, float, str]]:
+        """
+        Fetch content, timestamp, importance and metadata for several memories.
+
+        Args:
+            memory_ids: Memory IDs to fetch
+
+        Returns:
+            Dictionary mapping memory ID to (content, timestamp, importance, metadata_str)
+        """
+        rows = {}
+        cursor = self._reader().cursor()
+        for start in range(0, len(memory_ids), SQLITE_MAX_VARIABLES):
+            chunk = memory_ids[start:start + SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(
+                f"SELECT id, content, timestamp, importance, metadata FROM memories WHERE id IN ({placeholders})",
+                chunk
+            )
+            for memory_id, content, timestamp, importance, metadata_str in cursor.fetchall():
+                rows[memory_id] = (content, timestamp, importance, metadata_str)
+        return rows
+
+    @staticmethod
+    def _matches_filter(metadata: Dict[str, Any], filter_criteria: Dict[str, Any]) -> bool:
+        """Check whether memory metadata matches all filter criteria."""
+        return matches_filter(metadata, filter_criteria)
 
     def _load_metadata(self) -> Dict[str, Any]:
-        """Load memory metadata from file or create default."""
-        if os.path.exists(self.metadata_path):
-            try:
-                with open(self.metadata_path, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                logger.info(f"Loaded metadata with {len(metadata.get('memories', []))} memories")
-                return metadata
-            except Exception as e:
-                logger.error(f"Error loading metadata: {e}")
-
-        # Create default metadata
-        metadata = {
-            "created_at": datetime.now().isoformat(),
-            "last_updated": datetime.now().isoformat(),
-            "memory_count": 0,
-            "memories": {},
-            "user_summary": {},
-            "topics": []
-        }
+        """Load memory metadata from the snapshot and journal, or create default."""
+        def default_metadata() -> Dict[str, Any]:
+            return {
+                "created_at": datetime.now().isoformat(),
+                "last_updated": datetime.now().isoformat(),
+                "memory_count": 0,
+                "memories": {},
+                "user_summary": {},
+                "topics": []
+            }
+
+        return self.metadata_journal.load(default_metadata)
 
-        # Save default metadata
-        self._save_metadata(metadata)
+    @writes
+    def _save_metadata(self,
+                       metadata: Optional[Dict[str, Any]] = None,
+                       changes: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Save memory metadata.
 
-        return metadata
+        With ``changes``, the operations are applied to the metadata and appended to
+        the journal, which costs O(size of the change). Without ``changes``, a full
+        snapshot is written atomically (use after modifying the metadata in place).
 
-    def _save_metadata(self, metadata: Optional[Dict[str, Any]] = None) -> None:
-        """Save memory metadata to file."""
+        Args:
+            metadata: Metadata to save (defaults to this store's metadata)
+            changes: Journal operations (see memory.metadata_journal) describing the update
+        """
         if metadata is None:
             metadata = self.metadata
 
-        metadata["last_updated"] = datetime.now().isoformat()
+        # Any change to the stored memories invalidates cached retrievals
+        if changes is None or any(change["path"][:1] == ["memories"] for change in changes):
+            self.generation += 1
+
+        touched = self._touched_memory_ids(changes) if metadata is self.metadata else None
+        # What the touched memories contributed to the statistics before the change
+        stats_before = None
+        if touched is not None:
+            stats_before = {
+                memory_id: stats_contribution(self.metadata["memories"].get(memory_id))
+                for memory_id in touched
+            }
 
         try:
-            with open(self.metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2, ensure_ascii=False)
+            if changes is not None:
+                self.metadata_journal.apply(metadata, changes)
+            else:
+                metadata["last_updated"] = datetime.now().isoformat()
+                self.metadata_journal.compact(metadata)
             logger.debug("Saved metadata")
         except Exception as e:
             logger.error(f"Error saving metadata: {e}")
 
+        if metadata is self.metadata:
+            self._update_topic_index(touched)
+            self._update_integrity_index(touched)
+            self._update_retention_index(touched)
+            self._update_memory_stats(stats_before)
+
+    @staticmethod
+    def _touched_memory_ids(changes: Optional[List[Dict[str, Any]]]) -> Optional[List[str]]:
+        """Get the memory IDs a metadata change touches (None when all memories may have changed)."""
+        if changes is None or any(change["path"] == ["memories"] for change in changes):
+            return None
+        return list(dict.fromkeys(
+            change["path"][1] for change in changes
+            if change["path"][:1] == ["memories"] and len(change["path"]) > 1
+        ))
+
+    def _rebuild_topic_index(self) -> None:
+        """Rebuild the topic and retention indexes from the metadata entries."""
+        self.topic_index.clear()
+        for memory_id, entry in self.metadata["memories"].items():
+            self.topic_index.add(memory_id, memory_topics(entry.get("metadata") or {}))
+        self.retention_index.rebuild(self.metadata["memories"])
+
+    def _update_topic_index(self, touched: Optional[List[str]]) -> None:
+        """Re-index the memories touched by metadata changes (all of them after a full save)."""
+        if touched is None:
+            self._rebuild_topic_index()
+            return
+
+        memories = self.metadata["memories"]
+        for memory_id in touched:
+            entry = memories.get(memory_id)
+            if entry is None:
+                self.topic_index.remove(memory_id)
+            else:
+                self.topic_index.add(memory_id, memory_topics(entry.get("metadata") or {}))
+
+    def _update_retention_index(self, touched: Optional[List[str]]) -> None:
+        """Re-score the memories touched by metadata changes (the topic index rebuild covers full saves)."""
+        if touched is None:
+            return
+
+        memories = self.metadata["memories"]
+        for memory_id in touched:
+            entry = memories.get(memory_id)
+            if entry is None:
+                self.retention_index.remove(memory_id)
+            else:
+                self.retention_index.update(memory_id, entry)
+
+    def _load_memory_stats(self) -> None:
+        """Restore the statistics saved at the last clean close, or recompute them."""
+        if self.memory_stats.load(self.memory_stats_path):
+            # The saved statistics are only trusted until the next clean close
+            os.remove(self.memory_stats_path)
+            if len(self.memory_stats) == len(self.metadata["memories"]):
+                return
+            logger.warning("Saved memory stats do not match the metadata, recomputing")
+        self.memory_stats.rebuild(self.metadata["memories"])
+
+    def _update_memory_stats(self, before: Optional[Dict[str, Any]]) -> None:
+        """Apply the memories touched by metadata changes to the statistics (recompute after a full save)."""
+        if before is None:
+            self.memory_stats.rebuild(self.metadata["memories"])
+            return
+
+        memories = self.metadata["memories"]
+        self.memory_stats.update(before, {
+            memory_id: stats_contribution(memories.get(memory_id)) for memory_id in before
+        })
+
+    def _load_integrity_index(self) -> None:
+        """Restore the integrity checksums and mark memories without a valid checksum for verification."""
+        if self.integrity_index.load(self.integrity_index_path):
+            # The saved checksums are only trusted until the next clean close
+            os.remove(self.integrity_index_path)
+        self._update_integrity_index(None)
+        logger.info(f"Integrity index has {len(self.integrity_index)} verified memories, "
+                    f"{len(self.integrity_index.dirty)} to verify")
+
+    def _update_integrity_index(self, touched: Optional[List[str]]) -> None:
+        """Mark the memories touched by metadata changes for re-verification and forget deleted ones."""
+        memories = self.metadata["memories"]
+        if touched is None:
+            # Reconcile with the whole store: drop deleted memories, mark unverified ones
+            for shard in self.integrity_index.shards:
+                for memory_id in [memory_id for memory_id in shard if memory_id not in memories]:
+                    self.integrity_index.remove(memory_id)
+            self.integrity_index.mark_dirty([
+                memory_id for memory_id in memories
+                if memory_id not in self.integrity_index.dirty and self.integrity_index.checksum(memory_id) is None
+            ])
+            return
+
+        for memory_id in touched:
+            if memory_id in memories:
+                self.integrity_index.mark_dirty([memory_id])
+            else:
+                self.integrity_index.remove(memory_id)
+
+    @reads
+    def checksum_memories(self, memories: List[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Compute the integrity checksums of fetched memories.
+
+        Args:
+            memories: Memories from get_memories_by_ids
+
+        Returns:
+            Dictionary mapping memory ID to checksum (content, metadata and embedding digest)
+        """
+        if not memories:
+            return {}
+        embeddings = self._fetch_embeddings([memory["id"] for memory in memories])
+        return {
+            memory["id"]: record_checksum(
+                memory.get("content", ""),
+                {key: memory.get(key) for key in ("timestamp", "importance", "metadata")},
+                embedding
+            )
+            for memory, embedding in zip(memories, embeddings)
+        }
+
+    @staticmethod
+    def _metadata_entry(content: str, timestamp: str, importance: float, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the metadata.json entry for a memory."""
+        return {
+            "content": content[:100] + "..." if len(content) > 100 else content,  # Store preview
+            "timestamp": timestamp,
+            "importance": importance,
+            "metadata": metadata
+        }
+
     def add_memory(self,
                   content: str,
                   source_type: str = "conversation",
@@ -176,79 +812,139 @@ class LongTermMemory:
         Returns:
             ID of the stored memory
         """
-        # Generate a unique ID for the memory
-        memory_id = str(uuid.uuid4())
+        return self.add_memories([{
+            "content": content,
+            "source_type": source_type,
+            "importance": importance,
+            "metadata": metadata
+        }])[0]
+
+    def add_memories(self, memories: List[Dict[str, Any]]) -> List[str]:
+        """
+        Add several memories to long-term storage in one batch.
+
+        All contents are embedded with a single encode call, written to the vector
+        database in one insert (one transaction for SQLite), and recorded in the
+        metadata with a single journal write. The encode runs before the write lock
+        is taken, so retrievals are not blocked by the model's forward pass.
+
+        Args:
+            memories: Memories to store, each a dictionary with "content" and optional
+                "source_type", "importance" and "metadata" keys (the format produced by
+                MemoryEncoder)
+
+        Returns:
+            IDs of the stored memories, in input order
+        """
+        if not memories:
+            return []
 
         # Create timestamp
         timestamp = datetime.now().isoformat()
 
-        # Create default metadata if not provided
-        if metadata is None:
-            metadata = {}
-
-        # Add standard metadata
-        full_metadata = {
-            "source_type": source_type,
-            "timestamp": timestamp,
-            "importance": importance,
-            **metadata
-        }
+        memory_ids = []
+        contents = []
+        importances = []
+        full_metadatas = []
+        for memory in memories:
+            importance = memory.get("importance", 0.5)
 
-        # Generate embedding
-        embedding = self.embedding_model.encode(content)
+            # Add standard metadata
+            full_metadata = {
+                "source_type": memory.get("source_type", "conversation"),
+                "timestamp": timestamp,
+                "importance": importance,
+                **(memory.get("metadata") or {})
+            }
 
+            # Generate a unique ID for the memory
+            memory_ids.append(str(uuid.uuid4()))
+            contents.append(memory["content"])
+            importances.append(importance)
+            full_metadatas.append(full_metadata)
+
+        # Generate all embeddings in one batched forward pass (cached texts are not re-encoded)
+        embeddings = self.embedding_cache.encode(contents)
+
+        self._insert_memories(memory_ids, contents, importances, full_metadatas, timestamp, embeddings)
+        return memory_ids
+
+    @writes
+    def _insert_memories(self,
+                         memory_ids: List[str],
+                         contents: List[str],
+                         importances: List[float],
+                         full_metadatas: List[Dict[str, Any]],
+                         timestamp: str,
+                         embeddings: np.ndarray) -> None:
+        """Store embedded memories in the vector database, the indexes and the metadata."""
         # Store in vector database
         if self.vector_db_type == "chroma":
             self.collection.add(
-                ids=[memory_id],
-                embeddings=[embedding.tolist()],
-                metadatas=[full_metadata],
-                documents=[content]
+                ids=memory_ids,
+                embeddings=embeddings.tolist(),
+                metadatas=full_metadatas,
+                documents=contents
             )
         elif self.vector_db_type == "sqlite":
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "INSERT INTO memories VALUES (?, ?, ?, ?, ?, ?)",
-                (
-                    memory_id,
-                    content,
-                    embedding.tobytes(),
-                    timestamp,
-                    importance,
-                    json.dumps(full_metadata)
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO memories (id, content, embedding, timestamp, importance, metadata, source_type, "
+                    "embedding_int8, embedding_scale) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            memory_id,
+                            content,
+                            embedding.tobytes(),
+                            timestamp,
+                            importance,
+                            json.dumps(full_metadata),
+                            full_metadata.get("source_type"),
+                            int8_codes,
+                            int8_scale
+                        )
+                        for memory_id, content, embedding, importance, full_metadata, (int8_codes, int8_scale)
+                        in zip(memory_ids, contents, embeddings, importances, full_metadatas,
+                               self._int8_columns(embeddings))
+                    ]
                 )
-            )
-            self.conn.commit()
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO memory_topics VALUES (?, ?)",
+                    self._sqlite_topic_rows(memory_ids, full_metadatas)
+                )
+            self.vector_index.add_batch(memory_ids, embeddings)
         else:  # in-memory
-            self.vectors[memory_id] = embedding
-            self.contents[memory_id] = content
-            self.vector_metadata[memory_id] = full_metadata
-
-        # Update metadata
-        self.metadata["memories"][memory_id] = {
-            "content": content[:100] + "..." if len(content) > 100 else content,  # Store preview
-            "timestamp": timestamp,
-            "importance": importance,
-            "metadata": full_metadata
-        }
-        self.metadata["memory_count"] = len(self.metadata["memories"])
+            for memory_id, content, embedding, full_metadata in zip(memory_ids, contents, embeddings, full_metadatas):
+                self.vectors[memory_id] = embedding
+                self.contents[memory_id] = content
+                self.vector_metadata[memory_id] = full_metadata
+            self.vector_index.add_batch(memory_ids, embeddings)
 
-        # Save metadata
-        self._save_metadata()
+        self.lexical_index.add_batch(memory_ids, contents)
+        if self.embedding_clusters is not None:
+            self.embedding_clusters.partial_fit(memory_ids, embeddings)
 
-        logger.info(f"Added memory {memory_id} with {len(content)} chars")
+        # Update metadata
+        self._save_metadata(changes=[
+            set_op(["memories", memory_id], self._metadata_entry(content, timestamp, importance, full_metadata))
+            for memory_id, content, importance, full_metadata
+            in zip(memory_ids, contents, importances, full_metadatas)
+        ])
+
+        if len(memory_ids) == 1:
+            logger.info(f"Added memory {memory_ids[0]} with {len(contents[0])} chars")
+        else:
+            logger.info(f"Added {len(memory_ids)} memories in one batch")
 
         # Check if we need to prune memories
-        if self.metadata["memory_count"] > self.max_memories:
-            self._prune_memories()
-
-        return memory_id
+        self._check_prune()
 
     def retrieve_memories(self,
                          query: str,
                          limit: int = 5,
                          min_similarity: float = 0.5,
-                         filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+                         filter_criteria: Optional[Dict[str, Any]] = None,
+                         mode: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Retrieve relevant memories based on semantic similarity.
 
@@ -257,43 +953,172 @@ class LongTermMemory:
             limit: Maximum number of memories to retrieve
             min_similarity: Minimum similarity score (0.0 to 1.0)
             filter_criteria: Additional criteria to filter memories
+            mode: "vector", "lexical" (BM25 only) or "hybrid" (fused vector and
+                BM25 scores); defaults to the store's retrieval_mode
 
         Returns:
             List of relevant memories with metadata
         """
-        # Generate query embedding
-        query_embedding = self.embedding_model.encode(query)
+        mode = mode or self.retrieval_mode
+        if mode != "lexical":
+            self._maintain_vector_index()
+
+        with self.lock.read_locked():
+            if mode == "lexical":
+                memories = self.lexical_search(query, limit=limit, filter_criteria=filter_criteria)
+            elif mode == "hybrid":
+                memories = self._hybrid_search(query, limit, min_similarity, filter_criteria)
+            else:
+                # Generate query embedding
+                query_embedding = self.embedding_cache.encode(query)
+                memories = self._vector_search(query_embedding, limit, min_similarity, filter_criteria)
+
+            # Apply time decay to adjust relevance
+            memories = self._apply_time_decay(memories)
+
+        logger.info(f"Retrieved {len(memories)} memories for query: {query[:50]}...")
+
+        return memories
+
+    def _maintain_vector_index(self) -> None:
+        """Do deferred vector index work (IVF training) under the write lock, so searches stay read-only."""
+        index = getattr(self, "vector_index", None)
+        if index is not None and index.needs_maintenance:
+            with self.lock.write_locked():
+                index.maintain()
+
+    def _vector_search(self,
+                       query_embedding: np.ndarray,
+                       limit: int,
+                       min_similarity: float,
+                       filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Find the memories whose embeddings are most similar to a query embedding.
 
-        # Retrieve from vector database
+        Args:
+            query_embedding: Query embedding
+            limit: Maximum number of memories to return
+            min_similarity: Minimum similarity score
+            filter_criteria: Additional criteria to filter memories
+
+        Returns:
+            List of memories with their similarity, best first
+        """
         if self.vector_db_type == "chroma":
-            # Prepare filter if provided
-            where_filter = None
+            # Filter in the query where Chroma can; check the rest here, fetching more
+            # results until enough match or the collection is exhausted
+            where_filter, remaining = build_chroma_where(filter_criteria or {})
+            total = self.collection.count() if remaining else None
+            n_results = min(limit * CHROMA_FILTER_OVERFETCH, total) if remaining else limit
+
+            while True:
+                results = self.collection.query(
+                    query_embeddings=[query_embedding.tolist()],
+                    n_results=max(n_results, 1),
+                    where=where_filter or None,
+                    include=["documents", "metadatas", "distances"]
+                )
+
+                memories = []
+                below_threshold = False
+                for memory_id, content, metadata, distance in zip(
+                    results["ids"][0],
+                    results["documents"][0],
+                    results["metadatas"][0],
+                    results["distances"][0]
+                ):
+                    # Convert distance to similarity (ChromaDB returns L2 distance)
+                    similarity = 1.0 / (1.0 + distance)
+
+                    # Results are ordered by distance, so the rest are below the minimum too
+                    if similarity < min_similarity:
+                        below_threshold = True
+                        break
+
+                    metadata = metadata or {}
+                    if remaining and not self._matches_filter(metadata, remaining):
+                        continue
+
+                    # Add to results
+                    memories.append({
+                        "id": memory_id,
+                        "content": content,
+                        "similarity": similarity,
+                        "timestamp": metadata.get("timestamp"),
+                        "importance": metadata.get("importance", 0.5),
+                        "metadata": metadata
+                    })
+                    if len(memories) >= limit:
+                        break
+
+                if (not remaining or len(memories) >= limit or below_threshold
+                        or len(results["ids"][0]) < n_results or n_results >= total):
+                    break
+                n_results = min(n_results * CHROMA_FILTER_OVERFETCH, total)
+
+        elif self.vector_db_type == "sqlite":
             if filter_criteria:
-                where_filter = {}
-                for key, value in filter_criteria.items():
-                    where_filter[key] = value
-
-            results = self.collection.query(
-                query_embeddings=[query_embedding.tolist()],
-                n_results=limit,
-                where=where_filter
-            )
+                # Narrow the candidates in SQL, then score only the matching subset
+                candidate_ids, remaining = self._select_sqlite_ids(filter_criteria)
+                predicate = None
+                if remaining:
+                    predicate = lambda memory_id: self._matches_filter(
+                        self.metadata["memories"].get(memory_id, {}).get("metadata", {}),
+                        remaining
+                    )
+
+                hits = self.vector_index.search_subset(
+                    query_embedding,
+                    candidate_ids,
+                    limit=limit,
+                    min_similarity=min_similarity,
+                    predicate=predicate
+                )
+            else:
+                # Score every embedding in one pass over the vector index
+                hits = self.vector_index.search(
+                    query_embedding,
+                    limit=limit,
+                    min_similarity=min_similarity
+                )
+
+            # Fetch only the rows we are returning
+            rows = self._fetch_sqlite_rows([memory_id for memory_id, _ in hits])
 
             memories = []
-            for i, (memory_id, content, metadata, distance) in enumerate(zip(
-                results["ids"][0],
-                results["documents"][0],
-                results["metadatas"][0],
-                results["distances"][0]
-            )):
-                # Convert distance to similarity (ChromaDB returns L2 distance)
-                similarity = 1.0 / (1.0 + distance)
-
-                # Skip if below minimum similarity
-                if similarity < min_similarity:
+            for memory_id, similarity in hits:
+                if memory_id not in rows:
                     continue
 
-                # Add to results
+                content, timestamp, importance, metadata_str = rows[memory_id]
+                memories.append({
+                    "id": memory_id,
+                    "content": content,
+                    "similarity": similarity,
+                    "timestamp": timestamp,
+                    "importance": importance,
+                    "metadata": json.loads(metadata_str)
+                })
+
+        else:  # in-memory
+            predicate = None
+            if filter_criteria:
+                predicate = lambda memory_id: self._matches_filter(
+                    self.vector_metadata.get(memory_id, {}),
+                    filter_criteria
+                )
+
+            hits = self.vector_index.search(
+                query_embedding,
+                limit=limit,
+                min_similarity=min_similarity,
+                predicate=predicate
+            )
+
+            memories = []
+            for memory_id, similarity in hits:
+                content = self.contents.get(memory_id, "")
+                metadata = self.vector_metadata.get(memory_id, {})
                 memories.append({
                     "id": memory_id,
                     "content": content,
@@ -303,88 +1128,224 @@ class LongTermMemory:
                     "metadata": metadata
                 })
 
-        elif self.vector_db_type == "sqlite":
-            # Retrieve all memories from SQLite
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT id, content, embedding, timestamp, importance, metadata FROM memories")
-            rows = cursor.fetchall()
-
-            # Calculate similarities
-            similarities = []
-            for row in rows:
-                memory_id, content, embedding_bytes, timestamp, importance, metadata_str = row
-                embedding = np.frombuffer(embedding_bytes, dtype=np.float32)
-
-                # Calculate cosine similarity
-                similarity = np.dot(query_embedding, embedding) / (np.linalg.norm(query_embedding) * np.linalg.norm(embedding))
-
-                # Apply filter if provided
-                if filter_criteria:
-                    metadata = json.loads(metadata_str)
-                    if not all(metadata.get(k) == v for k, v in filter_criteria.items()):
-                        continue
+        return memories
 
-                # Skip if below minimum similarity
-                if similarity < min_similarity:
-                    continue
+    @reads
+    def lexical_search(self,
+                       query: str,
+                       limit: int = 5,
+                       filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Find memories by keyword with BM25 over the lexical index.
 
-                similarities.append((memory_id, content, similarity, timestamp, importance, metadata_str))
+        Only memories that share a term with the query are scored, and only the
+        returned memories are fetched from the store.
 
-            # Sort by similarity (descending)
-            similarities.sort(key=lambda x: x[2], reverse=True)
+        Args:
+            query: Query text
+            limit: Maximum number of memories to return
+            filter_criteria: Additional criteria to filter memories
 
-            # Take top results
-            memories = []
-            for memory_id, content, similarity, timestamp, importance, metadata_str in similarities[:limit]:
+        Returns:
+            List of memories best first, with the raw BM25 score in "lexical_score"
+            and the score relative to the best match (0.0 to 1.0) in "similarity"
+        """
+        hits = self.lexical_index.search(query, limit=limit, predicate=self._metadata_predicate(filter_criteria))
+        if not hits:
+            return []
+
+        best_score = hits[0][1]
+        scores = dict(hits)
+        memories = self.get_memories_by_ids(list(scores))
+        for memory in memories:
+            score = scores[memory["id"]]
+            memory["lexical_score"] = score
+            memory["similarity"] = score / best_score if best_score > 0 else 0.0
+        return memories
+
+    def _hybrid_search(self,
+                       query: str,
+                       limit: int,
+                       min_similarity: float,
+                       filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Fuse vector similarity and normalized BM25 scores.
+
+        Each candidate from either ranking scores
+        ``(1 - w) * cosine similarity + w * BM25 / best BM25`` with
+        ``w = hybrid_lexical_weight``; min_similarity applies to the fused score.
+
+        Args:
+            query: Query text
+            limit: Maximum number of memories to return
+            min_similarity: Minimum fused score
+            filter_criteria: Additional criteria to filter memories
+
+        Returns:
+            List of memories best first, with "vector_similarity", "lexical_score"
+            and the fused score in "similarity"
+        """
+        candidate_limit = limit * HYBRID_CANDIDATE_FACTOR
+        query_embedding = self.embedding_cache.encode(query)
+        vector_memories = self._vector_search(query_embedding, candidate_limit, -1.0, filter_criteria)
+        lexical_hits = dict(self.lexical_index.search(
+            query,
+            limit=candidate_limit,
+            predicate=self._metadata_predicate(filter_criteria)
+        ))
+
+        memories = {memory["id"]: memory for memory in vector_memories}
+        lexical_only = [memory_id for memory_id in lexical_hits if memory_id not in memories]
+        if lexical_only:
+            vector_scores = self._vector_similarities(query_embedding, lexical_only)
+            for memory in self.get_memories_by_ids(lexical_only):
+                memory["similarity"] = vector_scores.get(memory["id"], 0.0)
+                memories[memory["id"]] = memory
+
+        best_lexical = max(lexical_hits.values(), default=0.0)
+        weight = self.hybrid_lexical_weight
+        fused = []
+        for memory_id, memory in memories.items():
+            vector_similarity = memory["similarity"]
+            lexical_score = lexical_hits.get(memory_id, 0.0)
+            lexical_similarity = lexical_score / best_lexical if best_lexical > 0 else 0.0
+            score = (1.0 - weight) * vector_similarity + weight * lexical_similarity
+            if score < min_similarity:
+                continue
+            memory["vector_similarity"] = vector_similarity
+            memory["lexical_score"] = lexical_score
+            memory["similarity"] = score
+            fused.append(memory)
+
+        fused.sort(key=lambda memory: memory["similarity"], reverse=True)
+        return fused[:limit]
+
+    def _vector_similarities(self, query_embedding: np.ndarray, memory_ids: List[str]) -> Dict[str, float]:
+        """Cosine similarity of a query to specific memories (sqlite and in-memory backends)."""
+        if self.vector_db_type == "chroma":
+            return {}
+        hits = self.vector_index.search_subset(query_embedding, memory_ids, limit=len(memory_ids), min_similarity=-1.0)
+        return dict(hits)
+
+    def _metadata_predicate(self, filter_criteria: Optional[Dict[str, Any]]):
+        """Build a predicate that checks memory metadata against filter criteria."""
+        if not filter_criteria:
+            return None
+        return lambda memory_id: self._matches_filter(
+            self.metadata["memories"].get(memory_id, {}).get("metadata", {}),
+            filter_criteria
+        )
+
+    @reads
+    def filter_memories(self,
+                        filter_criteria: Dict[str, Any],
+                        limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get memories matching metadata filter criteria, newest first.
+
+        No embeddings are scored. On the SQLite backend the criteria on source_type,
+        timestamp, importance and topics are evaluated by SQL indexes; on Chroma the
+        criteria build_chroma_where can translate are evaluated by the collection.
+
+        Args:
+            filter_criteria: Filter criteria (equality values or operator dictionaries
+                such as {"timestamp": {"$gte": "2025-04-01"}})
+            limit: Maximum number of memories to return (None for all)
+
+        Returns:
+            List of matching memories with metadata
+        """
+        memories = []
+
+        if self.vector_db_type == "sqlite":
+            memory_ids, remaining = self._select_sqlite_ids(
+                filter_criteria,
+                order_by="timestamp DESC",
+                limit=limit
+            )
+            rows = self._fetch_sqlite_rows(memory_ids)
+            for memory_id in memory_ids:
+                if memory_id not in rows:
+                    continue
+                content, timestamp, importance, metadata_str = rows[memory_id]
+                metadata = json.loads(metadata_str)
+                if remaining and not self._matches_filter(metadata, remaining):
+                    continue
                 memories.append({
                     "id": memory_id,
                     "content": content,
-                    "similarity": similarity,
                     "timestamp": timestamp,
                     "importance": importance,
-                    "metadata": json.loads(metadata_str)
+                    "metadata": metadata
                 })
+                if limit is not None and len(memories) >= limit:
+                    break
+            return memories
 
+        if self.vector_db_type == "chroma":
+            # Only the memories matching the pushed-down part of the filter are returned
+            where_filter, remaining = build_chroma_where(filter_criteria)
+            results = self.collection.get(where=where_filter or None, include=["documents", "metadatas"])
+            entries = zip(results["ids"], results["documents"], (metadata or {} for metadata in results["metadatas"]))
         else:  # in-memory
-            # Calculate similarities for all vectors
-            similarities = []
-            for memory_id, embedding in self.vectors.items():
-                # Calculate cosine similarity
-                similarity = np.dot(query_embedding, embedding) / (np.linalg.norm(query_embedding) * np.linalg.norm(embedding))
-
-                # Apply filter if provided
-                if filter_criteria:
-                    metadata = self.vector_metadata.get(memory_id, {})
-                    if not all(metadata.get(k) == v for k, v in filter_criteria.items()):
-                        continue
-
-                # Skip if below minimum similarity
-                if similarity < min_similarity:
-                    continue
-
-                similarities.append((memory_id, similarity))
-
-            # Sort by similarity (descending)
-            similarities.sort(key=lambda x: x[1], reverse=True)
+            remaining = filter_criteria
+            entries = (
+                (memory_id, self.contents.get(memory_id, ""), metadata)
+                for memory_id, metadata in self.vector_metadata.items()
+            )
 
-            # Take top results
-            memories = []
-            for memory_id, similarity in similarities[:limit]:
-                content = self.contents.get(memory_id, "")
-                metadata = self.vector_metadata.get(memory_id, {})
+        for memory_id, content, metadata in entries:
+            if self._matches_filter(metadata, remaining):
                 memories.append({
                     "id": memory_id,
                     "content": content,
-                    "similarity": similarity,
                     "timestamp": metadata.get("timestamp"),
                     "importance": metadata.get("importance", 0.5),
                     "metadata": metadata
                 })
 
-        # Apply time decay to adjust relevance
-        memories = self._apply_time_decay(memories)
+        memories.sort(key=lambda memory: memory["timestamp"] or "", reverse=True)
+        return memories if limit is None else memories[:limit]
 
-        logger.info(f"Retrieved {len(memories)} memories for query: {query[:50]}...")
+    def search_memories(self,
+                        query: str,
+                        limit: int = 5,
+                        min_similarity: float = 0.0,
+                        metadata_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Search memories with a query that may contain "field:value" filters.
+
+        Filters such as "source_type:feedback", "metadata.feedback_type:positive" or
+        "date:>2025-04-01" are applied as metadata filters; any remaining text is
+        matched semantically. A query made only of filters returns the newest
+        matching memories.
+
+        Args:
+            query: Search query
+            limit: Maximum number of memories to return
+            min_similarity: Minimum similarity score for semantic matches
+            metadata_filter: Additional filter criteria
+
+        Returns:
+            List of matching memories with metadata
+        """
+        text, filter_criteria = parse_search_query(query)
+        if metadata_filter:
+            filter_criteria.update(metadata_filter)
+
+        if text:
+            memories = self.retrieve_memories(
+                text,
+                limit=limit,
+                min_similarity=min_similarity,
+                filter_criteria=filter_criteria or None
+            )
+        else:
+            memories = self.filter_memories(filter_criteria, limit=limit)
+
+        for memory in memories:
+            memory["source_type"] = memory["metadata"].get("source_type")
+            memory["created_at"] = memory["timestamp"]
 
         return memories
 
@@ -435,68 +1396,56 @@ class LongTermMemory:
 
         return memories
 
-    def _prune_memories(self) -> None:
-        """
-        Prune least important memories when we exceed the maximum.
-        """
-        if len(self.metadata["memories"]) <= self.max_memories:
+    def _check_prune(self) -> None:
+        """Prune, or schedule pruning, once the store is above its high-water mark."""
+        if len(self.metadata["memories"]) <= self.max_memories * self.prune_high_water:
             return
 
-        logger.info(f"Pruning memories (current: {len(self.metadata['memories'])}, max: {self.max_memories})")
-
-        # Sort memories by importance and recency
-        memories_with_scores = []
-        for memory_id, memory in self.metadata["memories"].items():
-            # Calculate age in days
-            try:
-                timestamp = memory.get("timestamp", datetime.now().isoformat())
-                memory_time = datetime.fromisoformat(timestamp)
-                now = datetime.now()
-                age_days = (now - memory_time).total_seconds() / (24 * 3600)
-
-                # Score combines importance and recency
-                importance = memory.get("importance", 0.5)
-                score = importance * (2 ** (-age_days / 30))  # Same decay as retrieval
-
-                memories_with_scores.append((memory_id, score))
-            except Exception as e:
-                logger.error(f"Error calculating memory score: {e}")
-                memories_with_scores.append((memory_id, 0))
-
-        # Sort by score (ascending, so lowest scores first)
-        memories_with_scores.sort(key=lambda x: x[1])
-
-        # Determine how many to remove
-        to_remove = len(self.metadata["memories"]) - self.max_memories
-
-        # Get IDs to remove
-        remove_ids = [memory_id for memory_id, _ in memories_with_scores[:to_remove]]
-
-        # Remove from vector database
-        if self.vector_db_type == "chroma":
-            self.collection.delete(ids=remove_ids)
-        elif self.vector_db_type == "sqlite":
-            cursor = self.conn.cursor()
-            for memory_id in remove_ids:
-                cursor.execute("DELETE FROM memories WHERE id = ?", (memory_id,))
-            self.conn.commit()
-        else:  # in-memory
-            for memory_id in remove_ids:
-                self.vectors.pop(memory_id, None)
-                self.contents.pop(memory_id, None)
-                self.vector_metadata.pop(memory_id, None)
+        if self.prune_scheduler is None:
+            self.prune_memories()
+        else:
+            self.prune_scheduler(self._prune_batch)
 
-        # Remove from metadata
-        for memory_id in remove_ids:
-            self.metadata["memories"].pop(memory_id, None)
+    def _prune_batch(self) -> int:
+        """Background pruning job: remove one batch and schedule the next if needed."""
+        removed = self.prune_memories(max_batches=1)
+        if len(self.metadata["memories"]) > self.max_memories and self.prune_scheduler is not None:
+            self.prune_scheduler(self._prune_batch)
+        return removed
 
-        self.metadata["memory_count"] = len(self.metadata["memories"])
+    @writes
+    def prune_memories(self, max_batches: Optional[int] = None) -> int:
+        """
+        Prune the least important memories when we exceed the maximum.
 
-        # Save metadata
-        self._save_metadata()
+        Victims are taken from the retention index (lowest importance * recency
+        decay first) and removed prune_batch_size at a time with delete_memories.
 
-        logger.info(f"Pruned {len(remove_ids)} memories")
+        Args:
+            max_batches: Maximum number of batches to remove (None until the store
+                is back at max_memories)
 
+        Returns:
+            Number of memories removed
+        """
+        removed = 0
+        batches = 0
+        while len(self.metadata["memories"]) > self.max_memories and (max_batches is None or batches < max_batches):
+            if batches == 0:
+                logger.info(f"Pruning memories (current: {len(self.metadata['memories'])}, max: {self.max_memories})")
+
+            to_remove = min(len(self.metadata["memories"]) - self.max_memories, self.prune_batch_size)
+            batch_removed = self.delete_memories(self.retention_index.lowest(to_remove))
+            if not batch_removed:
+                break
+            removed += batch_removed
+            batches += 1
+
+        if removed:
+            logger.info(f"Pruned {removed} memories")
+        return removed
+
+    @writes
     def update_user_summary(self, key: str, value: Any) -> None:
         """
         Update user summary information.
@@ -505,11 +1454,10 @@ class LongTermMemory:
             key: Summary key (e.g., "preferred_topics", "communication_style")
             value: Summary value
         """
-        self.metadata["user_summary"][key] = value
-        self.metadata["last_updated"] = datetime.now().isoformat()
-        self._save_metadata()
+        self._save_metadata(changes=[set_op(["user_summary", key], value)])
         logger.info(f"Updated user summary: {key} = {value}")
 
+    @reads
     def get_user_summary(self, key: Optional[str] = None) -> Any:
         """
         Get user summary information.
@@ -524,6 +1472,7 @@ class LongTermMemory:
             return self.metadata["user_summary"].get(key)
         return self.metadata["user_summary"]
 
+    @writes
     def add_topic(self, topic: str) -> None:
         """
         Add a topic to the list of known topics.
@@ -532,10 +1481,10 @@ class LongTermMemory:
             topic: Topic name
         """
         if topic not in self.metadata["topics"]:
-            self.metadata["topics"].append(topic)
-            self._save_metadata()
+            self._save_metadata(changes=[append_unique_op(["topics"], topic)])
             logger.info(f"Added topic: {topic}")
 
+    @reads
     def get_topics(self) -> List[str]:
         """
         Get list of known topics.
@@ -545,6 +1494,7 @@ class LongTermMemory:
         """
         return self.metadata["topics"]
 
+    @reads
     def get_memory_by_id(self, memory_id: str) -> Optional[Dict[str, Any]]:
         """
         Get a specific memory by ID.
@@ -555,52 +1505,63 @@ class LongTermMemory:
         Returns:
             Memory data or None if not found
         """
-        # Check metadata first
-        if memory_id not in self.metadata["memories"]:
-            return None
+        memories = self.get_memories_by_ids([memory_id])
+        return memories[0] if memories else None
 
-        # Get from vector database
-        if self.vector_db_type == "chroma":
-            results = self.collection.get(ids=[memory_id])
-            if not results["ids"]:
-                return None
+    @reads
+    def get_memories_by_ids(self, memory_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Get several memories by ID with one backend round trip.
 
-            return {
-                "id": memory_id,
-                "content": results["documents"][0],
-                "metadata": results["metadatas"][0]
-            }
+        Chroma is asked once for all IDs; SQLite uses WHERE id IN (...) in chunks
+        of SQLITE_MAX_VARIABLES.
 
-        elif self.vector_db_type == "sqlite":
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "SELECT content, timestamp, importance, metadata FROM memories WHERE id = ?",
-                (memory_id,)
-            )
-            row = cursor.fetchone()
+        Args:
+            memory_ids: Memory IDs
 
-            if not row:
-                return None
+        Returns:
+            Memories with id, content, timestamp, importance and metadata, in the
+            order of memory_ids (IDs that are unknown or not stored are skipped)
+        """
+        known_ids = [memory_id for memory_id in dict.fromkeys(memory_ids) if memory_id in self.metadata["memories"]]
+        if not known_ids:
+            return []
 
-            content, timestamp, importance, metadata_str = row
+        entries = {}
+        if self.vector_db_type == "chroma":
+            results = self.collection.get(ids=known_ids, include=["documents", "metadatas"])
+            for memory_id, content, metadata in zip(results["ids"], results["documents"], results["metadatas"]):
+                metadata = metadata or {}
+                entries[memory_id] = (content, metadata.get("timestamp"), metadata.get("importance", 0.5), metadata)
 
-            return {
-                "id": memory_id,
-                "content": content,
-                "timestamp": timestamp,
-                "importance": importance,
-                "metadata": json.loads(metadata_str)
-            }
+        elif self.vector_db_type == "sqlite":
+            for memory_id, (content, timestamp, importance, metadata_str) in self._fetch_sqlite_rows(known_ids).items():
+                entries[memory_id] = (content, timestamp, importance, json.loads(metadata_str))
 
         else:  # in-memory
-            if memory_id not in self.contents:
-                return None
+            for memory_id in known_ids:
+                if memory_id in self.contents:
+                    metadata = self.vector_metadata.get(memory_id, {})
+                    entries[memory_id] = (
+                        self.contents[memory_id],
+                        metadata.get("timestamp"),
+                        metadata.get("importance", 0.5),
+                        metadata
+                    )
 
-            return {
+        memories = []
+        for memory_id in known_ids:
+            if memory_id not in entries:
+                continue
+            content, timestamp, importance, metadata = entries[memory_id]
+            memories.append({
                 "id": memory_id,
-                "content": self.contents[memory_id],
-                "metadata": self.vector_metadata.get(memory_id, {})
-            }
+                "content": content,
+                "timestamp": timestamp,
+                "importance": importance,
+                "metadata": metadata
+            })
+        return memories
 
     def update_memory(self,
                      memory_id: str,
@@ -608,9 +1569,40 @@ class LongTermMemory:
         """
         Update a memory with new data.
 
+        New content is embedded before the write lock is taken, so retrievals are
+        not blocked by the model's forward pass.
+
+        Args:
+            memory_id: ID of the memory to update
+            updated_memory: Updated memory data
+
+        Returns:
+            True if successful, False otherwise
+        """
+        content_embedding = None
+        if "content" in updated_memory:
+            current_memory = self.get_memory_by_id(memory_id)
+            if current_memory and updated_memory["content"] != current_memory.get("content", ""):
+                try:
+                    content_embedding = self.embedding_cache.encode(updated_memory["content"])
+                except Exception as e:
+                    logger.error(f"Error updating memory {memory_id}: {e}", exc_info=True)
+                    return False
+
+        return self._update_memory(memory_id, updated_memory, content_embedding)
+
+    @writes
+    def _update_memory(self,
+                       memory_id: str,
+                       updated_memory: Dict[str, Any],
+                       content_embedding: Optional[np.ndarray]) -> bool:
+        """
+        Apply a memory update under the write lock.
+
         Args:
             memory_id: ID of the memory to update
             updated_memory: Updated memory data
+            content_embedding: Embedding of updated_memory["content"], if computed
 
         Returns:
             True if successful, False otherwise
@@ -646,9 +1638,10 @@ class LongTermMemory:
             if "reinforcement_count" in updated_memory:
                 merged_metadata["reinforcement_count"] = updated_memory["reinforcement_count"]
 
-            # Generate new embedding if content changed
+            # Use the new content's embedding if content changed (encoded here only if
+            # the content changed after update_memory looked at it)
             if content != current_memory.get("content", ""):
-                embedding = self.embedding_model.encode(content)
+                embedding = content_embedding if content_embedding is not None else self.embedding_cache.encode(content)
             else:
                 embedding = None
 
@@ -668,51 +1661,73 @@ class LongTermMemory:
                 self.collection.update(**update_data)
 
             elif self.vector_db_type == "sqlite":
-                cursor = self.conn.cursor()
-
-                if embedding is not None:
-                    # Update everything
-                    cursor.execute(
-                        "UPDATE memories SET content = ?, embedding = ?, importance = ?, metadata = ? WHERE id = ?",
-                        (
-                            content,
-                            embedding.tobytes(),
-                            importance,
-                            json.dumps(merged_metadata),
-                            memory_id
+                # Keep the indexed filter columns in step with the metadata
+                timestamp = merged_metadata.get("timestamp", current_memory.get("timestamp"))
+                with self.conn:
+                    if embedding is not None:
+                        # Update everything
+                        int8_codes, int8_scale = self._int8_columns(embedding.reshape(1, -1))[0]
+                        self.conn.execute(
+                            "UPDATE memories SET content = ?, embedding = ?, embedding_int8 = ?, embedding_scale = ?, "
+                            "timestamp = ?, importance = ?, metadata = ?, source_type = ? WHERE id = ?",
+                            (
+                                content,
+                                embedding.tobytes(),
+                                int8_codes,
+                                int8_scale,
+                                timestamp,
+                                importance,
+                                json.dumps(merged_metadata),
+                                merged_metadata.get("source_type"),
+                                memory_id
+                            )
                         )
-                    )
-                else:
-                    # Update without changing embedding
-                    cursor.execute(
-                        "UPDATE memories SET content = ?, importance = ?, metadata = ? WHERE id = ?",
-                        (
-                            content,
-                            importance,
-                            json.dumps(merged_metadata),
-                            memory_id
+                    else:
+                        # Update without changing embedding
+                        self.conn.execute(
+                            "UPDATE memories SET content = ?, timestamp = ?, importance = ?, "
+                            "metadata = ?, source_type = ? WHERE id = ?",
+                            (
+                                content,
+                                timestamp,
+                                importance,
+                                json.dumps(merged_metadata),
+                                merged_metadata.get("source_type"),
+                                memory_id
+                            )
                         )
+
+                    self.conn.execute("DELETE FROM memory_topics WHERE memory_id = ?", (memory_id,))
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO memory_topics VALUES (?, ?)",
+                        self._sqlite_topic_rows([memory_id], [merged_metadata])
                     )
 
-                self.conn.commit()
+                if embedding is not None:
+                    self.vector_index.add(memory_id, embedding)
 
             else:  # in-memory
                 if embedding is not None:
                     self.vectors[memory_id] = embedding
+                    self.vector_index.add(memory_id, embedding)
 
                 self.contents[memory_id] = content
                 self.vector_metadata[memory_id] = merged_metadata
 
-            # Update metadata
-            self.metadata["memories"][memory_id] = {
-                "content": content[:100] + "..." if len(content) > 100 else content,
-                "timestamp": merged_metadata.get("timestamp", datetime.now().isoformat()),
-                "importance": importance,
-                "metadata": merged_metadata
-            }
+            if content != current_memory.get("content", ""):
+                self.lexical_index.add(memory_id, content)
+            if embedding is not None and self.embedding_clusters is not None:
+                self.embedding_clusters.partial_fit([memory_id], embedding.reshape(1, -1))
 
-            # Save metadata
-            self._save_metadata()
+            # Update metadata
+            self._save_metadata(changes=[
+                set_op(["memories", memory_id], self._metadata_entry(
+                    content,
+                    merged_metadata.get("timestamp", datetime.now().isoformat()),
+                    importance,
+                    merged_metadata
+                ))
+            ])
 
             logger.info(f"Updated memory {memory_id}")
             return True
@@ -743,71 +1758,121 @@ class LongTermMemory:
         Returns:
             True if deleted, False if not found
         """
-        # Check if memory exists
-        if memory_id not in self.metadata["memories"]:
-            return False
+        return self.delete_memories([memory_id]) == 1
+
+    @writes
+    def delete_memories(self, memory_ids: List[str]) -> int:
+        """
+        Delete several memories with one backend delete and one metadata write.
+
+        Args:
+            memory_ids: Memory IDs (unknown IDs are ignored)
+
+        Returns:
+            Number of memories deleted
+        """
+        remove_ids = [memory_id for memory_id in dict.fromkeys(memory_ids) if memory_id in self.metadata["memories"]]
+        if not remove_ids:
+            return 0
 
         # Delete from vector database
         if self.vector_db_type == "chroma":
-            self.collection.delete(ids=[memory_id])
+            self.collection.delete(ids=remove_ids)
         elif self.vector_db_type == "sqlite":
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM memories WHERE id = ?", (memory_id,))
-            self.conn.commit()
+            with self.conn:
+                self.conn.executemany("DELETE FROM memories WHERE id = ?", [(memory_id,) for memory_id in remove_ids])
+                self.conn.executemany(
+                    "DELETE FROM memory_topics WHERE memory_id = ?",
+                    [(memory_id,) for memory_id in remove_ids]
+                )
+            self.vector_index.remove_batch(remove_ids)
         else:  # in-memory
-            self.vectors.pop(memory_id, None)
-            self.contents.pop(memory_id, None)
-            self.vector_metadata.pop(memory_id, None)
+            for memory_id in remove_ids:
+                self.vectors.pop(memory_id, None)
+                self.contents.pop(memory_id, None)
+                self.vector_metadata.pop(memory_id, None)
+            self.vector_index.remove_batch(remove_ids)
+
+        self.lexical_index.remove_batch(remove_ids)
+        if self.embedding_clusters is not None:
+            for memory_id in remove_ids:
+                self.embedding_clusters.remove(memory_id)
 
         # Delete from metadata
-        self.metadata["memories"].pop(memory_id, None)
-        self.metadata["memory_count"] = len(self.metadata["memories"])
+        self._save_metadata(changes=[delete_op(["memories", memory_id]) for memory_id in remove_ids])
+
+        if len(remove_ids) == 1:
+            logger.info(f"Deleted memory: {remove_ids[0]}")
+        else:
+            logger.info(f"Deleted {len(remove_ids)} memories in one batch")
+
+        for listener in list(self.deletion_listeners):
+            try:
+                listener(remove_ids)
+            except Exception as e:
+                logger.error(f"Error in memory deletion listener: {e}")
+
+        return len(remove_ids)
+
+    def add_deletion_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """
+        Register a callback that receives the IDs of deleted memories.
+
+        Listeners run inside the write lock after each delete_memories call,
+        including the deletes made by pruning, so they must not block.
 
-        # Save metadata
-        self._save_metadata()
+        Args:
+            listener: Callback taking the list of deleted memory IDs
+        """
+        self.deletion_listeners.append(listener)
 
-        logger.info(f"Deleted memory: {memory_id}")
+    def remove_deletion_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """
+        Unregister a deletion callback.
 
-        return True
+        Args:
+            listener: Callback previously passed to add_deletion_listener
+        """
+        if listener in self.deletion_listeners:
+            self.deletion_listeners.remove(listener)
 
+    @reads
     def get_memory_stats(self) -> Dict[str, Any]:
         """
         Get statistics about the memory store.
 
+        The counts, importance and timestamp statistics are maintained as memories
+        change (see memory.memory_stats), so no memories are scanned.
+
         Returns:
             Dictionary of statistics
         """
-        # Count memories by source type
-        source_types = {}
-        for memory in self.metadata["memories"].values():
-            source_type = memory.get("metadata", {}).get("source_type", "unknown")
-            source_types[source_type] = source_types.get(source_type, 0) + 1
-
-        # Calculate average importance
-        importance_values = [m.get("importance", 0.5) for m in self.metadata["memories"].values()]
-        avg_importance = sum(importance_values) / len(importance_values) if importance_values else 0
-
-        # Get oldest and newest memory timestamps
-        timestamps = [datetime.fromisoformat(m.get("timestamp", datetime.now().isoformat()))
-                     for m in self.metadata["memories"].values()]
-        oldest = min(timestamps).isoformat() if timestamps else None
-        newest = max(timestamps).isoformat() if timestamps else None
-
         return {
-            "total_memories": len(self.metadata["memories"]),
-            "source_types": source_types,
-            "average_importance": avg_importance,
-            "oldest_memory": oldest,
-            "newest_memory": newest,
+            **self.memory_stats.snapshot(),
             "topics": len(self.metadata["topics"]),
-            "user_summary_keys": list(self.metadata["user_summary"].keys())
+            "user_summary_keys": list(self.metadata["user_summary"].keys()),
+            "embedding_cache": self.embedding_cache.get_stats()
         }
 
+    @writes
     def close(self) -> None:
         """Close connections and save state."""
-        self._save_metadata()
+        # Fold the journal into a final snapshot
+        self.metadata["last_updated"] = datetime.now().isoformat()
+        self.metadata_journal.close(self.metadata)
+        self.embedding_cache.close()
+        self.lexical_index.save(self.lexical_index_path)
+        self.integrity_index.save(self.integrity_index_path)
+        self.memory_stats.save(self.memory_stats_path)
+        if self.embedding_clusters is not None:
+            self.embedding_clusters.save(self.embedding_clusters_path)
 
         if self.vector_db_type == "sqlite" and hasattr(self, 'conn'):
+            if isinstance(self.vector_index, MemmapVectorIndex) and not self.readers.closed:
+                # Only a cleanly closed store is known to reflect every embedding write
+                self.vector_index.source_revision = self._embedding_revision()
+            self.vector_index.save(self.vector_index_path)
+            self.readers.close()
             self.conn.close()
 
         logger.info("Long-term memory closed")
@@ -11,6 +11,8 @@ import time
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Union, Tuple
 
+from .memory_stats import MemoryStats
+
 logger = logging.getLogger("coda.memory.debug")
 
 class MemoryDebugSystem:
@@ -40,6 +42,11 @@ class MemoryDebugSystem:
         self.last_stats_update = 0
         self.stats_update_interval = 5  # seconds
 
+        # Push long-term stats when the store changes instead of waiting for a poll
+        memory_stats = getattr(getattr(memory_manager, "long_term", None), "memory_stats", None)
+        if self.ws and isinstance(memory_stats, MemoryStats):
+            memory_stats.add_listener(self._on_long_term_stats_changed)
+
         logger.info("MemoryDebugSystem initialized")
 
     def log_operation(self, operation_type: str, details: Dict[str, Any]) -> None:
@@ -129,6 +136,18 @@ class MemoryDebugSystem:
 
         return self.memory_stats_cache
 
+    def _on_long_term_stats_changed(self, long_term_stats: Dict[str, Any]) -> None:
+        """
+        Push updated long-term memory statistics.
+
+        Args:
+            long_term_stats: Statistics snapshot from the long-term store
+        """
+        stats = dict(self.memory_stats_cache)
+        stats["long_term"] = {**stats.get("long_term", {}), **long_term_stats}
+        self.memory_stats_cache = stats
+        self.ws.memory_debug_stats(stats)
+
     def _count_operations_by_type(self) -> Dict[str, int]:
         """
         Count operations by type.
@@ -0,0 +1,293 @@
+"""
+Metadata filters for Coda Lite's long-term memory.
+
+This module evaluates memory filter criteria and translates them into SQL for the
+sqlite backend and into ``where`` filters for the chroma backend. Criteria use
+the same shape as Chroma ``where`` filters: a plain value means equality, and a
+dictionary of operators expresses comparisons, e.g.
+``{"source_type": "feedback", "timestamp": {"$gte": "2025-04-01"}}``.
+"""
+
+import re
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger("coda.memory.filters")
+
+# Operators supported in filter criteria, with their SQL equivalents
+COMPARISON_OPERATORS = {
+    "$eq": "=",
+    "$ne": "!=",
+    "$gt": ">",
+    "$gte": ">=",
+    "$lt": "<",
+    "$lte": "<="
+}
+SET_OPERATORS = {"$in": "IN", "$nin": "NOT IN"}
+
+# Metadata keys stored in indexed columns of the sqlite memories table
+INDEXED_COLUMNS = ("source_type", "timestamp", "importance")
+
+# Metadata key stored in the memory_topics table
+TOPICS_KEY = "topics"
+
+# Aliases accepted in "field:value" search queries
+QUERY_FIELD_ALIASES = {
+    "type": "source_type",
+    "date": "timestamp",
+    "time": "timestamp",
+    "topic": "topics"
+}
+QUERY_PREFIX_OPERATORS = {">=": "$gte", "<=": "$lte", ">": "$gt", "<": "$lt"}
+QUERY_FIELD_PATTERN = re.compile(r"(?<!\S)([A-Za-z_][\w.]*):(>=|<=|>|<)?(\S+)")
+QUERY_BOOLEAN_WORDS = {"AND", "OR", "NOT"}
+
+
+def memory_topics(metadata: Dict[str, Any]) -> List[str]:
+    """
+    Get the topics of a memory as a list.
+
+    Args:
+        metadata: Memory metadata (topics may be a list or a comma-separated string)
+
+    Returns:
+        List of topics
+    """
+    topics = metadata.get(TOPICS_KEY) or []
+    if isinstance(topics, str):
+        topics = topics.split(",")
+    return [str(topic).strip() for topic in topics if str(topic).strip()]
+
+
+def _compare(actual: Any, operator: str, expected: Any) -> bool:
+    if operator == "$in":
+        return actual in expected
+    if operator == "$nin":
+        return actual not in expected
+    if operator == "$eq":
+        return actual == expected
+    if operator == "$ne":
+        return actual != expected
+    if actual is None:
+        return False
+    try:
+        if operator == "$gt":
+            return actual > expected
+        if operator == "$gte":
+            return actual >= expected
+        if operator == "$lt":
+            return actual < expected
+        if operator == "$lte":
+            return actual <= expected
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported filter operator: {operator}")
+
+
+def _conditions(value: Any) -> List[Tuple[str, Any]]:
+    """Split a filter value into (operator, operand) pairs."""
+    if isinstance(value, dict) and value and all(key.startswith("$") for key in value):
+        return list(value.items())
+    return [("$eq", value)]
+
+
+def matches_filter(metadata: Dict[str, Any], filter_criteria: Dict[str, Any]) -> bool:
+    """
+    Check whether memory metadata matches all filter criteria.
+
+    Args:
+        metadata: Memory metadata
+        filter_criteria: Filter criteria (equality values or operator dictionaries)
+
+    Returns:
+        True if every criterion matches
+    """
+    for key, value in filter_criteria.items():
+        if key == TOPICS_KEY:
+            # Topics match if any topic satisfies the condition
+            topics = memory_topics(metadata)
+            for operator, operand in _conditions(value):
+                if operator == "$nin":
+                    if any(topic in operand for topic in topics):
+                        return False
+                elif operator == "$ne":
+                    if operand in topics:
+                        return False
+                elif not any(_compare(topic, operator, operand) for topic in topics):
+                    return False
+            continue
+
+        actual = metadata.get(key)
+        if not all(_compare(actual, operator, operand) for operator, operand in _conditions(value)):
+            return False
+
+    return True
+
+
+def _sql_comparison(operator: str, operand_count: int) -> str:
+    """Build the SQL comparison for an operator, with placeholders."""
+    if operator in SET_OPERATORS:
+        return f"{SET_OPERATORS[operator]} ({','.join('?' * operand_count)})"
+    return f"{COMPARISON_OPERATORS[operator]} ?"
+
+
+def build_sql_filter(filter_criteria: Dict[str, Any]) -> Tuple[List[str], List[Any], Dict[str, Any]]:
+    """
+    Translate filter criteria on indexed keys into SQL conditions.
+
+    Args:
+        filter_criteria: Filter criteria
+
+    Returns:
+        Tuple of (SQL conditions to AND together, bound parameters, criteria that
+        could not be pushed down and must be checked in Python)
+    """
+    clauses = []
+    params = []
+    remaining = {}
+
+    for key, value in filter_criteria.items():
+        conditions = _conditions(value)
+        if key not in INDEXED_COLUMNS and key != TOPICS_KEY:
+            remaining[key] = value
+            continue
+
+        if any(operator not in COMPARISON_OPERATORS and operator not in SET_OPERATORS
+               for operator, _ in conditions):
+            remaining[key] = value
+            continue
+
+        for operator, operand in conditions:
+            if operator in SET_OPERATORS:
+                operands = list(operand)
+                if not operands:
+                    # Empty IN matches nothing; empty NOT IN matches everything
+                    if operator == "$in":
+                        clauses.append("0")
+                    continue
+            else:
+                operands = [operand]
+
+            if key == TOPICS_KEY:
+                # Negated topic conditions exclude memories having any of the topics
+                negated = operator in ("$ne", "$nin")
+                if negated:
+                    operator = "$in" if operator == "$nin" else "$eq"
+                comparison = _sql_comparison(operator, len(operands))
+                membership = "NOT IN" if negated else "IN"
+                clauses.append(f"id {membership} (SELECT memory_id FROM memory_topics WHERE topic {comparison})")
+            else:
+                clauses.append(f"{key} {_sql_comparison(operator, len(operands))}")
+            params.extend(operands)
+
+    return clauses, params, remaining
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_scalar(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool))
+
+
+def build_chroma_where(filter_criteria: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Translate filter criteria into a Chroma ``where`` filter.
+
+    Equality, $in and numeric comparisons are pushed down. Conditions Chroma cannot
+    evaluate the same way (topics, string ranges such as ISO timestamps, and
+    negations, which Chroma does not match against memories lacking the key) are
+    left to be checked in Python.
+
+    Args:
+        filter_criteria: Filter criteria
+
+    Returns:
+        Tuple of (where filter, empty if nothing could be pushed down; criteria that
+        must be checked in Python)
+    """
+    clauses = []
+    remaining = {}
+
+    for key, value in filter_criteria.items():
+        if key == TOPICS_KEY:
+            remaining[key] = value
+            continue
+
+        kept = []
+        for operator, operand in _conditions(value):
+            if operator == "$eq" and _is_scalar(operand):
+                clauses.append({key: {"$eq": operand}})
+            elif operator == "$in" and isinstance(operand, (list, tuple, set)) and operand \
+                    and all(_is_scalar(item) for item in operand):
+                clauses.append({key: {"$in": list(operand)}})
+            elif operator in ("$gt", "$gte", "$lt", "$lte") and _is_number(operand):
+                clauses.append({key: {operator: operand}})
+            else:
+                kept.append((operator, operand))
+
+        if kept:
+            remaining[key] = dict(kept) if len(kept) > 1 or kept[0][0] != "$eq" else kept[0][1]
+
+    if not clauses:
+        return {}, remaining
+    return (clauses[0] if len(clauses) == 1 else {"$and": clauses}), remaining
+
+
+def parse_search_query(query: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Split a search query into free text and "field:value" filter criteria.
+
+    Supports ``source_type:feedback``, ``metadata.feedback_type:positive``,
+    ``date:2025-04-01`` (any time that day) and comparisons such as
+    ``date:>2025-04-01`` or ``importance:>=0.7``.
+
+    Args:
+        query: Search query
+
+    Returns:
+        Tuple of (remaining free text, filter criteria)
+    """
+    criteria: Dict[str, Any] = {}
+
+    def collect(match: "re.Match") -> str:
+        field, prefix, value = match.groups()
+        if field.startswith("metadata."):
+            field = field[len("metadata."):]
+        field = QUERY_FIELD_ALIASES.get(field, field)
+        parsed_value: Any = value
+        if field == "importance":
+            try:
+                parsed_value = float(value)
+            except ValueError:
+                pass
+
+        if field == "timestamp" and not prefix:
+            # A bare date matches any time on that day
+            try:
+                day = datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                pass
+            else:
+                next_day = (day + timedelta(days=1)).strftime("%Y-%m-%d")
+                criteria[field] = {"$gte": value, "$lt": next_day}
+                return " "
+
+        if prefix:
+            criteria.setdefault(field, {})
+            if not isinstance(criteria[field], dict):
+                criteria[field] = {"$eq": criteria[field]}
+            criteria[field][QUERY_PREFIX_OPERATORS[prefix]] = parsed_value
+        else:
+            criteria[field] = parsed_value
+        return " "
+
+    text = QUERY_FIELD_PATTERN.sub(collect, query)
+
+    # Drop boolean keywords and grouping left over from query syntax
+    words = [word.strip("()") for word in text.split()]
+    text = " ".join(word for word in words if word and word not in QUERY_BOOLEAN_WORDS)
+
+    return text, criteria
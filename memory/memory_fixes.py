@@ -7,12 +7,9 @@ retrieval, and encoding.
 """
 
 import logging
-from typing import Dict, Any, List, Optional
-from datetime import datetime
-import json
+from typing import Dict, Any, List
 
 from .enhanced_memory_manager import EnhancedMemoryManager
-from .long_term import LongTermMemory
 from .encoder import MemoryEncoder
 
 logger = logging.getLogger("coda.memory.fixes")
@@ -52,10 +49,16 @@ def fix_memory_persistence():
         
         # Force persistence after assistant turns
         if role == "assistant" and self.auto_persist:
-            # Check if we have enough turns since last persist
-            turns_since_persist = self.short_term.turn_count - self.turn_count_at_last_persist
+            # Check if we have enough turns since the last persist, counting queued ones
+            with self.persist_lock:
+                turns_since_persist = self.short_term.turn_count - max(self.turn_count_at_last_persist,
+                                                                       self.turn_count_at_last_queued_persist)
             if turns_since_persist >= 1:  # Persist after every assistant turn
-                self.persist_short_term_memory()
+                if self.write_pipeline is not None:
+                    # Queue on the background writer instead of waiting for it here
+                    self._queue_persist()
+                else:
+                    self.persist_short_term_memory()
         
         return turn
     
@@ -272,57 +275,12 @@ def fix_vector_database():
     """Fix vector database issues."""
     logger.info("Fixing vector database issues")
     
-    # Patch LongTermMemory._save_metadata to ensure proper persistence
-    original_save_metadata = LongTermMemory._save_metadata
-    
-    def patched_save_metadata(self, metadata=None) -> None:
-        """Patched _save_metadata method to ensure proper persistence."""
-        # Use provided metadata or instance metadata
-        metadata_to_save = metadata if metadata is not None else self.metadata
-        
-        # Update last_updated timestamp
-        metadata_to_save["last_updated"] = datetime.now().isoformat()
-        
-        # Save metadata to file
-        try:
-            with open(self.metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata_to_save, f, indent=2, default=str)
-            
-            logger.debug(f"Saved metadata with {len(metadata_to_save.get('memories', []))} memories")
-        except Exception as e:
-            logger.error(f"Error saving metadata: {e}")
-            
-            # Try to save to a backup location
-            backup_path = f"{self.metadata_path}.backup"
-            try:
-                with open(backup_path, 'w', encoding='utf-8') as f:
-                    json.dump(metadata_to_save, f, indent=2, default=str)
-                logger.info(f"Saved metadata to backup location: {backup_path}")
-            except Exception as backup_error:
-                logger.error(f"Error saving metadata to backup location: {backup_error}")
-    
-    # Apply the patch
-    LongTermMemory._save_metadata = patched_save_metadata
-    logger.info("Patched LongTermMemory._save_metadata to ensure proper persistence")
-    
-    # Patch LongTermMemory.add_memory to ensure proper persistence
-    original_add_memory = LongTermMemory.add_memory
-    
-    def patched_add_memory(self, content: str, source_type: str = "conversation", importance: float = 0.5, metadata: Optional[Dict[str, Any]] = None) -> str:
-        """Patched add_memory method to ensure proper persistence."""
-        # Call original method
-        memory_id = original_add_memory(self, content, source_type, importance, metadata)
-        
-        # Force metadata save
-        self._save_metadata()
-        
-        return memory_id
-    
-    # Apply the patch
-    LongTermMemory.add_memory = patched_add_memory
-    logger.info("Patched LongTermMemory.add_memory to ensure proper persistence")
+    # LongTermMemory persists metadata through an append-only journal with atomic
+    # snapshot compaction, so _save_metadata and add_memory no longer need patching
+    # (forcing a full metadata rewrite after every add would defeat the journal).
+    logger.info("LongTermMemory metadata is journaled; skipping persistence patches")
     
     return {
-        "save_metadata_patched": True,
-        "add_memory_patched": True
+        "save_metadata_patched": False,
+        "add_memory_patched": False
     }
@@ -10,7 +10,10 @@ import json
 import logging
 import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Union, Iterator, Tuple
+
+from .snapshot_store import SnapshotStore, is_snapshot_file, read_header
+from .topic_index import TopicIndex
 
 # Import typing for type hints without circular imports
 from typing import TYPE_CHECKING
@@ -28,13 +31,22 @@ class MemorySnapshotManager:
     - Save snapshots to disk
     - Load snapshots from disk
     - Provide metadata about snapshots
+
+    Snapshots use one of two formats:
+    - "json": the whole snapshot is kept in memory and saved as one JSON document
+    - "delta": each snapshot is written when it is created as a compressed delta
+      of content-addressed records (see SnapshotStore); only the header (short-term
+      turns and statistics) is kept in memory and records are streamed on demand
     """
 
     def __init__(self,
                  memory_manager: 'EnhancedMemoryManager',
                  snapshot_dir: str = "data/memory/snapshots",
                  auto_snapshot: bool = False,
-                 snapshot_interval: int = 10):
+                 snapshot_interval: int = 10,
+                 snapshot_format: str = "json",
+                 snapshot_compression: str = "gzip",
+                 full_snapshot_interval: int = 20):
         """
         Initialize the memory snapshot manager.
 
@@ -43,18 +55,32 @@ class MemorySnapshotManager:
             snapshot_dir: Directory to store snapshots
             auto_snapshot: Whether to automatically create snapshots
             snapshot_interval: Number of turns between automatic snapshots
+            snapshot_format: "json" (full snapshots) or "delta" (content-addressed deltas)
+            snapshot_compression: Compression of delta snapshots ("gzip" or "zstd")
+            full_snapshot_interval: Delta snapshots per chain before a full snapshot
         """
         self.memory_manager = memory_manager
         self.snapshot_dir = snapshot_dir
         self.auto_snapshot = auto_snapshot
         self.snapshot_interval = snapshot_interval
+        self.snapshot_format = snapshot_format
         self.last_snapshot_turn = 0
         self.snapshots = {}
 
         # Create snapshot directory if it doesn't exist
         os.makedirs(self.snapshot_dir, exist_ok=True)
 
-        logger.info(f"MemorySnapshotManager initialized with snapshot_dir={snapshot_dir}")
+        self.store = None
+        if snapshot_format == "delta":
+            self.store = SnapshotStore(
+                snapshot_dir,
+                compression=snapshot_compression,
+                full_snapshot_interval=full_snapshot_interval
+            )
+        elif snapshot_format != "json":
+            raise ValueError(f"Unsupported snapshot format: {snapshot_format}")
+
+        logger.info(f"MemorySnapshotManager initialized with snapshot_dir={snapshot_dir}, format={snapshot_format}")
 
     def create_snapshot(self, snapshot_id: Optional[str] = None) -> str:
         """
@@ -79,10 +105,11 @@ class MemorySnapshotManager:
         }
 
         # Get long-term memory data
+        long_term = self.memory_manager.long_term
+        memories = long_term.metadata.get("memories", {})
         long_term_data = {
-            "memories": self.memory_manager.long_term.metadata.get("memories", {}),
-            "topics": self.memory_manager.long_term.metadata.get("topics", []),
-            "memory_count": self.memory_manager.long_term.metadata.get("memory_count", 0)
+            "topics": long_term.metadata.get("topics", []),
+            "memory_count": long_term.metadata.get("memory_count", 0)
         }
 
         # Create snapshot
@@ -94,6 +121,15 @@ class MemorySnapshotManager:
             "memory_stats": self.memory_manager.get_memory_stats()
         }
 
+        if self.store is not None:
+            # Write the changed records now and keep only the header in memory;
+            # topic index stamps tell which records changed since the last snapshot
+            topic_index = getattr(long_term, "topic_index", None)
+            stamp = topic_index.stamp if isinstance(topic_index, TopicIndex) else None
+            snapshot["filepath"] = self.store.write(snapshot_id, snapshot, dict(memories), stamp)
+        else:
+            long_term_data["memories"] = memories
+
         # Store snapshot in memory
         self.snapshots[snapshot_id] = snapshot
 
@@ -119,6 +155,15 @@ class MemorySnapshotManager:
         if snapshot_id not in self.snapshots:
             raise ValueError(f"Snapshot {snapshot_id} not found")
 
+        # Delta snapshots are already on disk; an explicit path gets a standalone copy
+        snapshot_path = self.snapshots[snapshot_id].get("filepath")
+        if snapshot_path is not None:
+            if filepath is not None and os.path.abspath(filepath) != os.path.abspath(snapshot_path):
+                store = self.store or SnapshotStore(self.snapshot_dir)
+                snapshot_path = store.export(snapshot_path, filepath)
+            logger.info(f"Saved memory snapshot {snapshot_id} to {snapshot_path}")
+            return snapshot_path
+
         # Generate filepath if not provided
         if filepath is None:
             filename = f"{snapshot_id}.json"
@@ -142,9 +187,13 @@ class MemorySnapshotManager:
         Returns:
             Snapshot ID
         """
-        # Load snapshot from file
-        with open(filepath, 'r', encoding='utf-8') as f:
-            snapshot = json.load(f)
+        # Load snapshot from file (only the header of a delta snapshot)
+        if is_snapshot_file(filepath):
+            snapshot = read_header(filepath)
+            snapshot["filepath"] = filepath
+        else:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
 
         # Get snapshot ID
         snapshot_id = snapshot.get("snapshot_id")
@@ -201,6 +250,26 @@ class MemorySnapshotManager:
             logger.error(f"Error applying snapshot {snapshot_id}: {e}")
             return False
 
+    def iter_snapshot_records(self, snapshot_id: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream the long-term memory records of a snapshot.
+
+        Args:
+            snapshot_id: ID of the snapshot
+
+        Yields:
+            (memory ID, metadata entry) pairs
+        """
+        # Check if snapshot exists
+        if snapshot_id not in self.snapshots:
+            raise ValueError(f"Snapshot {snapshot_id} not found")
+
+        snapshot = self.snapshots[snapshot_id]
+        if "filepath" in snapshot:
+            yield from SnapshotStore.iter_records(snapshot["filepath"])
+        else:
+            yield from snapshot.get("long_term", {}).get("memories", {}).items()
+
     def get_snapshot_metadata(self, snapshot_id: str) -> Dict[str, Any]:
         """
         Get metadata about a snapshot.
@@ -248,7 +317,7 @@ class MemorySnapshotManager:
             return []
 
         return [os.path.join(self.snapshot_dir, f) for f in os.listdir(self.snapshot_dir)
-                if f.endswith('.json')]
+                if f.endswith('.json') or (is_snapshot_file(f) and ".tmp." not in f)]
 
     def check_auto_snapshot(self) -> Optional[str]:
         """
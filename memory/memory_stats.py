@@ -0,0 +1,289 @@
+"""
+Running statistics for Coda Lite's long-term memory.
+
+This module provides a MemoryStats class that keeps the counts, importance sum and
+histogram, and oldest and newest timestamps of the memory store up to date as
+memories are added, updated and removed, so statistics requests cost O(1) instead
+of a scan over every memory's metadata. Listeners are notified when the statistics
+change, so they can be pushed to the dashboard instead of being polled.
+"""
+
+import os
+import json
+import heapq
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("coda.memory.stats")
+
+# Number of equal-width importance histogram bins over [0, 1]
+IMPORTANCE_BINS = 10
+
+# (source type, importance, timestamp) of one memory
+Contribution = Tuple[str, float, Optional[str]]
+
+
+def stats_contribution(entry: Optional[Dict[str, Any]]) -> Optional[Contribution]:
+    """
+    Get what a metadata entry contributes to the statistics.
+
+    Args:
+        entry: Metadata entry of a memory (None if the memory does not exist)
+
+    Returns:
+        Tuple of (source type, importance, timestamp), or None for no memory
+    """
+    if entry is None:
+        return None
+    source_type = (entry.get("metadata") or {}).get("source_type", "unknown")
+    try:
+        importance = float(entry.get("importance", 0.5))
+    except (TypeError, ValueError):
+        importance = 0.5
+    return source_type, importance, entry.get("timestamp") or None
+
+
+def importance_bin(importance: float) -> int:
+    """Get the histogram bin of an importance score."""
+    return min(max(int(importance * IMPORTANCE_BINS), 0), IMPORTANCE_BINS - 1)
+
+
+class MemoryStats:
+    """
+    Incrementally maintained memory statistics.
+
+    Responsibilities:
+    - Count memories in total and by source type, and keep the importance sum and
+      histogram, updated per changed memory
+    - Track the oldest and newest timestamps with lazily cleaned heaps
+    - Persist the statistics so a clean restart does not rescan the store
+    - Notify listeners with a snapshot after each change
+    """
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.total = 0
+        self.source_types: Counter = Counter()
+        self.importance_sum = 0.0
+        self.importance_histogram = [0] * IMPORTANCE_BINS
+        self.timestamps: Counter = Counter()
+        self._oldest: List[str] = []
+        self._newest: List["_Reversed"] = []
+        # Bumped by every change, so consumers can tell whether a snapshot is current
+        self.version = 0
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self.total
+
+    def _add(self, contribution: Contribution) -> None:
+        source_type, importance, timestamp = contribution
+        self.total += 1
+        self.source_types[source_type] += 1
+        self.importance_sum += importance
+        self.importance_histogram[importance_bin(importance)] += 1
+        if timestamp is not None:
+            if not self.timestamps[timestamp]:
+                heapq.heappush(self._oldest, timestamp)
+                heapq.heappush(self._newest, _Reversed(timestamp))
+            self.timestamps[timestamp] += 1
+
+    def _remove(self, contribution: Contribution) -> None:
+        source_type, importance, timestamp = contribution
+        self.total -= 1
+        self.source_types[source_type] -= 1
+        if self.source_types[source_type] <= 0:
+            del self.source_types[source_type]
+        self.importance_sum -= importance
+        self.importance_histogram[importance_bin(importance)] -= 1
+        if timestamp is not None:
+            self.timestamps[timestamp] -= 1
+            if self.timestamps[timestamp] <= 0:
+                # The heaps drop the timestamp when it reaches the top
+                del self.timestamps[timestamp]
+
+    def update(self,
+               before: Dict[str, Optional[Contribution]],
+               after: Dict[str, Optional[Contribution]]) -> None:
+        """
+        Apply changed memories.
+
+        Args:
+            before: Memory ID -> contribution before the change (None if it did not exist)
+            after: Memory ID -> contribution after the change (None if it was removed)
+        """
+        with self.lock:
+            changed = False
+            for memory_id, old in before.items():
+                new = after.get(memory_id)
+                if old == new:
+                    continue
+                if old is not None:
+                    self._remove(old)
+                if new is not None:
+                    self._add(new)
+                changed = True
+            if changed:
+                self.version += 1
+        if changed:
+            self._notify()
+
+    def rebuild(self, memories: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Recompute the statistics from every memory.
+
+        Args:
+            memories: Memory ID -> metadata entry
+        """
+        with self.lock:
+            self._reset()
+            for entry in memories.values():
+                self._add(stats_contribution(entry))
+            self.version += 1
+        self._notify()
+
+    def _reset(self) -> None:
+        self.total = 0
+        self.source_types = Counter()
+        self.importance_sum = 0.0
+        self.importance_histogram = [0] * IMPORTANCE_BINS
+        self.timestamps = Counter()
+        self._oldest = []
+        self._newest = []
+
+    def oldest(self) -> Optional[str]:
+        """Get the oldest memory timestamp."""
+        with self.lock:
+            while self._oldest and self._oldest[0] not in self.timestamps:
+                heapq.heappop(self._oldest)
+            return self._oldest[0] if self._oldest else None
+
+    def newest(self) -> Optional[str]:
+        """Get the newest memory timestamp."""
+        with self.lock:
+            while self._newest and self._newest[0].value not in self.timestamps:
+                heapq.heappop(self._newest)
+            return self._newest[0].value if self._newest else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the current statistics.
+
+        Returns:
+            Dictionary with total_memories, source_types, average_importance,
+            importance_histogram, oldest_memory, newest_memory and version
+        """
+        with self.lock:
+            oldest = self.oldest()
+            newest = self.newest()
+            return {
+                "total_memories": self.total,
+                "source_types": dict(self.source_types),
+                "average_importance": self.importance_sum / self.total if self.total else 0,
+                "importance_histogram": list(self.importance_histogram),
+                "oldest_memory": datetime.fromisoformat(oldest).isoformat() if oldest else None,
+                "newest_memory": datetime.fromisoformat(newest).isoformat() if newest else None,
+                "version": self.version
+            }
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Register a callback that receives a snapshot after each change.
+
+        Listeners run on the thread that changed the store, so they should only
+        hand the snapshot off (e.g. queue an event).
+
+        Args:
+            listener: Callback taking the statistics snapshot
+        """
+        self.listeners.append(listener)
+
+    def _notify(self) -> None:
+        if not self.listeners:
+            return
+        snapshot = self.snapshot()
+        for listener in list(self.listeners):
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Error in memory stats listener: {e}")
+
+    def save(self, path: str) -> bool:
+        """
+        Save the statistics.
+
+        Args:
+            path: Path of the JSON file
+
+        Returns:
+            True if saved, False otherwise
+        """
+        with self.lock:
+            state = {
+                "total": self.total,
+                "source_types": dict(self.source_types),
+                "importance_sum": self.importance_sum,
+                "importance_histogram": self.importance_histogram,
+                "timestamps": dict(self.timestamps)
+            }
+        try:
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(temp_path, path)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving memory stats: {e}")
+            return False
+
+    def load(self, path: str) -> bool:
+        """
+        Load saved statistics.
+
+        Args:
+            path: Path of the JSON file
+
+        Returns:
+            True if loaded, False if missing or unreadable (the statistics are unchanged)
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            histogram = [int(count) for count in state["importance_histogram"]]
+            if len(histogram) != IMPORTANCE_BINS:
+                raise ValueError("importance histogram has the wrong number of bins")
+            timestamps = Counter({timestamp: int(count) for timestamp, count in state["timestamps"].items()})
+        except Exception as e:
+            logger.error(f"Error loading memory stats: {e}")
+            return False
+
+        with self.lock:
+            self.total = int(state["total"])
+            self.source_types = Counter({key: int(count) for key, count in state["source_types"].items()})
+            self.importance_sum = float(state["importance_sum"])
+            self.importance_histogram = histogram
+            self.timestamps = timestamps
+            self._oldest = list(timestamps)
+            heapq.heapify(self._oldest)
+            self._newest = [_Reversed(timestamp) for timestamp in timestamps]
+            heapq.heapify(self._newest)
+            self.version += 1
+        return True
+
+
+class _Reversed:
+    """Heap item ordering timestamps newest first."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: str):
+        self.value = value
+
+    def __lt__(self, other: "_Reversed") -> bool:
+        return self.value > other.value
@@ -0,0 +1,355 @@
+"""
+Metadata journal for Coda Lite's long-term memory.
+
+This module provides a MetadataJournal class that persists the long-term memory
+metadata as a JSON snapshot plus an append-only journal of mutations. Writes
+append one line per change instead of rewriting the whole snapshot, and the
+journal is periodically compacted into a new snapshot in the background.
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("coda.memory.metadata_journal")
+
+# Supported journal operations
+OP_SET = "set"
+OP_DELETE = "delete"
+OP_APPEND_UNIQUE = "append_unique"
+
+
+def set_op(path: List[str], value: Any) -> Dict[str, Any]:
+    """Create a journal operation that sets the value at a path."""
+    return {"op": OP_SET, "path": list(path), "value": value}
+
+
+def delete_op(path: List[str]) -> Dict[str, Any]:
+    """Create a journal operation that removes the key at a path."""
+    return {"op": OP_DELETE, "path": list(path)}
+
+
+def append_unique_op(path: List[str], value: Any) -> Dict[str, Any]:
+    """Create a journal operation that appends a value to a list if it is not already present."""
+    return {"op": OP_APPEND_UNIQUE, "path": list(path), "value": value}
+
+
+def apply_op(metadata: Dict[str, Any], op: Dict[str, Any]) -> None:
+    """
+    Apply a journal operation to a metadata dictionary in place.
+
+    Operations are idempotent, so replaying a journal over a snapshot that already
+    contains some of its changes yields the same state.
+
+    Args:
+        metadata: Metadata dictionary to modify
+        op: Journal operation
+    """
+    path = op["path"]
+    if not path:
+        raise ValueError("Journal operation path must not be empty")
+
+    parent = metadata
+    for key in path[:-1]:
+        child = parent.get(key)
+        if not isinstance(child, dict):
+            if op["op"] == OP_DELETE:
+                return
+            child = {}
+            parent[key] = child
+        parent = child
+
+    key = path[-1]
+    if op["op"] == OP_SET:
+        parent[key] = op["value"]
+    elif op["op"] == OP_DELETE:
+        parent.pop(key, None)
+    elif op["op"] == OP_APPEND_UNIQUE:
+        values = parent.setdefault(key, [])
+        if op["value"] not in values:
+            values.append(op["value"])
+    else:
+        raise ValueError(f"Unknown journal operation: {op['op']}")
+
+    if path[0] == "memories":
+        metadata["memory_count"] = len(metadata.get("memories", {}))
+    if "ts" in op:
+        metadata["last_updated"] = op["ts"]
+
+
+def copy_metadata(value: Any) -> Any:
+    """
+    Copy the dictionaries and lists of a metadata value.
+
+    Journal operations mutate nested dictionaries and lists in place, so a snapshot
+    needs its own containers; the scalars inside them are immutable and are shared.
+
+    Args:
+        value: Metadata value to copy
+
+    Returns:
+        Copy that later operations on the original do not affect
+    """
+    if isinstance(value, dict):
+        return {key: copy_metadata(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_metadata(item) for item in value]
+    return value
+
+
+class MetadataJournal:
+    """
+    Snapshot plus append-only journal for long-term memory metadata.
+
+    Responsibilities:
+    - Load metadata by reading the snapshot and replaying the journal
+    - Append each mutation to the journal as one JSON line
+    - Compact the journal into a new snapshot (inline or on a background thread)
+    - Replace the snapshot atomically so a crash never leaves a truncated file
+
+    Compaction copies the metadata and rotates the live journal to
+    ``<journal>.compacting`` under the lock, then serializes and writes the copy
+    outside it, so new mutations keep flowing into a fresh journal while the
+    snapshot is written. The rotated file is only removed once the new snapshot is
+    in place.
+    """
+
+    def __init__(self,
+                 snapshot_path: str,
+                 journal_path: Optional[str] = None,
+                 compaction_threshold: int = 500,
+                 background_compaction: bool = True,
+                 fsync: bool = False):
+        """
+        Initialize the metadata journal.
+
+        Args:
+            snapshot_path: Path of the JSON snapshot (e.g. metadata.json)
+            journal_path: Path of the journal (defaults to the snapshot path with a .journal suffix)
+            compaction_threshold: Number of journal entries that triggers a compaction
+            background_compaction: Whether threshold compactions run on a background thread
+            fsync: Whether to fsync the journal after every append
+        """
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + ".journal"
+        self.compacting_path = self.journal_path + ".compacting"
+        self.compaction_threshold = max(1, compaction_threshold)
+        self.background_compaction = background_compaction
+        self.fsync = fsync
+
+        # Guards the metadata dictionary, the journal file handle and the entry count
+        self.lock = threading.RLock()
+        # Serializes compactions, so an older snapshot never replaces a newer one
+        self.compaction_lock = threading.Lock()
+        self.entry_count = 0
+        self.compaction_count = 0
+
+        self._journal_file = None
+        self._compaction_thread: Optional[threading.Thread] = None
+
+    def load(self, default_factory: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Load metadata from the snapshot and replay the journal on top of it.
+
+        Args:
+            default_factory: Called to create metadata when no snapshot exists
+
+        Returns:
+            Metadata dictionary
+        """
+        metadata = None
+        snapshot_exists = os.path.exists(self.snapshot_path)
+        if snapshot_exists:
+            try:
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading metadata snapshot: {e}")
+
+        if metadata is None:
+            metadata = default_factory()
+
+        recovered = self._replay(self.compacting_path, metadata)
+        self.entry_count = self._replay(self.journal_path, metadata)
+
+        if recovered or not snapshot_exists:
+            # Fold an interrupted compaction (or a brand-new store) into a snapshot now
+            self.compact(metadata)
+
+        logger.info(f"Loaded metadata with {len(metadata.get('memories', {}))} memories "
+                    f"({self.entry_count} journal entries replayed)")
+        return metadata
+
+    def _replay(self, path: str, metadata: Dict[str, Any]) -> int:
+        """Replay the operations in a journal file; returns the number applied."""
+        if not os.path.exists(path):
+            return 0
+
+        applied = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    apply_op(metadata, json.loads(line))
+                    applied += 1
+                except Exception as e:
+                    # A torn final line is expected after a crash mid-append
+                    logger.warning(f"Skipping unreadable journal entry {path}:{line_number}: {e}")
+        return applied
+
+    def _open_journal(self):
+        """Open the live journal for appending if it is not already open."""
+        if self._journal_file is None:
+            self._journal_file = open(self.journal_path, 'a', encoding='utf-8')
+        return self._journal_file
+
+    def _close_journal(self) -> None:
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+
+    def apply(self, metadata: Dict[str, Any], ops: List[Dict[str, Any]]) -> None:
+        """
+        Apply operations to the metadata and append them to the journal.
+
+        Args:
+            metadata: Metadata dictionary to modify
+            ops: Journal operations
+        """
+        if not ops:
+            return
+
+        timestamp = datetime.now().isoformat()
+        with self.lock:
+            lines = []
+            for op in ops:
+                op = {**op, "ts": timestamp}
+                apply_op(metadata, op)
+                lines.append(json.dumps(op, ensure_ascii=False))
+
+            journal = self._open_journal()
+            journal.write("\n".join(lines) + "\n")
+            journal.flush()
+            if self.fsync:
+                os.fsync(journal.fileno())
+
+            self.entry_count += len(ops)
+            should_compact = self.entry_count >= self.compaction_threshold
+
+        if should_compact:
+            if self.background_compaction:
+                self.compact_in_background(metadata)
+            else:
+                self.compact(metadata)
+
+    def compact(self, metadata: Dict[str, Any]) -> bool:
+        """
+        Write a full snapshot of the metadata and discard the journal it supersedes.
+
+        Args:
+            metadata: Current metadata dictionary
+
+        Returns:
+            True if the snapshot was written, False otherwise
+        """
+        with self.compaction_lock:
+            with self.lock:
+                # Copy under the lock so the snapshot matches the rotated journal exactly
+                snapshot = copy_metadata(metadata)
+
+                # Rotate the journal so new entries are not lost while the snapshot is written
+                self._close_journal()
+                if os.path.exists(self.journal_path):
+                    if os.path.exists(self.compacting_path):
+                        self._append_file(self.journal_path, self.compacting_path)
+                        os.remove(self.journal_path)
+                    else:
+                        os.replace(self.journal_path, self.compacting_path)
+                self.entry_count = 0
+
+            try:
+                self._write_snapshot(json.dumps(snapshot, indent=2, ensure_ascii=False))
+            except Exception as e:
+                # The rotated journal is kept and will be replayed on the next load
+                logger.error(f"Error writing metadata snapshot: {e}")
+                return False
+
+            with self.lock:
+                if os.path.exists(self.compacting_path):
+                    os.remove(self.compacting_path)
+                self.compaction_count += 1
+
+        logger.debug("Compacted metadata journal into snapshot")
+        return True
+
+    def compact_in_background(self, metadata: Dict[str, Any]) -> None:
+        """
+        Start a compaction on a background thread unless one is already running.
+
+        Args:
+            metadata: Current metadata dictionary
+        """
+        with self.lock:
+            if self._compaction_thread is not None and self._compaction_thread.is_alive():
+                return
+
+            self._compaction_thread = threading.Thread(
+                target=self.compact,
+                args=(metadata,),
+                name="MetadataJournalCompaction",
+                daemon=True
+            )
+            self._compaction_thread.start()
+
+    def wait_for_compaction(self, timeout: Optional[float] = None) -> None:
+        """Wait for a running background compaction to finish."""
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def close(self, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Finish pending compactions and close the journal.
+
+        Args:
+            metadata: If provided, the journal is compacted into a final snapshot
+        """
+        self.wait_for_compaction()
+        if metadata is not None:
+            self.compact(metadata)
+        with self.lock:
+            self._close_journal()
+
+    def _write_snapshot(self, serialized: str) -> None:
+        """Write the snapshot to a temporary file and atomically move it into place."""
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(serialized)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._fsync_directory()
+
+    def _fsync_directory(self) -> None:
+        """Persist the rename itself (best effort; not supported on every platform)."""
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.snapshot_path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _append_file(source_path: str, target_path: str) -> None:
+        with open(source_path, 'r', encoding='utf-8') as source, open(target_path, 'a', encoding='utf-8') as target:
+            for line in source:
+                target.write(line)
@@ -0,0 +1,147 @@
+"""
+Retention index for Coda Lite's long-term memory.
+
+This module provides a RetentionIndex class that keeps every memory in a min-heap
+ordered by its retention score, so pruning can pick the k least worth keeping in
+O(k log n) instead of scoring and sorting the whole store. The score decays
+every memory at the same rate (importance * 2^(-age_days / 30)), so the order
+between two memories never changes with time and the heap never needs re-scoring;
+only new and updated memories are pushed.
+"""
+
+import math
+import heapq
+import logging
+import threading
+from datetime import datetime
+from itertools import count
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("coda.memory.retention_index")
+
+# Half-life of the retention score in days (same decay as retrieval)
+RETENTION_HALF_LIFE_DAYS = 30
+
+
+def retention_key(importance: Optional[float], timestamp: Optional[str]) -> float:
+    """
+    Time-independent sort key of a memory's retention score.
+
+    log2(importance * 2^(-(now - t) / half_life)) = key - now / half_life, so
+    keys order memories exactly as their scores do at any time.
+
+    Args:
+        importance: Memory importance (0.0 to 1.0)
+        timestamp: ISO timestamp of the memory
+
+    Returns:
+        Sort key (lower is pruned first; -inf for memories that score 0)
+    """
+    try:
+        importance = 0.5 if importance is None else float(importance)
+        memory_time = datetime.fromisoformat(timestamp) if timestamp else datetime.now()
+    except (TypeError, ValueError) as e:
+        logger.error(f"Error calculating memory score: {e}")
+        return -math.inf
+    if importance <= 0:
+        return -math.inf
+    return math.log2(importance) + memory_time.timestamp() / (24 * 3600 * RETENTION_HALF_LIFE_DAYS)
+
+
+class RetentionIndex:
+    """
+    Min-heap of memories by retention score.
+
+    Responsibilities:
+    - Map memory IDs to their current heap entry (retention key, insertion order)
+    - Keep a heap for lowest-first traversal; updated and removed entries are
+      dropped from the heap lazily
+    - Return the k memories with the lowest retention scores in O(k log n)
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.entries: Dict[str, Tuple[float, int, str]] = {}
+        self.heap: List[Tuple[float, int, str]] = []
+        self._sequence = count()
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self.entries
+
+    def update(self, memory_id: str, entry: Dict[str, Any]) -> None:
+        """
+        Index or re-index a memory.
+
+        Args:
+            memory_id: Memory ID
+            entry: Metadata entry of the memory ("importance" and "timestamp")
+        """
+        key = retention_key(entry.get("importance", 0.5), entry.get("timestamp"))
+        with self.lock:
+            current = self.entries.get(memory_id)
+            if current is not None and current[0] == key:
+                return
+            self.entries[memory_id] = (key, next(self._sequence), memory_id)
+            heapq.heappush(self.heap, self.entries[memory_id])
+            if len(self.heap) > 2 * len(self.entries) + 64:
+                self._rebuild_heap()
+
+    def remove(self, memory_id: str) -> bool:
+        """
+        Forget a memory.
+
+        Args:
+            memory_id: Memory ID
+
+        Returns:
+            True if the memory was indexed, False otherwise
+        """
+        with self.lock:
+            return self.entries.pop(memory_id, None) is not None
+
+    def rebuild(self, memories: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Re-index every memory.
+
+        Args:
+            memories: Memory ID -> metadata entry, in insertion order
+        """
+        with self.lock:
+            self.entries = {
+                memory_id: (retention_key(entry.get("importance", 0.5), entry.get("timestamp")),
+                            next(self._sequence), memory_id)
+                for memory_id, entry in memories.items()
+            }
+            self._rebuild_heap()
+
+    def _rebuild_heap(self) -> None:
+        """Drop stale heap entries."""
+        self.heap = list(self.entries.values())
+        heapq.heapify(self.heap)
+
+    def _is_current(self, entry: Tuple[float, int, str]) -> bool:
+        return self.entries.get(entry[2]) is entry
+
+    def lowest(self, k: int) -> List[str]:
+        """
+        Get the memories with the lowest retention scores.
+
+        Args:
+            k: Number of memory IDs
+
+        Returns:
+            Up to k memory IDs, lowest score first; they stay indexed until removed
+        """
+        with self.lock:
+            popped = []
+            while self.heap and len(popped) < k:
+                entry = heapq.heappop(self.heap)
+                if self._is_current(entry):
+                    popped.append(entry)
+            for entry in popped:
+                heapq.heappush(self.heap, entry)
+            return [entry[2] for entry in popped]
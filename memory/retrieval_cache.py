@@ -0,0 +1,166 @@
+"""
+Retrieval result cache for Coda Lite's memory.
+
+This module provides a RetrievalCache that remembers the memories retrieved for
+recent queries. Each entry records the long-term store's generation counter,
+which every memory mutation bumps, so a cached result is only reused while the
+store is unchanged.
+"""
+
+import copy
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+logger = logging.getLogger("coda.memory.retrieval_cache")
+
+# Component name used for PerfTracker counters
+PERF_COMPONENT = "retrieval_cache"
+
+
+def _freeze(value: Any) -> Hashable:
+    """Turn filter criteria (nested dicts and lists) into a hashable key part."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class RetrievalCache:
+    """
+    Bounded LRU cache of retrieval results.
+
+    Responsibilities:
+    - Key results on the normalized query and the retrieval parameters
+    - Reuse a result only while the store generation it was computed at is current
+    - Hand out copies so callers can annotate results without touching the cache
+    - Report hits, misses and stale entries through a PerfTracker
+    """
+
+    def __init__(self, max_entries: int = 256, perf_tracker=None):
+        """
+        Initialize the retrieval cache.
+
+        Args:
+            max_entries: Maximum number of cached queries (0 disables the cache)
+            perf_tracker: Optional PerfTracker that receives hit/miss counters
+        """
+        self.max_entries = max(0, max_entries)
+        self.perf_tracker = perf_tracker
+        # Cache key -> (store generation, retrieved memories), least recently used first
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Lowercase, collapse whitespace and drop trailing punctuation."""
+        return " ".join(query.lower().split()).rstrip("?!.,;: ")
+
+    def make_key(self,
+                 query: str,
+                 limit: int,
+                 min_similarity: float,
+                 filter_criteria: Optional[Dict[str, Any]] = None,
+                 apply_temporal_weighting: bool = True) -> Hashable:
+        """
+        Build the cache key for a retrieval.
+
+        Args:
+            query: Query text
+            limit: Maximum number of memories
+            min_similarity: Minimum similarity score
+            filter_criteria: Metadata filter criteria
+            apply_temporal_weighting: Whether temporal weighting is applied
+
+        Returns:
+            Hashable cache key
+        """
+        return (
+            self.normalize_query(query),
+            limit,
+            round(float(min_similarity), 6),
+            _freeze(filter_criteria or {}),
+            bool(apply_temporal_weighting)
+        )
+
+    def get(self, key: Hashable, generation: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get a cached result.
+
+        Args:
+            key: Key from make_key
+            generation: Current generation of the memory store
+
+        Returns:
+            Copy of the cached memories, or None on a miss or a stale entry
+        """
+        if not self.max_entries:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] != generation:
+                del self.entries[key]
+                self.stale += 1
+                self._count("stale", 1)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                self._count("misses", 1)
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self._count("hits", 1)
+            return copy.deepcopy(entry[1])
+
+    def put(self, key: Hashable, generation: int, memories: List[Dict[str, Any]]) -> None:
+        """
+        Cache a result.
+
+        Args:
+            key: Key from make_key
+            generation: Generation of the memory store the result was computed at
+            memories: Retrieved memories
+        """
+        if not self.max_entries:
+            return
+
+        with self.lock:
+            self.entries[key] = (generation, copy.deepcopy(memories))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached results."""
+        with self.lock:
+            self.entries.clear()
+
+    def _count(self, counter: str, amount: int) -> None:
+        if self.perf_tracker is not None and amount:
+            self.perf_tracker.increment_counter(PERF_COMPONENT, counter, amount)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with entry count, hits, misses, stale entries and hit rate
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,339 @@
+"""
+Review schedule for Coda Lite's active recall.
+
+This module provides a ReviewSchedule class that keeps the next review time of
+each memory in a heap ordered by due time, and persists scheduled reviews and
+review results in their own snapshot plus append-only journal (reviews.json),
+separate from the long-term memory metadata. Finding the k most overdue reviews
+costs O(k log n) and each review write appends one journal line. Review totals
+and the number of due reviews are kept up to date as reviews are scheduled and
+recorded, so health metrics do not scan the history or the heap.
+"""
+
+import heapq
+import logging
+import threading
+from datetime import datetime
+from itertools import count
+from typing import Any, Callable, Dict, Iterator, List, MutableMapping, Optional, Set, Tuple
+
+from .metadata_journal import MetadataJournal, set_op, delete_op, append_unique_op
+
+logger = logging.getLogger("coda.memory.review_schedule")
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _format_timestamp(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class ReviewHistory(MutableMapping):
+    """
+    Mapping of memory ID to review records with running review totals.
+
+    Replacing or removing a memory's reviews, or appending one through append(),
+    keeps review_count, success_count and the interval totals current.
+    """
+
+    def __init__(self):
+        self.reviews: Dict[str, List[Dict[str, Any]]] = {}
+        self.review_count = 0
+        self.success_count = 0
+        self.interval_count = 0
+        self.interval_total = 0.0
+
+    def _count(self, reviews: List[Dict[str, Any]], sign: int) -> None:
+        for review in reviews:
+            self.review_count += sign
+            if review.get("success", False):
+                self.success_count += sign
+            interval = review.get("interval")
+            if interval is not None:
+                self.interval_count += sign
+                self.interval_total += sign * interval
+
+    def __getitem__(self, memory_id: str) -> List[Dict[str, Any]]:
+        return self.reviews[memory_id]
+
+    def __setitem__(self, memory_id: str, reviews: List[Dict[str, Any]]) -> None:
+        if memory_id in self.reviews:
+            self._count(self.reviews[memory_id], -1)
+        self.reviews[memory_id] = reviews
+        self._count(reviews, 1)
+
+    def __delitem__(self, memory_id: str) -> None:
+        self._count(self.reviews.pop(memory_id), -1)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.reviews)
+
+    def __len__(self) -> int:
+        return len(self.reviews)
+
+    def append(self, memory_id: str, review: Dict[str, Any]) -> None:
+        """
+        Append a review record to a memory's reviews.
+
+        Args:
+            memory_id: Memory ID
+            review: Review record with "timestamp", "success" and "interval"
+        """
+        self.reviews.setdefault(memory_id, []).append(review)
+        self._count([review], 1)
+
+
+class ReviewSchedule(MutableMapping):
+    """
+    Heap-ordered mapping of memory ID to next review time.
+
+    Responsibilities:
+    - Map memory IDs to due times, with a heap for due-order traversal
+      (rescheduled and removed entries are dropped from the heap lazily)
+    - Keep the review history of each memory, with running review totals
+    - Count due reviews incrementally as the reference time advances
+    - Persist schedule and history changes as journal appends (when a path is given)
+    - Import the review state that older versions kept in the memory metadata
+    """
+
+    def __init__(self, path: Optional[str] = None, compaction_threshold: int = 500):
+        """
+        Initialize the review schedule.
+
+        Args:
+            path: Snapshot path of the review store (e.g. reviews.json); None keeps
+                the schedule in memory only
+            compaction_threshold: Number of journal entries before the review store
+                snapshot is rewritten
+        """
+        self.journal = MetadataJournal(path, compaction_threshold=compaction_threshold) if path else None
+        self.state: Dict[str, Any] = {"scheduled_reviews": {}, "review_history": {}}
+        self.due: Dict[str, datetime] = {}
+        self.history = ReviewHistory()
+        self.heap: List[Tuple[float, int, str]] = []
+        # Due counting: IDs found due as of counted_until, and a heap of the rest
+        self.due_set: Set[str] = set()
+        self.upcoming: List[Tuple[float, int, str]] = []
+        self.counted_until = float("-inf")
+        self._sequence = count()
+        self.lock = threading.RLock()
+
+    @property
+    def persistent(self) -> bool:
+        return self.journal is not None
+
+    def load(self, legacy_state: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Load the schedule and history.
+
+        Args:
+            legacy_state: Review state in the old metadata format ("scheduled_reviews"
+                and "review_history" with ISO timestamps); used to seed a review
+                store that does not exist yet, or as the state itself when the
+                schedule is not persistent
+        """
+        legacy_state = legacy_state or {}
+        initial_state = {
+            "scheduled_reviews": dict(legacy_state.get("scheduled_reviews") or {}),
+            "review_history": {
+                memory_id: list(reviews)
+                for memory_id, reviews in (legacy_state.get("review_history") or {}).items()
+            }
+        }
+
+        with self.lock:
+            if self.journal is not None:
+                self.state = self.journal.load(lambda: initial_state)
+            else:
+                self.state = initial_state
+
+            self.due = {}
+            self.heap = []
+            self.due_set = set()
+            self.upcoming = []
+            for memory_id, timestamp in self.state.get("scheduled_reviews", {}).items():
+                self[memory_id] = _parse_timestamp(timestamp)
+
+            self.history.clear()
+            for memory_id, reviews in self.state.get("review_history", {}).items():
+                self.history[memory_id] = [
+                    {**review, "timestamp": _parse_timestamp(review["timestamp"])} for review in reviews
+                ]
+
+        logger.info(f"Loaded {len(self.due)} scheduled reviews and review history for {len(self.history)} memories")
+
+    def __getitem__(self, memory_id: str) -> datetime:
+        return self.due[memory_id]
+
+    def __setitem__(self, memory_id: str, due: datetime) -> None:
+        with self.lock:
+            self.due[memory_id] = due
+            entry = (due.timestamp(), next(self._sequence), memory_id)
+            heapq.heappush(self.heap, entry)
+            self.due_set.discard(memory_id)
+            if entry[0] <= self.counted_until:
+                self.due_set.add(memory_id)
+            else:
+                heapq.heappush(self.upcoming, entry)
+            if len(self.heap) > 2 * len(self.due) + 64 or len(self.upcoming) > 2 * len(self.due) + 64:
+                self._rebuild_heap()
+
+    def __delitem__(self, memory_id: str) -> None:
+        with self.lock:
+            del self.due[memory_id]
+            self.due_set.discard(memory_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.due)
+
+    def __len__(self) -> int:
+        return len(self.due)
+
+    def _rebuild_heap(self) -> None:
+        """Drop stale heap entries."""
+        self.heap = [(due.timestamp(), next(self._sequence), memory_id) for memory_id, due in self.due.items()]
+        heapq.heapify(self.heap)
+        self.upcoming = [entry for entry in self.heap if entry[2] not in self.due_set]
+        heapq.heapify(self.upcoming)
+
+    def _is_current(self, entry: Tuple[float, int, str]) -> bool:
+        due = self.due.get(entry[2])
+        return due is not None and due.timestamp() == entry[0]
+
+    def due_ids(self,
+                now: Optional[datetime] = None,
+                limit: Optional[int] = None,
+                include: Optional[Callable[[str], bool]] = None) -> List[str]:
+        """
+        Get the memories whose review is due, most overdue first.
+
+        Args:
+            now: Reference time (defaults to now)
+            limit: Maximum number of memory IDs (None for all due)
+            include: Predicate a memory ID must pass to be returned (e.g. that the
+                memory still exists); rejected IDs do not count toward the limit
+
+        Returns:
+            Memory IDs; they stay scheduled until rescheduled or removed
+        """
+        cutoff = (now or datetime.now()).timestamp()
+        with self.lock:
+            popped = []
+            due_ids = []
+            while self.heap and self.heap[0][0] <= cutoff and (limit is None or len(due_ids) < limit):
+                entry = heapq.heappop(self.heap)
+                if self._is_current(entry):
+                    popped.append(entry)
+                    if include is None or include(entry[2]):
+                        due_ids.append(entry[2])
+            for entry in popped:
+                heapq.heappush(self.heap, entry)
+            return due_ids
+
+    def due_count(self, now: Optional[datetime] = None) -> int:
+        """
+        Count the memories whose review is due.
+
+        Reviews that became due since the last count are moved out of the upcoming
+        heap once, so repeated counts at advancing times cost O(log n) per review
+        that fell due; counting at an earlier time than before scans the heap.
+
+        Args:
+            now: Reference time (defaults to now)
+
+        Returns:
+            Number of due reviews
+        """
+        cutoff = (now or datetime.now()).timestamp()
+        with self.lock:
+            if cutoff < self.counted_until:
+                return len(self.due_ids(now))
+            while self.upcoming and self.upcoming[0][0] <= cutoff:
+                entry = heapq.heappop(self.upcoming)
+                if self._is_current(entry):
+                    self.due_set.add(entry[2])
+            self.counted_until = cutoff
+            return len(self.due_set)
+
+    def schedule(self, memory_id: str, due: datetime) -> None:
+        """
+        Set and persist the next review time of a memory.
+
+        Args:
+            memory_id: Memory ID
+            due: Next review time
+        """
+        with self.lock:
+            self[memory_id] = due
+            self._append([set_op(["scheduled_reviews", memory_id], due.isoformat())])
+
+    def unschedule(self, memory_id: str) -> bool:
+        """
+        Remove and persist the removal of a memory's scheduled review.
+
+        Args:
+            memory_id: Memory ID
+
+        Returns:
+            True if a review was scheduled, False otherwise
+        """
+        with self.lock:
+            if memory_id not in self.due:
+                return False
+            del self[memory_id]
+            self._append([delete_op(["scheduled_reviews", memory_id])])
+            return True
+
+    def record(self, memory_id: str, review: Dict[str, Any]) -> None:
+        """
+        Append and persist a review result.
+
+        Args:
+            memory_id: Memory ID
+            review: Review record with "timestamp", "success" and "interval"
+        """
+        with self.lock:
+            self.history.append(memory_id, review)
+            self._append([append_unique_op(
+                ["review_history", memory_id],
+                {**review, "timestamp": _format_timestamp(review["timestamp"])}
+            )])
+
+    def _append(self, ops: List[Dict[str, Any]]) -> None:
+        if self.journal is not None:
+            self.journal.apply(self.state, ops)
+
+    def serialize(self, memory_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Get review state in the metadata format (ISO timestamps).
+
+        Args:
+            memory_ids: Memories to include (None for all)
+
+        Returns:
+            Dictionary with "scheduled_reviews" and "review_history"
+        """
+        with self.lock:
+            if memory_ids is None:
+                memory_ids = list(set(self.due) | set(self.history))
+            return {
+                "scheduled_reviews": {
+                    memory_id: _format_timestamp(self.due[memory_id])
+                    for memory_id in memory_ids if memory_id in self.due
+                },
+                "review_history": {
+                    memory_id: [
+                        {**review, "timestamp": _format_timestamp(review["timestamp"])}
+                        for review in self.history[memory_id]
+                    ]
+                    for memory_id in memory_ids if memory_id in self.history
+                }
+            }
+
+    def close(self) -> None:
+        """Fold the journal into a final review store snapshot."""
+        if self.journal is not None:
+            with self.lock:
+                self.journal.close(self.state)
@@ -9,9 +9,14 @@ import logging
 import time
 import random
 import json
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple, Set, Callable
 
+from .ann_index import measure_recall
+from .integrity_index import IntegrityIndex
+from .metadata_journal import set_op, delete_op
+
 logger = logging.getLogger("coda.memory.self_testing")
 
 class MemorySelfTestingFramework:
@@ -24,6 +29,8 @@ class MemorySelfTestingFramework:
     - Run periodic integrity checks
     - Generate test cases for memory operations
     - Validate memory retrieval accuracy
+    - Re-verify only the memories changed since their last verification, on a
+      worker thread if requested, reporting progress as it goes
     """
     
     def __init__(self, memory_manager, config: Dict[str, Any] = None):
@@ -41,6 +48,12 @@ class MemorySelfTestingFramework:
         self.test_interval = self.config.get("memory", {}).get("self_test_interval", 24)  # hours
         self.test_batch_size = self.config.get("memory", {}).get("self_test_batch_size", 10)
         self.repair_threshold = self.config.get("memory", {}).get("repair_threshold", 0.7)  # Repair if confidence > 70%
+        self.min_index_recall = self.config.get("memory", {}).get("ann_min_recall", 0.9)
+        self.integrity_batch_size = self.config.get("memory", {}).get("integrity_batch_size", 256)
+        
+        # Background integrity checks
+        self._check_thread = None
+        self.last_background_result = None
         
         # Test tracking
         self.last_test_time = datetime.now() - timedelta(hours=self.test_interval)  # Force initial test
@@ -59,13 +72,34 @@ class MemorySelfTestingFramework:
         
         logger.info("MemorySelfTestingFramework initialized")
     
+    def _integrity_index(self) -> Optional[IntegrityIndex]:
+        """Get the long-term memory's integrity index, if it keeps one."""
+        integrity_index = getattr(self.memory_manager.long_term, "integrity_index", None)
+        return integrity_index if isinstance(integrity_index, IntegrityIndex) else None
+    
+    def _report_progress(self, check: str, done: int, total: int) -> None:
+        """
+        Report the progress of an integrity check.
+        
+        Args:
+            check: Name of the check ("consistency_check" or "integrity_audit")
+            done: Units (memories or shards) done so far
+            total: Total units
+        """
+        logger.debug(f"{check}: {done}/{total}")
+    
     def run_consistency_check(self, memory_ids: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Run a consistency check on memories.
         
+        Without memory_ids, the memories changed since their last verification are
+        checked when the long-term memory keeps an integrity index (a store with no
+        changed memories is clean without reading any record); otherwise a random
+        sample is checked. Memories that pass are checksummed into the index.
+        
         Args:
-            memory_ids: Optional list of memory IDs to check (if None, selects random sample)
-            
+            memory_ids: Optional list of memory IDs to check (if None, selects changed memories or a random sample)
+        
         Returns:
             Dictionary with check results
         """
@@ -73,8 +107,14 @@ class MemorySelfTestingFramework:
         self.last_test_time = datetime.now()
         self.metrics["last_test_time"] = self.last_test_time.isoformat()
         
+        integrity_index = self._integrity_index()
+        changes = {}
+        
         # Select memories to check
-        if memory_ids is None:
+        if memory_ids is None and integrity_index is not None:
+            changes = integrity_index.dirty_ids()
+            memory_ids = list(changes)
+        elif memory_ids is None:
             all_memory_ids = list(self.memory_manager.long_term.metadata.get("memories", {}).keys())
             if not all_memory_ids:
                 return {
@@ -96,10 +136,71 @@ class MemorySelfTestingFramework:
             "repairs": []
         }
         
+        # Check the memories in batches, each fetched from long-term storage at once
+        batch_size = max(1, self.integrity_batch_size)
+        for start in range(0, len(memory_ids), batch_size):
+            batch_ids = memory_ids[start:start + batch_size]
+            inconsistencies, consistent_memories = self._check_memories(batch_ids)
+            results["inconsistencies"].extend(inconsistencies)
+            
+            if integrity_index is not None and consistent_memories:
+                checksums = self.memory_manager.long_term.checksum_memories(consistent_memories)
+                for memory_id, checksum in checksums.items():
+                    integrity_index.update(memory_id, checksum, changes.get(memory_id))
+            
+            self._report_progress("consistency_check", min(start + batch_size, len(memory_ids)), len(memory_ids))
+        
+        if integrity_index is not None:
+            results["clean"] = integrity_index.is_clean() and not results["inconsistencies"]
+            results["checksum"] = integrity_index.rollup()
+        
+        # Update metrics
+        self.metrics["tests_run"] += 1
+        if results["inconsistencies"]:
+            self.metrics["tests_failed"] += 1
+        else:
+            self.metrics["tests_passed"] += 1
+        
+        # Add to test history
+        self.test_history.append({
+            "timestamp": self.last_test_time.isoformat(),
+            "memories_checked": len(memory_ids),
+            "inconsistencies_found": len(results["inconsistencies"])
+        })
+        
+        # Trim test history
+        if len(self.test_history) > 100:
+            self.test_history = self.test_history[-100:]
+        
+        # Attempt repairs if needed
+        if results["inconsistencies"]:
+            repair_results = self._repair_inconsistencies(results["inconsistencies"])
+            results["repairs"] = repair_results
+        
+        return results
+    
+    def _check_memories(self, memory_ids: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Compare stored memories with their metadata entries.
+        
+        Args:
+            memory_ids: Memory IDs to check
+        
+        Returns:
+            Tuple of (inconsistencies, memories without inconsistencies)
+        """
+        inconsistencies = []
+        consistent_memories = []
+        
+        # Get the memories from long-term storage in one batch
+        stored_memories = {
+            memory["id"]: memory
+            for memory in self.memory_manager.long_term.get_memories_by_ids(memory_ids)
+        }
+        
         # Check each memory
         for memory_id in memory_ids:
-            # Get memory from long-term storage
-            memory = self.memory_manager.long_term.get_memory_by_id(memory_id)
+            memory = stored_memories.get(memory_id)
             
             # Check if memory exists
             if not memory:
@@ -109,7 +210,7 @@ class MemorySelfTestingFramework:
                     "description": "Memory exists in metadata but not in storage",
                     "severity": "high"
                 }
-                results["inconsistencies"].append(inconsistency)
+                inconsistencies.append(inconsistency)
                 continue
             
             # Check metadata consistency
@@ -121,9 +222,11 @@ class MemorySelfTestingFramework:
                     "description": "Memory exists in storage but not in metadata",
                     "severity": "medium"
                 }
-                results["inconsistencies"].append(inconsistency)
+                inconsistencies.append(inconsistency)
                 continue
             
+            consistent = True
+            
             # Check content consistency
             if "content" in memory and "content" in metadata_memory:
                 # Check if content preview matches actual content
@@ -140,7 +243,8 @@ class MemorySelfTestingFramework:
                             "description": "Content preview in metadata doesn't match actual content",
                             "severity": "low"
                         }
-                        results["inconsistencies"].append(inconsistency)
+                        inconsistencies.append(inconsistency)
+                        consistent = False
             
             # Check importance consistency
             if "importance" in memory.get("metadata", {}) and "importance" in metadata_memory:
@@ -151,33 +255,116 @@ class MemorySelfTestingFramework:
                         "description": "Importance in metadata doesn't match importance in memory",
                         "severity": "low"
                     }
-                    results["inconsistencies"].append(inconsistency)
+                    inconsistencies.append(inconsistency)
+                    consistent = False
+            
+            if consistent:
+                consistent_memories.append(memory)
         
-        # Update metrics
-        self.metrics["tests_run"] += 1
-        if results["inconsistencies"]:
-            self.metrics["tests_failed"] += 1
-        else:
-            self.metrics["tests_passed"] += 1
+        return inconsistencies, consistent_memories
+    
+    def run_integrity_audit(self) -> Dict[str, Any]:
+        """
+        Re-checksum every verified memory from storage, one shard at a time.
         
-        # Add to test history
-        self.test_history.append({
-            "timestamp": self.last_test_time.isoformat(),
-            "memories_checked": len(memory_ids),
-            "inconsistencies_found": len(results["inconsistencies"])
-        })
+        Each shard's recomputed root is compared with the stored one, so only shards
+        that differ are compared record by record. Memories whose checksum changed
+        without a recorded write are marked for the next consistency check.
         
-        # Trim test history
-        if len(self.test_history) > 100:
-            self.test_history = self.test_history[-100:]
+        Returns:
+            Dictionary with audit results
+        """
+        integrity_index = self._integrity_index()
+        if integrity_index is None:
+            return {
+                "status": "skipped",
+                "reason": "Long-term memory has no integrity index",
+                "timestamp": datetime.now().isoformat()
+            }
         
-        # Attempt repairs if needed
-        if results["inconsistencies"]:
-            repair_results = self._repair_inconsistencies(results["inconsistencies"])
-            results["repairs"] = repair_results
+        long_term = self.memory_manager.long_term
+        results = {
+            "status": "completed",
+            "timestamp": datetime.now().isoformat(),
+            "shards_checked": integrity_index.n_shards,
+            "shards_mismatched": 0,
+            "inconsistencies": []
+        }
         
+        for shard in range(integrity_index.n_shards):
+            with integrity_index.lock:
+                verified_ids = [memory_id for memory_id in integrity_index.shards[shard]
+                                if memory_id not in integrity_index.dirty]
+                pending = {memory_id: integrity_index.checksum(memory_id)
+                           for memory_id in integrity_index.shards[shard] if memory_id in integrity_index.dirty}
+            
+            checksums = long_term.checksum_memories(long_term.get_memories_by_ids(verified_ids))
+            # Memories waiting for a consistency check keep their old checksum here
+            checksums.update(pending)
+            
+            mismatched_ids = [
+                memory_id for memory_id in integrity_index.diff_shard(shard, checksums)
+                if memory_id not in integrity_index.dirty
+            ]
+            if mismatched_ids:
+                results["shards_mismatched"] += 1
+                integrity_index.mark_dirty(mismatched_ids)
+                results["inconsistencies"].extend({
+                    "memory_id": memory_id,
+                    "type": "checksum_mismatch",
+                    "description": "Stored memory changed without a recorded write",
+                    "severity": "medium"
+                } for memory_id in mismatched_ids)
+            
+            self._report_progress("integrity_audit", shard + 1, integrity_index.n_shards)
+        
+        results["checksum"] = integrity_index.rollup()
         return results
     
+    def start_background_check(self, audit: bool = False) -> bool:
+        """
+        Run the consistency check (or the integrity audit) on a worker thread.
+        
+        Args:
+            audit: Run run_integrity_audit instead of run_consistency_check
+        
+        Returns:
+            True if the check was started, False if one is already running
+        """
+        if self._check_thread is not None and self._check_thread.is_alive():
+            return False
+        
+        self._check_thread = threading.Thread(
+            target=self._run_background_check,
+            args=(self.run_integrity_audit if audit else self.run_consistency_check,),
+            name="MemoryIntegrityCheck",
+            daemon=True
+        )
+        self._check_thread.start()
+        return True
+    
+    def _run_background_check(self, check: Callable[[], Dict[str, Any]]) -> None:
+        try:
+            self.last_background_result = check()
+        except Exception as e:
+            logger.error(f"Error running background integrity check: {e}")
+            self.last_background_result = {"status": "error", "error": str(e)}
+    
+    def wait_for_background_check(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for a running background check to finish.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            Result of the last background check, if any
+        """
+        thread = self._check_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.last_background_result
+    
     def _repair_inconsistencies(self, inconsistencies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Attempt to repair inconsistencies.
@@ -190,6 +377,16 @@ class MemorySelfTestingFramework:
         """
         repairs = []
         
+        # Fetch the memories that repairs read from storage in one batch
+        stored_memories = {
+            memory["id"]: memory
+            for memory in self.memory_manager.long_term.get_memories_by_ids([
+                inconsistency["memory_id"]
+                for inconsistency in inconsistencies
+                if inconsistency["type"] != "missing"
+            ])
+        }
+        
         for inconsistency in inconsistencies:
             memory_id = inconsistency["memory_id"]
             repair_result = {
@@ -208,49 +405,49 @@ class MemorySelfTestingFramework:
                     # Memory exists in metadata but not in storage
                     # Remove from metadata
                     if memory_id in self.memory_manager.long_term.metadata.get("memories", {}):
-                        self.memory_manager.long_term.metadata["memories"].pop(memory_id)
-                        self.memory_manager.long_term._save_metadata()
+                        self.memory_manager.long_term._save_metadata(changes=[delete_op(["memories", memory_id])])
                         repair_result["success"] = True
                         repair_result["action"] = "removed_from_metadata"
                 
                 elif inconsistency["type"] == "metadata_missing":
                     # Memory exists in storage but not in metadata
                     # Get memory and add to metadata
-                    memory = self.memory_manager.long_term.get_memory_by_id(memory_id)
+                    memory = stored_memories.get(memory_id)
                     if memory:
                         content = memory.get("content", "")
                         importance = memory.get("metadata", {}).get("importance", 0.5)
                         
                         # Add to metadata
-                        self.memory_manager.long_term.metadata.setdefault("memories", {})[memory_id] = {
+                        self.memory_manager.long_term._save_metadata(changes=[set_op(["memories", memory_id], {
                             "content": content[:100] + "..." if len(content) > 100 else content,
                             "importance": importance,
                             "timestamp": memory.get("metadata", {}).get("timestamp", datetime.now().isoformat())
-                        }
-                        self.memory_manager.long_term._save_metadata()
+                        })])
                         repair_result["success"] = True
                         repair_result["action"] = "added_to_metadata"
                 
                 elif inconsistency["type"] == "content_mismatch":
                     # Content preview in metadata doesn't match actual content
                     # Update metadata preview
-                    memory = self.memory_manager.long_term.get_memory_by_id(memory_id)
+                    memory = stored_memories.get(memory_id)
                     if memory and memory_id in self.memory_manager.long_term.metadata.get("memories", {}):
                         content = memory.get("content", "")
-                        self.memory_manager.long_term.metadata["memories"][memory_id]["content"] = \
+                        self.memory_manager.long_term._save_metadata(changes=[set_op(
+                            ["memories", memory_id, "content"],
                             content[:100] + "..." if len(content) > 100 else content
-                        self.memory_manager.long_term._save_metadata()
+                        )])
                         repair_result["success"] = True
                         repair_result["action"] = "updated_preview"
                 
                 elif inconsistency["type"] == "importance_mismatch":
                     # Importance in metadata doesn't match importance in memory
                     # Update metadata importance
-                    memory = self.memory_manager.long_term.get_memory_by_id(memory_id)
+                    memory = stored_memories.get(memory_id)
                     if memory and memory_id in self.memory_manager.long_term.metadata.get("memories", {}):
                         importance = memory.get("metadata", {}).get("importance", 0.5)
-                        self.memory_manager.long_term.metadata["memories"][memory_id]["importance"] = importance
-                        self.memory_manager.long_term._save_metadata()
+                        self.memory_manager.long_term._save_metadata(changes=[set_op(
+                            ["memories", memory_id, "importance"], importance
+                        )])
                         repair_result["success"] = True
                         repair_result["action"] = "updated_importance"
             
@@ -322,6 +519,73 @@ class MemorySelfTestingFramework:
         
         return results
     
+    def test_vector_index_recall(self, k: int = 10, sample_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Test the recall@k of the long-term vector index against exact search.
+        
+        Stored embeddings are sampled and used as queries; an approximate index passes
+        if it finds at least ``ann_min_recall`` of the exact top-k on average.
+        
+        Args:
+            k: Number of neighbours compared per query
+            sample_size: Number of queries (defaults to the self-test batch size)
+            
+        Returns:
+            Dictionary with test results
+        """
+        timestamp = datetime.now().isoformat()
+        vector_index = getattr(self.memory_manager.long_term, "vector_index", None)
+        if vector_index is None or len(vector_index) == 0:
+            return {
+                "status": "skipped",
+                "reason": "No vector index to check",
+                "timestamp": timestamp
+            }
+        
+        # Use stored embeddings as queries
+        sample_size = min(sample_size or self.test_batch_size, len(vector_index))
+        positions = random.sample(range(len(vector_index)), sample_size)
+        queries = vector_index.matrix[positions]
+        
+        start_time = time.time()
+        recall = measure_recall(vector_index, queries, k)
+        duration = time.time() - start_time
+        passed = recall >= self.min_index_recall
+        
+        # Update metrics
+        self.metrics["tests_run"] += 1
+        if passed:
+            self.metrics["tests_passed"] += 1
+        else:
+            self.metrics["tests_failed"] += 1
+            logger.warning(f"Vector index recall@{k} is {recall:.3f} (minimum {self.min_index_recall})")
+        
+        results = {
+            "status": "completed",
+            "timestamp": timestamp,
+            "index_type": type(vector_index).__name__,
+            "k": k,
+            "queries": sample_size,
+            "recall": recall,
+            "min_recall": self.min_index_recall,
+            "passed": passed,
+            "duration_seconds": duration
+        }
+        
+        # Add to test history
+        self.test_history.append({
+            "timestamp": timestamp,
+            "test": "vector_index_recall",
+            "recall": recall,
+            "passed": passed
+        })
+        
+        # Trim test history
+        if len(self.test_history) > 100:
+            self.test_history = self.test_history[-100:]
+        
+        return results
+    
     def generate_test_memory(self, memory_type: str = "fact") -> Dict[str, Any]:
         """
         Generate a test memory for testing purposes.
@@ -7,19 +7,228 @@ This module provides a MemoryManager class for handling short-term conversation
 import os
 import json
 import logging
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 from collections import deque
-from typing import List, Dict, Any, Optional, Union
+from itertools import islice
+from typing import List, Dict, Any, Optional, Union, Callable, Iterable, Tuple
 
 logger = logging.getLogger("coda.memory")
 
+def _default_token_estimate(text: str) -> int:
+    return max(1, len(text) // 4)
+
+class TurnBuffer(deque):
+    """
+    Deque of conversation turns with cached token counts.
+    
+    Responsibilities:
+    - Estimate each turn's tokens once, when it is added
+    - Keep running totals of message (non-system turn) tokens, messages and system
+      turns before each turn, so the tokens of any suffix are one subtraction
+    - Find the oldest turn of the newest window that fits a token budget by bisection
+    - Stay consistent under every deque mutation: appends and pops at either end
+      update the totals in O(1), other mutations rebuild them
+    
+    The totals only grow while turns are appended and aged out, so the offsets of
+    a turn stay comparable between calls; `epoch` changes whenever that stops
+    being true. Turns must not be edited in place once added.
+    """
+    
+    def __init__(self,
+                 iterable: Iterable[Dict[str, Any]] = (),
+                 maxlen: Optional[int] = None,
+                 estimate_tokens: Optional[Callable[[str], int]] = None):
+        """
+        Initialize the buffer.
+        
+        Args:
+            iterable: Initial turns
+            maxlen: Maximum number of turns (older turns are dropped)
+            estimate_tokens: Token estimator for turn content (defaults to ~4 chars per token)
+        """
+        super().__init__(maxlen=maxlen)
+        self.estimate_tokens = estimate_tokens or _default_token_estimate
+        self.epoch = 0
+        self._tokens = deque()
+        self._tokens_before = deque()
+        self._messages_before = deque()
+        self._systems_before = deque()
+        self._token_total = 0
+        self._message_total = 0
+        self._system_total = 0
+        self.extend(iterable)
+    
+    def _offsets(self, turn: Dict[str, Any]) -> Tuple[int, int, int]:
+        """Get the (tokens, message, system) increments a turn adds to the totals."""
+        tokens = self.estimate_tokens(turn["content"])
+        if turn["role"] == "system":
+            return tokens, 0, 1
+        return tokens, 1, 0
+    
+    def _push_right(self, turn: Dict[str, Any]) -> None:
+        tokens, messages, systems = self._offsets(turn)
+        self._tokens.append(tokens)
+        self._tokens_before.append(self._token_total)
+        self._messages_before.append(self._message_total)
+        self._systems_before.append(self._system_total)
+        self._token_total += tokens * messages
+        self._message_total += messages
+        self._system_total += systems
+    
+    def _rebuild(self) -> None:
+        """Recompute the cached counts and totals from the turns."""
+        for cache in (self._tokens, self._tokens_before, self._messages_before, self._systems_before):
+            cache.clear()
+        self._token_total = self._message_total = self._system_total = 0
+        for turn in self:
+            self._push_right(turn)
+        self.epoch += 1
+    
+    def append(self, turn: Dict[str, Any]) -> None:
+        if self.maxlen == 0:
+            return
+        if len(self) == self.maxlen:
+            self.popleft()
+        super().append(turn)
+        self._push_right(turn)
+    
+    def appendleft(self, turn: Dict[str, Any]) -> None:
+        if self.maxlen == 0:
+            return
+        if len(self) == self.maxlen:
+            self.pop()
+        tokens, messages, systems = self._offsets(turn)
+        if self:
+            tokens_before = self._tokens_before[0] - tokens * messages
+            messages_before = self._messages_before[0] - messages
+            systems_before = self._systems_before[0] - systems
+        else:
+            tokens_before, messages_before, systems_before = self._token_total, self._message_total, self._system_total
+            self._token_total += tokens * messages
+            self._message_total += messages
+            self._system_total += systems
+        super().appendleft(turn)
+        self._tokens.appendleft(tokens)
+        self._tokens_before.appendleft(tokens_before)
+        self._messages_before.appendleft(messages_before)
+        self._systems_before.appendleft(systems_before)
+        self.epoch += 1
+    
+    def pop(self) -> Dict[str, Any]:
+        turn = super().pop()
+        self._tokens.pop()
+        self._token_total = self._tokens_before.pop()
+        self._message_total = self._messages_before.pop()
+        self._system_total = self._systems_before.pop()
+        self.epoch += 1
+        return turn
+    
+    def popleft(self) -> Dict[str, Any]:
+        turn = super().popleft()
+        for cache in (self._tokens, self._tokens_before, self._messages_before, self._systems_before):
+            cache.popleft()
+        return turn
+    
+    def extend(self, turns: Iterable[Dict[str, Any]]) -> None:
+        for turn in list(turns):
+            self.append(turn)
+    
+    def extendleft(self, turns: Iterable[Dict[str, Any]]) -> None:
+        for turn in list(turns):
+            self.appendleft(turn)
+    
+    def __iadd__(self, turns: Iterable[Dict[str, Any]]) -> "TurnBuffer":
+        self.extend(turns)
+        return self
+    
+    def clear(self) -> None:
+        super().clear()
+        self._rebuild()
+    
+    def insert(self, index: int, turn: Dict[str, Any]) -> None:
+        super().insert(index, turn)
+        self._rebuild()
+    
+    def remove(self, turn: Dict[str, Any]) -> None:
+        super().remove(turn)
+        self._rebuild()
+    
+    def rotate(self, n: int = 1) -> None:
+        super().rotate(n)
+        self._rebuild()
+    
+    def reverse(self) -> None:
+        super().reverse()
+        self._rebuild()
+    
+    def __setitem__(self, index: int, turn: Dict[str, Any]) -> None:
+        super().__setitem__(index, turn)
+        self._rebuild()
+    
+    def __delitem__(self, index: int) -> None:
+        super().__delitem__(index)
+        self._rebuild()
+    
+    def __imul__(self, n: int) -> "TurnBuffer":
+        super().__imul__(n)
+        self._rebuild()
+        return self
+    
+    def copy(self) -> "TurnBuffer":
+        return TurnBuffer(self, self.maxlen, self.estimate_tokens)
+    
+    __copy__ = copy
+    
+    def tokens(self, index: int) -> int:
+        """Get the cached token count of the turn at an index."""
+        return self._tokens[index]
+    
+    def first_system_index(self) -> Optional[int]:
+        """Get the index of the first system turn (None if there is none)."""
+        if not self or self._system_total == self._systems_before[0]:
+            return None
+        return bisect_right(self._systems_before, self._systems_before[0]) - 1
+    
+    def window_start(self, max_tokens: int) -> int:
+        """
+        Find where the newest run of messages fitting a token budget starts.
+        
+        Args:
+            max_tokens: Token budget for the messages (system turns are not counted)
+        
+        Returns:
+            Index of the oldest turn in the window (len(self) if no message fits)
+        """
+        return bisect_left(self._tokens_before, self._token_total - max_tokens)
+    
+    def tokens_from(self, index: int) -> int:
+        """Get the tokens of the messages from an index to the newest turn."""
+        return self._token_total - (self._tokens_before[index] if index < len(self) else self._token_total)
+    
+    def message_offset(self, index: int) -> int:
+        """Get the number of messages added before the turn at an index (or in total)."""
+        return self._messages_before[index] if index < len(self) else self._message_total
+    
+    @property
+    def message_total(self) -> int:
+        """Get the number of messages added since the counts were last rebuilt."""
+        return self._message_total
+    
+    def messages_from(self, index: int) -> List[Dict[str, Any]]:
+        """Get the messages (non-system turns) from an index to the newest turn, oldest first."""
+        messages = [turn for turn in islice(reversed(self), len(self) - index) if turn["role"] != "system"]
+        messages.reverse()
+        return messages
+
 class MemoryManager:
     """
     Manages short-term conversation memory for Coda.
     
     Responsibilities:
     - Store conversation turns (user/assistant messages)
-    - Provide context for LLM within token limits
+    - Provide context for LLM within token limits, from cached per-turn token
+      counts, and report how the context changed since the previous call
     - Support basic export/import for debugging
     
     Future extensibility:
@@ -34,7 +243,8 @@ class MemoryManager:
         Args:
             max_turns: Maximum number of conversation turns to store
         """
-        self.turns = deque(maxlen=max_turns)
+        self.turns = TurnBuffer(maxlen=max_turns, estimate_tokens=self._estimate_tokens)
+        self._last_window = None
         self.session_start = datetime.now().isoformat()
         self.turn_count = 0
         logger.info(f"MemoryManager initialized with max_turns={max_turns}")
@@ -66,55 +276,94 @@ class MemoryManager:
         logger.debug(f"Added turn {self.turn_count} with role '{role}'")
         return turn
     
+    def _context_window(self, max_tokens: int) -> Tuple[Optional[Dict[str, Any]], int, int]:
+        """
+        Locate the context within the token budget.
+        
+        Args:
+            max_tokens: Maximum number of tokens to include
+        
+        Returns:
+            Tuple of (first system turn or None, index of the oldest turn in the
+            window, estimated token count)
+        """
+        system_turn = None
+        system_tokens = 0
+        system_index = self.turns.first_system_index()
+        if system_index is not None:
+            system_turn = self.turns[system_index]
+            system_tokens = self.turns.tokens(system_index)
+        
+        # The window is the longest run of newest messages whose tokens fit
+        start = self.turns.window_start(max_tokens - system_tokens)
+        return system_turn, start, system_tokens + self.turns.tokens_from(start)
+    
     def get_context(self, max_tokens: int = 800) -> List[Dict[str, str]]:
         """
         Get conversation context within token budget.
         
+        The first system message is always included, followed by the newest
+        messages that fit in the remaining budget.
+        
         Args:
             max_tokens: Maximum number of tokens to include
-            
+        
         Returns:
             List of {"role": "...", "content": "..."} dicts for LLM context
         """
-        context = []
-        token_count = 0
-        
-        # Always include system message if present
-        system_messages = [t for t in self.turns if t["role"] == "system"]
-        if system_messages:
-            system_message = system_messages[0]  # Use the first system message
-            system_tokens = self._estimate_tokens(system_message["content"])
-            context.append({
-                "role": "system",
-                "content": system_message["content"]
-            })
-            token_count += system_tokens
-            logger.debug(f"Added system message to context ({system_tokens} tokens)")
-        
-        # Process non-system turns from newest to oldest
-        non_system_turns = [t for t in self.turns if t["role"] != "system"]
-        
-        for turn in reversed(non_system_turns):
-            # Estimate tokens
-            turn_tokens = self._estimate_tokens(turn["content"])
-            
-            if token_count + turn_tokens <= max_tokens:
-                # Add to beginning to maintain chronological order
-                # (after system message if present)
-                insert_pos = 1 if context and context[0]["role"] == "system" else 0
-                context.insert(insert_pos, {
-                    "role": turn["role"],
-                    "content": turn["content"]
-                })
-                token_count += turn_tokens
-                logger.debug(f"Added turn {turn['turn_id']} to context ({turn_tokens} tokens)")
-            else:
-                logger.debug(f"Skipped turn {turn['turn_id']} due to token limit")
-                break
-        
+        system_turn, start, token_count = self._context_window(max_tokens)
+        context = self._format_context(system_turn, self.turns.messages_from(start))
         logger.info(f"Generated context with {len(context)} turns and ~{token_count} tokens")
         return context
     
+    def get_context_diff(self, max_tokens: int = 800) -> Dict[str, Any]:
+        """
+        Get conversation context and how it changed since the previous call.
+        
+        When "reset" is False, the new context is the previous one with "dropped"
+        messages removed after the system message and "added" appended at the end,
+        so a caller holding the previous context (or an LLM prompt cache) can
+        reuse its unchanged part.
+        
+        Args:
+            max_tokens: Maximum number of tokens to include
+        
+        Returns:
+            Dictionary with the full "context", "reset" (True on the first call or
+            when the system message changed or turns were removed or reordered),
+            "dropped" (number of messages) and "added" (list of messages)
+        """
+        system_turn, start, token_count = self._context_window(max_tokens)
+        messages = self.turns.messages_from(start)
+        context = self._format_context(system_turn, messages)
+        
+        window = (self.turns.epoch, system_turn, self.turns.message_offset(start), self.turns.message_total)
+        previous = self._last_window
+        self._last_window = window
+        
+        if (previous is None or previous[0] != window[0] or previous[1] is not window[1]
+                or window[2] < previous[2] or window[3] < previous[3]):
+            return {"context": context, "reset": True, "dropped": 0, "added": context[1 if system_turn else 0:]}
+        
+        _, _, previous_start, previous_end = previous
+        _, _, new_start, new_end = window
+        dropped = min(new_start, previous_end) - previous_start
+        added_count = new_end - max(new_start, previous_end)
+        logger.debug(f"Context diff: dropped {dropped}, added {added_count} messages (~{token_count} tokens)")
+        return {
+            "context": context,
+            "reset": False,
+            "dropped": dropped,
+            "added": context[len(context) - added_count:] if added_count else []
+        }
+    
+    @staticmethod
+    def _format_context(system_turn: Optional[Dict[str, Any]],
+                        messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        context = [{"role": "system", "content": system_turn["content"]}] if system_turn else []
+        context.extend({"role": turn["role"], "content": turn["content"]} for turn in messages)
+        return context
+    
     def _estimate_tokens(self, text: str) -> int:
         """
         Estimate token count for a text string.
@@ -0,0 +1,343 @@
+"""
+Delta snapshot store for Coda Lite.
+
+This module provides a SnapshotStore class that writes memory snapshots as
+compressed JSON-lines files. Long-term memory records are content-addressed by
+hash: a snapshot lists only the records that changed since its parent and
+includes a record body only if no snapshot since the last full snapshot holds the
+same content. Every ``full_snapshot_interval`` snapshots a self-contained full
+snapshot starts a new chain. Restoring walks the chain and streams records
+instead of loading one large JSON document.
+
+File layout (``<snapshot_id>.snap.gz`` or ``.snap.zst``):
+    line 1: header with snapshot fields and the parent file name (null for a full snapshot)
+    then:   {"id", "hash", "record"} for a record whose content is new in the chain
+            {"id", "hash"} for a record whose content is held by an earlier snapshot
+            {"id", "deleted": true} for a removed record
+"""
+
+import io
+import os
+import gzip
+import json
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+# Try to import zstd compression
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger("coda.memory.snapshot_store")
+
+SNAPSHOT_FORMAT = "coda-memory-snapshot"
+SNAPSHOT_EXTENSIONS = {"gzip": ".snap.gz", "zstd": ".snap.zst"}
+HEAD_FILE = "HEAD"
+
+
+def is_snapshot_file(path: str) -> bool:
+    """Check whether a path names a delta snapshot file."""
+    return path.endswith(tuple(SNAPSHOT_EXTENSIONS.values()))
+
+
+def record_hash(record: Dict[str, Any]) -> str:
+    """Content hash of a memory record (canonical JSON)."""
+    serialized = json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+
+def _open_snapshot(path: str, mode: str):
+    """Open a snapshot file as a text stream ("r" or "w"), compressed by extension."""
+    if path.endswith(SNAPSHOT_EXTENSIONS["zstd"]):
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError(f"zstandard is required to open {path}")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"))
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """
+    Read the header line of a snapshot file.
+
+    Args:
+        path: Snapshot file path
+
+    Returns:
+        Header dictionary
+    """
+    with _open_snapshot(path, "r") as f:
+        header = json.loads(f.readline())
+    if header.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"{path} is not a memory snapshot")
+    return header
+
+
+def _iter_entries(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream the record entries of a snapshot file (the header is skipped)."""
+    with _open_snapshot(path, "r") as f:
+        f.readline()
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class SnapshotStore:
+    """
+    Content-addressed delta snapshot files.
+
+    Responsibilities:
+    - Write snapshots holding only the records changed since the parent snapshot
+    - Start a new self-contained chain every ``full_snapshot_interval`` snapshots
+    - Track the chain head (HEAD file) so deltas continue across restarts
+    - Stream the records of any snapshot by walking its chain
+    - Export a snapshot as a standalone full snapshot
+    """
+
+    def __init__(self,
+                 snapshot_dir: str,
+                 compression: str = "gzip",
+                 full_snapshot_interval: int = 20):
+        """
+        Initialize the snapshot store.
+
+        Args:
+            snapshot_dir: Directory of the snapshot files
+            compression: "gzip" or "zstd" (gzip is used if zstandard is not installed)
+            full_snapshot_interval: Snapshots per chain before a full snapshot is written
+        """
+        if compression == "zstd" and not ZSTD_AVAILABLE:
+            logger.warning("zstandard not available, compressing snapshots with gzip")
+            compression = "gzip"
+        if compression not in SNAPSHOT_EXTENSIONS:
+            raise ValueError(f"Unsupported snapshot compression: {compression}")
+
+        self.snapshot_dir = snapshot_dir
+        self.compression = compression
+        self.extension = SNAPSHOT_EXTENSIONS[compression]
+        self.full_snapshot_interval = max(1, full_snapshot_interval)
+
+        # State of the chain head; loaded from disk on first use
+        self.head: Optional[str] = None
+        self.record_hashes: Dict[str, str] = {}  # memory ID -> content hash at the head
+        self.record_stamps: Dict[str, Any] = {}  # memory ID -> change stamp when last hashed
+        self.stored_hashes: Set[str] = set()  # hashes with a record body in the current chain
+        self.chain_length = 0
+        self._resumed = False
+
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    def path_for(self, snapshot_id: str) -> str:
+        """
+        Get an unused file path for a snapshot.
+
+        Snapshot IDs can repeat (e.g. "final_snapshot" in every session), but files
+        are never overwritten because later snapshots may name them as parent.
+        """
+        path = os.path.join(self.snapshot_dir, snapshot_id + self.extension)
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(self.snapshot_dir, f"{snapshot_id}.{suffix}{self.extension}")
+            suffix += 1
+        return path
+
+    def _resume(self) -> None:
+        """Load the head of an existing chain so new snapshots continue it."""
+        if self._resumed:
+            return
+        self._resumed = True
+
+        head_path = os.path.join(self.snapshot_dir, HEAD_FILE)
+        if not os.path.exists(head_path):
+            return
+        with open(head_path, 'r', encoding='utf-8') as f:
+            head = f.read().strip()
+        path = os.path.join(self.snapshot_dir, head)
+        if not head or not os.path.exists(path):
+            return
+
+        try:
+            chain = self.chain(path)
+            self.record_hashes = self._resolve_hashes(chain)
+            self.stored_hashes = {
+                entry["hash"] for chain_path in chain for entry in _iter_entries(chain_path) if "record" in entry
+            }
+            self.chain_length = len(chain) - 1
+            self.head = head
+            logger.info(f"Resumed snapshot chain at {head} ({len(self.record_hashes)} records)")
+        except Exception as e:
+            # Start a new chain with a full snapshot
+            logger.error(f"Error resuming snapshot chain from {head}: {e}")
+            self.record_hashes, self.stored_hashes = {}, set()
+
+    @staticmethod
+    def chain(path: str) -> List[str]:
+        """
+        Get the files needed to restore a snapshot.
+
+        Args:
+            path: Snapshot file path
+
+        Returns:
+            File paths from the full snapshot to the given snapshot
+        """
+        chain = [path]
+        parent = read_header(path).get("parent")
+        while parent:
+            parent_path = os.path.join(os.path.dirname(path), parent)
+            if parent_path in chain:
+                raise ValueError(f"Snapshot chain of {path} has a cycle")
+            chain.append(parent_path)
+            parent = read_header(parent_path).get("parent")
+        chain.reverse()
+        return chain
+
+    @staticmethod
+    def _resolve_hashes(chain: List[str]) -> Dict[str, str]:
+        """Replay the record lists of a chain into memory ID -> hash."""
+        hashes = {}
+        for path in chain:
+            for entry in _iter_entries(path):
+                if entry.get("deleted"):
+                    hashes.pop(entry["id"], None)
+                else:
+                    hashes[entry["id"]] = entry["hash"]
+        return hashes
+
+    def write(self,
+              snapshot_id: str,
+              header: Dict[str, Any],
+              records: Dict[str, Dict[str, Any]],
+              stamp: Optional[Callable[[str], Any]] = None) -> str:
+        """
+        Write a snapshot of the given records, as a delta from the chain head.
+
+        Args:
+            snapshot_id: Snapshot ID (also the file name)
+            header: Snapshot fields stored in the header line
+            records: Memory ID -> record
+            stamp: Optional function returning a change stamp per memory ID; records
+                whose stamp is unchanged since the last snapshot are not re-hashed
+
+        Returns:
+            Path to the snapshot file
+        """
+        self._resume()
+
+        full = self.head is None or self.chain_length + 1 >= self.full_snapshot_interval
+        if full:
+            self.record_hashes, self.stored_hashes = {}, set()
+
+        entries = []
+        hashes = {}
+        stamps = {}
+        for memory_id, record in records.items():
+            current_stamp = stamp(memory_id) if stamp is not None else None
+            digest = self.record_hashes.get(memory_id)
+            if current_stamp is None or digest is None or self.record_stamps.get(memory_id) != current_stamp:
+                digest = record_hash(record)
+            hashes[memory_id] = digest
+            stamps[memory_id] = current_stamp
+
+            if self.record_hashes.get(memory_id) == digest:
+                continue
+            if digest in self.stored_hashes:
+                entries.append({"id": memory_id, "hash": digest})
+            else:
+                entries.append({"id": memory_id, "hash": digest, "record": record})
+                self.stored_hashes.add(digest)
+
+        for memory_id in self.record_hashes.keys() - hashes.keys():
+            entries.append({"id": memory_id, "deleted": True})
+
+        path = self.path_for(snapshot_id)
+        self._write_file(path, {
+            **header,
+            "format": SNAPSHOT_FORMAT,
+            "snapshot_id": snapshot_id,
+            "parent": None if full else self.head,
+            "record_count": len(hashes)
+        }, entries)
+        self._set_head(os.path.basename(path))
+
+        self.record_hashes = hashes
+        self.record_stamps = stamps
+        self.chain_length = 0 if full else self.chain_length + 1
+
+        logger.info(f"Wrote {'full' if full else 'delta'} snapshot {snapshot_id} "
+                    f"({len(entries)} of {len(hashes)} records changed)")
+        return path
+
+    def _write_file(self, path: str, header: Dict[str, Any], entries) -> None:
+        """Write a snapshot file atomically."""
+        extension = next(ext for ext in SNAPSHOT_EXTENSIONS.values() if path.endswith(ext))
+        tmp_path = path[:-len(extension)] + ".tmp" + extension
+        with _open_snapshot(tmp_path, "w") as f:
+            f.write(json.dumps(header, ensure_ascii=False, default=str) + "\n")
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        os.replace(tmp_path, path)
+
+    def _set_head(self, name: str) -> None:
+        head_path = os.path.join(self.snapshot_dir, HEAD_FILE)
+        with open(head_path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(name)
+        os.replace(head_path + ".tmp", head_path)
+        self.head = name
+
+    @classmethod
+    def iter_records(cls, path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream the records of a snapshot.
+
+        Only the ID -> hash map of the chain is held in memory; record bodies are
+        yielded as they are read, newest file first.
+
+        Args:
+            path: Snapshot file path
+
+        Yields:
+            (memory ID, record) pairs
+        """
+        chain = cls.chain(path)
+        wanted: Dict[str, List[str]] = {}
+        for memory_id, digest in cls._resolve_hashes(chain).items():
+            wanted.setdefault(digest, []).append(memory_id)
+
+        for chain_path in reversed(chain):
+            if not wanted:
+                break
+            for entry in _iter_entries(chain_path):
+                memory_ids = wanted.pop(entry.get("hash"), None) if "record" in entry else None
+                for memory_id in memory_ids or ():
+                    yield memory_id, entry["record"]
+
+        if wanted:
+            logger.warning(f"Snapshot {path} is missing {len(wanted)} records")
+
+    def export(self, path: str, filepath: str) -> str:
+        """
+        Write a snapshot as a standalone full snapshot.
+
+        Args:
+            path: Snapshot file path
+            filepath: Target path (its extension selects the compression)
+
+        Returns:
+            The target path
+        """
+        if not is_snapshot_file(filepath):
+            filepath += self.extension
+        header = {**read_header(path), "parent": None}
+        entries = (
+            {"id": memory_id, "hash": record_hash(record), "record": record}
+            for memory_id, record in self.iter_records(path)
+        )
+        self._write_file(filepath, header, entries)
+        return filepath
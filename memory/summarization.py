@@ -11,7 +11,11 @@ import re
 import math
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple, Set, Counter
-from collections import defaultdict, Counter
+from collections import Counter
+
+from .memory_filters import memory_topics
+from .embedding_clusters import EmbeddingClusters
+from .topic_index import TopicIndex
 
 logger = logging.getLogger("coda.memory.summarization")
 
@@ -43,6 +47,7 @@ class MemorySummarizationSystem:
         self.summary_cache_ttl = self.config.get("memory", {}).get("summary_cache_ttl", 3600)  # 1 hour
         
         # Topic clustering settings
+        self.clustering_mode = self.config.get("memory", {}).get("clustering_mode", "topics")
         self.similarity_threshold = self.config.get("memory", {}).get("topic_similarity_threshold", 0.7)
         self.max_topics_per_cluster = self.config.get("memory", {}).get("max_topics_per_cluster", 5)
         
@@ -54,6 +59,10 @@ class MemorySummarizationSystem:
         self.topic_clusters_cache = {}
         self.profile_cache = {}
         
+        # Memories of the cached clusters, with the topic index stamp they were fetched at
+        self.cluster_memories: Dict[str, Tuple[Optional[int], Dict[str, Any]]] = {}
+        self.topic_clusters_version = None
+        
         # Cache timestamps
         self.last_topic_clustering = datetime.now() - timedelta(days=1)  # Force initial clustering
         self.last_profile_update = datetime.now() - timedelta(days=1)  # Force initial profile update
@@ -64,222 +73,170 @@ class MemorySummarizationSystem:
         """
         Cluster memories by topic.
         
+        In "topics" mode, topics with at least two memories are merged when their
+        Jaccard overlap reaches the similarity threshold; the groups come from the
+        long-term memory's topic index. In "embedding" mode, the groups are the
+        long-term memory's mini-batch k-means clusters and are named after their
+        most common topics. Either way the clusters are precomputed, and only
+        memories that changed since the last clustering are fetched from storage.
+        
         Args:
-            force_update: Whether to force a cache update
+            force_update: Whether to force a recomputation
             
         Returns:
             Dictionary mapping topic clusters to lists of memories
         """
+        long_term = self.memory_manager.long_term
+        topic_index = getattr(long_term, "topic_index", None)
+        if not isinstance(topic_index, TopicIndex):
+            topic_index = None
+        embedding_clusters = getattr(long_term, "embedding_clusters", None)
+        use_embeddings = (
+            self.clustering_mode == "embedding"
+            and topic_index is not None
+            and isinstance(embedding_clusters, EmbeddingClusters)
+            and embedding_clusters.is_trained
+        )
+        version = None
+        if topic_index is not None:
+            version = (topic_index.version, embedding_clusters.version if use_embeddings else None)
+        
         # Check if we have a cached result that's still valid
-        cache_age = (datetime.now() - self.last_topic_clustering).total_seconds()
-        if not force_update and self.topic_clusters_cache and cache_age < self.summary_cache_ttl:
-            return self.topic_clusters_cache
+        if not force_update and self.topic_clusters_cache:
+            if version is not None:
+                if version == self.topic_clusters_version:
+                    return self.topic_clusters_cache
+            else:
+                cache_age = (datetime.now() - self.last_topic_clustering).total_seconds()
+                if cache_age < self.summary_cache_ttl:
+                    return self.topic_clusters_cache
         
-        # Get all memories
-        all_memories = []
         try:
-            # Get all memory IDs from metadata
-            memory_ids = list(self.memory_manager.long_term.metadata.get("memories", {}).keys())
+            if topic_index is None:
+                topic_index = self._build_topic_index()
             
-            # Get memory objects
-            for memory_id in memory_ids:
-                memory = self.memory_manager.long_term.get_memory_by_id(memory_id)
-                if memory:
-                    all_memories.append(memory)
+            # Get the memory IDs of each group and fetch the memories
+            if use_embeddings:
+                topic_groups = None
+                group_memory_ids = embedding_clusters.clusters()
+            else:
+                topic_groups = topic_index.clusters(self.similarity_threshold)
+                group_memory_ids = [topic_index.cluster_memory_ids(topics) for topics in topic_groups]
+            memories = self._refresh_cluster_memories(topic_index, [
+                memory_id for memory_ids in group_memory_ids for memory_id in memory_ids
+            ])
         except Exception as e:
             logger.error(f"Error retrieving memories for clustering: {e}")
             return {}
         
-        # Extract topics from memories
-        memory_topics = {}
-        for memory in all_memories:
-            memory_id = memory.get("id")
-            if not memory_id:
+        # Name each cluster and filter out small clusters
+        clusters = {}
+        for position, memory_ids in enumerate(group_memory_ids):
+            cluster_memories = [memories[memory_id] for memory_id in memory_ids if memory_id in memories]
+            if len(cluster_memories) < self.min_cluster_size:
                 continue
-                
-            # Get topics from metadata
-            topics_str = memory.get("metadata", {}).get("topics", "")
-            if isinstance(topics_str, list):
-                topics = topics_str
+            if topic_groups is not None:
+                name = ", ".join(topic_groups[position][:self.max_topics_per_cluster])
             else:
-                topics = topics_str.split(",") if topics_str else []
-            
-            # Store topics for this memory
-            if topics:
-                memory_topics[memory_id] = topics
-        
-        # Count topic occurrences
-        topic_counts = Counter()
-        for topics in memory_topics.values():
-            topic_counts.update(topics)
-        
-        # Filter out rare topics (mentioned only once)
-        common_topics = {topic for topic, count in topic_counts.items() if count > 1 and topic}
-        
-        # Group memories by topic
-        topic_memories = defaultdict(list)
-        for memory in all_memories:
-            memory_id = memory.get("id")
-            if not memory_id or memory_id not in memory_topics:
-                continue
-                
-            # Get topics for this memory
-            topics = memory_topics[memory_id]
-            
-            # Add memory to each of its topics
-            for topic in topics:
-                if topic in common_topics:
-                    topic_memories[topic].append(memory)
+                name = self._name_embedding_cluster(cluster_memories, clusters)
+            clusters[name] = cluster_memories
         
-        # Merge similar topics
-        merged_topics = self._merge_similar_topics(topic_memories)
-        
-        # Filter out small clusters
-        clusters = {topic: memories for topic, memories in merged_topics.items() 
-                   if len(memories) >= self.min_cluster_size}
+        # Drop cached summaries of clusters whose membership changed
+        for name, cluster_memories in self.topic_clusters_cache.items():
+            if [m.get("id") for m in clusters.get(name, [])] != [m.get("id") for m in cluster_memories]:
+                self.summary_cache.pop(f"topic_{name}", None)
         
         # Update cache
         self.topic_clusters_cache = clusters
+        self.topic_clusters_version = version
         self.last_topic_clustering = datetime.now()
         
         logger.info(f"Clustered memories into {len(clusters)} topic clusters")
         
         return clusters
     
-    def _merge_similar_topics(self, topic_memories: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    def _name_embedding_cluster(self, memories: List[Dict[str, Any]], taken: Dict[str, Any]) -> str:
         """
-        Merge similar topics based on memory overlap.
+        Name an embedding cluster after the most common topics of its memories.
         
         Args:
-            topic_memories: Dictionary mapping topics to lists of memories
+            memories: Memories of the cluster
+            taken: Clusters named so far
             
         Returns:
-            Dictionary with merged topics
+            Cluster name that is not in taken
         """
-        # Calculate topic similarity based on memory overlap
-        topic_similarity = {}
-        topics = list(topic_memories.keys())
-        
-        for i, topic1 in enumerate(topics):
-            for topic2 in topics[i+1:]:
-                # Get memory IDs for each topic
-                memories1 = {m.get("id") for m in topic_memories[topic1] if m.get("id")}
-                memories2 = {m.get("id") for m in topic_memories[topic2] if m.get("id")}
-                
-                # Calculate Jaccard similarity
-                intersection = len(memories1.intersection(memories2))
-                union = len(memories1.union(memories2))
-                
-                if union > 0:
-                    similarity = intersection / union
-                    
-                    # Store similarity if above threshold
-                    if similarity >= self.similarity_threshold:
-                        topic_similarity[(topic1, topic2)] = similarity
-        
-        # Merge topics based on similarity
-        merged_topics = {}
-        merged_sets = {}
-        
-        # Sort similarities in descending order
-        sorted_similarities = sorted(topic_similarity.items(), key=lambda x: x[1], reverse=True)
-        
-        # Process each topic pair
-        for (topic1, topic2), similarity in sorted_similarities:
-            # Check if either topic has already been merged
-            merged1 = None
-            merged2 = None
-            
-            for merged_set_id, merged_set in merged_sets.items():
-                if topic1 in merged_set:
-                    merged1 = merged_set_id
-                if topic2 in merged_set:
-                    merged2 = merged_set_id
-            
-            if merged1 is None and merged2 is None:
-                # Create a new merged set
-                merged_set_id = f"{topic1}_{topic2}"
-                merged_sets[merged_set_id] = {topic1, topic2}
-                
-                # Merge memories
-                merged_topics[merged_set_id] = topic_memories[topic1] + topic_memories[topic2]
-                
-            elif merged1 is not None and merged2 is None:
-                # Add topic2 to merged1
-                merged_sets[merged1].add(topic2)
-                
-                # Add memories from topic2
-                merged_topics[merged1].extend(topic_memories[topic2])
-                
-            elif merged1 is None and merged2 is not None:
-                # Add topic1 to merged2
-                merged_sets[merged2].add(topic1)
-                
-                # Add memories from topic1
-                merged_topics[merged2].extend(topic_memories[topic1])
-                
-            elif merged1 != merged2:
-                # Merge the two merged sets
-                merged_sets[merged1].update(merged_sets[merged2])
-                merged_topics[merged1].extend(merged_topics[merged2])
-                
-                # Remove the second merged set
-                del merged_sets[merged2]
-                del merged_topics[merged2]
-        
-        # Add topics that weren't merged
-        for topic, memories in topic_memories.items():
-            # Check if topic was merged
-            merged = False
-            for merged_set in merged_sets.values():
-                if topic in merged_set:
-                    merged = True
-                    break
-            
-            # If not merged, add as is
-            if not merged:
-                merged_topics[topic] = memories
-        
-        # Create readable cluster names
-        readable_clusters = {}
-        for cluster_id, memories in merged_topics.items():
-            # Get topics in this cluster
-            if "_" in cluster_id:
-                topics = cluster_id.split("_")
-            else:
-                topics = [cluster_id]
-            
-            # Limit to max_topics_per_cluster
-            if len(topics) > self.max_topics_per_cluster:
-                topics = topics[:self.max_topics_per_cluster]
-            
-            # Create readable name
-            readable_name = ", ".join(topics)
-            
-            # Remove duplicates from memories
-            unique_memories = []
-            seen_ids = set()
-            for memory in memories:
-                memory_id = memory.get("id")
-                if memory_id and memory_id not in seen_ids:
-                    unique_memories.append(memory)
-                    seen_ids.add(memory_id)
-            
-            readable_clusters[readable_name] = unique_memories
+        topic_counts = Counter(
+            topic for memory in memories for topic in memory_topics(memory.get("metadata", {}))
+        )
+        name = ", ".join(topic for topic, _ in topic_counts.most_common(self.max_topics_per_cluster))
+        base_name = name or "cluster"
+        number = 1
+        while not name or name in taken:
+            number += 1
+            name = f"{base_name} {number}"
+        return name
+    
+    def _build_topic_index(self) -> TopicIndex:
+        """
+        Build a topic index by fetching every memory (for stores without one).
+        
+        Returns:
+            Topic index over all memories
+        """
+        memory_ids = list(self.memory_manager.long_term.metadata.get("memories", {}).keys())
+        topic_index = TopicIndex()
+        self.cluster_memories = {}
+        for memory in self.memory_manager.long_term.get_memories_by_ids(memory_ids):
+            memory_id = memory.get("id")
+            if not memory_id:
+                continue
+            topic_index.add(memory_id, memory_topics(memory.get("metadata", {})))
+            self.cluster_memories[memory_id] = (topic_index.stamp(memory_id), memory)
+        return topic_index
+    
+    def _refresh_cluster_memories(self, topic_index: TopicIndex, memory_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Bring the cached cluster memories up to date with the topic index.
         
-        return readable_clusters
+        Args:
+            topic_index: Topic index the clusters were computed from
+            memory_ids: IDs of the memories in the clusters
+            
+        Returns:
+            Dictionary mapping memory ID to memory
+        """
+        wanted = dict.fromkeys(memory_ids)
+        
+        # Fetch only memories that are new or changed since they were cached
+        stale_ids = [
+            memory_id for memory_id in wanted
+            if self.cluster_memories.get(memory_id, (None,))[0] != topic_index.stamp(memory_id)
+        ]
+        if stale_ids:
+            for memory in self.memory_manager.long_term.get_memories_by_ids(stale_ids):
+                self.cluster_memories[memory["id"]] = (topic_index.stamp(memory["id"]), memory)
+        
+        # Drop memories that are no longer in any cluster
+        self.cluster_memories = {
+            memory_id: entry for memory_id, entry in self.cluster_memories.items() if memory_id in wanted
+        }
+        return {memory_id: memory for memory_id, (_, memory) in self.cluster_memories.items()}
     
-    def summarize_topic_cluster(self, topic: str, memories: List[Dict[str, Any]]) -> str:
+    def summarize_topic_cluster(self, topic: str, memories: Optional[List[Dict[str, Any]]] = None) -> str:
         """
         Generate a summary for a topic cluster.
         
         Args:
             topic: The topic name
-            memories: List of memories in the cluster
+            memories: List of memories in the cluster (defaults to the
+                precomputed members of the cluster named topic)
             
         Returns:
             Summary text
         """
+        memories = self._cluster_members(topic, memories)
+        
         # Check if we have a cached summary
         cache_key = f"topic_{topic}"
         if cache_key in self.summary_cache:
@@ -322,6 +279,12 @@ class MemorySummarizationSystem:
         
         return summary
     
+    def _cluster_members(self, topic: str, memories: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Get the memories of a cluster, reading the precomputed clusters if none are given."""
+        if memories is not None:
+            return memories
+        return self.cluster_memories_by_topic().get(topic, [])
+    
     def generate_topic_summaries(self, force_update: bool = False) -> Dict[str, str]:
         """
         Generate summaries for all topic clusters.
@@ -406,11 +369,9 @@ class MemorySummarizationSystem:
             memory_ids = list(self.memory_manager.long_term.metadata.get("memories", {}).keys())
             
             # Get memory objects and count types
-            for memory_id in memory_ids:
-                memory = self.memory_manager.long_term.get_memory_by_id(memory_id)
-                if memory:
-                    memory_type = memory.get("metadata", {}).get("source_type", "unknown")
-                    memory_types[memory_type] += 1
+            for memory in self.memory_manager.long_term.get_memories_by_ids(memory_ids):
+                memory_type = memory.get("metadata", {}).get("source_type", "unknown")
+                memory_types[memory_type] += 1
         except Exception as e:
             logger.error(f"Error counting memory types: {e}")
         
@@ -461,12 +422,10 @@ class MemorySummarizationSystem:
             memory_ids = list(self.memory_manager.long_term.metadata.get("memories", {}).keys())
             
             # Get memory objects and filter by date
-            for memory_id in memory_ids:
-                memory = self.memory_manager.long_term.get_memory_by_id(memory_id)
-                if memory:
-                    timestamp = memory.get("metadata", {}).get("timestamp", "")
-                    if timestamp and timestamp > cutoff_str:
-                        recent_memories.append(memory)
+            for memory in self.memory_manager.long_term.get_memories_by_ids(memory_ids):
+                timestamp = memory.get("metadata", {}).get("timestamp", "")
+                if timestamp and timestamp > cutoff_str:
+                    recent_memories.append(memory)
         except Exception as e:
             logger.error(f"Error retrieving recent memories: {e}")
             return f"Error retrieving recent memories: {e}"
@@ -618,6 +577,8 @@ class MemorySummarizationSystem:
         self.summary_cache = {}
         self.topic_clusters_cache = {}
         self.profile_cache = {}
+        self.cluster_memories = {}
+        self.topic_clusters_version = None
         self.last_topic_clustering = datetime.now() - timedelta(days=1)
         self.last_profile_update = datetime.now() - timedelta(days=1)
         
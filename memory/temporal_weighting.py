@@ -9,10 +9,107 @@ types of memories.
 import math
 import logging
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Dict, Any, List, Optional, Tuple, Union
 
+import numpy as np
+
 logger = logging.getLogger("coda.memory.temporal")
 
+SECONDS_PER_DAY = 24 * 3600
+
+# Naive datetimes are compared as local wall-clock time, like datetime.now()
+_EPOCH = datetime(1970, 1, 1)
+
+# Base forgetting thresholds by memory type (facts and preferences are harder to forget)
+FORGETTING_BASE_THRESHOLDS = {
+    "fact": 0.1,
+    "preference": 0.05
+}
+DEFAULT_FORGETTING_BASE_THRESHOLD = 0.2
+
+def _wall_clock_seconds(moment: datetime) -> float:
+    """Convert a datetime to seconds since the epoch in local wall-clock time."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return (moment - _EPOCH).total_seconds()
+
+@lru_cache(maxsize=65536)
+def parse_timestamp(timestamp: str) -> float:
+    """
+    Parse an ISO format timestamp into wall-clock seconds, with caching.
+
+    Args:
+        timestamp: ISO format timestamp
+
+    Returns:
+        Seconds since the epoch, or NaN if the timestamp cannot be parsed
+    """
+    try:
+        return _wall_clock_seconds(datetime.fromisoformat(timestamp))
+    except (TypeError, ValueError):
+        return math.nan
+
+class TemporalColumns:
+    """
+    Column-oriented view of a set of memories for vectorized temporal scoring.
+
+    Responsibilities:
+    - Parse each memory's timestamp once (cached across sweeps) into epoch seconds
+    - Hold type-specific half-lives, importance, reinforcement counts and similarity
+      as NumPy arrays aligned with the input memories
+
+    Fields are read from the top level of each memory, falling back to its
+    "metadata" dictionary (the layout used by LongTermMemory).
+    """
+
+    def __init__(self, memories: List[Dict[str, Any]], weighting: "TemporalWeightingSystem"):
+        """
+        Build columns for a list of memories.
+
+        Args:
+            memories: List of memory dictionaries
+            weighting: Temporal weighting system providing the decay rates
+        """
+        self.memories = memories
+        count = len(memories)
+
+        self.timestamps = np.empty(count, dtype=np.float64)
+        self.half_lives = np.empty(count, dtype=np.float64)
+        self.importance = np.empty(count, dtype=np.float64)
+        self.reinforcement = np.empty(count, dtype=np.float64)
+        self.similarity = np.empty(count, dtype=np.float64)
+        self.base_thresholds = np.empty(count, dtype=np.float64)
+
+        now_seconds = _wall_clock_seconds(datetime.now())
+        for row, memory in enumerate(memories):
+            metadata = memory.get("metadata") or {}
+            timestamp = memory.get("timestamp") or metadata.get("timestamp")
+            source_type = memory.get("source_type") or metadata.get("source_type") or "conversation"
+
+            self.timestamps[row] = parse_timestamp(timestamp) if timestamp else now_seconds
+            self.half_lives[row] = weighting.decay_rates.get(source_type, weighting.default_decay_rate)
+            self.importance[row] = memory.get("importance", metadata.get("importance", 0.5))
+            self.reinforcement[row] = memory.get("reinforcement_count", metadata.get("reinforcement_count", 0)) or 0
+            self.similarity[row] = memory.get("similarity", 0.0) or 0.0
+            self.base_thresholds[row] = FORGETTING_BASE_THRESHOLDS.get(source_type, DEFAULT_FORGETTING_BASE_THRESHOLD)
+
+    def __len__(self) -> int:
+        return len(self.memories)
+
+    def ages(self, now: Optional[datetime] = None) -> np.ndarray:
+        """
+        Get memory ages in days (NaN where the timestamp could not be parsed).
+
+        Args:
+            now: Reference time (defaults to the current time)
+
+        Returns:
+            Array of ages in days
+        """
+        now_seconds = _wall_clock_seconds(now or datetime.now())
+        return (now_seconds - self.timestamps) / SECONDS_PER_DAY
+
 class TemporalWeightingSystem:
     """
     Manages temporal weighting for memories.
@@ -96,6 +193,86 @@ class TemporalWeightingSystem:
             logger.error(f"Error calculating decay factor: {e}")
             return 1.0  # Default to no decay on error
     
+    def build_columns(self, memories: List[Dict[str, Any]]) -> TemporalColumns:
+        """
+        Build a column-oriented view of memories for vectorized scoring.
+        
+        Args:
+            memories: List of memory dictionaries
+            
+        Returns:
+            TemporalColumns aligned with the memories
+        """
+        return TemporalColumns(memories, self)
+    
+    def decay_factors(self,
+                      columns: TemporalColumns,
+                      use_reinforcement: bool = True,
+                      now: Optional[datetime] = None) -> np.ndarray:
+        """
+        Calculate decay factors for every memory in one vectorized pass.
+        
+        Matches calculate_decay_factor element-wise (1.0 where the timestamp is invalid).
+        
+        Args:
+            columns: Memory columns
+            use_reinforcement: Whether reinforcement extends the half-life
+            now: Reference time (defaults to the current time)
+            
+        Returns:
+            Array of decay factors
+        """
+        half_lives = columns.half_lives
+        if use_reinforcement:
+            # Each reinforcement extends the half-life
+            reinforcement_factor = np.minimum(columns.reinforcement, self.max_reinforcement_count) / self.max_reinforcement_count
+            half_lives = half_lives * (1 + np.maximum(reinforcement_factor, 0.0) * self.reinforcement_boost)
+        
+        factors = np.exp2(-columns.ages(now) / half_lives)
+        return np.where(np.isnan(factors), 1.0, factors)
+    
+    def score_columns(self,
+                      columns: TemporalColumns,
+                      recency_boost: bool = True,
+                      now: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """
+        Score every memory in one vectorized pass.
+        
+        Args:
+            columns: Memory columns
+            recency_boost: Whether to apply additional recency bias
+            now: Reference time (defaults to the current time)
+            
+        Returns:
+            Dictionary of arrays: decay_factor, importance_weight, recency_score, final_score
+        """
+        now = now or datetime.now()
+        decay_factor = self.decay_factors(columns, now=now)
+        
+        # Importance decays slower than recency
+        importance_weight = np.power(columns.importance, 1 - self.importance_retention)
+        
+        if recency_boost:
+            # Recency score: 1.0 for now, approaches 0.0 as age increases
+            recency_score = 1.0 / (1.0 + columns.ages(now) * self.recency_bias / 10.0)
+            recency_score = np.where(np.isnan(recency_score), 0.5, recency_score)
+        else:
+            recency_score = np.full(len(columns), 0.5)
+        
+        # If similarity is provided, include it in the score
+        final_score = np.where(
+            columns.similarity > 0,
+            columns.similarity * 0.4 + importance_weight * 0.3 + recency_score * 0.3,
+            importance_weight * 0.5 + recency_score * 0.5
+        ) * decay_factor
+        
+        return {
+            "decay_factor": decay_factor,
+            "importance_weight": importance_weight,
+            "recency_score": recency_score,
+            "final_score": final_score
+        }
+    
     def apply_temporal_weighting(self, 
                                memories: List[Dict[str, Any]],
                                recency_boost: bool = True) -> List[Dict[str, Any]]:
@@ -109,58 +286,27 @@ class TemporalWeightingSystem:
         Returns:
             List of memories with updated scores
         """
-        now = datetime.now()
-        weighted_memories = []
+        if not memories:
+            return []
         
-        for memory in memories:
-            # Get memory metadata
-            timestamp = memory.get("timestamp", now.isoformat())
-            source_type = memory.get("source_type", "conversation")
-            importance = memory.get("importance", 0.5)
-            reinforcement_count = memory.get("reinforcement_count", 0)
-            similarity = memory.get("similarity", 0.0)
-            
-            # Calculate decay factor
-            decay_factor = self.calculate_decay_factor(timestamp, source_type, reinforcement_count)
-            
-            # Calculate weighted importance
-            # Importance decays slower than recency
-            importance_weight = importance ** (1 - self.importance_retention)
-            
-            # Calculate recency score
-            if recency_boost:
-                try:
-                    memory_time = datetime.fromisoformat(timestamp)
-                    age_days = (now - memory_time).total_seconds() / (24 * 3600)
-                    # Recency score: 1.0 for now, approaches 0.0 as age increases
-                    recency_score = 1.0 / (1.0 + age_days * self.recency_bias / 10.0)
-                except Exception as e:
-                    logger.error(f"Error calculating recency score: {e}")
-                    recency_score = 0.5
-            else:
-                recency_score = 0.5
-            
-            # Calculate final score
-            # If similarity is provided, include it in the score
-            if similarity > 0:
-                final_score = (similarity * 0.4 + importance_weight * 0.3 + recency_score * 0.3) * decay_factor
-            else:
-                final_score = (importance_weight * 0.5 + recency_score * 0.5) * decay_factor
-            
-            # Update memory with temporal weighting information
-            weighted_memory = memory.copy()
+        columns = self.build_columns(memories)
+        scores = self.score_columns(columns, recency_boost)
+        
+        # Sort by final score (descending, stable for ties)
+        order = np.argsort(-scores["final_score"], kind="stable")
+        
+        weighted_memories = []
+        for row in order:
+            # Update a copy of the memory with temporal weighting information
+            weighted_memory = memories[row].copy()
             weighted_memory.update({
-                "decay_factor": decay_factor,
-                "importance_weight": importance_weight,
-                "recency_score": recency_score,
-                "final_score": final_score
+                "decay_factor": float(scores["decay_factor"][row]),
+                "importance_weight": float(scores["importance_weight"][row]),
+                "recency_score": float(scores["recency_score"][row]),
+                "final_score": float(scores["final_score"][row])
             })
-            
             weighted_memories.append(weighted_memory)
         
-        # Sort by final score (descending)
-        weighted_memories.sort(key=lambda x: x.get("final_score", 0), reverse=True)
-        
         return weighted_memories
     
     def calculate_forgetting_threshold(self, 
@@ -258,6 +404,60 @@ class TemporalWeightingSystem:
             logger.error(f"Error determining if memory should be forgotten: {e}")
             return False  # Default to keeping the memory on error
     
+    def select_memories_to_forget(self,
+                                  memories: Union[List[Dict[str, Any]], TemporalColumns],
+                                  current_memory_count: int,
+                                  max_memories: int,
+                                  now: Optional[datetime] = None) -> List[int]:
+        """
+        Select memories to forget with one vectorized pass over the whole set.
+        
+        Equivalent to calling should_forget_memory on each memory in order while
+        lowering the memory count after every forgotten memory.
+        
+        Args:
+            memories: Memory dictionaries, or columns built from them
+            current_memory_count: Current number of memories in the system
+            max_memories: Maximum number of memories allowed
+            now: Reference time (defaults to the current time)
+            
+        Returns:
+            Indices (into memories) of the memories to forget, in order
+        """
+        columns = memories if isinstance(memories, TemporalColumns) else self.build_columns(memories)
+        if not len(columns):
+            return []
+        
+        now = now or datetime.now()
+        ages = columns.ages(now)
+        decay_factor = self.decay_factors(columns, use_reinforcement=False, now=now)
+        
+        # Higher importance = lower threshold; older memories have higher thresholds
+        importance_factor = 1.0 - columns.importance
+        age_factor = np.minimum(ages / columns.half_lives, 1.0)
+        threshold = np.minimum(columns.base_thresholds * (1.0 + importance_factor) * (1.0 + age_factor), 0.9)
+        
+        # Invalid timestamps are always kept
+        valid = ~np.isnan(ages)
+        
+        # Memories that survive even the highest memory pressure are never forgotten
+        candidates = np.flatnonzero(valid & (decay_factor < threshold * 1.5))
+        
+        forget = []
+        for row in candidates:
+            memory_pressure = (current_memory_count - len(forget)) / max_memories
+            if memory_pressure > 0.9:
+                pressure_factor = 1.5
+            elif memory_pressure > 0.7:
+                pressure_factor = 1.2
+            else:
+                pressure_factor = 1.0
+            
+            if decay_factor[row] < threshold[row] * pressure_factor:
+                forget.append(int(row))
+        
+        return forget
+    
     def reinforce_memory(self, 
                         memory: Dict[str, Any],
                         reinforcement_strength: float = 1.0) -> Dict[str, Any]:
@@ -0,0 +1,201 @@
+"""
+Topic index for Coda Lite's long-term memory.
+
+This module provides a TopicIndex class, an inverted index from topic to memory
+IDs that also keeps exact co-occurrence counts for every pair of topics. It is
+updated incrementally as memories are added, updated and deleted, so topic
+clusters can be derived with a union-find pass over the co-occurring pairs
+instead of comparing every pair of topics.
+"""
+
+import logging
+from collections import defaultdict
+from itertools import chain, combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("coda.memory.topic_index")
+
+
+class TopicIndex:
+    """
+    Incrementally maintained topic -> memory ID index.
+
+    Responsibilities:
+    - Keep the memories of each topic (in insertion order) and the topics of each memory
+    - Keep exact overlap counts for every pair of topics that share a memory
+    - Stamp each memory with the index version at its last change, so callers
+      can refresh only the memories that changed
+    - Group topics whose Jaccard overlap meets a threshold with union-find
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.members: Dict[str, Dict[str, None]] = {}
+        self.memory_topics: Dict[str, Tuple[str, ...]] = {}
+        self.pair_counts: Dict[Tuple[str, str], int] = {}
+        self.stamps: Dict[str, int] = {}
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.memory_topics)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self.memory_topics
+
+    def add(self, memory_id: str, topics: Iterable[str]) -> None:
+        """
+        Add or replace the topics of a memory.
+
+        Args:
+            memory_id: Memory ID
+            topics: Topics of the memory (duplicates and empty topics are ignored)
+        """
+        topics = tuple(sorted({topic for topic in topics if topic}))
+        self.version += 1
+        self.stamps[memory_id] = self.version
+
+        if self.memory_topics.get(memory_id) == topics:
+            return
+        self._unlink(memory_id)
+
+        self.memory_topics[memory_id] = topics
+        for topic in topics:
+            self.members.setdefault(topic, {})[memory_id] = None
+        for pair in combinations(topics, 2):
+            self.pair_counts[pair] = self.pair_counts.get(pair, 0) + 1
+
+    def add_batch(self, memory_ids: List[str], topic_lists: List[Iterable[str]]) -> None:
+        """
+        Add or replace the topics of several memories.
+
+        Args:
+            memory_ids: Memory IDs
+            topic_lists: Topics of each memory
+        """
+        for memory_id, topics in zip(memory_ids, topic_lists):
+            self.add(memory_id, topics)
+
+    def remove(self, memory_id: str) -> bool:
+        """
+        Remove a memory.
+
+        Args:
+            memory_id: Memory ID
+
+        Returns:
+            True if removed, False if not indexed
+        """
+        if memory_id not in self.memory_topics:
+            return False
+
+        self._unlink(memory_id)
+        del self.memory_topics[memory_id]
+        del self.stamps[memory_id]
+        self.version += 1
+        return True
+
+    def _unlink(self, memory_id: str) -> None:
+        """Drop a memory from the topic members and pair counts."""
+        topics = self.memory_topics.get(memory_id, ())
+        for topic in topics:
+            members = self.members[topic]
+            del members[memory_id]
+            if not members:
+                del self.members[topic]
+        for pair in combinations(topics, 2):
+            count = self.pair_counts[pair] - 1
+            if count:
+                self.pair_counts[pair] = count
+            else:
+                del self.pair_counts[pair]
+
+    def clear(self) -> None:
+        """Remove every memory."""
+        self.members = {}
+        self.memory_topics = {}
+        self.pair_counts = {}
+        self.stamps = {}
+        self.version += 1
+
+    def jaccard(self, topic1: str, topic2: str) -> float:
+        """
+        Jaccard overlap of the memories of two topics.
+
+        Args:
+            topic1: First topic
+            topic2: Second topic
+
+        Returns:
+            Shared memories divided by the memories of either topic (0.0 to 1.0)
+        """
+        if topic1 == topic2:
+            return 1.0 if topic1 in self.members else 0.0
+        shared = self.pair_counts.get((min(topic1, topic2), max(topic1, topic2)), 0)
+        union = len(self.members.get(topic1, ())) + len(self.members.get(topic2, ())) - shared
+        return shared / union if union else 0.0
+
+    def clusters(self, similarity_threshold: float, min_topic_size: int = 2) -> List[List[str]]:
+        """
+        Group topics whose memories overlap.
+
+        Only pairs of topics that share at least one memory are considered, so the
+        cost is proportional to the number of co-occurring pairs.
+
+        Args:
+            similarity_threshold: Minimum Jaccard overlap for two topics to be merged
+            min_topic_size: Topics with fewer memories are left out
+
+        Returns:
+            Lists of topics, largest topic first within each group and largest
+            groups first
+        """
+        parent = {topic: topic for topic, members in self.members.items() if len(members) >= min_topic_size}
+
+        def find(topic: str) -> str:
+            while parent[topic] != topic:
+                parent[topic] = parent[parent[topic]]
+                topic = parent[topic]
+            return topic
+
+        for (topic1, topic2), shared in self.pair_counts.items():
+            if topic1 not in parent or topic2 not in parent:
+                continue
+            union = len(self.members[topic1]) + len(self.members[topic2]) - shared
+            if shared / union >= similarity_threshold:
+                root1, root2 = find(topic1), find(topic2)
+                if root1 != root2:
+                    parent[root2] = root1
+
+        groups = defaultdict(list)
+        for topic in parent:
+            groups[find(topic)].append(topic)
+
+        size = lambda topic: (-len(self.members[topic]), topic)
+        return sorted(
+            (sorted(topics, key=size) for topics in groups.values()),
+            key=lambda topics: size(topics[0])
+        )
+
+    def cluster_memory_ids(self, topics: Iterable[str]) -> List[str]:
+        """
+        Get the memories of a group of topics.
+
+        Args:
+            topics: Topics of the group
+
+        Returns:
+            Memory IDs of any of the topics, without duplicates
+        """
+        return list(dict.fromkeys(chain.from_iterable(self.members.get(topic, ()) for topic in topics)))
+
+    def stamp(self, memory_id: str) -> Optional[int]:
+        """
+        Get the index version at which a memory last changed.
+
+        Args:
+            memory_id: Memory ID
+
+        Returns:
+            Version number, or None if the memory is not indexed
+        """
+        return self.stamps.get(memory_id)
@@ -0,0 +1,526 @@
+"""
+Vector index for Coda Lite's long-term memory.
+
+This module provides a VectorIndex class that keeps every embedding in a single
+contiguous, pre-normalized matrix so that top-k retrieval is one matrix-vector
+product instead of a per-row Python loop. The matrix can be stored in float32,
+float16 or int8 (with a per-row scale); reduced-precision indexes rescore their
+top candidates against full-precision vectors.
+"""
+
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("coda.memory.vector_index")
+
+# Storage precisions and the NumPy dtypes used for the index matrix
+PRECISIONS = {
+    "float32": np.float32,
+    "float16": np.float16,
+    "int8": np.int8
+}
+
+# Rows dequantized per block when scoring a reduced-precision matrix
+SCORE_CHUNK_ROWS = 16384
+
+# Similarity slack for first-pass candidates of reduced-precision indexes
+QUANTIZATION_MARGIN = 0.02
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize vectors to int8 with one symmetric scale per vector.
+
+    Args:
+        vectors: 2-D float array (normally unit-length rows)
+
+    Returns:
+        Tuple of (int8 codes, float32 scales) where codes * scale approximates each row
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class VectorIndex:
+    """
+    Exact cosine-similarity index over a contiguous embedding matrix.
+
+    Responsibilities:
+    - Hold all embeddings as one row-normalized matrix (float32, float16 or int8)
+    - Keep the matrix up to date incrementally (add, update, remove)
+    - Answer top-k queries with a single matrix-vector product and argpartition
+
+    Rows are kept dense: removing an id moves the last row into the freed slot,
+    so the live rows are always ``matrix[:len(index)]``.
+
+    With ``precision`` set to "float16" or "int8" the matrix holds reduced-precision
+    rows (int8 rows are scaled by ``scales``). Searches then select
+    ``rescore_factor`` times more candidates than requested and, if a
+    ``full_precision_loader`` is set, rescore them against the full-precision
+    vectors before returning the top results.
+    """
+
+    def __init__(self,
+                 dimension: Optional[int] = None,
+                 initial_capacity: int = 256,
+                 precision: str = "float32",
+                 rescore_factor: int = 4):
+        """
+        Initialize the vector index.
+
+        Args:
+            dimension: Embedding dimension (inferred from the first vector if None)
+            initial_capacity: Number of rows to preallocate
+            precision: Storage precision of the matrix ("float32", "float16" or "int8")
+            rescore_factor: Candidate multiplier for rescoring reduced-precision results
+        """
+        if precision not in PRECISIONS:
+            logger.warning(f"Unknown embedding precision {precision}, falling back to float32")
+            precision = "float32"
+
+        self.dimension = dimension
+        self.initial_capacity = max(1, initial_capacity)
+        self.precision = precision
+        self.dtype = PRECISIONS[precision]
+        self.rescore_factor = max(1, rescore_factor)
+        self._reset_ids()
+        self.matrix: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+
+        # Called with memory IDs; returns their full-precision embeddings as rows
+        self.full_precision_loader: Optional[Callable[[List[str]], np.ndarray]] = None
+
+        if dimension is not None:
+            self._allocate(self.initial_capacity, dimension)
+
+    @property
+    def quantized(self) -> bool:
+        return self.precision != "float32"
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self.positions
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """
+        Normalize vectors to unit length.
+
+        Args:
+            vectors: A single vector or a 2-D array of row vectors
+
+        Returns:
+            Float32 array of the same shape with unit-length rows (zero rows stay zero)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _allocate(self, capacity: int, dimension: int) -> None:
+        """Allocate an empty backing matrix (and scales for int8)."""
+        self.dimension = dimension
+        self.matrix = np.zeros((capacity, dimension), dtype=self.dtype)
+        self.scales = np.ones(capacity, dtype=np.float32) if self.precision == "int8" else None
+
+    def _encode_rows(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Convert normalized float32 rows to the storage precision."""
+        if self.precision == "int8":
+            return quantize_int8(vectors)
+        return vectors.astype(self.dtype), None
+
+    def rows(self, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Get rows of the matrix as float32 (dequantized for reduced precisions).
+
+        Args:
+            positions: Row positions (None means all live rows)
+
+        Returns:
+            2-D float32 array of normalized embeddings
+        """
+        if positions is None:
+            positions = slice(0, len(self.ids))
+        rows = self.matrix[positions].astype(np.float32)
+        if self.scales is not None:
+            rows *= self.scales[positions][:, None]
+        return rows
+
+    def _ensure_capacity(self, required_rows: int, dimension: int) -> None:
+        """Grow the backing matrix so it can hold at least required_rows rows."""
+        if self.matrix is None:
+            self._allocate(max(self.initial_capacity, required_rows), dimension)
+            return
+
+        if dimension != self.dimension:
+            raise ValueError(f"Embedding dimension {dimension} does not match index dimension {self.dimension}")
+
+        capacity = self.matrix.shape[0]
+        if required_rows <= capacity:
+            return
+
+        while capacity < required_rows:
+            capacity *= 2
+
+        grown = np.zeros((capacity, self.dimension), dtype=self.dtype)
+        grown[:len(self.ids)] = self.matrix[:len(self.ids)]
+        self.matrix = grown
+
+        if self.scales is not None:
+            grown_scales = np.ones(capacity, dtype=np.float32)
+            grown_scales[:len(self.ids)] = self.scales[:len(self.ids)]
+            self.scales = grown_scales
+
+    def add(self, memory_id: str, embedding: np.ndarray) -> None:
+        """
+        Add or replace the embedding for a memory.
+
+        Args:
+            memory_id: Memory ID
+            embedding: Embedding vector
+        """
+        self.add_batch([memory_id], np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+
+    def add_batch(self, memory_ids: List[str], embeddings: np.ndarray) -> None:
+        """
+        Add or replace embeddings for several memories at once.
+
+        Args:
+            memory_ids: Memory IDs
+            embeddings: 2-D array with one embedding per ID
+        """
+        if not memory_ids:
+            return
+
+        embeddings = self.normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(memory_ids), -1))
+        codes, scales = self._encode_rows(embeddings)
+        self.add_encoded_batch(memory_ids, codes, scales)
+
+    def add_encoded_batch(self,
+                          memory_ids: List[str],
+                          codes: np.ndarray,
+                          scales: Optional[np.ndarray] = None) -> None:
+        """
+        Add rows that are already normalized and in the storage precision.
+
+        Used to load persisted int8 codes without re-quantizing.
+
+        Args:
+            memory_ids: Memory IDs
+            codes: 2-D array of rows in the index dtype
+            scales: Per-row scales (required for int8)
+        """
+        if not memory_ids:
+            return
+
+        new_ids = [memory_id for memory_id in dict.fromkeys(memory_ids) if memory_id not in self.positions]
+        self._ensure_capacity(len(self.ids) + len(new_ids), codes.shape[1])
+
+        for row, memory_id in enumerate(memory_ids):
+            position = self.positions.get(memory_id)
+            if position is None:
+                position = len(self.ids)
+                self.ids.append(memory_id)
+                self.positions[memory_id] = position
+            self.matrix[position] = codes[row]
+            if self.scales is not None:
+                self.scales[position] = scales[row]
+
+    def remove(self, memory_id: str) -> bool:
+        """
+        Remove a memory from the index.
+
+        Args:
+            memory_id: Memory ID
+
+        Returns:
+            True if removed, False if not found
+        """
+        position = self.positions.pop(memory_id, None)
+        if position is None:
+            return False
+
+        last_position = len(self.ids) - 1
+        last_id = self.ids.pop()
+
+        if position != last_position:
+            # Move the last row into the freed slot to keep rows dense
+            self.matrix[position] = self.matrix[last_position]
+            if self.scales is not None:
+                self.scales[position] = self.scales[last_position]
+            self.ids[position] = last_id
+            self.positions[last_id] = position
+
+        return True
+
+    def remove_batch(self, memory_ids: Iterable[str]) -> int:
+        """
+        Remove several memories from the index.
+
+        Args:
+            memory_ids: Memory IDs
+
+        Returns:
+            Number of memories removed
+        """
+        return sum(1 for memory_id in memory_ids if self.remove(memory_id))
+
+    @property
+    def needs_maintenance(self) -> bool:
+        """Whether maintain() has deferred work to do before the next search."""
+        return False
+
+    def maintain(self) -> None:
+        """
+        Do deferred index maintenance.
+
+        Called under a store's write lock before searching, so that searches never
+        modify the index and can run concurrently. The exact index has nothing to defer.
+        """
+
+    def _reset_ids(self) -> None:
+        """Forget every memory ID (the rows are reallocated separately)."""
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+
+    def clear(self) -> None:
+        """Remove all embeddings from the index."""
+        self._reset_ids()
+        if self.dimension is not None:
+            self._allocate(self.initial_capacity, self.dimension)
+
+    def get_vector(self, memory_id: str) -> Optional[np.ndarray]:
+        """
+        Get the normalized embedding stored for a memory.
+
+        Args:
+            memory_id: Memory ID
+
+        Returns:
+            Normalized embedding or None if not found
+        """
+        position = self.positions.get(memory_id)
+        if position is None:
+            return None
+        return self.rows(np.array([position]))[0]
+
+    def similarities(self, query_embedding: np.ndarray) -> np.ndarray:
+        """
+        Compute cosine similarities between a query and every indexed vector.
+
+        Args:
+            query_embedding: Query embedding
+
+        Returns:
+            Array of similarities aligned with ``self.ids``
+        """
+        if not self.ids:
+            return np.zeros(0, dtype=np.float32)
+
+        query = self.normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+        count = len(self.ids)
+        if not self.quantized:
+            return self.matrix[:count] @ query
+
+        # Dequantize block by block so scoring never materializes a float32 copy of the matrix
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SCORE_CHUNK_ROWS):
+            stop = min(start + SCORE_CHUNK_ROWS, count)
+            scores[start:stop] = self.matrix[start:stop].astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales[:count]
+        return scores
+
+    def search(self,
+               query_embedding: np.ndarray,
+               limit: int = 5,
+               min_similarity: float = -1.0,
+               predicate: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Find the most similar memories to a query embedding.
+
+        Args:
+            query_embedding: Query embedding
+            limit: Maximum number of results
+            min_similarity: Minimum cosine similarity to include
+            predicate: Optional filter called with a memory ID; only IDs for which it
+                returns True are included
+
+        Returns:
+            List of (memory_id, similarity) tuples sorted by similarity (descending)
+        """
+        if limit <= 0 or not self.ids:
+            return []
+
+        scores = self.similarities(query_embedding)
+        return self._top_k(None, scores, limit, min_similarity, predicate, query_embedding)
+
+    def search_subset(self,
+                      query_embedding: np.ndarray,
+                      memory_ids: Iterable[str],
+                      limit: int = 5,
+                      min_similarity: float = -1.0,
+                      predicate: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Find the most similar memories among a candidate set.
+
+        Only the candidate rows are scored, so searching a pre-filtered subset costs
+        time proportional to the subset rather than to the whole index.
+
+        Args:
+            query_embedding: Query embedding
+            memory_ids: Candidate memory IDs (IDs not in the index are ignored)
+            limit: Maximum number of results
+            min_similarity: Minimum cosine similarity to include
+            predicate: Optional filter called with a memory ID
+
+        Returns:
+            List of (memory_id, similarity) tuples sorted by similarity (descending)
+        """
+        positions = np.fromiter(
+            (self.positions[memory_id] for memory_id in memory_ids if memory_id in self.positions),
+            dtype=np.int64
+        )
+        if limit <= 0 or positions.size == 0:
+            return []
+
+        query = self.normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+        scores = self.rows(positions) @ query
+        return self._top_k(positions, scores, limit, min_similarity, predicate, query_embedding)
+
+    def _top_k(self,
+               positions: Optional[np.ndarray],
+               scores: np.ndarray,
+               limit: int,
+               min_similarity: float,
+               predicate: Optional[Callable[[str], bool]],
+               query_embedding: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """
+        Select the best-scoring rows.
+
+        For reduced-precision indexes, ``rescore_factor * limit`` candidates are
+        selected with a small similarity margin and then rescored exactly.
+
+        Args:
+            positions: Row positions the scores belong to (None means all rows in order)
+            scores: Similarity scores aligned with positions
+            limit: Maximum number of results
+            min_similarity: Minimum cosine similarity to include
+            predicate: Optional filter called with a memory ID
+            query_embedding: Query embedding, used to rescore reduced-precision results
+
+        Returns:
+            List of (memory_id, similarity) tuples sorted by similarity (descending)
+        """
+        if not self.quantized or query_embedding is None:
+            return self._select(positions, scores, limit, min_similarity, predicate)
+
+        candidates = self._select(
+            positions,
+            scores,
+            limit * self.rescore_factor,
+            min_similarity - QUANTIZATION_MARGIN,
+            predicate
+        )
+        return self._rescore(candidates, query_embedding, limit, min_similarity)
+
+    def _select(self,
+                positions: Optional[np.ndarray],
+                scores: np.ndarray,
+                limit: int,
+                min_similarity: float,
+                predicate: Optional[Callable[[str], bool]]) -> List[Tuple[str, float]]:
+        """Select the top-scoring rows that pass the threshold and predicate."""
+        candidates = np.flatnonzero(scores >= min_similarity)
+        if candidates.size == 0:
+            return []
+
+        if predicate is None and candidates.size > limit:
+            # Partial selection of the top-k, then sort only those k
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        results = []
+        for index in order:
+            position = index if positions is None else positions[index]
+            memory_id = self.ids[position]
+            if predicate is not None and not predicate(memory_id):
+                continue
+            results.append((memory_id, float(scores[index])))
+            if len(results) >= limit:
+                break
+
+        return results
+
+    def _rescore(self,
+                 candidates: List[Tuple[str, float]],
+                 query_embedding: np.ndarray,
+                 limit: int,
+                 min_similarity: float) -> List[Tuple[str, float]]:
+        """
+        Rescore reduced-precision candidates against full-precision vectors.
+
+        Args:
+            candidates: (memory_id, approximate similarity) tuples
+            query_embedding: Query embedding
+            limit: Maximum number of results
+            min_similarity: Minimum cosine similarity to include
+
+        Returns:
+            List of (memory_id, similarity) tuples sorted by similarity (descending)
+        """
+        if not candidates:
+            return []
+
+        memory_ids = [memory_id for memory_id, _ in candidates]
+        scores = np.array([score for _, score in candidates], dtype=np.float32)
+
+        if self.full_precision_loader is not None:
+            try:
+                vectors = self.normalize(self.full_precision_loader(memory_ids))
+                query = self.normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+                scores = vectors @ query
+            except Exception as e:
+                logger.error(f"Error rescoring with full-precision vectors: {e}")
+
+        order = np.argsort(-scores, kind="stable")
+        return [
+            (memory_ids[index], float(scores[index]))
+            for index in order
+            if scores[index] >= min_similarity
+        ][:limit]
+
+    def save(self, path: str) -> bool:
+        """
+        Persist index state that cannot be rebuilt cheaply from the database.
+
+        The exact index is rebuilt from the stored embeddings, so there is nothing to save.
+
+        Args:
+            path: File path for the index state
+
+        Returns:
+            True if state was written, False otherwise
+        """
+        return False
+
+    def load(self, path: str) -> bool:
+        """
+        Restore index state saved by save().
+
+        Args:
+            path: File path for the index state
+
+        Returns:
+            True if state was restored, False otherwise
+        """
+        return False
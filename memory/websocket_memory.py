@@ -16,6 +16,7 @@ from memory.memory_debug import MemoryDebugSystem
 from memory.websocket_active_recall import WebSocketEnhancedActiveRecall
 from memory.websocket_self_testing import WebSocketEnhancedSelfTesting
 from memory.websocket_summarization import WebSocketEnhancedSummarization
+from memory.write_pipeline import after_pending_writes
 from websocket.integration import CodaWebSocketIntegration
 
 logger = logging.getLogger("coda.memory.websocket")
@@ -28,7 +29,9 @@ class WebSocketEnhancedMemoryManager(EnhancedMemoryManager):
         websocket_integration: CodaWebSocketIntegration,
         config: Dict[str, Any],
         short_term_memory: Optional[ShortTermMemory] = None,
-        long_term_memory: Optional[LongTermMemory] = None
+        long_term_memory: Optional[LongTermMemory] = None,
+        model_registry=None,
+        perf_tracker=None
     ):
         """
         Initialize the WebSocketEnhancedMemoryManager.
@@ -38,6 +41,10 @@ class WebSocketEnhancedMemoryManager(EnhancedMemoryManager):
             config: Configuration dictionary
             short_term_memory: Optional existing short-term memory instance
             long_term_memory: Optional existing long-term memory instance
+            model_registry: Optional ModelRegistry used to load the embedding model
+                in the background
+            perf_tracker: Optional PerfTracker that receives the cache hit/miss
+                counters (the tracker whose counters COMPONENT_STATS reports)
         """
         # Ensure config has the expected structure
         if not isinstance(config, dict):
@@ -70,7 +77,9 @@ class WebSocketEnhancedMemoryManager(EnhancedMemoryManager):
         super().__init__(
             config=config,
             short_term_memory=short_term_memory,
-            long_term_memory=long_term_memory
+            long_term_memory=long_term_memory,
+            model_registry=model_registry,
+            perf_tracker=perf_tracker
         )
 
         # Initialize memory debug system
@@ -175,6 +184,43 @@ class WebSocketEnhancedMemoryManager(EnhancedMemoryManager):
 
         return memory_id
 
+    def add_memories(self, memories: List[Dict[str, Any]]) -> List[str]:
+        """
+        Add several memories to long-term storage in one batch with WebSocket events.
+
+        Args:
+            memories: Memories to store, each a dictionary with "content" and optional
+                "source_type", "importance" and "metadata" keys
+
+        Returns:
+            IDs of the stored memories
+        """
+        # Add the memories in one batch
+        memory_ids = super().add_memories(memories)
+        stored = [memory for memory in memories if "content" in memory]
+
+        # Emit a memory store event per stored memory
+        for memory_id, memory in zip(memory_ids, stored):
+            self.ws.memory_store(
+                content=memory["content"],
+                memory_type=memory.get("source_type", "conversation"),
+                importance=memory.get("importance", 0.5),
+                memory_id=memory_id
+            )
+
+        # Log operation in debug system
+        self.debug.log_operation(
+            operation_type="add_memories",
+            details={
+                "memory_ids": memory_ids,
+                "count": len(memory_ids)
+            }
+        )
+
+        logger.debug(f"Added {len(memory_ids)} memories in one batch")
+
+        return memory_ids
+
     def get_memories(
         self,
         query: str,
@@ -212,6 +258,7 @@ class WebSocketEnhancedMemoryManager(EnhancedMemoryManager):
 
         return memories
 
+    @after_pending_writes
     def update_memory(
         self,
         memory_id: str,
@@ -275,6 +322,7 @@ class WebSocketEnhancedMemoryManager(EnhancedMemoryManager):
 
         return result
 
+    @after_pending_writes
     def delete_memory(self, memory_id: str) -> bool:
         """
         Delete a memory from long-term storage with WebSocket events.
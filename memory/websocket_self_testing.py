@@ -60,6 +60,47 @@ class WebSocketEnhancedSelfTesting(MemorySelfTestingFramework):
         
         return results
     
+    def _report_progress(self, check: str, done: int, total: int) -> None:
+        """
+        Report the progress of an integrity check as a WebSocket event.
+        
+        Args:
+            check: Name of the check ("consistency_check" or "integrity_audit")
+            done: Units (memories or shards) done so far
+            total: Total units
+        """
+        super()._report_progress(check, done, total)
+        
+        if self.ws:
+            self.ws.emit_event("memory_integrity_progress", {
+                "check": check,
+                "done": done,
+                "total": total,
+                "timestamp": datetime.now().isoformat()
+            })
+    
+    def run_integrity_audit(self) -> Dict[str, Any]:
+        """
+        Run an integrity audit and emit WebSocket event.
+        
+        Returns:
+            Dictionary with audit results
+        """
+        # Call parent method
+        results = super().run_integrity_audit()
+        
+        # Emit WebSocket event
+        if self.ws:
+            self.ws.emit_event("memory_integrity_audit", {
+                "status": results.get("status"),
+                "shards_checked": results.get("shards_checked", 0),
+                "shards_mismatched": results.get("shards_mismatched", 0),
+                "inconsistencies_found": len(results.get("inconsistencies", [])),
+                "timestamp": datetime.now().isoformat()
+            })
+        
+        return results
+    
     def _repair_inconsistencies(self, inconsistencies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Attempt to repair inconsistencies and emit WebSocket event.
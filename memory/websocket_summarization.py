@@ -57,17 +57,20 @@ class WebSocketEnhancedSummarization(MemorySummarizationSystem):
         
         return clusters
     
-    def summarize_topic_cluster(self, topic: str, memories: List[Dict[str, Any]]) -> str:
+    def summarize_topic_cluster(self, topic: str, memories: Optional[List[Dict[str, Any]]] = None) -> str:
         """
         Generate a summary for a topic cluster and emit WebSocket event.
         
         Args:
             topic: The topic name
-            memories: List of memories in the cluster
+            memories: List of memories in the cluster (defaults to the
+                precomputed members of the cluster named topic)
             
         Returns:
             Summary text
         """
+        memories = self._cluster_members(topic, memories)
+        
         # Call parent method
         summary = super().summarize_topic_cluster(topic, memories)
         
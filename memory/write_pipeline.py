@@ -0,0 +1,351 @@
+"""
+Background write pipeline for Coda Lite's memory.
+
+This module provides a MemoryWritePipeline that applies memory bookkeeping
+(persisting conversation turns to long-term memory, automatic snapshots) on a
+single worker thread, so the thread answering the user never waits on encoding,
+embedding or disk I/O. Writes run in submission order, repeated writes that are
+still queued are coalesced, and a bounded queue applies backpressure when the
+worker falls behind. Low-priority writes (such as pruning) yield to every other
+queued write and are deferred rather than waited for when the queue is full. Reads wait only for the queued writes that change the long-term
+store, so they see them (read-your-writes) without waiting on unrelated work.
+"""
+
+import queue
+import logging
+import functools
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+logger = logging.getLogger("coda.memory.write_pipeline")
+
+# Queue item that tells the worker to exit
+_STOP = object()
+
+
+class _WriteOp:
+    """A queued write: the function to call, its arguments and its result future."""
+
+    __slots__ = ("fn", "args", "kwargs", "key", "low_priority", "store_write", "future")
+
+    def __init__(self, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any], key: Optional[Hashable],
+                 low_priority: bool = False, store_write: bool = False):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.low_priority = low_priority
+        self.store_write = store_write
+        self.future: Future = Future()
+
+
+class MemoryWritePipeline:
+    """
+    Bounded, ordered background writer for memory mutations.
+
+    Responsibilities:
+    - Run submitted writes one at a time, in order, on a worker thread
+    - Coalesce a write with a queued write of the same key
+    - Move low-priority writes behind the writes queued after them, and defer
+      them until a queued write completes when the queue is full
+    - Block submitters when too many writes are queued (backpressure)
+    - Let synchronous writes wait for queued writes so they see them (flush/exclusive)
+    - Let reads wait for just the queued writes to the store (wait_for_store_writes)
+    """
+
+    def __init__(self, max_pending: int = 64, name: str = "memory-writer"):
+        """
+        Initialize the write pipeline and start its worker thread.
+
+        Args:
+            max_pending: Maximum number of queued writes before submit() blocks
+            name: Name of the worker thread
+        """
+        self.max_pending = max_pending
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        # Held by the worker while a write runs and by synchronous writes inside exclusive()
+        self.lock = threading.RLock()
+        self._pending_keys: Dict[Hashable, _WriteOp] = {}
+        # Low-priority writes submitted while the queue was full
+        self._deferred: List[_WriteOp] = []
+        self._pending_lock = threading.Lock()
+        # Queued or running store writes; reads wait for it to reach zero
+        self._store_writes = 0
+        self._store_writes_done = threading.Condition(self._pending_lock)
+        self._local = threading.local()
+        self.closed = False
+        self.stats = {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0}
+
+        self.worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self.worker.start()
+
+        logger.info(f"MemoryWritePipeline started with up to {max_pending} pending writes")
+
+    def submit(self, fn: Callable[..., Any], *args, key: Optional[Hashable] = None,
+               low_priority: bool = False, store_write: bool = False, **kwargs) -> Future:
+        """
+        Queue a write.
+
+        If a write with the same key is still queued, its arguments are replaced
+        with these and its future is returned instead of queueing a second write.
+        Writes submitted from the worker thread, or after close(), run inline.
+        Low-priority writes never wait for room in the queue: they are queued if
+        there is room and otherwise deferred until a queued write completes.
+
+        Args:
+            fn: Function performing the write
+            *args: Positional arguments for fn
+            key: Optional coalescing key
+            low_priority: Run the write only when no other write is queued
+            store_write: Whether the write changes the long-term store, so reads
+                wait for it (ignored for low-priority writes)
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            Future resolving to the write's return value
+        """
+        if self.closed or (self._in_worker() and not low_priority):
+            return self._run_inline(fn, args, kwargs)
+
+        with self._pending_lock:
+            self.stats["submitted"] += 1
+            store_write = store_write and not low_priority
+            if key is not None and key in self._pending_keys:
+                op = self._pending_keys[key]
+                op.args, op.kwargs = args, kwargs
+                if store_write and not op.store_write:
+                    op.store_write = True
+                    self._store_writes += 1
+                self.stats["coalesced"] += 1
+                return op.future
+
+            op = _WriteOp(fn, args, kwargs, key, low_priority, store_write)
+            if key is not None:
+                self._pending_keys[key] = op
+            if store_write:
+                self._store_writes += 1
+
+        if low_priority:
+            # The submitter may hold locks the worker needs, so never wait for room
+            # (or for the worker's lock): the queue is full, so a queued write will
+            # complete and move the deferred write into the queue
+            try:
+                self.queue.put_nowait(op)
+            except queue.Full:
+                with self._pending_lock:
+                    self._deferred.append(op)
+            return op.future
+
+        # Blocks while the queue is full
+        self.queue.put(op)
+        return op.future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued write has been applied.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        if self._in_worker() or self._holds_lock():
+            # The writes would wait for us; they will run once we return
+            return self.queue.unfinished_tasks == 0
+
+        with self.queue.all_tasks_done:
+            if timeout is None:
+                while self.queue.unfinished_tasks:
+                    self.queue.all_tasks_done.wait()
+                return True
+            return self.queue.all_tasks_done.wait_for(lambda: not self.queue.unfinished_tasks, timeout)
+
+    def wait_for_store_writes(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the queued writes to the long-term store have been applied.
+
+        Unlike flush(), this does not wait for other queued work (e.g. snapshots
+        or pruning), and writes queued afterwards keep running alongside the caller.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if no store write is pending, False on timeout
+        """
+        with self._store_writes_done:
+            if self._in_worker() or self._holds_lock():
+                # The writes would wait for us; they will run once we return
+                return self._store_writes == 0
+            return self._store_writes_done.wait_for(lambda: self._store_writes == 0, timeout)
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """
+        Context manager that waits for queued writes and keeps new ones from running.
+
+        Used around synchronous writes so they do not interleave with background ones.
+        """
+        if self._holds_lock() or self._in_worker():
+            with self._owned():
+                yield
+            return
+
+        while True:
+            self.flush()
+            self.lock.acquire()
+            if not self.queue.unfinished_tasks or self.closed:
+                break
+            # A write was queued between the flush and the acquire
+            self.lock.release()
+
+        try:
+            with self._owned():
+                yield
+        finally:
+            self.lock.release()
+
+    @property
+    def pending(self) -> int:
+        """Number of writes queued or running."""
+        return self.queue.unfinished_tasks
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Apply the queued writes and stop the worker thread.
+
+        Args:
+            timeout: Maximum seconds to wait for the queued writes
+        """
+        if self.closed:
+            return
+
+        self.flush(timeout)
+        self.closed = True
+        self.queue.put(_STOP)
+        self.worker.join(timeout)
+
+        logger.info(f"MemoryWritePipeline closed: {self.stats}")
+
+    def _run(self) -> None:
+        """Worker loop: apply queued writes in order."""
+        while True:
+            op = self.queue.get()
+            try:
+                if op is _STOP:
+                    with self._pending_lock:
+                        deferred, self._deferred = self._deferred, []
+                    for deferred_op in deferred:
+                        with self.lock, self._owned():
+                            self._apply(deferred_op)
+                    return
+
+                if op.low_priority and not self.queue.empty() and self._requeue(op):
+                    continue
+
+                with self._pending_lock:
+                    if op.key is not None and self._pending_keys.get(op.key) is op:
+                        del self._pending_keys[op.key]
+
+                with self.lock, self._owned():
+                    self._apply(op)
+                if op.store_write:
+                    with self._store_writes_done:
+                        self._store_writes -= 1
+                        self._store_writes_done.notify_all()
+            finally:
+                # Queue deferred writes before this one is marked done, so flush() waits for them
+                self._queue_deferred()
+                self.queue.task_done()
+
+    def _apply(self, op: _WriteOp) -> None:
+        """Run one write and resolve its future."""
+        if not op.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = op.fn(*op.args, **op.kwargs)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Background memory write {getattr(op.fn, '__name__', op.fn)} failed: {e}", exc_info=True)
+            op.future.set_exception(e)
+        else:
+            self.stats["completed"] += 1
+            op.future.set_result(result)
+
+    def _queue_deferred(self) -> None:
+        """Move deferred low-priority writes into the queue while there is room."""
+        with self._pending_lock:
+            while self._deferred:
+                try:
+                    self.queue.put_nowait(self._deferred[0])
+                except queue.Full:
+                    return
+                self._deferred.pop(0)
+
+    def _requeue(self, op: _WriteOp) -> bool:
+        """Move a low-priority write to the back of the queue (False if the queue is full)."""
+        try:
+            self.queue.put_nowait(op)
+            return True
+        except queue.Full:
+            return False
+
+    def _run_inline(self, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Future:
+        """Run a write on the calling thread."""
+        op = _WriteOp(fn, args, kwargs, None)
+        with self.lock, self._owned():
+            self._apply(op)
+        return op.future
+
+    def _in_worker(self) -> bool:
+        return threading.current_thread() is self.worker
+
+    def _holds_lock(self) -> bool:
+        return getattr(self._local, "depth", 0) > 0
+
+    @contextmanager
+    def _owned(self) -> Iterator[None]:
+        """Track that the current thread holds the pipeline lock."""
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        try:
+            yield
+        finally:
+            self._local.depth -= 1
+
+
+def after_pending_writes(method: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Decorator for memory manager methods that must see queued writes.
+
+    The method runs inside the manager's ``write_pipeline.exclusive()`` when a
+    pipeline is configured, and directly otherwise.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        pipeline = getattr(self, "write_pipeline", None)
+        if pipeline is None:
+            return method(self, *args, **kwargs)
+        with pipeline.exclusive():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def reads_after_pending_writes(method: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Decorator for memory manager reads.
+
+    Reads first wait for the queued writes to the long-term store, so they see
+    them, and then run without holding the pipeline: the store's own reader-writer
+    lock makes them safe alongside writes queued later. Queued writes that do not
+    touch the store (snapshots, pruning) are not waited for.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        pipeline = getattr(self, "write_pipeline", None)
+        if pipeline is not None:
+            pipeline.wait_for_store_writes()
+        return method(self, *args, **kwargs)
+    return wrapper
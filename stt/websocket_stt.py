@@ -28,6 +28,7 @@ class WebSocketWhisperSTT(WhisperSTT):
         beam_size: int = 5,
         vad_filter: bool = True,
         vad_parameters: Optional[Dict] = None,
+        model_registry=None,
     ):
         """
         Initialize the WebSocketWhisperSTT module.
@@ -44,6 +45,8 @@ class WebSocketWhisperSTT(WhisperSTT):
             beam_size (int): Beam size to use for decoding
             vad_filter (bool): Whether to use voice activity detection
             vad_parameters (dict, optional): Parameters for VAD
+            model_registry (ModelRegistry, optional): Registry that loads the Whisper
+                model in the background; the first transcription waits for it
         """
         super().__init__(
             model_size=model_size,
@@ -55,6 +58,7 @@ class WebSocketWhisperSTT(WhisperSTT):
             beam_size=beam_size,
             vad_filter=vad_filter,
             vad_parameters=vad_parameters,
+            model_registry=model_registry,
         )
 
         self.ws = websocket_integration
@@ -31,6 +31,7 @@ class WhisperSTT:
         beam_size: int = 5,
         vad_filter: bool = True,
         vad_parameters: Optional[Dict] = None,
+        model_registry=None,
     ):
         """
         Initialize the WhisperSTT module.
@@ -46,6 +47,8 @@ class WhisperSTT:
             beam_size (int): Beam size to use for decoding
             vad_filter (bool): Whether to use voice activity detection
             vad_parameters (dict, optional): Parameters for VAD
+            model_registry (ModelRegistry, optional): Registry that loads the Whisper
+                model in the background; the first transcription waits for it
         """
         self.model_size = model_size
         self.device = device
@@ -57,35 +60,13 @@ class WhisperSTT:
 
         logger.info(f"Initializing WhisperSTT with model size: {model_size} on {device}")
 
-        # Try to initialize faster-whisper model with the requested device
-        try:
-            self.model = WhisperModel(
-                model_size,
-                device=device,
-                compute_type=compute_type,
-                download_root=download_root,
-                local_files_only=local_files_only,
-            )
-            logger.info(f"Successfully initialized WhisperModel on {device}")
-        except Exception as e:
-            # If CUDA initialization fails, fall back to CPU
-            if device.lower() != "cpu":
-                logger.warning(f"Failed to initialize WhisperModel on {device}: {e}")
-                logger.warning("Falling back to CPU")
-                self.device = "cpu"
-                self.compute_type = "float32"  # Better for CPU
-                self.model = WhisperModel(
-                    model_size,
-                    device="cpu",
-                    compute_type="float32",
-                    download_root=download_root,
-                    local_files_only=local_files_only,
-                )
-                logger.info("Successfully initialized WhisperModel on CPU as fallback")
-            else:
-                # If CPU initialization also fails, re-raise the exception
-                logger.error(f"Failed to initialize WhisperModel on CPU: {e}")
-                raise
+        self.download_root = download_root
+        self.local_files_only = local_files_only
+
+        if model_registry is not None:
+            self.model = model_registry.load(f"whisper:{model_size}:{device}:{compute_type}", self._load_model)
+        else:
+            self.model = self._load_model()
 
         # Audio recording parameters
         self.format = pyaudio.paInt16
@@ -129,6 +110,46 @@ class WhisperSTT:
 
         logger.info("WhisperSTT initialized successfully")
 
+    def _load_model(self) -> WhisperModel:
+        """
+        Load the faster-whisper model, falling back to CPU if the device fails.
+
+        Returns:
+            WhisperModel: The loaded model
+        """
+        # Try to initialize faster-whisper model with the requested device
+        device = self.device
+        try:
+            model = WhisperModel(
+                self.model_size,
+                device=device,
+                compute_type=self.compute_type,
+                download_root=self.download_root,
+                local_files_only=self.local_files_only,
+            )
+            logger.info(f"Successfully initialized WhisperModel on {device}")
+        except Exception as e:
+            # If CUDA initialization fails, fall back to CPU
+            if device.lower() != "cpu":
+                logger.warning(f"Failed to initialize WhisperModel on {device}: {e}")
+                logger.warning("Falling back to CPU")
+                self.device = "cpu"
+                self.compute_type = "float32"  # Better for CPU
+                model = WhisperModel(
+                    self.model_size,
+                    device="cpu",
+                    compute_type="float32",
+                    download_root=self.download_root,
+                    local_files_only=self.local_files_only,
+                )
+                logger.info("Successfully initialized WhisperModel on CPU as fallback")
+            else:
+                # If CPU initialization also fails, re-raise the exception
+                logger.error(f"Failed to initialize WhisperModel on CPU: {e}")
+                raise
+
+        return model
+
     def transcribe_audio(self, audio_path: Union[str, np.ndarray]) -> str:
         """
         Transcribe audio file to text.
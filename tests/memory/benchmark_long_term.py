@@ -0,0 +1,285 @@
+"""
+Long-Term Memory Benchmark
+
+This script measures how LongTermMemory scales on deterministic synthetic corpora
+(1k to 1M memories), using the stub embedding model so that no model download is
+needed. For every backend configuration and corpus size it records add
+throughput, retrieval latency percentiles, prune time, metadata save time and
+process RSS, and writes a JSON report that can be diffed between releases.
+
+Usage:
+    python tests/memory/benchmark_long_term.py --sizes 1000 10000 --backends sqlite in_memory
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import functools
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from unittest.mock import patch
+
+import numpy as np
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from memory.ann_index import VECTOR_INDEX_TYPES
+from memory.long_term import LongTermMemory
+from test_utils import CHROMADB_AVAILABLE, StubEmbeddingModel, generate_memory_corpus, generate_memory_queries
+from version import __version__
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger("memory_test.benchmark")
+
+# Bump when the report layout changes so old reports are not diffed blindly
+REPORT_SCHEMA_VERSION = 1
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+def backend_configurations() -> Dict[str, Dict[str, Any]]:
+    """
+    Get the LongTermMemory options of every benchmarked backend.
+
+    Every vector index type is benchmarked on the sqlite and in-memory backends, so
+    index types added to VECTOR_INDEX_TYPES are picked up automatically.
+
+    Returns:
+        Backend name -> LongTermMemory keyword arguments
+    """
+    configurations = {"chroma": {"vector_db_type": "chroma"}}
+    for vector_db_type in ("sqlite", "in_memory"):
+        for index_type in VECTOR_INDEX_TYPES:
+            name = vector_db_type if index_type == "exact" else f"{vector_db_type}-{index_type}"
+            configurations[name] = {"vector_db_type": vector_db_type, "vector_index_type": index_type}
+    configurations["sqlite-mmap"] = {"vector_db_type": "sqlite", "embedding_store": "mmap"}
+    return configurations
+
+def current_rss_mb() -> Optional[float]:
+    """Get the resident set size of this process in MB (None without psutil)."""
+    if not PSUTIL_AVAILABLE:
+        return None
+    return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """
+    Summarize latencies.
+
+    Args:
+        latencies: Latencies in seconds
+
+    Returns:
+        Mean and p50/p95/p99 latencies in milliseconds
+    """
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99))
+    }
+
+def benchmark_backend(name: str,
+                      options: Dict[str, Any],
+                      corpus: List[Dict[str, Any]],
+                      queries: List[str],
+                      storage_path: str,
+                      batch_size: int = 1000,
+                      dimension: int = 256,
+                      prune_fraction: float = 0.1) -> Dict[str, Any]:
+    """
+    Benchmark one backend on one corpus.
+
+    Args:
+        name: Backend name
+        options: LongTermMemory keyword arguments of the backend
+        corpus: Memories to add
+        queries: Retrieval queries
+        storage_path: Directory for the store (must not exist)
+        batch_size: Memories per add_memories call
+        dimension: Embedding dimension of the stub model
+        prune_fraction: Fraction of the corpus removed by the prune measurement
+
+    Returns:
+        Measurements of the run
+    """
+    result: Dict[str, Any] = {"backend": name, "size": len(corpus)}
+    rss_before = current_rss_mb()
+
+    embedding_model = functools.partial(StubEmbeddingModel, dimension=dimension)
+    with patch("memory.long_term.SentenceTransformer", embedding_model):
+        memory = LongTermMemory(storage_path=storage_path, max_memories=len(corpus), **options)
+        try:
+            start = time.perf_counter()
+            for offset in range(0, len(corpus), batch_size):
+                memory.add_memories(corpus[offset:offset + batch_size])
+            add_seconds = time.perf_counter() - start
+            result["add"] = {
+                "seconds": add_seconds,
+                "memories_per_second": len(corpus) / add_seconds if add_seconds else None
+            }
+
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                memory.retrieve_memories(query, limit=5, min_similarity=0.0)
+                latencies.append(time.perf_counter() - start)
+            result["retrieve"] = {"queries": len(queries), **latency_summary(latencies)}
+
+            start = time.perf_counter()
+            memory._save_metadata()
+            result["metadata_save_seconds"] = time.perf_counter() - start
+
+            rss_loaded = current_rss_mb()
+            result["rss_mb"] = rss_loaded
+            result["rss_delta_mb"] = rss_loaded - rss_before if rss_loaded is not None else None
+
+            memory.max_memories = int(len(corpus) * (1 - prune_fraction))
+            start = time.perf_counter()
+            pruned = memory.prune_memories()
+            result["prune"] = {"seconds": time.perf_counter() - start, "memories_removed": pruned}
+        finally:
+            memory.close()
+
+    logger.info(f"{name} ({len(corpus)} memories): {result['add']['memories_per_second']:.0f} adds/s, "
+                f"p95 retrieval {result['retrieve']['p95_ms']:.2f} ms")
+    return result
+
+def run_benchmark(sizes: List[int],
+                  backends: Optional[List[str]] = None,
+                  query_count: int = 200,
+                  batch_size: int = 1000,
+                  dimension: int = 256,
+                  seed: int = 0,
+                  prune_fraction: float = 0.1,
+                  work_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Benchmark backends on corpora of increasing size.
+
+    Args:
+        sizes: Corpus sizes
+        backends: Backend names (None for every configuration)
+        query_count: Retrieval queries per run
+        batch_size: Memories per add_memories call
+        dimension: Embedding dimension of the stub model
+        seed: Seed of the corpus and query generators
+        prune_fraction: Fraction of the corpus removed by the prune measurement
+        work_dir: Directory for the stores (a temporary directory if None)
+
+    Returns:
+        Benchmark report
+    """
+    configurations = backend_configurations()
+    backends = list(configurations) if backends is None else backends
+    unknown = [name for name in backends if name not in configurations]
+    if unknown:
+        raise ValueError(f"Unknown backends: {unknown} (available: {list(configurations)})")
+
+    report = {
+        "schema_version": REPORT_SCHEMA_VERSION,
+        "timestamp": datetime.now().isoformat(),
+        "version": __version__,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "psutil": PSUTIL_AVAILABLE
+        },
+        "parameters": {
+            "sizes": sizes,
+            "backends": backends,
+            "queries": query_count,
+            "batch_size": batch_size,
+            "dimension": dimension,
+            "seed": seed,
+            "prune_fraction": prune_fraction
+        },
+        "results": []
+    }
+
+    root = tempfile.mkdtemp(dir=work_dir)
+    try:
+        # Queries are numbered so that no retrieval is served from a cache
+        queries = [f"{query} {i}" for i, query in enumerate(generate_memory_queries(query_count, seed))]
+        for size in sizes:
+            corpus = generate_memory_corpus(size, seed)
+            for name in backends:
+                if name == "chroma" and not CHROMADB_AVAILABLE:
+                    report["results"].append({"backend": name, "size": size, "skipped": "chromadb not installed"})
+                    continue
+
+                storage_path = os.path.join(root, f"{name}_{size}")
+                try:
+                    report["results"].append(benchmark_backend(
+                        name, configurations[name], corpus, queries, storage_path,
+                        batch_size=batch_size, dimension=dimension, prune_fraction=prune_fraction
+                    ))
+                except Exception as e:
+                    logger.error(f"Benchmark of {name} with {size} memories failed: {e}", exc_info=True)
+                    report["results"].append({"backend": name, "size": size, "error": str(e)})
+                finally:
+                    shutil.rmtree(storage_path, ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return report
+
+def print_report_summary(report: Dict[str, Any]) -> None:
+    """Print a table of the benchmark results."""
+    print("\n" + "=" * 96)
+    print("Long-Term Memory Benchmark")
+    print("=" * 96)
+    print(f"{'Backend':<18}{'Size':>9}{'Adds/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'Save s':>9}{'Prune s':>9}{'RSS MB':>9}")
+    for result in report["results"]:
+        if "add" not in result:
+            print(f"{result['backend']:<18}{result['size']:>9}  {result.get('skipped') or result.get('error')}")
+            continue
+        rss = f"{result['rss_mb']:.0f}" if result["rss_mb"] is not None else "-"
+        print(f"{result['backend']:<18}{result['size']:>9}{result['add']['memories_per_second']:>10.0f}"
+              f"{result['retrieve']['p50_ms']:>9.2f}{result['retrieve']['p95_ms']:>9.2f}"
+              f"{result['retrieve']['p99_ms']:>9.2f}{result['metadata_save_seconds']:>9.3f}"
+              f"{result['prune']['seconds']:>9.3f}{rss:>9}")
+    print("=" * 96)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Coda Lite's long-term memory backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Corpus sizes")
+    parser.add_argument("--backends", nargs="+", choices=list(backend_configurations()),
+                        help="Backends to benchmark (default: all)")
+    parser.add_argument("--queries", type=int, default=200, help="Retrieval queries per run")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Memories per add_memories call")
+    parser.add_argument("--dimension", type=int, default=256, help="Embedding dimension")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--work-dir", help="Directory for the benchmark stores")
+    parser.add_argument("--output", help="Report path (default: data/memory/test/results/benchmark_<time>.json)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # Per-operation logging of the store would dominate the measurements
+    logging.getLogger("coda").setLevel(logging.WARNING)
+
+    report = run_benchmark(args.sizes, args.backends, query_count=args.queries, batch_size=args.batch_size,
+                           dimension=args.dimension, seed=args.seed, work_dir=args.work_dir)
+
+    output = args.output or f"data/memory/test/results/benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_report_summary(report)
+    print(f"Report saved to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Tests for batched long-term memory insertion.
+"""
+
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from memory.long_term import LongTermMemory
+from memory.enhanced_memory_manager import EnhancedMemoryManager
+from test_utils import StubEmbeddingModel
+
+class TestAddMemories(unittest.TestCase):
+    """Test LongTermMemory.add_memories and the batched persistence path."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_memory(self, vector_db_type: str, **kwargs) -> LongTermMemory:
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type=vector_db_type, **kwargs)
+        self.addCleanup(memory.close)
+        return memory
+
+    def _check_backend(self, vector_db_type: str) -> None:
+        memory = self._create_memory(vector_db_type)
+        journal_entries = memory.metadata_journal.entry_count
+
+        memory_ids = memory.add_memories([
+            {"content": "The user likes green tea", "source_type": "preference", "importance": 0.8},
+            {"content": "The weather in Paris is rainy", "metadata": {"topics": ["weather"]}},
+            {"content": "The dentist appointment is on Friday"}
+        ])
+
+        self.assertEqual(len(memory_ids), 3)
+        self.assertEqual(memory.embedding_model.encode_calls, 1)
+        self.assertEqual(memory.metadata["memory_count"], 3)
+        self.assertEqual(memory.metadata_journal.entry_count - journal_entries, 3)
+
+        stored = memory.get_memory_by_id(memory_ids[1])
+        self.assertEqual(stored["content"], "The weather in Paris is rainy")
+        self.assertEqual(stored["metadata"]["source_type"], "conversation")
+        self.assertEqual(stored["metadata"]["topics"], ["weather"])
+        self.assertEqual(memory.metadata["memories"][memory_ids[0]]["importance"], 0.8)
+
+        results = memory.retrieve_memories("dentist appointment", limit=1, min_similarity=0.1)
+        self.assertEqual(results[0]["id"], memory_ids[2])
+
+    def test_sqlite_backend(self):
+        """Test batched insertion with the sqlite backend."""
+        self._check_backend("sqlite")
+
+    def test_in_memory_backend(self):
+        """Test batched insertion with the in-memory backend."""
+        self._check_backend("in_memory")
+
+    def test_empty_batch(self):
+        """Test that an empty batch does nothing."""
+        memory = self._create_memory("sqlite")
+        self.assertEqual(memory.add_memories([]), [])
+        self.assertEqual(memory.embedding_model.encode_calls, 0)
+
+    def test_batch_prunes_once(self):
+        """Test that a batch exceeding max_memories is pruned down to the limit."""
+        memory = self._create_memory("sqlite", max_memories=3)
+        memory.add_memories([{"content": f"Memory number {i}"} for i in range(5)])
+
+        self.assertEqual(memory.metadata["memory_count"], 3)
+        self.assertEqual(len(memory.vector_index), 3)
+
+    def test_persist_short_term_memory_uses_one_batch(self):
+        """Test that persisting a conversation encodes all chunks in one call."""
+        config = {
+            "memory": {
+                "long_term_path": self.test_dir,
+                "vector_db": "sqlite",
+                "auto_persist": False,
+                "chunk_size": 10,
+                "min_chunk_length": 5,
+                "snapshot_dir": f"{self.test_dir}/snapshots",
+                "auto_snapshot": False
+            }
+        }
+        manager = EnhancedMemoryManager(config=config)
+        self.addCleanup(manager.long_term.close)
+
+        for i in range(10):
+            manager.add_turn("user", f"Tell me something interesting about topic number {i} please")
+            manager.add_turn("assistant", f"Here is an interesting fact about topic number {i}")
+
+        encode_calls = manager.long_term.embedding_model.encode_calls
+        stored = manager.persist_short_term_memory()
+
+        self.assertGreater(stored, 1)
+        self.assertEqual(len(manager.long_term.metadata["memories"]), stored)
+        self.assertEqual(manager.long_term.embedding_model.encode_calls - encode_calls, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Tests for the approximate nearest-neighbour vector index.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from memory.ann_index import IVFVectorIndex, create_vector_index, measure_recall
+from memory.vector_index import VectorIndex
+from memory.long_term import LongTermMemory
+from memory.self_testing import MemorySelfTestingFramework
+from test_utils import StubEmbeddingModel
+
+def clustered_vectors(rng, count: int, dimension: int = 32, clusters: int = 20) -> np.ndarray:
+    """Generate vectors scattered around random cluster centres."""
+    centres = rng.normal(size=(clusters, dimension))
+    labels = rng.integers(0, clusters, size=count)
+    return (centres[labels] + 0.3 * rng.normal(size=(count, dimension))).astype(np.float32)
+
+class TestIVFVectorIndex(unittest.TestCase):
+    """Test IVFVectorIndex functionality."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.rng = np.random.default_rng(7)
+        self.vectors = clustered_vectors(self.rng, 2000)
+        self.ids = [f"m{i}" for i in range(len(self.vectors))]
+        self.index = IVFVectorIndex(nprobe=8, min_train_size=500)
+        self.index.add_batch(self.ids, self.vectors)
+        self.index.maintain()
+
+    def test_exact_until_trained(self):
+        """Test that small indexes are searched exactly."""
+        index = IVFVectorIndex(min_train_size=5000)
+        index.add_batch(self.ids, self.vectors)
+
+        self.assertEqual(measure_recall(index, self.vectors[:20], k=10), 1.0)
+        self.assertFalse(index.is_trained)
+
+    def test_search_never_trains(self):
+        """Test that searches leave training to maintain() and are exact until it runs."""
+        index = IVFVectorIndex(min_train_size=500)
+        index.add_batch(self.ids, self.vectors)
+
+        self.assertEqual(measure_recall(index, self.vectors[:20], k=10), 1.0)
+        self.assertFalse(index.is_trained)
+        self.assertTrue(index.needs_maintenance)
+        index.maintain()
+        self.assertTrue(index.is_trained)
+        self.assertFalse(index.needs_maintenance)
+
+    def test_recall_at_k(self):
+        """Test that probing a few clusters finds most of the exact top-k."""
+        queries = self.vectors[self.rng.choice(len(self.vectors), size=50, replace=False)]
+
+        recall = self.index.measure_recall(queries, k=10)
+
+        self.assertTrue(self.index.is_trained)
+        self.assertGreaterEqual(recall, 0.9)
+
+    def test_nprobe_trades_recall(self):
+        """Test that probing every cluster is exact."""
+        self.index.nprobe = len(self.index.lists)
+
+        self.assertEqual(self.index.measure_recall(self.vectors[:20], k=10), 1.0)
+
+    def test_incremental_insert_and_delete(self):
+        """Test that cluster lists stay consistent through inserts, updates and deletes."""
+
+        self.index.add("new", self.vectors[5] * 2)
+        self.assertEqual({memory_id for memory_id, _ in self.index.search(self.vectors[5], limit=2)}, {"new", "m5"})
+
+        for memory_id in self.ids[:300]:
+            self.index.remove(memory_id)
+        self.index.add("m400", self.vectors[0])
+
+        members = sorted(position for cluster in self.index.lists for position in cluster)
+        self.assertEqual(members, list(range(len(self.index))))
+        for position in range(len(self.index)):
+            self.assertIn(position, self.index.lists[self.index.assignments[position]])
+        self.assertNotIn("m0", [memory_id for memory_id, _ in self.index.search(self.vectors[0], limit=5)])
+
+    def test_save_and_load(self):
+        """Test that persisted clusters are restored without retraining."""
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir, ignore_errors=True)
+        path = os.path.join(test_dir, "memories.ann.npz")
+
+        self.assertTrue(self.index.save(path))
+
+        restored = IVFVectorIndex(nprobe=8, min_train_size=500)
+        restored.add_batch(self.ids + ["extra"], np.vstack([self.vectors, self.vectors[:1]]))
+        self.assertTrue(restored.load(path))
+
+        np.testing.assert_allclose(restored.centroids, self.index.centroids)
+        self.assertEqual([memory_id for memory_id, _ in restored.search(self.vectors[3], limit=3)],
+                         [memory_id for memory_id, _ in self.index.search(self.vectors[3], limit=3)])
+        self.assertEqual(sum(len(cluster) for cluster in restored.lists), len(self.ids) + 1)
+
+    def test_create_vector_index(self):
+        """Test the index factory."""
+        self.assertIsInstance(create_vector_index("ivf", nprobe=4), IVFVectorIndex)
+        self.assertIs(type(create_vector_index("exact")), VectorIndex)
+        self.assertIs(type(create_vector_index("unknown")), VectorIndex)
+
+class TestLongTermMemoryANN(unittest.TestCase):
+    """Test the IVF index through LongTermMemory and the self-testing framework."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_memory(self) -> LongTermMemory:
+        return LongTermMemory(
+            storage_path=self.test_dir,
+            vector_db_type="sqlite",
+            max_memories=10000,
+            vector_index_type="ivf",
+            vector_index_options={"min_train_size": 100, "nprobe": 4}
+        )
+
+    def test_ivf_backend_persists_state(self):
+        """Test retrieval, persistence and the recall self-test with the IVF index."""
+        memory = self._create_memory()
+        memory_ids = memory.add_memories([
+            {"content": f"note {i} about topic {i % 17} and item {i % 5}"} for i in range(300)
+        ])
+        target = memory.add_memory("The user likes green tea in the morning")
+
+        self.assertEqual(memory.retrieve_memories("green tea morning", limit=1, min_similarity=0.1)[0]["id"], target)
+        self.assertTrue(memory.vector_index.is_trained)
+        memory.close()
+        self.assertTrue(os.path.exists(memory.vector_index_path))
+
+        reloaded = self._create_memory()
+        self.addCleanup(reloaded.close)
+        self.assertTrue(reloaded.vector_index.is_trained)
+        self.assertIn(memory_ids[0], reloaded.vector_index)
+
+        manager = MagicMock()
+        manager.long_term = reloaded
+        self_testing = MemorySelfTestingFramework(manager, {"memory": {"ann_min_recall": 0.5}})
+        results = self_testing.test_vector_index_recall(k=5, sample_size=20)
+
+        self.assertEqual(results["status"], "completed")
+        self.assertEqual(results["index_type"], "IVFVectorIndex")
+        self.assertTrue(results["passed"])
+        self.assertEqual(self_testing.metrics["tests_passed"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+"""
+Tests for the synthetic-corpus long-term memory benchmark.
+"""
+
+import json
+import unittest
+
+from benchmark_long_term import backend_configurations, run_benchmark
+from memory.ann_index import VECTOR_INDEX_TYPES
+from test_utils import generate_memory_corpus, generate_memory_queries
+
+class TestMemoryBenchmark(unittest.TestCase):
+    """Test corpus generation and the benchmark report."""
+
+    def test_corpus_is_deterministic(self):
+        """Test that the same seed gives the same corpus and queries."""
+        self.assertEqual(generate_memory_corpus(50, seed=3), generate_memory_corpus(50, seed=3))
+        self.assertNotEqual(generate_memory_corpus(50, seed=3), generate_memory_corpus(50, seed=4))
+        self.assertEqual(generate_memory_queries(10), generate_memory_queries(10))
+        self.assertEqual(len({memory["content"] for memory in generate_memory_corpus(200)}), 200)
+
+    def test_every_index_type_is_benchmarked(self):
+        """Test that each vector index type gets a configuration on both local backends."""
+        configurations = backend_configurations()
+        for index_type in VECTOR_INDEX_TYPES:
+            self.assertIn(index_type, {options.get("vector_index_type")
+                                       for options in configurations.values()
+                                       if options["vector_db_type"] == "sqlite"})
+        self.assertIn("chroma", configurations)
+
+    def test_report_has_every_measurement(self):
+        """Test that a small run measures each backend and serializes to JSON."""
+        report = run_benchmark([300], ["sqlite", "in_memory"], query_count=20, batch_size=100, dimension=64)
+        report = json.loads(json.dumps(report))
+
+        self.assertEqual([(result["backend"], result["size"]) for result in report["results"]],
+                         [("sqlite", 300), ("in_memory", 300)])
+        for result in report["results"]:
+            self.assertGreater(result["add"]["memories_per_second"], 0)
+            self.assertEqual(result["retrieve"]["queries"], 20)
+            self.assertLessEqual(result["retrieve"]["p50_ms"], result["retrieve"]["p99_ms"])
+            self.assertEqual(result["prune"]["memories_removed"], 30)
+            self.assertIn("metadata_save_seconds", result)
+            self.assertIn("rss_mb", result)
+
+        with self.assertRaises(ValueError):
+            run_benchmark([10], ["unknown"])
+
+if __name__ == "__main__":
+    unittest.main()
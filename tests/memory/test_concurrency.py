@@ -0,0 +1,149 @@
+"""
+Tests for reader-writer concurrency in long-term memory.
+"""
+
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from memory.concurrency import ReadWriteLock
+from memory.long_term import LongTermMemory
+from test_utils import StubEmbeddingModel
+
+def _start(target) -> threading.Event:
+    """Run target on a daemon thread and return an event set when it returns."""
+    done = threading.Event()
+    threading.Thread(target=lambda: (target(), done.set()), daemon=True).start()
+    return done
+
+class TestReadWriteLock(unittest.TestCase):
+    """Test ReadWriteLock sharing, exclusion and writer preference."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.lock = ReadWriteLock()
+
+    def _read(self):
+        with self.lock.read_locked():
+            pass
+
+    def _write(self):
+        with self.lock.write_locked():
+            pass
+
+    def test_readers_share_and_writers_exclude(self):
+        """Test that readers run together while a writer waits for them."""
+        with self.lock.read_locked():
+            self.assertTrue(_start(self._read).wait(5))
+            writer_done = _start(self._write)
+            self.assertFalse(writer_done.wait(0.2))
+
+            # A waiting writer keeps new readers out, but this thread may re-enter
+            self.assertFalse(_start(self._read).wait(0.2))
+            with self.lock.read_locked():
+                pass
+        self.assertTrue(writer_done.wait(5))
+
+    def test_writer_reentry_and_reads(self):
+        """Test that the writing thread can write and read again, and reads cannot upgrade."""
+        with self.lock.write_locked():
+            with self.lock.write_locked(), self.lock.read_locked():
+                self.assertTrue(self.lock.write_held)
+            self.assertFalse(_start(self._read).wait(0.2))
+        self.assertFalse(self.lock.write_held)
+
+        with self.lock.read_locked():
+            with self.assertRaises(RuntimeError):
+                self.lock.acquire_write()
+
+class TestLongTermMemoryConcurrency(unittest.TestCase):
+    """Test LongTermMemory's locking and per-thread SQLite readers."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite")
+        self.addCleanup(self.memory.close)
+        self.memory_ids = self.memory.add_memories([{"content": f"The user enjoys hobby {i}"} for i in range(10)])
+
+    def test_reads_run_alongside_reads_and_wait_for_writes(self):
+        """Test that retrievals are not serialized behind each other but wait for a write in progress."""
+        self.assertEqual(self.memory.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        retrieve = lambda: self.memory.retrieve_memories("hobby", limit=3, min_similarity=-1.0)
+
+        with self.memory.lock.read_locked():
+            self.assertTrue(_start(retrieve).wait(5))
+
+        with self.memory.lock.write_locked():
+            reader_done = _start(lambda: self.memory.get_memories_by_ids(self.memory_ids))
+            self.assertFalse(reader_done.wait(0.2))
+        self.assertTrue(reader_done.wait(5))
+
+    def test_concurrent_retrievals_and_writes(self):
+        """Test that threads reading while another writes see consistent results on their own connections."""
+        errors = []
+        connections = []
+
+        def reader():
+            try:
+                connections.append(self.memory.readers.connection())
+                for _ in range(20):
+                    memories = self.memory.get_memories_by_ids(self.memory_ids)
+                    self.assertEqual(len(memories), 10)
+                    self.memory.retrieve_memories("hobby", limit=3, min_similarity=-1.0)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for i in range(20):
+            self.memory.add_memory(f"The user mentioned fact {i}")
+        for thread in threads:
+            thread.join(30)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len({id(conn) for conn in connections}), 4)
+        self.assertEqual(len(self.memory.metadata["memories"]), 30)
+
+    def test_retrievals_do_not_wait_for_write_encodes(self):
+        """Test that a retrieval runs while a write is still embedding its content."""
+        entered = threading.Event()
+        release = threading.Event()
+        original_encode = self.memory.embedding_cache.encode
+
+        def slow_encode(texts):
+            if texts == ["The user bought a kayak"]:
+                entered.set()
+                release.wait(5)
+            return original_encode(texts)
+
+        with patch.object(self.memory.embedding_cache, "encode", side_effect=slow_encode):
+            writer_done = _start(lambda: self.memory.add_memory("The user bought a kayak"))
+            self.assertTrue(entered.wait(5))
+            reader_done = _start(lambda: self.memory.retrieve_memories("hobby", limit=3, min_similarity=-1.0))
+            self.assertTrue(reader_done.wait(5))
+            release.set()
+            self.assertTrue(writer_done.wait(5))
+
+        self.assertEqual(len(self.memory.metadata["memories"]), 11)
+
+    def test_reader_connections_of_exited_threads_are_closed(self):
+        """Test that short-lived reader threads do not leave their connections open."""
+        for _ in range(5):
+            thread = threading.Thread(target=lambda: self.memory.get_memories_by_ids(self.memory_ids))
+            thread.start()
+            thread.join(5)
+
+        # At most the calling thread's and the last exited thread's connections remain
+        self.assertLessEqual(len(self.memory.readers), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Tests for the embedding cache used by long-term memory.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from memory.embedding_cache import EmbeddingCache
+from memory.enhanced_memory_manager import EnhancedMemoryManager
+from memory.long_term import LongTermMemory
+from utils.perf_tracker import PerfTracker
+from test_utils import StubEmbeddingModel
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Test EmbeddingCache functionality."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        self.model = StubEmbeddingModel()
+
+    def _create_cache(self, **kwargs) -> EmbeddingCache:
+        cache = EmbeddingCache(encode_fn=self.model.encode, model_name="stub", **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_hits_skip_the_encoder(self):
+        """Test that repeated and whitespace-variant texts are served from the cache."""
+        cache = self._create_cache()
+
+        first = cache.encode("what time is it")
+        second = cache.encode("  what   time is it ")
+
+        self.assertEqual(self.model.encode_calls, 1)
+        np.testing.assert_array_equal(first, second)
+        np.testing.assert_allclose(first, self.model.encode("what time is it"))
+        self.assertEqual(cache.get_stats()["hits"], 1)
+        self.assertEqual(cache.get_stats()["misses"], 1)
+
+    def test_batch_encodes_only_misses(self):
+        """Test that a batch encodes each missing text once, in one call."""
+        cache = self._create_cache()
+        cache.encode("green tea")
+
+        embeddings = cache.encode(["green tea", "black coffee", "black coffee"])
+
+        self.assertEqual(embeddings.shape, (3, self.model.dimension))
+        self.assertEqual(self.model.encode_calls, 2)
+        np.testing.assert_array_equal(embeddings[1], embeddings[2])
+
+    def test_model_name_is_part_of_the_key(self):
+        """Test that different models do not share cache entries."""
+        cache = self._create_cache()
+        other = EmbeddingCache(encode_fn=self.model.encode, model_name="other")
+        self.assertNotEqual(cache.make_key("hello"), other.make_key("hello"))
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = self._create_cache(max_entries=2)
+        cache.encode("a")
+        cache.encode("b")
+        cache.encode("a")
+        cache.encode("c")
+
+        self.assertIn(cache.make_key("a"), cache.entries)
+        self.assertNotIn(cache.make_key("b"), cache.entries)
+
+    def test_disk_tier_survives_restart(self):
+        """Test that persisted embeddings are reused by a new cache instance."""
+        persist_path = os.path.join(self.test_dir, "embedding_cache.db")
+        cache = self._create_cache(persist_path=persist_path)
+        expected = cache.encode("remember the dentist")
+        cache.close()
+
+        restarted = self._create_cache(persist_path=persist_path)
+        calls = self.model.encode_calls
+        np.testing.assert_allclose(restarted.encode("remember the dentist"), expected)
+
+        self.assertEqual(self.model.encode_calls, calls)
+        self.assertEqual(restarted.get_stats()["disk_hits"], 1)
+
+    def test_perf_tracker_counters(self):
+        """Test that hits and misses are reported to the PerfTracker."""
+        tracker = PerfTracker(enable_system_monitoring=False)
+        cache = self._create_cache(perf_tracker=tracker)
+
+        cache.encode(["a", "b"])
+        cache.encode("a")
+
+        self.assertEqual(tracker.get_counters("embedding_cache"), {"misses": 2, "hits": 1})
+        self.assertIn("encode", tracker.get_component_stats("embedding_cache")["embedding_cache"])
+
+class TestLongTermMemoryEmbeddingCache(unittest.TestCase):
+    """Test that LongTermMemory embeds through the cache."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_queries_hit_the_cache(self):
+        """Test that retrieving with the same query twice encodes it once."""
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite",
+                                embedding_cache_persist=True)
+        self.addCleanup(memory.close)
+        memory_id = memory.add_memory("The user likes green tea")
+
+        calls = memory.embedding_model.encode_calls
+        memory.retrieve_memories("green tea", limit=1)
+        memory.retrieve_memories("green tea", limit=1)
+
+        self.assertEqual(memory.embedding_model.encode_calls - calls, 1)
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, "embedding_cache.db")))
+        self.assertEqual(memory.get_memory_stats()["embedding_cache"]["hits"], 1)
+        self.assertEqual(memory.retrieve_memories("green tea", limit=1)[0]["id"], memory_id)
+
+    def test_manager_reports_to_the_given_tracker(self):
+        """Test that the memory manager hands its PerfTracker to the embedding cache."""
+        tracker = PerfTracker(enable_system_monitoring=False)
+        manager = EnhancedMemoryManager(config={
+            "memory": {
+                "long_term_path": self.test_dir,
+                "vector_db": "sqlite",
+                "auto_snapshot": False,
+                "snapshot_dir": os.path.join(self.test_dir, "snapshots")
+            }
+        }, perf_tracker=tracker)
+        self.addCleanup(manager.close)
+
+        manager.long_term.retrieve_memories("green tea", limit=1)
+        manager.long_term.retrieve_memories("green tea", limit=1)
+
+        self.assertEqual(tracker.get_counters("embedding_cache"), {"misses": 1, "hits": 1})
+
+if __name__ == "__main__":
+    unittest.main()
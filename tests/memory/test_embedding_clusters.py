@@ -0,0 +1,133 @@
+"""
+Tests for mini-batch k-means embedding clusters.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from memory.embedding_clusters import EmbeddingClusters
+from memory.long_term import LongTermMemory
+from memory.summarization import MemorySummarizationSystem
+from test_utils import StubEmbeddingModel
+
+class TestEmbeddingClusters(unittest.TestCase):
+    """Test EmbeddingClusters training, assignment and persistence."""
+
+    def setUp(self):
+        """Set up test environment."""
+        rng = np.random.RandomState(3)
+        centers = np.eye(16, dtype=np.float32)[:3] * 10
+        self.vectors = np.vstack([center + rng.randn(40, 16).astype(np.float32) for center in centers])
+        self.ids = [f"memory-{i}" for i in range(120)]
+        self.blob = {memory_id: i // 40 for i, memory_id in enumerate(self.ids)}
+
+    def _assert_pure(self, clusters: EmbeddingClusters) -> None:
+        for members in clusters.clusters():
+            self.assertEqual(len({self.blob[memory_id] for memory_id in members}), 1)
+
+    def test_incremental_batches_find_blobs(self):
+        """Test that streaming memories in small batches separates well-spread groups."""
+        clusters = EmbeddingClusters(n_clusters=3, batch_size=8)
+        order = np.random.RandomState(0).permutation(120)
+        for start in range(0, 120, 10):
+            batch = order[start:start + 10]
+            clusters.partial_fit([self.ids[i] for i in batch], self.vectors[batch])
+
+        self.assertTrue(clusters.is_trained)
+        self.assertEqual(sorted(len(members) for members in clusters.clusters()), [40, 40, 40])
+        self._assert_pure(clusters)
+
+    def test_seeding_waits_for_k_memories(self):
+        """Test that nothing is clustered until k memories have been seen."""
+        clusters = EmbeddingClusters(n_clusters=3)
+        clusters.partial_fit(self.ids[:1], self.vectors[:1])
+        clusters.partial_fit(self.ids[40:41], self.vectors[40:41])
+        self.assertFalse(clusters.is_trained)
+        self.assertEqual(clusters.clusters(), [])
+
+        clusters.partial_fit(self.ids[80:81], self.vectors[80:81])
+        self.assertTrue(clusters.is_trained)
+        self.assertEqual(len(clusters.clusters()), 3)
+
+    def test_update_remove_and_persist(self):
+        """Test reassignment on update, removal and a save/load round trip."""
+        clusters = EmbeddingClusters(n_clusters=3)
+        clusters.fit(self.ids, self.vectors)
+        self._assert_pure(clusters)
+
+        moved = self.ids[0]
+        clusters.partial_fit([moved], self.vectors[100:101])
+        self.assertEqual(clusters.assignments[moved], clusters.assignments[self.ids[100]])
+        self.assertTrue(clusters.remove(self.ids[1]))
+        self.assertFalse(clusters.remove(self.ids[1]))
+
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir, ignore_errors=True)
+        path = os.path.join(test_dir, "clusters.npz")
+        self.assertTrue(clusters.save(path))
+
+        restored = EmbeddingClusters(n_clusters=3)
+        self.assertTrue(restored.load(path))
+        self.assertEqual(restored.assignments, clusters.assignments)
+        np.testing.assert_array_equal(restored.assign(self.vectors[:5]), clusters.assign(self.vectors[:5]))
+        self.assertFalse(EmbeddingClusters(n_clusters=4).load(path))
+
+class TestEmbeddingClusteringInSummaries(unittest.TestCase):
+    """Test embedding clusters maintained by LongTermMemory and read by summarization."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_memory(self) -> LongTermMemory:
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite", embedding_clusters=2)
+        self.addCleanup(memory.close)
+        return memory
+
+    def _add_memories(self, memory: LongTermMemory):
+        return memory.add_memories(
+            [{"content": f"green tea sencha matcha cup {i}", "metadata": {"topics": "tea"}} for i in range(3)]
+            + [{"content": f"python code debug compile bug {i}", "metadata": {"topics": "programming,python"}}
+               for i in range(3)]
+        )
+
+    def test_restart_restores_clusters(self):
+        """Test that clusters are saved on close and caught up with deletes on restart."""
+        memory = self._create_memory()
+        memory_ids = self._add_memories(memory)
+        memory.close()
+
+        with patch.object(EmbeddingClusters, "fit", side_effect=AssertionError("clusters refitted")):
+            reopened = self._create_memory()
+        self.assertEqual(len(reopened.embedding_clusters.assignments), 6)
+
+        reopened.delete_memory(memory_ids[0])
+        self.assertNotIn(memory_ids[0], reopened.embedding_clusters)
+
+    def test_summaries_read_embedding_clusters(self):
+        """Test that embedding mode clusters are named after their topics and summarized by name."""
+        memory = self._create_memory()
+        self._add_memories(memory)
+        manager = MagicMock()
+        manager.long_term = memory
+        summarization = MemorySummarizationSystem(manager, {"memory": {"clustering_mode": "embedding", "min_cluster_size": 2}})
+
+        clusters = summarization.cluster_memories_by_topic()
+
+        self.assertEqual(sorted(clusters), ["programming, python", "tea"])
+        self.assertTrue(all(len(memories) == 3 for memories in clusters.values()))
+        with patch.object(memory, "get_memories_by_ids", side_effect=AssertionError("clusters rebuilt")):
+            summary = summarization.summarize_topic_cluster("tea")
+        self.assertIn("Contains 3 memories", summary)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Tests for the memory-mapped embedding store.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from memory.embedding_store import MemmapVectorIndex
+from memory.long_term import LongTermMemory
+from memory.vector_index import VectorIndex
+from test_utils import StubEmbeddingModel
+
+class TestMemmapVectorIndex(unittest.TestCase):
+    """Test the memory-mapped vector index on its own."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        self.path = os.path.join(self.test_dir, "embeddings")
+        self.vectors = np.random.RandomState(7).randn(50, 16).astype(np.float32)
+        self.ids = [f"memory-{i}" for i in range(50)]
+
+    def test_matches_exact_index(self):
+        """Test that searches return the same results as the in-RAM index."""
+        store = MemmapVectorIndex(self.path, initial_capacity=8)
+        exact = VectorIndex()
+        store.add_batch(self.ids, self.vectors)
+        exact.add_batch(self.ids, self.vectors)
+
+        self.assertGreaterEqual(store.capacity, 50)
+        for query in self.vectors[:5]:
+            self.assertEqual(store.search(query, limit=5), exact.search(query, limit=5))
+
+    def test_reopen_maps_existing_files(self):
+        """Test that a second instance maps the same vectors without loading them."""
+        MemmapVectorIndex(self.path).add_batch(self.ids, self.vectors)
+
+        reader = MemmapVectorIndex(self.path, read_only=True)
+
+        self.assertIsInstance(reader.matrix, np.memmap)
+        self.assertEqual(len(reader), 50)
+        self.assertIsNone(reader._positions)  # ID map is only built when needed
+        self.assertEqual(reader.search(self.vectors[3], limit=1)[0][0], "memory-3")
+
+    def test_tombstones_and_compaction(self):
+        """Test that deletes leave tombstones until the store is compacted."""
+        store = MemmapVectorIndex(self.path)
+        store.add_batch(self.ids, self.vectors)
+
+        self.assertEqual(store.remove_batch(self.ids[:10]), 10)
+        self.assertEqual(len(store), 40)
+        self.assertEqual(store.count, 50)
+        self.assertNotIn("memory-3", [memory_id for memory_id, _ in store.search(self.vectors[3], limit=50, min_similarity=-1.0)])
+
+        self.assertEqual(store.compact(), 10)
+        self.assertEqual((store.count, store.deleted), (40, 0))
+        self.assertEqual(store.search(self.vectors[20], limit=1)[0][0], "memory-20")
+
+        reopened = MemmapVectorIndex(self.path, read_only=True)
+        self.assertEqual(len(reopened), 40)
+        self.assertNotIn("memory-3", reopened)
+
+    def test_refresh_picks_up_writes(self):
+        """Test that a reader sees rows added by the writer after refresh()."""
+        writer = MemmapVectorIndex(self.path, initial_capacity=8)
+        writer.add_batch(self.ids[:5], self.vectors[:5])
+        reader = MemmapVectorIndex(self.path, read_only=True)
+
+        writer.add_batch(self.ids[5:], self.vectors[5:])
+        reader.refresh()
+
+        self.assertEqual(len(reader), 50)
+        self.assertEqual(reader.search(self.vectors[40], limit=1)[0][0], "memory-40")
+
+class TestLongTermMemoryEmbeddingStore(unittest.TestCase):
+    """Test the sqlite backend with embedding_store="mmap"."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_memory(self) -> LongTermMemory:
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite", embedding_store="mmap")
+        self.addCleanup(memory.close)
+        return memory
+
+    def test_restart_does_not_reload_embeddings(self):
+        """Test that reopening maps the store instead of reading embeddings from SQLite."""
+        memory = self._create_memory()
+        memory_ids = memory.add_memories([
+            {"content": "The user likes green tea"},
+            {"content": "The dentist appointment is on Friday"}
+        ])
+        memory.close()
+
+        with patch.object(MemmapVectorIndex, "add_batch", side_effect=AssertionError("embeddings reloaded")):
+            reopened = self._create_memory()
+
+        self.assertIsInstance(reopened.vector_index, MemmapVectorIndex)
+        results = reopened.retrieve_memories("dentist appointment", limit=1, min_similarity=0.1)
+        self.assertEqual(results[0]["id"], memory_ids[1])
+
+    def test_delete_and_compact(self):
+        """Test that deleted memories are tombstoned and compacted away."""
+        memory = self._create_memory()
+        memory_ids = memory.add_memories([{"content": f"Memory number {i}"} for i in range(4)])
+
+        memory.delete_memory(memory_ids[0])
+        self.assertEqual(memory.vector_index.deleted, 1)
+        self.assertEqual(memory.compact_embeddings(min_tombstone_ratio=0.5), 0)
+        self.assertEqual(memory.compact_embeddings(), 1)
+        self.assertEqual(len(memory.vector_index), 3)
+
+    def test_rebuilds_store_that_drifted(self):
+        """Test that a store that does not match memories.db is rebuilt from SQLite."""
+        memory = self._create_memory()
+        memory.add_memories([{"content": f"Memory number {i}"} for i in range(3)])
+        memory.close()
+        for suffix in (".npy", ".ids.npy", ".live.npy", ".json"):
+            os.remove(os.path.join(self.test_dir, f"embeddings{suffix}"))
+
+        reopened = self._create_memory()
+
+        self.assertEqual(len(reopened.vector_index), 3)
+
+    def test_rebuilds_store_with_stale_embeddings(self):
+        """Test that an embedding changed in memories.db while the store was closed is reloaded."""
+        memory = self._create_memory()
+        memory_ids = memory.add_memories([{"content": "The user likes green tea"},
+                                          {"content": "The dentist appointment is on Friday"}])
+        memory.close()
+
+        # Another writer re-embeds a memory without touching the mapped store
+        new_embedding = StubEmbeddingModel().encode("The user moved to Lisbon")
+        conn = sqlite3.connect(os.path.join(self.test_dir, "memories.db"))
+        with conn:
+            conn.execute("UPDATE memories SET embedding = ? WHERE id = ?", (new_embedding.tobytes(), memory_ids[0]))
+        conn.close()
+
+        reopened = self._create_memory()
+        results = reopened.retrieve_memories("moved to Lisbon", limit=1, min_similarity=0.1)
+        self.assertEqual(results[0]["id"], memory_ids[0])
+
+        # A cleanly closed store is trusted again
+        reopened.close()
+        with patch.object(MemmapVectorIndex, "add_batch", side_effect=AssertionError("embeddings reloaded")):
+            self._create_memory()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Tests for bulk memory fetches by ID.
+"""
+
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from memory.active_recall import ActiveRecallSystem
+from memory.enhanced_memory_manager import EnhancedMemoryManager
+from memory.long_term import LongTermMemory
+from memory.self_testing import MemorySelfTestingFramework
+from memory.summarization import MemorySummarizationSystem
+from test_utils import StubEmbeddingModel
+
+class TestGetMemoriesByIds(unittest.TestCase):
+    """Test LongTermMemory.get_memories_by_ids on each local backend."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_memory(self, vector_db_type: str) -> LongTermMemory:
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type=vector_db_type)
+        self.addCleanup(memory.close)
+        return memory
+
+    def test_returns_records_in_order(self):
+        """Test ordering, duplicates and unknown IDs on both backends."""
+        for vector_db_type in ("sqlite", "in_memory"):
+            with self.subTest(vector_db_type=vector_db_type):
+                memory = self._create_memory(vector_db_type)
+                memory_ids = memory.add_memories([
+                    {"content": f"Memory number {i}", "source_type": "fact", "importance": 0.1 * i}
+                    for i in range(5)
+                ])
+
+                requested = [memory_ids[3], "unknown", memory_ids[0], memory_ids[3]]
+                results = memory.get_memories_by_ids(requested)
+
+                self.assertEqual([result["id"] for result in results], [memory_ids[3], memory_ids[0]])
+                self.assertEqual(results[0]["content"], "Memory number 3")
+                self.assertAlmostEqual(results[0]["importance"], 0.3)
+                self.assertEqual(results[0]["metadata"]["source_type"], "fact")
+                self.assertEqual(results[0], memory.get_memory_by_id(memory_ids[3]))
+                self.assertEqual(memory.get_memories_by_ids([]), [])
+
+    def test_sqlite_uses_one_query(self):
+        """Test that the SQLite backend fetches a batch with a single SELECT."""
+        memory = self._create_memory("sqlite")
+        memory_ids = memory.add_memories([{"content": f"Memory number {i}"} for i in range(20)])
+
+        # Reads go through the calling thread's reader connection
+        statements = []
+        reader = memory.readers.connection()
+        reader.set_trace_callback(statements.append)
+        memory.get_memories_by_ids(memory_ids)
+        reader.set_trace_callback(None)
+
+        self.assertEqual(len([statement for statement in statements if statement.startswith("SELECT")]), 1)
+
+class TestBulkFetchCallers(unittest.TestCase):
+    """Test that maintenance passes do not fetch memories one at a time."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.config = {
+            "memory": {
+                "long_term_path": self.test_dir,
+                "vector_db": "sqlite",
+                "auto_persist": False,
+                "snapshot_dir": f"{self.test_dir}/snapshots",
+                "auto_snapshot": False
+            }
+        }
+        self.manager = EnhancedMemoryManager(config=self.config)
+        self.addCleanup(self.manager.long_term.close)
+        self.memory_ids = self.manager.add_memories([
+            {"content": f"The user talked about topic {i}", "source_type": "fact", "metadata": {"topics": f"chat,topic{i}"}}
+            for i in range(6)
+        ])
+
+        patcher = patch.object(self.manager.long_term, "get_memory_by_id",
+                               side_effect=AssertionError("per-memory lookup"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_summarization_and_self_testing(self):
+        """Test topic clustering and the consistency check."""
+        clusters = MemorySummarizationSystem(self.manager, self.config).cluster_memories_by_topic(force_update=True)
+        self.assertEqual(len(clusters.get("chat", [])), 6)
+
+        results = MemorySelfTestingFramework(self.manager, self.config).run_consistency_check(self.memory_ids)
+        self.assertEqual(results["memories_checked"], 6)
+        self.assertFalse([issue for issue in results["inconsistencies"] if issue["type"] == "missing"])
+
+    def test_active_recall(self):
+        """Test integrity verification and due reviews."""
+        recall = ActiveRecallSystem(self.manager, self.config)
+
+        self.assertTrue(recall.verify_memory_integrity(batch_size=6)["verified"])
+
+        for memory_id in self.memory_ids[:3]:
+            recall.schedule_review(memory_id, 0.5)
+            recall.scheduled_reviews[memory_id] = recall.scheduled_reviews[memory_id].replace(year=2000)
+        self.assertEqual(len(recall.get_due_reviews(limit=5)), 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Tests for per-record integrity checksums and incremental integrity checks.
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from memory.integrity_index import IntegrityIndex
+from memory.long_term import LongTermMemory
+from memory.self_testing import MemorySelfTestingFramework
+from test_utils import StubEmbeddingModel
+
+class TestIntegrityIndex(unittest.TestCase):
+    """Test IntegrityIndex dirty tracking, roots and persistence."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.index = IntegrityIndex(n_shards=4)
+        self.index.mark_dirty(["a", "b", "c"])
+        for memory_id, change in self.index.dirty_ids().items():
+            self.index.update(memory_id, f"sum-{memory_id}", change)
+
+    def test_changes_during_verification_stay_dirty(self):
+        """Test that a record re-marked or removed while being verified keeps no stale checksum."""
+        self.assertTrue(self.index.is_clean())
+        self.index.mark_dirty(["a", "b"])
+        changes = self.index.dirty_ids()
+
+        self.index.mark_dirty(["a"])
+        self.index.remove("b")
+        self.assertFalse(self.index.update("a", "new", changes["a"]))
+        self.assertFalse(self.index.update("b", "new", changes["b"]))
+        self.assertEqual(list(self.index.dirty), ["a"])
+        self.assertIsNone(self.index.checksum("b"))
+
+    def test_roots_locate_differences(self):
+        """Test that matching roots prove a shard clean and differing roots name the records."""
+        rollup = self.index.rollup()
+        shard = self.index.shard_of("a")
+        stored = dict(self.index.shards[shard])
+
+        self.assertEqual(self.index.diff_shard(shard, stored), [])
+        self.assertEqual(self.index.diff_shard(shard, {**stored, "a": "tampered"}), ["a"])
+
+        self.index.update("a", "sum-a2")
+        self.assertNotEqual(self.index.rollup(), rollup)
+
+    def test_damaged_shards_are_dropped_on_load(self):
+        """Test that a shard whose saved root does not match its checksums is not trusted."""
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir, ignore_errors=True)
+        path = f"{test_dir}/integrity_index.json"
+        self.index.mark_dirty(["c"])
+        self.assertTrue(self.index.save(path))
+
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        state["shards"][self.index.shard_of("a")]["a"] = "tampered"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+        restored = IntegrityIndex(n_shards=4)
+        self.assertTrue(restored.load(path))
+        self.assertIsNone(restored.checksum("a"))
+        self.assertIn("c", restored.dirty)
+
+class TestIncrementalIntegrityChecks(unittest.TestCase):
+    """Test integrity checks against LongTermMemory's integrity index."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.memory = self._create_memory()
+        self.memory_ids = self.memory.add_memories([{"content": f"The user likes hobby {i}"} for i in range(5)])
+
+    def _create_memory(self) -> LongTermMemory:
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite", integrity_shards=4)
+        self.addCleanup(memory.close)
+        return memory
+
+    def _create_framework(self) -> MemorySelfTestingFramework:
+        manager = MagicMock()
+        manager.long_term = self.memory
+        return MemorySelfTestingFramework(manager, {"memory": {"integrity_batch_size": 2}})
+
+    def test_only_changed_memories_are_checked(self):
+        """Test that checks cover new and updated memories only and a clean store reads nothing."""
+        framework = self._create_framework()
+        progress = []
+        framework._report_progress = lambda check, done, total: progress.append((done, total))
+
+        results = framework.run_consistency_check()
+        self.assertEqual(results["memories_checked"], 5)
+        self.assertTrue(results["clean"])
+        self.assertEqual(progress, [(2, 5), (4, 5), (5, 5)])
+
+        with patch.object(self.memory, "get_memories_by_ids", side_effect=AssertionError("store read")):
+            results = framework.run_consistency_check()
+        self.assertEqual(results["memories_checked"], 0)
+        self.assertTrue(results["clean"])
+
+        self.memory.update_memory(self.memory_ids[1], {"content": "The user likes hobby 1 a lot"})
+        self.assertEqual(list(self.memory.integrity_index.dirty), [self.memory_ids[1]])
+        self.assertEqual(framework.run_consistency_check()["memories_checked"], 1)
+
+        # Checksums survive a clean restart
+        self.memory.close()
+        self.memory = self._create_memory()
+        self.assertTrue(self.memory.integrity_index.is_clean())
+        self.assertEqual(len(self.memory.integrity_index), 5)
+
+    def test_background_audit_finds_unrecorded_changes(self):
+        """Test that the audit on a worker thread flags a record changed behind the store's back."""
+        framework = self._create_framework()
+        framework.run_consistency_check()
+        with self.memory.conn:
+            self.memory.conn.execute("UPDATE memories SET content = ? WHERE id = ?", ("tampered", self.memory_ids[3]))
+
+        self.assertTrue(framework.start_background_check(audit=True))
+        results = framework.wait_for_background_check(timeout=30)
+
+        self.assertEqual([issue["memory_id"] for issue in results["inconsistencies"]], [self.memory_ids[3]])
+        self.assertEqual(results["shards_mismatched"], 1)
+        self.assertEqual(list(self.memory.integrity_index.dirty), [self.memory_ids[3]])
+
+if __name__ == "__main__":
+    unittest.main()
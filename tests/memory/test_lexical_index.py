@@ -0,0 +1,145 @@
+"""
+Tests for the BM25 lexical index and lexical/hybrid retrieval.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from memory.lexical_index import BM25Index, tokenize
+from memory.long_term import LongTermMemory
+from test_utils import StubEmbeddingModel
+
+class TestBM25Index(unittest.TestCase):
+    """Test BM25Index scoring and maintenance."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.index = BM25Index()
+        self.index.add_batch(
+            ["tea", "coffee", "weather", "trip"],
+            [
+                "The user likes green tea in the morning",
+                "The user drinks coffee at work",
+                "It rained in Paris all week",
+                "Plan the trip to Zanzibar in June"
+            ]
+        )
+
+    def test_tokenize(self):
+        """Test that stopwords and punctuation are dropped."""
+        self.assertEqual(tokenize("What's the weather in Paris?"), ["what's", "weather", "paris"])
+
+    def test_rare_terms_score_higher(self):
+        """Test that matches on rare terms outrank matches on common ones."""
+        results = self.index.search("user zanzibar", limit=4)
+
+        self.assertEqual(results[0][0], "trip")
+        self.assertEqual({memory_id for memory_id, _ in results}, {"trip", "tea", "coffee"})
+        self.assertEqual(self.index.search("unknown words"), [])
+
+    def test_update_and_remove(self):
+        """Test that replacing and removing documents keeps the postings exact."""
+        self.index.add("tea", "The user now prefers mint infusions")
+        self.assertNotIn("tea", [memory_id for memory_id, _ in self.index.search("green tea")])
+        self.assertEqual(self.index.search("mint")[0][0], "tea")
+
+        self.assertTrue(self.index.remove("trip"))
+        self.assertFalse(self.index.remove("trip"))
+        self.assertNotIn("zanzibar", self.index.postings)
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.total_length, sum(self.index.doc_lengths.values()))
+
+    def test_save_and_load(self):
+        """Test that a saved index scores identically after loading."""
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir, ignore_errors=True)
+        path = os.path.join(test_dir, "lexical_index.json")
+
+        self.assertTrue(self.index.save(path))
+        restored = BM25Index()
+        self.assertTrue(restored.load(path))
+
+        self.assertEqual(restored.search("user coffee"), self.index.search("user coffee"))
+
+class TestLongTermMemoryLexicalSearch(unittest.TestCase):
+    """Test lexical and hybrid retrieval in LongTermMemory."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_memory(self, **kwargs) -> LongTermMemory:
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite", **kwargs)
+        self.addCleanup(memory.close)
+        return memory
+
+    def test_lexical_search_fetches_only_results(self):
+        """Test that keyword search does not look up every memory."""
+        memory = self._create_memory()
+        memory_ids = memory.add_memories([
+            {"content": "The user likes green tea", "source_type": "preference"},
+            {"content": "The dentist appointment is on Friday", "source_type": "fact"},
+            {"content": "Green tea is grown in Japan", "source_type": "fact"}
+        ])
+
+        with patch.object(memory, "get_memory_by_id", side_effect=AssertionError("per-memory lookup")):
+            results = memory.lexical_search("green tea", limit=5, filter_criteria={"source_type": "fact"})
+
+        self.assertEqual([result["id"] for result in results], [memory_ids[2]])
+        self.assertEqual(results[0]["similarity"], 1.0)
+
+    def test_index_follows_updates_and_persists(self):
+        """Test incremental maintenance and restoring the index after a restart."""
+        memory = self._create_memory()
+        memory_id, deleted_id = memory.add_memories([
+            {"content": "The user likes green tea"},
+            {"content": "The user walks the dog daily"}
+        ])
+        memory.update_memory(memory_id, {"content": "The user likes oolong"})
+        memory.delete_memory(deleted_id)
+        memory.close()
+
+        with patch.object(BM25Index, "add_batch", side_effect=AssertionError("index rebuilt")):
+            reopened = self._create_memory()
+
+        self.assertEqual(reopened.lexical_search("oolong")[0]["id"], memory_id)
+        self.assertEqual(reopened.lexical_search("green tea"), [])
+        self.assertEqual(reopened.lexical_search("dog"), [])
+
+    def test_rebuilds_after_unclean_shutdown(self):
+        """Test that the index is rebuilt from the store when it was not saved."""
+        memory = self._create_memory()
+        memory_id = memory.add_memory("The user collects vintage postcards")
+        memory.metadata_journal.close(memory.metadata)  # Simulate a crash before the index is saved
+
+        reopened = self._create_memory()
+
+        self.assertEqual(reopened.lexical_search("postcards")[0]["id"], memory_id)
+
+    def test_hybrid_mode_fuses_scores(self):
+        """Test that hybrid retrieval lifts a rare keyword match above a vector match."""
+        memory = self._create_memory(hybrid_lexical_weight=0.5)
+        common_id, rare_id = memory.add_memories([
+            {"content": "the the the trip to the store"},
+            {"content": "zanzibar"},
+            {"content": "trip planning notes"},
+            {"content": "trip budget"}
+        ])[:2]
+
+        vector = memory.retrieve_memories("the trip to zanzibar", limit=2, min_similarity=0.0, mode="vector")
+        hybrid = memory.retrieve_memories("the trip to zanzibar", limit=2, min_similarity=0.0, mode="hybrid")
+
+        self.assertEqual(max(vector, key=lambda m: m["similarity"])["id"], common_id)
+        best = max(hybrid, key=lambda m: m["similarity"])
+        self.assertEqual(best["id"], rare_id)
+        self.assertAlmostEqual(best["similarity"], 0.5 * best["vector_similarity"] + 0.5, places=5)
+
+if __name__ == "__main__":
+    unittest.main()
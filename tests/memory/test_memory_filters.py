@@ -0,0 +1,259 @@
+"""
+Tests for metadata filters and SQL filter pushdown in long-term memory.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from memory.long_term import LongTermMemory, SQLITE_SCHEMA_VERSION
+from memory.memory_filters import build_chroma_where, build_sql_filter, matches_filter, parse_search_query
+from test_utils import StubEmbeddingModel
+
+class TestMemoryFilters(unittest.TestCase):
+    """Test filter evaluation, SQL translation and query parsing."""
+
+    def test_matches_filter_operators(self):
+        """Test equality, range, set and topic conditions."""
+        metadata = {"source_type": "fact", "importance": 0.8, "timestamp": "2025-04-02T10:00:00",
+                    "topics": ["tea", "mornings"]}
+
+        self.assertTrue(matches_filter(metadata, {"source_type": "fact", "importance": {"$gte": 0.5}}))
+        self.assertTrue(matches_filter(metadata, {"timestamp": {"$gt": "2025-04-01", "$lt": "2025-04-03"}}))
+        self.assertTrue(matches_filter(metadata, {"source_type": {"$in": ["fact", "preference"]}}))
+        self.assertTrue(matches_filter(metadata, {"topics": "tea"}))
+        self.assertFalse(matches_filter(metadata, {"topics": {"$nin": ["mornings"]}}))
+        self.assertFalse(matches_filter(metadata, {"importance": {"$lt": 0.5}}))
+        self.assertFalse(matches_filter(metadata, {"missing": {"$gt": 1}}))
+
+    def test_build_sql_filter(self):
+        """Test that indexed keys become SQL and other keys remain for Python."""
+        clauses, params, remaining = build_sql_filter({
+            "source_type": "feedback",
+            "timestamp": {"$gte": "2025-04-01"},
+            "topics": {"$in": ["tea", "coffee"]},
+            "feedback_type": "positive"
+        })
+
+        self.assertEqual(clauses, [
+            "source_type = ?",
+            "timestamp >= ?",
+            "id IN (SELECT memory_id FROM memory_topics WHERE topic IN (?,?))"
+        ])
+        self.assertEqual(params, ["feedback", "2025-04-01", "tea", "coffee"])
+        self.assertEqual(remaining, {"feedback_type": "positive"})
+
+    def test_build_chroma_where(self):
+        """Test that Chroma-compatible conditions become a where filter and the rest remain."""
+        where, remaining = build_chroma_where({
+            "source_type": {"$in": ["fact", "preference"]},
+            "importance": {"$gte": 0.5, "$ne": 0.7},
+            "timestamp": {"$gte": "2025-04-01"},
+            "topics": "tea",
+            "feedback_type": "positive"
+        })
+
+        self.assertEqual(where, {"$and": [
+            {"source_type": {"$in": ["fact", "preference"]}},
+            {"importance": {"$gte": 0.5}},
+            {"feedback_type": {"$eq": "positive"}}
+        ]})
+        self.assertEqual(remaining, {"importance": {"$ne": 0.7}, "timestamp": {"$gte": "2025-04-01"},
+                                     "topics": "tea"})
+        self.assertEqual(build_chroma_where({"source_type": "fact"}), ({"source_type": {"$eq": "fact"}}, {}))
+        self.assertEqual(build_chroma_where({"topics": "tea"}), ({}, {"topics": "tea"}))
+
+    def test_parse_search_query(self):
+        """Test that field filters are separated from free text."""
+        text, criteria = parse_search_query("source_type:fact AND (I OR my OR name) date:>2025-04-01")
+        self.assertEqual(text, "I my name")
+        self.assertEqual(criteria, {"source_type": "fact", "timestamp": {"$gt": "2025-04-01"}})
+
+        text, criteria = parse_search_query("source_type:feedback metadata.feedback_type:positive date:2025-04-01")
+        self.assertEqual(text, "")
+        self.assertEqual(criteria, {
+            "source_type": "feedback",
+            "feedback_type": "positive",
+            "timestamp": {"$gte": "2025-04-01", "$lt": "2025-04-02"}
+        })
+
+class TestLongTermMemoryFilterPushdown(unittest.TestCase):
+    """Test filtered retrieval through the SQLite and in-memory backends."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_memory(self, vector_db_type: str = "sqlite") -> LongTermMemory:
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type=vector_db_type)
+        self.addCleanup(memory.close)
+        return memory
+
+    def _add_sample_memories(self, memory: LongTermMemory) -> None:
+        memory.add_memories(
+            [{"content": f"conversation note {i}", "source_type": "conversation"} for i in range(50)] +
+            [
+                {"content": "The user prefers green tea", "source_type": "preference",
+                 "importance": 0.9, "metadata": {"topics": ["tea"]}},
+                {"content": "The user dislikes coffee", "source_type": "preference",
+                 "importance": 0.4, "metadata": {"topics": "coffee, drinks"}},
+                {"content": "Great answer about tea", "source_type": "feedback",
+                 "metadata": {"feedback_type": "positive", "topics": ["tea"]}}
+            ]
+        )
+
+    def test_filtered_retrieval_scores_only_candidates(self):
+        """Test that a type-scoped query only scores the matching subset."""
+        memory = self._create_memory()
+        self._add_sample_memories(memory)
+
+        with patch.object(memory.vector_index, "search", side_effect=AssertionError("full scan")), \
+             patch.object(memory.vector_index, "search_subset",
+                          wraps=memory.vector_index.search_subset) as search_subset:
+            results = memory.retrieve_memories("green tea", limit=5, min_similarity=0.0,
+                                               filter_criteria={"source_type": "preference"})
+
+        self.assertEqual(len(list(search_subset.call_args[0][1])), 2)
+        self.assertEqual(results[0]["content"], "The user prefers green tea")
+        self.assertEqual({result["metadata"]["source_type"] for result in results}, {"preference"})
+
+    def test_filter_memories_and_search_memories(self):
+        """Test structured queries over indexed columns, topics and remaining metadata."""
+        memory = self._create_memory()
+        self._add_sample_memories(memory)
+
+        self.assertEqual(len(memory.filter_memories({"source_type": "conversation"}, limit=10)), 10)
+        self.assertEqual(
+            [m["content"] for m in memory.filter_memories({"source_type": "preference", "importance": {"$gt": 0.5}})],
+            ["The user prefers green tea"]
+        )
+        self.assertEqual(
+            sorted(m["content"] for m in memory.filter_memories({"topics": "tea"})),
+            ["Great answer about tea", "The user prefers green tea"]
+        )
+        self.assertEqual(len(memory.filter_memories({"topics": "drinks"})), 1)
+
+        feedback = memory.search_memories("source_type:feedback metadata.feedback_type:positive", limit=10)
+        self.assertEqual(len(feedback), 1)
+        self.assertEqual(feedback[0]["source_type"], "feedback")
+        self.assertEqual(memory.search_memories("source_type:feedback metadata.feedback_type:negative"), [])
+        self.assertEqual(len(memory.search_memories("source_type:feedback date:>2000-01-01")), 1)
+
+    def test_update_and_delete_keep_indexes_in_step(self):
+        """Test that updates and deletes maintain the indexed columns and topics."""
+        memory = self._create_memory()
+        memory_id = memory.add_memory("Walks in the park", source_type="fact", metadata={"topics": ["walking"]})
+
+        memory.update_memory(memory_id, {"metadata": {"source_type": "preference", "topics": ["parks"]}})
+        self.assertEqual(memory.filter_memories({"source_type": "fact"}), [])
+        self.assertEqual(memory.filter_memories({"topics": "parks"})[0]["id"], memory_id)
+        self.assertEqual(memory.filter_memories({"topics": "walking"}), [])
+
+        memory.delete_memory(memory_id)
+        self.assertEqual(memory.conn.execute("SELECT COUNT(*) FROM memory_topics").fetchone()[0], 0)
+
+    def test_migrates_existing_database(self):
+        """Test that a database created before the indexed columns is backfilled."""
+        conn = sqlite3.connect(os.path.join(self.test_dir, "memories.db"))
+        conn.execute('''
+        CREATE TABLE memories (
+            id TEXT PRIMARY KEY, content TEXT NOT NULL, embedding BLOB NOT NULL,
+            timestamp TEXT NOT NULL, importance REAL NOT NULL, metadata TEXT NOT NULL
+        )''')
+        embedding = StubEmbeddingModel().encode("old fact")
+        conn.execute("INSERT INTO memories VALUES (?, ?, ?, ?, ?, ?)", (
+            "old", "old fact", embedding.tobytes(), "2025-01-01T00:00:00", 0.5,
+            json.dumps({"source_type": "fact", "topics": ["history"]})
+        ))
+        conn.commit()
+        conn.close()
+
+        memory = self._create_memory()
+
+        self.assertEqual(memory.conn.execute("PRAGMA user_version").fetchone()[0], SQLITE_SCHEMA_VERSION)
+        self.assertEqual([m["id"] for m in memory.filter_memories({"source_type": "fact"})], ["old"])
+        self.assertEqual([m["id"] for m in memory.filter_memories({"topics": "history"})], ["old"])
+
+    def test_in_memory_backend_filters(self):
+        """Test that the in-memory backend supports the same criteria."""
+        memory = self._create_memory(vector_db_type="in_memory")
+        self._add_sample_memories(memory)
+
+        results = memory.retrieve_memories("tea", limit=5, min_similarity=0.0,
+                                           filter_criteria={"topics": "tea", "importance": {"$gte": 0.5}})
+        self.assertEqual({result["content"] for result in results},
+                         {"The user prefers green tea", "Great answer about tea"})
+        self.assertEqual(len(memory.search_memories("type:preference")), 2)
+
+    def test_chroma_backend_pushes_filters_into_queries(self):
+        """Test that the Chroma backend passes where filters and requests only the fields it reads."""
+        memory = self._create_memory(vector_db_type="in_memory")
+        memory.vector_db_type = "chroma"
+        memory.collection = MagicMock()
+        tea = {"source_type": "preference", "timestamp": "2025-04-02T10:00:00", "topics": "tea"}
+        coffee = {"source_type": "preference", "timestamp": "2025-04-03T10:00:00", "topics": "coffee"}
+        memory.collection.get.return_value = {
+            "ids": ["tea", "coffee"],
+            "documents": ["The user prefers green tea", "The user drinks coffee"],
+            "metadatas": [tea, coffee]
+        }
+        memory.collection.count.return_value = 2
+        memory.collection.query.return_value = {
+            "ids": [["coffee", "tea"]],
+            "documents": [["The user drinks coffee", "The user prefers green tea"]],
+            "metadatas": [[coffee, tea]],
+            "distances": [[0.1, 0.2]]
+        }
+
+        results = memory.filter_memories({"source_type": "preference", "topics": "tea"})
+        self.assertEqual([result["id"] for result in results], ["tea"])
+        memory.collection.get.assert_called_once_with(where={"source_type": {"$eq": "preference"}},
+                                                      include=["documents", "metadatas"])
+
+        results = memory._vector_search(memory.embedding_model.encode("tea"), limit=1, min_similarity=0.0,
+                                        filter_criteria={"source_type": "preference", "topics": "tea"})
+        self.assertEqual([result["id"] for result in results], ["tea"])
+        _, kwargs = memory.collection.query.call_args
+        self.assertEqual(kwargs["where"], {"source_type": {"$eq": "preference"}})
+        self.assertEqual(kwargs["include"], ["documents", "metadatas", "distances"])
+        self.assertGreater(kwargs["n_results"], 1)
+
+    def test_chroma_backend_fetches_more_for_selective_filters(self):
+        """Test that Chroma queries grow until enough results pass the filters checked in Python."""
+        memory = self._create_memory(vector_db_type="in_memory")
+        memory.vector_db_type = "chroma"
+        memory.collection = MagicMock()
+        ids = [f"m{i}" for i in range(20)]
+        metadatas = [{"source_type": "fact", "topics": "tea" if i == 19 else "coffee"} for i in range(20)]
+        memory.collection.count.return_value = len(ids)
+
+        def query(query_embeddings, n_results, where, include):
+            return {
+                "ids": [ids[:n_results]],
+                "documents": [[f"note {memory_id}" for memory_id in ids[:n_results]]],
+                "metadatas": [metadatas[:n_results]],
+                "distances": [[0.01 * i for i in range(n_results)]]
+            }
+        memory.collection.query.side_effect = query
+
+        results = memory._vector_search(memory.embedding_model.encode("tea"), limit=1, min_similarity=0.0,
+                                        filter_criteria={"topics": "tea"})
+
+        self.assertEqual([result["id"] for result in results], ["m19"])
+        self.assertEqual([kwargs["n_results"] for _, kwargs in memory.collection.query.call_args_list], [4, 16, 20])
+
+        memory.collection.query.reset_mock()
+        self.assertEqual(memory._vector_search(memory.embedding_model.encode("tea"), limit=1, min_similarity=0.0,
+                                               filter_criteria={"topics": "juice"}), [])
+        self.assertEqual(memory.collection.query.call_count, 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Tests for incrementally maintained memory statistics.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from memory.long_term import LongTermMemory
+from memory.memory_debug import MemoryDebugSystem
+from memory.memory_stats import MemoryStats, stats_contribution
+from test_utils import StubEmbeddingModel
+
+def assert_same_stats(test: unittest.TestCase, stats: dict, expected: dict) -> None:
+    """Compare statistics snapshots, allowing for rounding in the running importance sum."""
+    for key, value in expected.items():
+        if key == "average_importance":
+            test.assertAlmostEqual(stats[key], value)
+        elif key != "version":
+            test.assertEqual(stats[key], value, key)
+
+class TestMemoryStats(unittest.TestCase):
+    """Test MemoryStats updates, timestamps and persistence."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.stats = MemoryStats()
+        self.entries = {
+            "a": {"importance": 0.2, "timestamp": "2025-04-01T10:00:00", "metadata": {"source_type": "fact"}},
+            "b": {"importance": 0.9, "timestamp": "2025-04-03T10:00:00", "metadata": {"source_type": "preference"}},
+            "c": {"importance": 0.5, "timestamp": "2025-04-02T10:00:00", "metadata": {"source_type": "fact"}}
+        }
+        self.stats.rebuild(self.entries)
+
+    def test_updates_match_recomputation(self):
+        """Test that removing and changing memories gives the same stats as a rebuild."""
+        self.stats.update({"a": stats_contribution(self.entries["a"]), "c": stats_contribution(self.entries["c"])},
+                          {"a": None, "c": stats_contribution({**self.entries["c"], "importance": 1.0})})
+        expected = MemoryStats()
+        expected.rebuild({"b": self.entries["b"], "c": {**self.entries["c"], "importance": 1.0}})
+
+        snapshot = self.stats.snapshot()
+        assert_same_stats(self, snapshot, expected.snapshot())
+        self.assertEqual(snapshot["source_types"], {"fact": 1, "preference": 1})
+        self.assertAlmostEqual(snapshot["average_importance"], 0.95)
+        self.assertEqual(snapshot["oldest_memory"], "2025-04-02T10:00:00")
+        self.assertEqual(snapshot["newest_memory"], "2025-04-03T10:00:00")
+        self.assertEqual(sum(snapshot["importance_histogram"]), 2)
+
+    def test_listeners_and_persistence(self):
+        """Test that listeners see each change and saved stats load without the entries."""
+        seen = []
+        self.stats.add_listener(seen.append)
+        self.stats.update({"a": stats_contribution(self.entries["a"])}, {"a": stats_contribution(self.entries["a"])})
+        self.assertEqual(seen, [])
+        self.stats.update({"a": stats_contribution(self.entries["a"])}, {"a": None})
+        self.assertEqual([snapshot["total_memories"] for snapshot in seen], [2])
+
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir, ignore_errors=True)
+        path = os.path.join(test_dir, "memory_stats.json")
+        self.assertTrue(self.stats.save(path))
+        restored = MemoryStats()
+        self.assertTrue(restored.load(path))
+        assert_same_stats(self, restored.snapshot(), self.stats.snapshot())
+        self.assertFalse(MemoryStats().load(os.path.join(test_dir, "missing.json")))
+
+class TestLongTermMemoryStats(unittest.TestCase):
+    """Test that LongTermMemory keeps its statistics in step with the store."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_memory(self, **kwargs) -> LongTermMemory:
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite", **kwargs)
+        self.addCleanup(memory.close)
+        return memory
+
+    def _assert_matches_scan(self, memory: LongTermMemory) -> None:
+        expected = MemoryStats()
+        expected.rebuild(memory.metadata["memories"])
+        assert_same_stats(self, memory.get_memory_stats(), expected.snapshot())
+
+    def test_stats_follow_mutations_without_scans(self):
+        """Test that adds, updates, deletes and pruning keep the stats equal to a full scan."""
+        memory = self._create_memory(max_memories=8)
+        ids = memory.add_memories([
+            {"content": f"The user likes hobby {i}", "source_type": "fact" if i % 2 else "preference",
+             "importance": i / 10}
+            for i in range(10)
+        ])
+        self._assert_matches_scan(memory)
+        self.assertEqual(memory.get_memory_stats()["total_memories"], 8)
+
+        memory.update_memory(ids[9], {"importance": 0.05, "metadata": {"source_type": "feedback"}})
+        memory.delete_memory(ids[8])
+        self._assert_matches_scan(memory)
+
+        with patch.object(memory.memory_stats, "rebuild", side_effect=AssertionError("scan")):
+            self.assertEqual(memory.get_memory_stats()["total_memories"], 7)
+
+    def test_stats_survive_clean_restart(self):
+        """Test that a clean close persists the stats and a restart loads them without a scan."""
+        memory = self._create_memory()
+        memory.add_memories([{"content": f"The user likes hobby {i}", "importance": 0.7} for i in range(5)])
+        expected = memory.get_memory_stats()
+        memory.close()
+
+        with patch("memory.long_term.MemoryStats.rebuild", side_effect=AssertionError("scan")):
+            memory = self._create_memory()
+        self.assertEqual(memory.get_memory_stats()["source_types"], expected["source_types"])
+        self.assertAlmostEqual(memory.get_memory_stats()["average_importance"], 0.7)
+        self.assertFalse(os.path.exists(memory.memory_stats_path))
+
+    def test_debug_system_pushes_stats_on_change(self):
+        """Test that the debug system emits stats when the store changes."""
+        memory = self._create_memory()
+        manager = MagicMock()
+        manager.long_term = memory
+        ws = MagicMock()
+        MemoryDebugSystem(manager, websocket_integration=ws)
+
+        memory.add_memories([{"content": "The user likes tea"}])
+        stats = ws.memory_debug_stats.call_args[0][0]
+        self.assertEqual(stats["long_term"]["total_memories"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+"""
+Tests for the long-term memory metadata journal.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from memory.metadata_journal import MetadataJournal, apply_op, set_op, delete_op, append_unique_op
+from memory.long_term import LongTermMemory
+from test_utils import StubEmbeddingModel
+
+def default_metadata():
+    return {"memory_count": 0, "memories": {}, "user_summary": {}, "topics": []}
+
+class TestMetadataJournal(unittest.TestCase):
+    """Test MetadataJournal functionality."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        self.snapshot_path = os.path.join(self.test_dir, "metadata.json")
+
+    def _create_journal(self, **kwargs) -> MetadataJournal:
+        journal = MetadataJournal(self.snapshot_path, background_compaction=False, **kwargs)
+        self.addCleanup(journal.close)
+        return journal
+
+    def test_apply_op(self):
+        """Test applying each operation type."""
+        metadata = default_metadata()
+        apply_op(metadata, set_op(["memories", "a"], {"importance": 0.5}))
+        apply_op(metadata, set_op(["memories", "a", "importance"], 0.9))
+        apply_op(metadata, append_unique_op(["topics"], "tea"))
+        apply_op(metadata, append_unique_op(["topics"], "tea"))
+        apply_op(metadata, set_op(["review_history", "a"], []))
+
+        self.assertEqual(metadata["memories"]["a"]["importance"], 0.9)
+        self.assertEqual(metadata["memory_count"], 1)
+        self.assertEqual(metadata["topics"], ["tea"])
+        self.assertEqual(metadata["review_history"], {"a": []})
+
+        apply_op(metadata, delete_op(["memories", "a"]))
+        apply_op(metadata, delete_op(["missing", "a"]))
+        self.assertEqual(metadata["memory_count"], 0)
+        self.assertNotIn("missing", metadata)
+
+    def test_replay_without_compaction(self):
+        """Test that appended changes survive a reload without a snapshot rewrite."""
+        journal = self._create_journal()
+        metadata = journal.load(default_metadata)
+        snapshot_mtime = os.path.getmtime(self.snapshot_path)
+
+        journal.apply(metadata, [set_op(["memories", "a"], {"content": "tea"})])
+        journal.apply(metadata, [set_op(["user_summary", "name"], "Sam")])
+        journal.close()
+
+        self.assertEqual(os.path.getmtime(self.snapshot_path), snapshot_mtime)
+
+        reloaded = self._create_journal().load(default_metadata)
+        self.assertEqual(reloaded["memories"], {"a": {"content": "tea"}})
+        self.assertEqual(reloaded["user_summary"], {"name": "Sam"})
+        self.assertEqual(reloaded["memory_count"], 1)
+
+    def test_torn_journal_line_is_ignored(self):
+        """Test that a partially written final line does not prevent loading."""
+        journal = self._create_journal()
+        metadata = journal.load(default_metadata)
+        journal.apply(metadata, [set_op(["memories", "a"], {"content": "tea"})])
+        journal.close()
+
+        with open(journal.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"op": "set", "path": ["memo')
+
+        reloaded = self._create_journal().load(default_metadata)
+        self.assertEqual(list(reloaded["memories"]), ["a"])
+
+    def test_compaction_threshold(self):
+        """Test that reaching the threshold folds the journal into the snapshot."""
+        journal = self._create_journal(compaction_threshold=3)
+        metadata = journal.load(default_metadata)
+
+        for i in range(3):
+            journal.apply(metadata, [set_op(["memories", f"m{i}"], {"content": str(i)})])
+
+        self.assertEqual(journal.entry_count, 0)
+        self.assertEqual(journal.compaction_count, 2)  # Initial snapshot plus threshold
+        self.assertFalse(os.path.exists(journal.compacting_path))
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)["memories"]), 3)
+
+    def test_background_compaction(self):
+        """Test that background compaction keeps concurrent appends."""
+        journal = MetadataJournal(self.snapshot_path, compaction_threshold=2)
+        metadata = journal.load(default_metadata)
+
+        for i in range(10):
+            journal.apply(metadata, [set_op(["memories", f"m{i}"], {"content": str(i)})])
+        journal.close()
+
+        reloaded = self._create_journal().load(default_metadata)
+        self.assertEqual(len(reloaded["memories"]), 10)
+
+    def test_recover_interrupted_compaction(self):
+        """Test that a rotated journal left by a crash is replayed and folded."""
+        journal = self._create_journal()
+        metadata = journal.load(default_metadata)
+        journal.apply(metadata, [set_op(["memories", "a"], {"content": "tea"})])
+        journal.close()
+
+        # Simulate a crash after rotation but before the snapshot was replaced
+        os.replace(journal.journal_path, journal.compacting_path)
+
+        recovered_journal = self._create_journal()
+        reloaded = recovered_journal.load(default_metadata)
+        self.assertIn("a", reloaded["memories"])
+        self.assertFalse(os.path.exists(recovered_journal.compacting_path))
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            self.assertIn("a", json.load(f)["memories"])
+
+    def test_compaction_serializes_outside_lock(self):
+        """Test that appends proceed while a compaction serializes its snapshot."""
+        journal = self._create_journal()
+        metadata = journal.load(default_metadata)
+        journal.apply(metadata, [set_op(["memories", "a"], {"content": "tea"})])
+
+        dumps = json.dumps
+        appended = []
+
+        def append_during_dumps(*args, **kwargs):
+            if "indent" not in kwargs:
+                # Journal lines written by the appending thread
+                return dumps(*args, **kwargs)
+            thread = threading.Thread(target=lambda: (
+                journal.apply(metadata, [set_op(["memories", "a", "content"], "coffee"),
+                                         set_op(["memories", "b"], {"content": "cake"})]),
+                appended.append(True)
+            ))
+            thread.start()
+            thread.join(5)
+            return dumps(*args, **kwargs)
+
+        with patch("memory.metadata_journal.json.dumps", side_effect=append_during_dumps):
+            self.assertTrue(journal.compact(metadata))
+
+        self.assertEqual(appended, [True])
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)["memories"], {"a": {"content": "tea"}})
+
+        journal.close()
+        reloaded = self._create_journal().load(default_metadata)
+        self.assertEqual(reloaded["memories"], {"a": {"content": "coffee"}, "b": {"content": "cake"}})
+
+class TestLongTermMemoryJournal(unittest.TestCase):
+    """Test that LongTermMemory journals metadata changes."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_metadata_persisted_through_journal(self):
+        """Test that memory, summary and topic changes are recovered without close()."""
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite")
+        kept_id = memory.add_memory("The user likes green tea")
+        deleted_id = memory.add_memory("Temporary note")
+        memory.update_memory(kept_id, {"importance": 0.9})
+        memory.delete_memory(deleted_id)
+        memory.update_user_summary("name", "Sam")
+        memory.add_topic("tea")
+
+        self.assertGreater(memory.metadata_journal.entry_count, 0)
+
+        # Reload without closing, as after a crash
+        memory.metadata_journal.close()
+        reloaded = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite")
+        self.addCleanup(reloaded.close)
+        self.addCleanup(memory.conn.close)
+
+        self.assertEqual(list(reloaded.metadata["memories"]), [kept_id])
+        self.assertEqual(reloaded.metadata["memories"][kept_id]["importance"], 0.9)
+        self.assertEqual(reloaded.metadata["memory_count"], 1)
+        self.assertEqual(reloaded.get_user_summary("name"), "Sam")
+        self.assertEqual(reloaded.get_topics(), ["tea"])
+
+    def test_close_compacts_journal(self):
+        """Test that closing the store folds the journal into metadata.json."""
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite")
+        memory_id = memory.add_memory("The user likes green tea")
+        memory.close()
+
+        self.assertFalse(os.path.exists(memory.metadata_journal.journal_path))
+        with open(memory.metadata_path, 'r', encoding='utf-8') as f:
+            self.assertIn(memory_id, json.load(f)["memories"])
+
+if __name__ == "__main__":
+    unittest.main()
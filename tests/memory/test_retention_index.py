@@ -0,0 +1,152 @@
+"""
+Tests for retention-ordered pruning of long-term memory.
+"""
+
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from memory.enhanced_memory_manager import EnhancedMemoryManager
+from memory.long_term import LongTermMemory
+from memory.retention_index import RetentionIndex, retention_key
+from memory.write_pipeline import MemoryWritePipeline
+from test_utils import StubEmbeddingModel
+
+class TestRetentionIndex(unittest.TestCase):
+    """Test RetentionIndex ordering and lazy heap updates."""
+
+    def test_keys_order_like_decayed_scores(self):
+        """Test that keys sort memories the way importance * recency decay does."""
+        now = datetime.now()
+        entries = {
+            "old_important": {"importance": 0.9, "timestamp": (now - timedelta(days=60)).isoformat()},
+            "new_trivial": {"importance": 0.2, "timestamp": now.isoformat()},
+            "recent_medium": {"importance": 0.5, "timestamp": (now - timedelta(days=5)).isoformat()},
+            "unscored": {"importance": 0.0, "timestamp": now.isoformat()},
+        }
+
+        def score(entry):
+            age_days = (now - datetime.fromisoformat(entry["timestamp"])).total_seconds() / (24 * 3600)
+            return entry["importance"] * (2 ** (-age_days / 30))
+
+        by_key = sorted(entries, key=lambda memory_id: retention_key(**entries[memory_id]))
+        self.assertEqual(by_key, sorted(entries, key=lambda memory_id: score(entries[memory_id])))
+
+        index = RetentionIndex()
+        index.rebuild(entries)
+        self.assertEqual(index.lowest(2), by_key[:2])
+
+    def test_updates_and_removals_are_lazy(self):
+        """Test that re-scored and removed memories are neither returned twice nor at all."""
+        timestamp = datetime.now().isoformat()
+        index = RetentionIndex()
+        for i, importance in enumerate([0.1, 0.2, 0.3]):
+            index.update(f"m{i}", {"importance": importance, "timestamp": timestamp})
+
+        index.update("m0", {"importance": 0.9, "timestamp": timestamp})
+        index.update("m0", {"importance": 0.1, "timestamp": timestamp})
+        index.remove("m1")
+
+        self.assertEqual(index.lowest(5), ["m0", "m2"])
+        self.assertEqual(len(index), 2)
+
+class TestPruning(unittest.TestCase):
+    """Test LongTermMemory pruning through the retention index."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite",
+                                     max_memories=5, prune_high_water=1.5, prune_batch_size=2)
+        self.addCleanup(self.memory.close)
+
+    def _add(self, count, start=0):
+        return self.memory.add_memories([
+            {"content": f"The user mentioned fact {i}", "importance": 0.1 + 0.1 * (i % 9)}
+            for i in range(start, start + count)
+        ])
+
+    def test_prunes_lowest_scores_in_batches_above_high_water(self):
+        """Test that pruning waits for the high-water mark and removes the lowest-scored memories."""
+        memory_ids = self._add(7)
+        self.assertEqual(len(self.memory.metadata["memories"]), 7)
+
+        with patch.object(self.memory, "delete_memories", wraps=self.memory.delete_memories) as deletes:
+            memory_ids += self._add(1, start=7)
+
+        # Back down to max_memories in batches of at most prune_batch_size
+        self.assertEqual([len(call.args[0]) for call in deletes.call_args_list], [2, 1])
+        self.assertEqual(set(self.memory.metadata["memories"]), set(memory_ids[3:]))
+        self.assertEqual(self.memory.conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0], 5)
+        self.assertEqual(len(self.memory.retention_index), 5)
+
+    def test_background_pruning(self):
+        """Test that a prune scheduler moves pruning out of add_memories."""
+        pipeline = MemoryWritePipeline()
+        self.addCleanup(pipeline.close, 5)
+        self.memory.prune_scheduler = lambda job: pipeline.submit(job, key="prune_memories", low_priority=True)
+
+        with pipeline.exclusive():
+            self._add(8)
+            self.assertEqual(len(self.memory.metadata["memories"]), 8)
+
+        self.assertTrue(pipeline.flush(timeout=5))
+        self.assertEqual(len(self.memory.metadata["memories"]), 5)
+
+    def test_manager_prunes_in_background_without_async_writes(self):
+        """Test that the memory manager moves pruning out of add_memories on its own thread."""
+        manager = EnhancedMemoryManager(config={
+            "memory": {
+                "long_term_path": f"{self.test_dir}/manager",
+                "vector_db": "sqlite",
+                "max_memories": 5,
+                "prune_high_water": 1.5,
+                "prune_batch_size": 2,
+                "auto_snapshot": False,
+                "snapshot_dir": f"{self.test_dir}/snapshots"
+            }
+        })
+        self.addCleanup(manager.close)
+        self.assertIsNone(manager.write_pipeline)
+
+        # Hold the pruning thread so the batches are observably deferred
+        with manager.prune_pipeline.exclusive():
+            manager.long_term.add_memories([
+                {"content": f"The user mentioned fact {i}", "importance": 0.5} for i in range(8)
+            ])
+            self.assertEqual(len(manager.long_term.metadata["memories"]), 8)
+
+        self.assertTrue(manager.prune_pipeline.flush(timeout=5))
+        self.assertEqual(len(manager.long_term.metadata["memories"]), 5)
+
+    def test_forget_memories_deletes_in_one_batch(self):
+        """Test that the manager's forgetting pass removes its selection with one batched delete."""
+        manager = EnhancedMemoryManager(config={
+            "memory": {
+                "long_term_path": f"{self.test_dir}/forget",
+                "vector_db": "sqlite",
+                "max_memories": 100,
+                "auto_snapshot": False,
+                "snapshot_dir": f"{self.test_dir}/snapshots"
+            }
+        })
+        self.addCleanup(manager.close)
+        manager.long_term.add_memories([
+            {"content": f"The user mentioned fact {i}", "importance": 0.1 + 0.1 * (i % 9)} for i in range(8)
+        ])
+
+        with patch.object(manager.long_term, "delete_memories", wraps=manager.long_term.delete_memories) as deletes:
+            forgotten = manager.forget_memories(max_memories=5)
+
+        self.assertEqual(deletes.call_count, 1)
+        self.assertEqual(forgotten, 8 - len(manager.long_term.metadata["memories"]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Tests for the retrieval result cache.
+"""
+
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from memory.enhanced_memory_manager import EnhancedMemoryManager
+from memory.memory_debug import MemoryDebugSystem
+from memory.retrieval_cache import RetrievalCache
+from utils.perf_tracker import PerfTracker
+from test_utils import StubEmbeddingModel
+
+class TestRetrievalCache(unittest.TestCase):
+    """Test RetrievalCache keys, invalidation and bounds."""
+
+    def test_normalized_queries_share_entries(self):
+        """Test that case, spacing and trailing punctuation do not change the key."""
+        cache = RetrievalCache()
+        self.assertEqual(
+            cache.make_key("What is my  NAME?", 5, 0.3, {"source_type": "fact"}),
+            cache.make_key("what is my name", 5, 0.3, {"source_type": "fact"})
+        )
+        self.assertNotEqual(cache.make_key("name", 5, 0.3), cache.make_key("name", 3, 0.3))
+        self.assertNotEqual(cache.make_key("name", 5, 0.3), cache.make_key("name", 5, 0.3, {"source_type": "fact"}))
+
+    def test_generation_change_invalidates(self):
+        """Test that an entry is only returned for the generation it was stored at."""
+        cache = RetrievalCache()
+        key = cache.make_key("tea", 5, 0.3)
+        cache.put(key, 1, [{"id": "a", "similarity": 0.9}])
+
+        hit = cache.get(key, 1)
+        hit[0]["similarity"] = 0.0  # Callers get copies
+        self.assertEqual(cache.get(key, 1)[0]["similarity"], 0.9)
+
+        self.assertIsNone(cache.get(key, 2))
+        self.assertEqual(cache.get_stats()["stale"], 1)
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_bounded_lru(self):
+        """Test that the least recently used entry is evicted."""
+        cache = RetrievalCache(max_entries=2)
+        keys = [cache.make_key(query, 5, 0.3) for query in ("a", "b", "c")]
+        cache.put(keys[0], 0, [])
+        cache.put(keys[1], 0, [])
+        cache.get(keys[0], 0)
+        cache.put(keys[2], 0, [])
+
+        self.assertIn(keys[0], cache.entries)
+        self.assertNotIn(keys[1], cache.entries)
+
+class TestEnhancedMemoryManagerRetrievalCache(unittest.TestCase):
+    """Test retrieval caching in EnhancedMemoryManager."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.perf_tracker = PerfTracker(enable_system_monitoring=False)
+        self.manager = EnhancedMemoryManager(config={
+            "memory": {
+                "long_term_path": self.test_dir,
+                "vector_db": "sqlite",
+                "auto_persist": False,
+                "snapshot_dir": f"{self.test_dir}/snapshots",
+                "auto_snapshot": False
+            }
+        }, perf_tracker=self.perf_tracker)
+        self.addCleanup(self.manager.long_term.close)
+        self.manager.add_fact("The user likes green tea")
+
+    def test_repeated_query_hits_cache(self):
+        """Test that a repeated query skips the store but is re-weighted."""
+        first = self.manager.retrieve_relevant_memories("green tea", min_similarity=0.1)
+
+        with patch.object(self.manager.long_term, "retrieve_memories", side_effect=AssertionError("store queried")), \
+             patch.object(self.manager.temporal_weighting, "apply_temporal_weighting",
+                          wraps=self.manager.temporal_weighting.apply_temporal_weighting) as weighting:
+            second = self.manager.retrieve_relevant_memories("Green tea?", min_similarity=0.1)
+
+        weighting.assert_called_once()
+        self.assertEqual([memory["id"] for memory in second], [memory["id"] for memory in first])
+        self.assertEqual(self.perf_tracker.get_counters("retrieval_cache"), {"misses": 1, "hits": 1})
+        self.assertEqual(self.manager.get_memory_stats()["retrieval_cache"]["hit_rate"], 0.5)
+
+    def test_debug_search_hits_cache(self):
+        """Test that repeated dashboard searches reuse cached retrievals."""
+        debug = MemoryDebugSystem(self.manager)
+        first = debug.search_memories("green tea")
+
+        with patch.object(self.manager.long_term, "retrieve_memories", side_effect=AssertionError("store queried")), \
+             patch.object(self.manager.long_term, "lexical_search", side_effect=AssertionError("store queried")):
+            second = debug.search_memories("green tea")
+
+        self.assertEqual([memory["id"] for memory in second], [memory["id"] for memory in first])
+        self.assertEqual(self.manager.retrieval_cache.get_stats()["hits"], 1)
+
+    def test_writes_invalidate_cache(self):
+        """Test that adding, updating and deleting memories invalidate cached results."""
+        self.manager.retrieve_relevant_memories("green tea", min_similarity=0.1)
+        memory_id = self.manager.add_fact("Green tea is grown in Japan")
+
+        results = self.manager.retrieve_relevant_memories("green tea", min_similarity=0.1)
+        self.assertIn(memory_id, [memory["id"] for memory in results])
+
+        self.manager.long_term.delete_memory(memory_id)
+        results = self.manager.retrieve_relevant_memories("green tea", min_similarity=0.1)
+        self.assertNotIn(memory_id, [memory["id"] for memory in results])
+        self.assertEqual(self.manager.retrieval_cache.get_stats()["hits"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+"""
+Tests for the heap-backed review schedule.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from memory.active_recall import ActiveRecallSystem
+from memory.long_term import LongTermMemory
+from memory.metadata_journal import set_op
+from memory.review_schedule import ReviewSchedule
+from test_utils import StubEmbeddingModel
+
+class TestReviewSchedule(unittest.TestCase):
+    """Test ReviewSchedule ordering and persistence."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        self.path = os.path.join(self.test_dir, "reviews.json")
+        self.now = datetime(2026, 1, 1, 12, 0)
+
+    def test_due_ids_in_due_order(self):
+        """Test that due reviews come out most overdue first, honouring the limit."""
+        schedule = ReviewSchedule()
+        schedule.load()
+        for hours, memory_id in [(-1, "a"), (2, "future"), (-3, "b"), (-2, "c")]:
+            schedule.schedule(memory_id, self.now + timedelta(hours=hours))
+
+        self.assertEqual(schedule.due_ids(self.now), ["b", "c", "a"])
+        self.assertEqual(schedule.due_ids(self.now, limit=2), ["b", "c"])
+        # Peeking leaves the schedule intact
+        self.assertEqual(len(schedule), 4)
+        self.assertEqual(len(schedule.heap), 4)
+
+    def test_stale_entries_are_skipped(self):
+        """Test that rescheduled and removed reviews do not come back from the heap."""
+        schedule = ReviewSchedule()
+        schedule.load()
+        schedule.schedule("a", self.now - timedelta(hours=2))
+        schedule.schedule("b", self.now - timedelta(hours=1))
+        schedule.schedule("a", self.now + timedelta(days=1))
+        self.assertTrue(schedule.unschedule("b"))
+        self.assertFalse(schedule.unschedule("b"))
+
+        self.assertEqual(schedule.due_ids(self.now), [])
+        self.assertEqual(schedule.due_ids(self.now + timedelta(days=2)), ["a"])
+
+    def test_journal_replay_and_legacy_import(self):
+        """Test that schedule and review writes survive a reopen and legacy state seeds a new store."""
+        legacy = {
+            "scheduled_reviews": {"old": (self.now - timedelta(hours=1)).isoformat()},
+            "review_history": {"old": [{"timestamp": self.now.isoformat(), "success": True, "interval": 1.0}]}
+        }
+        schedule = ReviewSchedule(self.path)
+        schedule.load(legacy)
+        schedule.schedule("new", self.now - timedelta(hours=2))
+        schedule.record("new", {"timestamp": self.now, "success": False, "interval": 0.5})
+        schedule.unschedule("old")
+
+        # Reopen without closing, so the journal has to be replayed
+        reopened = ReviewSchedule(self.path)
+        reopened.load({"scheduled_reviews": {"ignored": self.now.isoformat()}})
+
+        self.assertEqual(reopened.due_ids(self.now), ["new"])
+        self.assertEqual(reopened.history["new"][0]["timestamp"], self.now)
+        self.assertTrue(reopened.history["old"][0]["success"])
+
+    def test_due_count_tracks_schedule_changes(self):
+        """Test that the due count follows scheduling, rescheduling and removal as time advances."""
+        schedule = ReviewSchedule()
+        schedule.load()
+        for hours, memory_id in [(-1, "a"), (2, "future"), (-3, "b")]:
+            schedule.schedule(memory_id, self.now + timedelta(hours=hours))
+
+        self.assertEqual(schedule.due_count(self.now), 2)
+        self.assertEqual(schedule.due_count(self.now + timedelta(hours=3)), 3)
+
+        schedule.schedule("a", self.now + timedelta(days=1))
+        schedule.unschedule("b")
+        later = self.now + timedelta(hours=3)
+        self.assertEqual(schedule.due_count(later), len(schedule.due_ids(later)))
+        # An earlier reference time is still answered correctly
+        self.assertEqual(schedule.due_count(self.now), 0)
+
+    def test_review_totals_follow_history_changes(self):
+        """Test that running review totals match recorded and replaced review histories."""
+        schedule = ReviewSchedule()
+        schedule.load({"review_history": {"old": [{"timestamp": self.now.isoformat(), "success": True,
+                                                   "interval": 2.0}]}})
+        schedule.record("new", {"timestamp": self.now, "success": False, "interval": 4.0})
+        self.assertEqual(schedule.history.review_count, 2)
+        self.assertEqual(schedule.history.success_count, 1)
+        self.assertAlmostEqual(schedule.history.interval_total / schedule.history.interval_count, 3.0)
+
+        schedule.history["old"] = []
+        self.assertEqual(schedule.history.review_count, 1)
+        self.assertEqual(schedule.history.success_count, 0)
+
+class TestActiveRecallReviewStore(unittest.TestCase):
+    """Test ActiveRecallSystem with a review store next to LongTermMemory."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite")
+        self.addCleanup(self.memory.close)
+        self.manager = MagicMock()
+        self.manager.long_term = self.memory
+
+    def test_reviews_bypass_memory_metadata(self):
+        """Test that legacy reviews move to the review store and review writes skip the metadata."""
+        memory_ids = self.memory.add_memories([
+            {"content": "The user likes green tea", "importance": 0.9},
+            {"content": "The user owns a bicycle", "importance": 0.2}
+        ])
+        overdue = (datetime.now() - timedelta(hours=1)).isoformat()
+        self.memory._save_metadata(changes=[
+            set_op(["scheduled_reviews", memory_ids[1]], overdue)
+        ])
+
+        recall = ActiveRecallSystem(self.manager)
+        self.addCleanup(recall.close)
+        self.assertTrue(recall.scheduled_reviews.persistent)
+        self.assertNotIn("scheduled_reviews", self.memory.metadata)
+        self.assertIn(memory_ids[1], recall.scheduled_reviews)
+
+        with patch.object(self.memory, "_save_metadata") as save_metadata:
+            recall.schedule_review(memory_ids[0], 0.9)
+            recall.scheduled_reviews.schedule(memory_ids[0], datetime.now() - timedelta(hours=2))
+            recall.record_review(memory_ids[1], success=False)
+        save_metadata.assert_not_called()
+
+        self.assertEqual([m["id"] for m in recall.get_due_reviews()], [memory_ids[0]])
+        recall.close()
+
+        reopened = ActiveRecallSystem(self.manager)
+        self.addCleanup(reopened.close)
+        self.assertEqual(len(reopened.review_history[memory_ids[1]]), 1)
+        self.assertEqual(set(reopened.scheduled_reviews), set(memory_ids))
+
+    def test_deleted_memories_leave_due_reviews(self):
+        """Test that deleting the most overdue memories still returns the remaining due reviews."""
+        memory_ids = self.memory.add_memories([
+            {"content": f"The user mentioned fact number {i}", "importance": 0.5} for i in range(10)
+        ])
+        recall = ActiveRecallSystem(self.manager)
+        self.addCleanup(recall.close)
+        now = datetime.now()
+        for hours, memory_id in enumerate(memory_ids, 1):
+            recall.scheduled_reviews.schedule(memory_id, now - timedelta(hours=hours))
+
+        # The last five are the most overdue
+        self.assertEqual(self.memory.delete_memories(memory_ids[5:]), 5)
+
+        self.assertEqual(len(recall.scheduled_reviews), 5)
+        self.assertEqual({m["id"] for m in recall.get_due_reviews(limit=5)}, set(memory_ids[:5]))
+
+    def test_due_reviews_skip_missing_memories(self):
+        """Test that reviews of memories removed behind the schedule's back do not use up the limit."""
+        memory_ids = self.memory.add_memories([
+            {"content": f"The user mentioned fact number {i}", "importance": 0.5} for i in range(4)
+        ])
+        recall = ActiveRecallSystem(self.manager)
+        self.addCleanup(recall.close)
+        recall.scheduled_reviews.schedule("missing", datetime.now() - timedelta(days=1))
+        for memory_id in memory_ids:
+            recall.scheduled_reviews.schedule(memory_id, datetime.now() - timedelta(hours=1))
+
+        self.assertEqual(len(recall.get_due_reviews(limit=4)), 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,6 +9,7 @@ import json
 import os
 
 from memory.self_testing import MemorySelfTestingFramework
+from test_utils import stub_bulk_fetch
 
 class TestMemorySelfTestingFramework(unittest.TestCase):
     """Test memory self-testing functionality."""
@@ -63,6 +64,8 @@ class TestMemorySelfTestingFramework(unittest.TestCase):
         
         self.memory_manager.long_term.get_memory_by_id.side_effect = get_memory_by_id
         
+        stub_bulk_fetch(self.memory_manager.long_term, self.test_memories)
+        
         # Add test memories to metadata
         self.memory_manager.long_term.metadata["memories"] = {
             "memory1": {"content": "This is a test fact", "importance": 0.9},
@@ -0,0 +1,108 @@
+"""
+Tests for delta, content-addressed memory snapshots.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from memory import snapshot_store
+from memory.long_term import LongTermMemory
+from memory.memory_snapshot import MemorySnapshotManager
+from memory.short_term import MemoryManager as ShortTermMemory
+from memory.snapshot_store import SnapshotStore, read_header
+from test_utils import StubEmbeddingModel
+
+def _entries(path):
+    return list(snapshot_store._iter_entries(path))
+
+class TestSnapshotStore(unittest.TestCase):
+    """Test SnapshotStore deltas, chains and streaming restore."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        self.records = {f"m{i}": {"content": f"memory {i}", "importance": 0.5} for i in range(5)}
+
+    def test_deltas_hold_only_changes(self):
+        """Test that a delta lists changed and deleted records and stores each content once."""
+        store = SnapshotStore(self.test_dir)
+        full_path = store.write("s1", {}, self.records)
+        self.assertEqual(len(_entries(full_path)), 5)
+
+        self.records["m0"] = {"content": "changed", "importance": 0.9}
+        self.records["copy"] = dict(self.records["m1"])
+        del self.records["m4"]
+        delta_path = store.write("s2", {}, self.records)
+
+        entries = {entry["id"]: entry for entry in _entries(delta_path)}
+        self.assertEqual(set(entries), {"m0", "copy", "m4"})
+        self.assertIn("record", entries["m0"])
+        self.assertNotIn("record", entries["copy"])
+        self.assertTrue(entries["m4"]["deleted"])
+        self.assertEqual(read_header(delta_path)["parent"], os.path.basename(full_path))
+
+        self.assertEqual(dict(SnapshotStore.iter_records(delta_path)), self.records)
+        self.assertEqual(len(dict(SnapshotStore.iter_records(full_path))), 5)
+
+    def test_chain_resumes_and_restarts(self):
+        """Test that a new store continues the chain and a full snapshot starts a new one."""
+        SnapshotStore(self.test_dir).write("s1", {}, self.records)
+
+        store = SnapshotStore(self.test_dir, full_snapshot_interval=2)
+        self.records["m1"] = {"content": "edited"}
+        delta_path = store.write("s2", {}, self.records)
+        self.assertEqual(len(_entries(delta_path)), 1)
+
+        full_path = store.write("s2", {}, self.records)
+        self.assertNotEqual(full_path, delta_path)
+        self.assertIsNone(read_header(full_path)["parent"])
+        self.assertEqual(dict(SnapshotStore.iter_records(delta_path)), self.records)
+
+class TestDeltaSnapshots(unittest.TestCase):
+    """Test MemorySnapshotManager with the delta format."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.long_term = LongTermMemory(storage_path=os.path.join(self.test_dir, "long_term"), vector_db_type="sqlite")
+        self.addCleanup(self.long_term.close)
+        self.manager = MagicMock()
+        self.manager.long_term = self.long_term
+        self.manager.short_term = ShortTermMemory(max_turns=10)
+        self.manager.get_memory_stats.return_value = {"long_term_count": 3}
+        self.snapshots = MemorySnapshotManager(
+            self.manager, snapshot_dir=os.path.join(self.test_dir, "snapshots"), snapshot_format="delta"
+        )
+
+    def test_snapshots_write_changed_records(self):
+        """Test that snapshots are written on creation, hash only changed records and restore."""
+        memory_ids = self.long_term.add_memories([{"content": f"Fact number {i}"} for i in range(3)])
+        self.manager.short_term.add_turn("user", "Hello")
+        first_id = self.snapshots.create_snapshot()
+        self.assertNotIn("memories", self.snapshots.snapshots[first_id]["long_term"])
+
+        self.long_term.update_memory(memory_ids[0], {"importance": 0.95})
+        with patch.object(snapshot_store, "record_hash", wraps=snapshot_store.record_hash) as hashed:
+            second_id = self.snapshots.create_snapshot()
+        self.assertEqual(hashed.call_count, 1)
+
+        records = dict(self.snapshots.iter_snapshot_records(second_id))
+        self.assertEqual(records, self.long_term.metadata["memories"])
+
+        export_path = self.snapshots.save_snapshot(second_id, os.path.join(self.test_dir, "export"))
+        loaded_id = self.snapshots.load_snapshot(export_path)
+        self.assertEqual(dict(self.snapshots.iter_snapshot_records(loaded_id)), records)
+        self.assertEqual(self.snapshots.get_snapshot_metadata(loaded_id)["short_term_turns"], 1)
+        self.assertEqual(len(self.snapshots.list_snapshot_files()), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,6 +9,7 @@ import json
 import os
 
 from memory.summarization import MemorySummarizationSystem
+from test_utils import stub_bulk_fetch
 
 class TestMemorySummarizationSystem(unittest.TestCase):
     """Test memory summarization functionality."""
@@ -97,6 +98,8 @@ class TestMemorySummarizationSystem(unittest.TestCase):
 
         self.memory_manager.long_term.get_memory_by_id.side_effect = get_memory_by_id
 
+        stub_bulk_fetch(self.memory_manager.long_term, self.test_memories)
+
         # Add test memories to metadata
         self.memory_manager.long_term.metadata["memories"] = {
             "memory1": {"content": "The user likes Japanese food", "importance": 0.8},
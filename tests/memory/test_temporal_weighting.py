@@ -247,5 +247,69 @@ class TestTemporalWeighting(unittest.TestCase):
         self.assertGreater(partial_time, old_time)
         self.assertLess(partial_time, reinforced_time)  # Should be between old and fully reinforced
 
+    def _sample_memories(self, count: int = 300):
+        """Create memories of mixed types, ages and importance."""
+        now = datetime.now()
+        source_types = ["conversation", "fact", "preference", "feedback", "summary", "other"]
+        memories = []
+        for i in range(count):
+            memories.append({
+                "content": f"memory {i}",
+                "timestamp": (now - timedelta(days=(i * 7) % 200, hours=i % 24)).isoformat(),
+                "importance": (i % 10) / 10.0,
+                "source_type": source_types[i % len(source_types)],
+                "reinforcement_count": i % 7,
+                "similarity": (i % 4) / 4.0
+            })
+        memories.append({"content": "bad timestamp", "timestamp": "not a date", "importance": 0.1})
+        return memories
+
+    def test_vectorized_scores_match_per_memory_scores(self):
+        """Test that the columnar decay factors match calculate_decay_factor."""
+        memories = self._sample_memories()
+        columns = self.temporal_weighting.build_columns(memories)
+
+        decay_factors = self.temporal_weighting.decay_factors(columns)
+
+        for memory, decay_factor in zip(memories, decay_factors):
+            expected = self.temporal_weighting.calculate_decay_factor(
+                memory["timestamp"],
+                memory.get("source_type", "conversation"),
+                memory.get("reinforcement_count", 0)
+            )
+            self.assertAlmostEqual(decay_factor, expected, places=5)
+
+        weighted = self.temporal_weighting.apply_temporal_weighting(memories)
+        self.assertEqual(len(weighted), len(memories))
+        self.assertNotIn("final_score", memories[0])
+        bad = next(memory for memory in weighted if memory["content"] == "bad timestamp")
+        self.assertEqual((bad["decay_factor"], bad["recency_score"]), (1.0, 0.5))
+
+    def test_select_memories_to_forget_matches_sequential_sweep(self):
+        """Test that the vectorized sweep forgets the same memories as should_forget_memory."""
+        memories = self._sample_memories()
+        max_memories = 200
+
+        expected = []
+        for row, memory in enumerate(memories):
+            if self.temporal_weighting.should_forget_memory(memory, len(memories) - len(expected), max_memories):
+                expected.append(row)
+
+        selected = self.temporal_weighting.select_memories_to_forget(memories, len(memories), max_memories)
+
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(selected, expected)
+
+    def test_columns_read_long_term_metadata_layout(self):
+        """Test that fields nested under "metadata" are used when not at the top level."""
+        timestamp = (datetime.now() - timedelta(days=60)).isoformat()
+        columns = self.temporal_weighting.build_columns([
+            {"timestamp": timestamp, "importance": 0.5,
+             "metadata": {"source_type": "preference", "reinforcement_count": 2}}
+        ])
+
+        self.assertEqual(columns.half_lives[0], 90.0)
+        self.assertEqual(columns.reinforcement[0], 2)
+
 if __name__ == "__main__":
     unittest.main()
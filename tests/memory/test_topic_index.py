@@ -0,0 +1,115 @@
+"""
+Tests for the topic index and incremental topic clustering.
+"""
+
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from memory.long_term import LongTermMemory
+from memory.summarization import MemorySummarizationSystem
+from memory.topic_index import TopicIndex
+from test_utils import StubEmbeddingModel
+
+class TestTopicIndex(unittest.TestCase):
+    """Test TopicIndex maintenance and clustering."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.index = TopicIndex()
+        self.index.add_batch(
+            ["m1", "m2", "m3", "m4", "m5"],
+            [["food", "japan"], ["japan", "travel"], ["japan", "language"], ["food", "japan"], ["python"]]
+        )
+
+    def test_pair_counts_follow_updates(self):
+        """Test that replacing and removing memories keeps the overlap counts exact."""
+        self.assertEqual(self.index.pair_counts[("food", "japan")], 2)
+        self.assertAlmostEqual(self.index.jaccard("japan", "food"), 0.5)
+
+        self.index.add("m4", ["food", "pizza"])
+        self.assertEqual(self.index.pair_counts[("food", "japan")], 1)
+        self.assertEqual(self.index.pair_counts[("food", "pizza")], 1)
+
+        self.assertTrue(self.index.remove("m1"))
+        self.assertFalse(self.index.remove("m1"))
+        self.assertNotIn(("food", "japan"), self.index.pair_counts)
+        self.assertEqual(list(self.index.members["japan"]), ["m2", "m3"])
+        self.assertNotIn("python", {topic for pair in self.index.pair_counts for topic in pair})
+
+    def test_clusters_merge_transitively(self):
+        """Test that union-find merges chains of overlapping topics."""
+        self.assertEqual(self.index.clusters(0.7), [["japan"], ["food"]])
+        self.assertEqual(self.index.clusters(0.5), [["japan", "food"]])
+
+        # pizza only overlaps japan through food
+        self.index.add_batch(["m6", "m7"], [["food", "japan", "pizza"], ["food", "pizza"]])
+        self.assertLess(self.index.jaccard("japan", "pizza"), 0.5)
+        self.assertEqual(self.index.clusters(0.5), [["japan", "food", "pizza"]])
+        self.assertEqual(self.index.cluster_memory_ids(["food", "pizza"]), ["m1", "m4", "m6", "m7"])
+
+    def test_stamps_track_changes(self):
+        """Test that a memory's stamp changes whenever it is re-indexed."""
+        stamp = self.index.stamp("m1")
+        self.index.add("m1", ["food", "japan"])
+
+        self.assertGreater(self.index.stamp("m1"), stamp)
+        self.assertIsNone(self.index.stamp("unknown"))
+
+class TestIncrementalTopicClustering(unittest.TestCase):
+    """Test the topic index in LongTermMemory and clustering on top of it."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_memory(self) -> LongTermMemory:
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite")
+        self.addCleanup(memory.close)
+        return memory
+
+    def test_index_follows_store(self):
+        """Test that adds, updates and deletes reach the index and survive a restart."""
+        memory = self._create_memory()
+        kept_id, deleted_id = memory.add_memories([
+            {"content": "The user likes sushi", "metadata": {"topics": "food,japan"}},
+            {"content": "The user visited Kyoto", "metadata": {"topics": ["japan", "travel"]}}
+        ])
+        memory.update_memory(kept_id, {"metadata": {"topics": "food,cooking"}})
+        memory.delete_memory(deleted_id)
+
+        self.assertEqual(memory.topic_index.memory_topics, {kept_id: ("cooking", "food")})
+        memory.close()
+
+        reopened = self._create_memory()
+        self.assertEqual(reopened.topic_index.memory_topics, {kept_id: ("cooking", "food")})
+
+    def test_new_memories_fetch_only_changes(self):
+        """Test that reclustering after an insert only fetches the new memory."""
+        memory = self._create_memory()
+        manager = MagicMock()
+        manager.long_term = memory
+        summarization = MemorySummarizationSystem(manager, {"memory": {"min_cluster_size": 2}})
+        memory.add_memories([
+            {"content": f"Japanese memory {i}", "metadata": {"topics": "japan,food"}}
+            for i in range(3)
+        ])
+
+        clusters = summarization.cluster_memories_by_topic()
+        self.assertEqual({name: len(memories) for name, memories in clusters.items()}, {"food, japan": 3})
+        self.assertIs(summarization.cluster_memories_by_topic(), clusters)
+
+        new_id = memory.add_memory("The user loves ramen", metadata={"topics": "japan,food"})
+        with patch.object(memory, "get_memories_by_ids", wraps=memory.get_memories_by_ids) as fetch:
+            clusters = summarization.cluster_memories_by_topic()
+
+        fetch.assert_called_once_with([new_id])
+        self.assertEqual(len(clusters["food, japan"]), 4)
+
+if __name__ == "__main__":
+    unittest.main()
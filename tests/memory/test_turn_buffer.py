@@ -0,0 +1,87 @@
+"""
+Tests for cached short-term context assembly and context diffs.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from memory.short_term import MemoryManager, TurnBuffer
+
+class TestTurnBuffer(unittest.TestCase):
+    """Test TurnBuffer token caching and window lookup."""
+
+    def test_tokens_are_estimated_once(self):
+        """Test that each turn's tokens are estimated when it is added, not on every context build."""
+        memory = MemoryManager(max_turns=3)
+        with patch.object(memory.turns, "estimate_tokens", wraps=memory.turns.estimate_tokens) as estimate:
+            memory.add_turn("system", "You are Coda.")
+            for i in range(5):
+                memory.add_turn("user", f"Message number {i}")
+            memory.get_context(max_tokens=1000)
+            memory.get_context(max_tokens=10)
+        self.assertEqual(estimate.call_count, 6)
+
+        # The system message aged out with the oldest turns
+        self.assertIsNone(memory.turns.first_system_index())
+        self.assertEqual([turn["content"] for turn in memory.get_context(max_tokens=1000)],
+                         ["Message number 2", "Message number 3", "Message number 4"])
+
+    def test_window_after_deque_mutations(self):
+        """Test that the window stays correct after direct deque edits."""
+        turns = TurnBuffer(maxlen=4, estimate_tokens=len)
+        turns.extend({"role": "user", "content": "a" * n} for n in (1, 2, 3))
+        turns.appendleft({"role": "system", "content": "sys"})
+        self.assertEqual(turns.first_system_index(), 0)
+        self.assertEqual(turns.window_start(5), 2)
+
+        del turns[2]
+        self.assertEqual(turns.tokens_from(turns.window_start(4)), 4)
+        turns.append({"role": "assistant", "content": "bbbb"})
+        self.assertEqual([turn["content"] for turn in turns.messages_from(turns.window_start(5))], ["bbbb"])
+        turns.append({"role": "user", "content": "c"})
+        self.assertIsNone(turns.first_system_index())
+        self.assertEqual(turns.tokens_from(0), 9)
+
+class TestContextDiff(unittest.TestCase):
+    """Test MemoryManager.get_context_diff."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.memory = MemoryManager(max_turns=10)
+        self.memory.add_turn("system", "You are Coda.")
+        self.memory.add_turn("user", "Hello there.")
+
+    def test_diff_reuses_previous_context(self):
+        """Test that new turns are added and turns leaving the budget are dropped from the front."""
+        first = self.memory.get_context_diff(max_tokens=12)
+        self.assertTrue(first["reset"])
+        self.assertEqual(first["context"], self.memory.get_context(max_tokens=12))
+
+        self.memory.add_turn("assistant", "Hi! How can I help?")
+        self.memory.add_turn("user", "Tell me the time.")
+        diff = self.memory.get_context_diff(max_tokens=12)
+
+        self.assertFalse(diff["reset"])
+        self.assertEqual(diff["dropped"], 1)
+        self.assertEqual(diff["added"], [{"role": "assistant", "content": "Hi! How can I help?"},
+                                         {"role": "user", "content": "Tell me the time."}])
+        self.assertEqual(first["context"][:1] + first["context"][1 + diff["dropped"]:] + diff["added"],
+                         diff["context"])
+
+        self.assertEqual(self.memory.get_context_diff(max_tokens=12)["added"], [])
+
+    def test_diff_resets_when_turns_are_removed(self):
+        """Test that removing turns or resetting memory forces a full context."""
+        self.memory.get_context_diff()
+        self.memory.turns.pop()
+        self.memory.add_turn("user", "Something else.")
+        self.assertTrue(self.memory.get_context_diff()["reset"])
+
+        self.memory.reset()
+        self.memory.add_turn("user", "Hello there.")
+        diff = self.memory.get_context_diff()
+        self.assertTrue(diff["reset"])
+        self.assertEqual(diff["added"], diff["context"])
+
+if __name__ == "__main__":
+    unittest.main()
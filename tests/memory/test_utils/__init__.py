@@ -11,6 +11,10 @@ from .memory_test_utils import (
     TestLongTermMemory,
     TestMemoryEncoder,
     TestEnhancedMemoryManager,
+    StubEmbeddingModel,
+    generate_memory_corpus,
+    generate_memory_queries,
+    stub_bulk_fetch,
     REAL_MEMORY_AVAILABLE,
     SENTENCE_TRANSFORMERS_AVAILABLE,
     CHROMADB_AVAILABLE
@@ -25,6 +29,10 @@ __all__ = [
     "TestLongTermMemory",
     "TestMemoryEncoder",
     "TestEnhancedMemoryManager",
+    "StubEmbeddingModel",
+    "generate_memory_corpus",
+    "generate_memory_queries",
+    "stub_bulk_fetch",
     "REAL_MEMORY_AVAILABLE",
     "SENTENCE_TRANSFORMERS_AVAILABLE",
     "CHROMADB_AVAILABLE"
@@ -6,15 +6,20 @@ that don't depend on WebSocket integration or other external dependencies.
 """
 
 import os
+import re
 import sys
+import hashlib
 import logging
 import json
 import time
 import uuid
+import random
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from collections import deque
 
+import numpy as np
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -52,6 +57,116 @@ except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
     CHROMADB_AVAILABLE = False
 
+class StubEmbeddingModel:
+    """
+    Deterministic stand-in for SentenceTransformer.
+
+    Each lowercase word is hashed into a fixed bucket of the embedding, so texts that
+    share words get similar vectors without downloading a real model.
+    """
+
+    def __init__(self, model_name: str = "stub", device: str = "cpu", dimension: int = 256):
+        """
+        Initialize the stub embedding model.
+
+        Args:
+            model_name: Ignored, kept for SentenceTransformer compatibility
+            device: Ignored, kept for SentenceTransformer compatibility
+            dimension: Embedding dimension
+        """
+        self.model_name = model_name
+        self.dimension = dimension
+        self.encode_calls = 0
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0
+        if not vector.any():
+            vector[0] = 1.0
+        return vector
+
+    def encode(self, sentences, **kwargs) -> np.ndarray:
+        """
+        Encode one text or a list of texts.
+
+        Args:
+            sentences: A string or a list of strings
+
+        Returns:
+            A 1-D array for a string, or a 2-D array for a list
+        """
+        self.encode_calls += 1
+        if isinstance(sentences, str):
+            return self._encode_one(sentences)
+        return np.vstack([self._encode_one(text) for text in sentences]) if sentences else \
+            np.zeros((0, self.dimension), dtype=np.float32)
+
+# Vocabulary of the synthetic corpora
+CORPUS_SOURCE_TYPES = ["conversation", "fact", "preference", "feedback", "summary"]
+CORPUS_TOPICS = ["tea", "coffee", "music", "travel", "work", "family", "weather", "books",
+                 "movies", "cooking", "sports", "health", "games", "garden", "science", "history"]
+CORPUS_WORDS = ["likes", "prefers", "mentioned", "asked", "about", "morning", "evening", "weekend",
+                "usually", "never", "often", "favourite", "new", "old", "green", "quiet", "long",
+                "short", "plans", "remembers", "trip", "recipe", "album", "project", "meeting"]
+
+def generate_memory_corpus(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Generate a deterministic corpus of memories.
+
+    The same size and seed always give the same memories, so benchmark runs can be
+    compared across releases.
+
+    Args:
+        size: Number of memories
+        seed: Random seed
+
+    Returns:
+        Memories in the format accepted by LongTermMemory.add_memories
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        topics = rng.sample(CORPUS_TOPICS, 2)
+        words = rng.choices(CORPUS_WORDS, k=6)
+        corpus.append({
+            "content": f"Memory {i}: the user {words[0]} {topics[0]} {' '.join(words[1:])} {topics[1]}",
+            "source_type": rng.choice(CORPUS_SOURCE_TYPES),
+            "importance": round(rng.uniform(0.1, 1.0), 3),
+            "metadata": {"topics": ",".join(topics)}
+        })
+    return corpus
+
+def generate_memory_queries(count: int, seed: int = 0) -> List[str]:
+    """
+    Generate deterministic retrieval queries over the corpus vocabulary.
+
+    Args:
+        count: Number of queries
+        seed: Random seed
+
+    Returns:
+        Query texts
+    """
+    rng = random.Random(seed + 1)
+    return [f"what does the user {rng.choice(CORPUS_WORDS)} about {rng.choice(CORPUS_TOPICS)}"
+            for _ in range(count)]
+
+def stub_bulk_fetch(long_term: Any, memories: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Make a mocked long-term memory's get_memories_by_ids serve from a dictionary.
+
+    Args:
+        long_term: Mocked long-term memory
+        memories: Memories keyed by ID; later additions are served too
+    """
+    def get_memories_by_ids(memory_ids):
+        return [memories[memory_id] for memory_id in memory_ids if memory_id in memories]
+
+    long_term.get_memories_by_ids.side_effect = get_memories_by_ids
+
 # Simplified memory system components for testing
 class TestShortTermMemory:
     """Simplified short-term memory for testing."""
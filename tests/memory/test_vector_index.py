@@ -0,0 +1,247 @@
+"""
+Tests for the vector index used by the long-term memory backends.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from memory.vector_index import VectorIndex, quantize_int8
+from memory.long_term import LongTermMemory
+from test_utils import StubEmbeddingModel
+
+class TestVectorIndex(unittest.TestCase):
+    """Test VectorIndex functionality."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.index = VectorIndex(initial_capacity=2)
+        self.rng = np.random.default_rng(42)
+
+    def test_search_matches_brute_force(self):
+        """Test that top-k results match a brute-force cosine ranking."""
+        vectors = self.rng.normal(size=(50, 16)).astype(np.float32)
+        ids = [f"m{i}" for i in range(50)]
+        self.index.add_batch(ids, vectors)
+
+        query = self.rng.normal(size=16).astype(np.float32)
+        expected = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+        expected_ids = [ids[i] for i in np.argsort(-expected)[:5]]
+
+        results = self.index.search(query, limit=5)
+
+        self.assertEqual([memory_id for memory_id, _ in results], expected_ids)
+        self.assertAlmostEqual(results[0][1], float(np.max(expected)), places=5)
+
+    def test_remove_keeps_rows_dense(self):
+        """Test that removing an ID moves the last row into its slot."""
+        self.index.add_batch(["a", "b", "c"], np.eye(3, dtype=np.float32))
+
+        self.assertTrue(self.index.remove("a"))
+        self.assertFalse(self.index.remove("a"))
+
+        self.assertEqual(len(self.index), 2)
+        self.assertNotIn("a", self.index)
+        self.assertEqual(self.index.search(np.array([0, 0, 1.0]), limit=1)[0][0], "c")
+        self.assertEqual(self.index.search(np.array([0, 1.0, 0]), limit=1)[0][0], "b")
+
+    def test_add_replaces_existing_vector(self):
+        """Test that adding an existing ID updates its embedding in place."""
+        self.index.add("a", np.array([1.0, 0.0]))
+        self.index.add("a", np.array([0.0, 1.0]))
+
+        self.assertEqual(len(self.index), 1)
+        np.testing.assert_allclose(self.index.get_vector("a"), [0.0, 1.0])
+
+    def test_min_similarity_and_predicate(self):
+        """Test filtering by minimum similarity and predicate."""
+        self.index.add_batch(["a", "b", "c"], np.array([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]]))
+
+        results = self.index.search(np.array([1.0, 0.0]), limit=5, min_similarity=0.5)
+        self.assertEqual([memory_id for memory_id, _ in results], ["a", "b"])
+
+        results = self.index.search(np.array([1.0, 0.0]), limit=5, predicate=lambda memory_id: memory_id != "a")
+        self.assertEqual([memory_id for memory_id, _ in results], ["b", "c"])
+
+    def test_dimension_mismatch(self):
+        """Test that vectors of a different dimension are rejected."""
+        self.index.add("a", np.ones(4))
+        with self.assertRaises(ValueError):
+            self.index.add("b", np.ones(3))
+
+class TestLongTermMemoryVectorIndex(unittest.TestCase):
+    """Test that the sqlite and in-memory backends retrieve through the vector index."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_memory(self, vector_db_type: str) -> LongTermMemory:
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type=vector_db_type)
+        self.addCleanup(memory.close)
+        return memory
+
+    def _check_backend(self, vector_db_type: str) -> None:
+        memory = self._create_memory(vector_db_type)
+        fact_id = memory.add_memory("The user likes green tea in the morning", source_type="fact")
+        memory.add_memory("The weather in Paris is rainy today", source_type="conversation")
+        memory.add_memory("The user prefers short answers", source_type="preference")
+
+        results = memory.retrieve_memories("green tea", limit=1, min_similarity=0.1)
+        self.assertEqual([m["id"] for m in results], [fact_id])
+        self.assertEqual(results[0]["content"], "The user likes green tea in the morning")
+
+        results = memory.retrieve_memories("the user", limit=5, min_similarity=0.0,
+                                           filter_criteria={"source_type": "preference"})
+        self.assertEqual([m["metadata"]["source_type"] for m in results], ["preference"])
+
+        memory.update_memory(fact_id, {"content": "The user enjoys black coffee"})
+        self.assertNotIn(fact_id, [m["id"] for m in memory.retrieve_memories("green tea", limit=5, min_similarity=0.3)])
+        self.assertEqual(memory.retrieve_memories("black coffee", limit=1)[0]["id"], fact_id)
+
+        memory.delete_memory(fact_id)
+        self.assertNotIn(fact_id, memory.vector_index)
+
+    def test_sqlite_backend(self):
+        """Test retrieval with the sqlite backend."""
+        self._check_backend("sqlite")
+
+    def test_in_memory_backend(self):
+        """Test retrieval with the in-memory backend."""
+        self._check_backend("in_memory")
+
+    def test_sqlite_index_rebuilt_on_load(self):
+        """Test that the sqlite index is rebuilt from the database on startup."""
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite")
+        memory_id = memory.add_memory("Remember the dentist appointment on Friday")
+        memory.close()
+
+        reloaded = self._create_memory("sqlite")
+        self.assertIn(memory_id, reloaded.vector_index)
+        self.assertEqual(reloaded.retrieve_memories("dentist appointment", limit=1)[0]["id"], memory_id)
+
+class TestQuantizedVectorIndex(unittest.TestCase):
+    """Test reduced-precision storage with full-precision rescoring."""
+
+    def setUp(self):
+        """Set up test environment."""
+        rng = np.random.default_rng(3)
+        self.vectors = rng.normal(size=(3000, 64)).astype(np.float32)
+        self.ids = [f"m{i}" for i in range(len(self.vectors))]
+        self.queries = self.vectors[:25] + 0.5 * rng.normal(size=(25, 64)).astype(np.float32)
+        self.exact = VectorIndex()
+        self.exact.add_batch(self.ids, self.vectors)
+
+    def _create_index(self, precision: str) -> VectorIndex:
+        index = VectorIndex(precision=precision)
+        index.add_batch(self.ids, self.vectors)
+        full_precision = dict(zip(self.ids, self.vectors))
+        index.full_precision_loader = lambda memory_ids: np.vstack([full_precision[i] for i in memory_ids])
+        return index
+
+    def test_int8_quantization_error(self):
+        """Test that int8 codes with per-vector scales reconstruct unit vectors closely."""
+        normalized = VectorIndex.normalize(self.vectors)
+        codes, scales = quantize_int8(normalized)
+
+        self.assertEqual(codes.dtype, np.int8)
+        self.assertLess(np.abs(codes * scales[:, None] - normalized).max(), 0.01)
+
+    def test_reduced_precision_storage_and_rescoring(self):
+        """Test that quantized indexes are smaller and return exact results after rescoring."""
+        for precision, ratio in (("float16", 2), ("int8", 4)):
+            with self.subTest(precision=precision):
+                index = self._create_index(precision)
+                self.assertLessEqual(index.matrix.nbytes * ratio, self.exact.matrix.nbytes)
+
+                for query in self.queries:
+                    expected = self.exact.search(query, limit=10)
+                    results = index.search(query, limit=10)
+                    self.assertEqual([memory_id for memory_id, _ in results],
+                                     [memory_id for memory_id, _ in expected])
+                    self.assertAlmostEqual(results[0][1], expected[0][1], places=5)
+
+    def test_remove_keeps_scales_aligned(self):
+        """Test that moving the last row on removal also moves its scale."""
+        index = self._create_index("int8")
+        index.remove("m0")
+
+        np.testing.assert_allclose(index.get_vector(self.ids[-1]), VectorIndex.normalize(self.vectors[-1]), atol=0.01)
+
+class TestLongTermMemoryQuantized(unittest.TestCase):
+    """Test int8 storage through LongTermMemory."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_migrates_and_loads_int8_codes(self):
+        """Test that an existing database is backfilled and reloaded from int8 codes."""
+        conn = sqlite3.connect(os.path.join(self.test_dir, "memories.db"))
+        conn.execute('''
+        CREATE TABLE memories (
+            id TEXT PRIMARY KEY, content TEXT NOT NULL, embedding BLOB NOT NULL,
+            timestamp TEXT NOT NULL, importance REAL NOT NULL, metadata TEXT NOT NULL
+        )''')
+        model = StubEmbeddingModel()
+        for i, content in enumerate(["green tea in the morning", "dentist on friday", "black coffee"]):
+            conn.execute("INSERT INTO memories VALUES (?, ?, ?, ?, ?, ?)", (
+                f"old{i}", content, model.encode(content).tobytes(), "2025-01-01T00:00:00", 0.5,
+                json.dumps({"source_type": "fact"})
+            ))
+        conn.commit()
+        conn.close()
+
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite", embedding_precision="int8")
+        self.addCleanup(memory.close)
+
+        self.assertFalse(memory.conn.execute(
+            "SELECT COUNT(*) FROM memories WHERE embedding_int8 IS NULL").fetchone()[0])
+        self.assertEqual(memory.vector_index.matrix.dtype, np.int8)
+
+        new_id = memory.add_memory("remember to water the plants")
+        results = memory.retrieve_memories("green tea morning", limit=1, min_similarity=0.1)
+        self.assertEqual(results[0]["id"], "old0")
+        self.assertAlmostEqual(results[0]["similarity"], float(
+            VectorIndex.normalize(model.encode("green tea morning")) @ VectorIndex.normalize(model.encode("green tea in the morning"))
+        ), places=5)
+        memory.close()
+
+        # Startup loads the stored codes instead of quantizing float32 embeddings again
+        with patch.object(VectorIndex, "add_batch", side_effect=AssertionError("float32 embeddings loaded")):
+            reloaded = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite", embedding_precision="int8")
+        self.addCleanup(reloaded.close)
+        self.assertIn(new_id, reloaded.vector_index)
+
+    def test_loads_float32_only_for_rows_without_codes(self):
+        """Test that startup reads float32 embeddings only for rows that lack int8 codes."""
+        memory = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite", embedding_precision="int8")
+        memory_ids = memory.add_memories([{"content": content} for content in ("green tea", "dentist", "coffee")])
+        with memory.conn:
+            memory.conn.execute("UPDATE memories SET embedding_int8 = NULL, embedding_scale = NULL WHERE id = ?",
+                                (memory_ids[1],))
+        memory.close()
+
+        with patch.object(VectorIndex, "add_batch", autospec=True, side_effect=VectorIndex.add_batch) as add_batch:
+            reloaded = LongTermMemory(storage_path=self.test_dir, vector_db_type="sqlite", embedding_precision="int8")
+        self.addCleanup(reloaded.close)
+
+        self.assertEqual([call.args[1] for call in add_batch.call_args_list], [[memory_ids[1]]])
+        self.assertEqual(len(reloaded.vector_index), 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 import json
 
 from memory.websocket_active_recall import WebSocketEnhancedActiveRecall
+from test_utils import stub_bulk_fetch
 
 class TestWebSocketEnhancedActiveRecall(unittest.TestCase):
     """Test WebSocket-enhanced active recall functionality."""
@@ -80,6 +81,8 @@ class TestWebSocketEnhancedActiveRecall(unittest.TestCase):
         
         self.memory_manager.long_term.get_memory_by_id.side_effect = get_memory_by_id
         
+        stub_bulk_fetch(self.memory_manager.long_term, self.test_memories)
+        
         # Add test memories to metadata
         self.memory_manager.long_term.metadata["memories"] = {
             "memory1": {"content": "This is a test fact", "importance": 0.9},
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 import json
 
 from memory.websocket_summarization import WebSocketEnhancedSummarization
+from test_utils import stub_bulk_fetch
 
 class TestWebSocketEnhancedSummarization(unittest.TestCase):
     """Test WebSocket-enhanced summarization functionality."""
@@ -84,6 +85,8 @@ class TestWebSocketEnhancedSummarization(unittest.TestCase):
         
         self.memory_manager.long_term.get_memory_by_id.side_effect = get_memory_by_id
         
+        stub_bulk_fetch(self.memory_manager.long_term, self.test_memories)
+        
         # Add test memories to metadata
         self.memory_manager.long_term.metadata["memories"] = {
             "memory1": {"content": "The user likes Japanese food", "importance": 0.8},
@@ -0,0 +1,301 @@
+"""
+Tests for the background memory write pipeline.
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from memory.encoder import MemoryEncoder
+from memory.enhanced_memory_manager import EnhancedMemoryManager
+from memory.memory_fixes import apply_memory_fixes
+from memory.write_pipeline import MemoryWritePipeline
+from test_utils import StubEmbeddingModel
+
+class TestMemoryWritePipeline(unittest.TestCase):
+    """Test ordering, coalescing, backpressure and flushing."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.pipeline = MemoryWritePipeline(max_pending=2)
+        self.addCleanup(self.pipeline.close, 5)
+
+    def _block_worker(self) -> threading.Event:
+        """Occupy the worker until the returned event is set."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocker():
+            started.set()
+            release.wait(5)
+
+        self.pipeline.submit(blocker)
+        started.wait(5)
+        return release
+
+    def test_writes_run_in_order_on_worker(self):
+        """Test that writes run one after another on the worker thread."""
+        applied = []
+        for i in range(5):
+            self.pipeline.submit(lambda i=i: applied.append((i, threading.current_thread().name)))
+
+        self.assertTrue(self.pipeline.flush(timeout=5))
+        self.assertEqual([i for i, _ in applied], list(range(5)))
+        self.assertEqual({name for _, name in applied}, {"memory-writer"})
+
+    def test_queued_writes_with_same_key_coalesce(self):
+        """Test that a queued write is replaced by a newer one with the same key."""
+        release = self._block_worker()
+        applied = []
+
+        first = self.pipeline.submit(applied.append, "old", key="persist")
+        second = self.pipeline.submit(applied.append, "new", key="persist")
+        release.set()
+        self.pipeline.flush(timeout=5)
+
+        self.assertIs(first, second)
+        self.assertEqual(applied, ["new"])
+        self.assertEqual(self.pipeline.stats["coalesced"], 1)
+
+    def test_full_queue_blocks_submit(self):
+        """Test that submit waits while the queue is full."""
+        release = self._block_worker()
+        self.pipeline.submit(lambda: None)
+        self.pipeline.submit(lambda: None)
+
+        submitted = threading.Event()
+        threading.Thread(target=lambda: (self.pipeline.submit(lambda: None), submitted.set()), daemon=True).start()
+
+        self.assertFalse(submitted.wait(0.2))
+        release.set()
+        self.assertTrue(submitted.wait(5))
+
+    def test_exclusive_sees_queued_writes(self):
+        """Test that exclusive() waits for writes submitted before it."""
+        applied = []
+        self.pipeline.submit(lambda: (time.sleep(0.1), applied.append("write")))
+
+        with self.pipeline.exclusive():
+            self.assertEqual(applied, ["write"])
+
+    def test_wait_for_store_writes_skips_other_writes(self):
+        """Test that readers wait for queued store writes only."""
+        release = self._block_worker()
+        self.assertTrue(self.pipeline.wait_for_store_writes(timeout=0.2))
+
+        applied = []
+        self.pipeline.submit(applied.append, "persist", store_write=True)
+        self.assertFalse(self.pipeline.wait_for_store_writes(timeout=0.2))
+
+        release.set()
+        self.assertTrue(self.pipeline.wait_for_store_writes(timeout=5))
+        self.assertEqual(applied, ["persist"])
+
+    def test_failed_write_does_not_stop_worker(self):
+        """Test that an exception is stored on the future and later writes still run."""
+        def failing():
+            raise RuntimeError("disk full")
+
+        future = self.pipeline.submit(failing)
+        after = self.pipeline.submit(lambda: "ok")
+
+        self.assertEqual(after.result(timeout=5), "ok")
+        self.assertIsInstance(future.exception(timeout=5), RuntimeError)
+
+    def test_low_priority_writes_yield(self):
+        """Test that a low-priority write runs after writes queued behind it."""
+        release = self._block_worker()
+        applied = []
+
+        self.pipeline.submit(applied.append, "prune", key="prune", low_priority=True)
+        self.pipeline.submit(applied.append, "persist")
+        release.set()
+
+        self.assertTrue(self.pipeline.flush(timeout=5))
+        self.assertEqual(applied, ["persist", "prune"])
+
+    def test_low_priority_writes_are_deferred_when_full(self):
+        """Test that a low-priority write on a full queue returns at once and runs on the worker later."""
+        release = self._block_worker()
+        self.pipeline.submit(lambda: None)
+        self.pipeline.submit(lambda: None)
+
+        # The submitter must not wait for the worker's lock, which the blocker holds
+        start_time = time.time()
+        future = self.pipeline.submit(lambda: threading.current_thread().name, key="prune", low_priority=True)
+        self.assertLess(time.time() - start_time, 1.0)
+        self.assertFalse(future.done())
+
+        release.set()
+        self.assertTrue(self.pipeline.flush(timeout=5))
+        self.assertEqual(future.result(timeout=5), "memory-writer")
+
+class TestAsyncMemoryWrites(unittest.TestCase):
+    """Test EnhancedMemoryManager with async_writes enabled."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir, ignore_errors=True)
+        patcher = patch("memory.long_term.SentenceTransformer", StubEmbeddingModel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.manager = EnhancedMemoryManager(config={
+            "memory": {
+                "long_term_path": self.test_dir,
+                "vector_db": "sqlite",
+                "auto_persist": True,
+                "persist_interval": 1,
+                "async_writes": True,
+                "snapshot_dir": f"{self.test_dir}/snapshots",
+                "auto_snapshot": False
+            }
+        })
+        self.addCleanup(self.manager.close)
+
+    def test_add_turn_does_not_wait_for_persistence(self):
+        """Test that persistence runs on the writer thread, not the caller."""
+        release = threading.Event()
+        persist_threads = []
+        original_add_memories = self.manager.long_term.add_memories
+
+        def slow_add_memories(memories):
+            persist_threads.append(threading.current_thread().name)
+            release.wait(5)
+            return original_add_memories(memories)
+
+        with patch.object(self.manager.long_term, "add_memories", side_effect=slow_add_memories):
+            self.manager.add_turn("user", "Remember that my sister's birthday is in March")
+            start_time = time.time()
+            self.manager.add_turn("assistant", "Got it, your sister's birthday is in March")
+            self.assertLess(time.time() - start_time, 1.0)
+
+            release.set()
+            self.assertTrue(self.manager.flush(timeout=5))
+
+        self.assertEqual(persist_threads, ["memory-writer"])
+        self.assertGreater(len(self.manager.long_term.metadata["memories"]), 0)
+
+    def test_coalesced_persists_keep_every_turn(self):
+        """Test that turns scrolling out of short-term memory behind a busy writer are still stored."""
+        self.manager = EnhancedMemoryManager(config={
+            "memory": {
+                "long_term_path": f"{self.test_dir}/short_buffer",
+                "vector_db": "sqlite",
+                "max_turns": 6,
+                "auto_persist": True,
+                "persist_interval": 1,
+                "async_writes": True,
+                "snapshot_dir": f"{self.test_dir}/short_buffer/snapshots",
+                "auto_snapshot": False
+            }
+        })
+        self.addCleanup(self.manager.close)
+        release = threading.Event()
+        started = threading.Event()
+
+        def busy_writer():
+            started.set()
+            release.wait(5)
+
+        persisted_turn_ids = []
+        original_encode = self.manager.encoder.encode_conversation
+
+        def encode_conversation(turns, *args, **kwargs):
+            persisted_turn_ids.extend(turn["turn_id"] for turn in turns)
+            return original_encode(turns, *args, **kwargs)
+
+        self.manager.write_pipeline.submit(busy_writer, key="auto_snapshot")
+        self.assertTrue(started.wait(5))
+        with patch.object(self.manager.encoder, "encode_conversation", side_effect=encode_conversation):
+            for i in range(30):
+                self.manager.add_turn("user", f"Remember fact number {i}")
+                self.manager.add_turn("assistant", f"Noted fact number {i}")
+            release.set()
+            self.assertTrue(self.manager.flush(timeout=5))
+
+        self.assertEqual(sorted(persisted_turn_ids), list(range(60)))
+        self.assertEqual(self.manager.turn_count_at_last_persist, 60)
+
+    def test_memory_fixes_add_turn_does_not_wait_for_persistence(self):
+        """Test that the patched add_turn from apply_memory_fixes still persists in the background."""
+        for cls, names in ((EnhancedMemoryManager, ("add_turn", "close", "retrieve_relevant_memories",
+                                                    "get_enhanced_context")),
+                           (MemoryEncoder, ("_extract_topics", "_calculate_importance"))):
+            for name in names:
+                self.addCleanup(setattr, cls, name, cls.__dict__[name])
+        apply_memory_fixes()
+
+        release = threading.Event()
+        original_add_memories = self.manager.long_term.add_memories
+
+        def slow_add_memories(memories):
+            release.wait(5)
+            return original_add_memories(memories)
+
+        with patch.object(self.manager.long_term, "add_memories", side_effect=slow_add_memories):
+            self.manager.add_turn("user", "Remember that my sister's birthday is in March")
+            start_time = time.time()
+            self.manager.add_turn("assistant", "Got it, your sister's birthday is in March")
+            self.assertLess(time.time() - start_time, 1.0)
+
+            release.set()
+            self.assertTrue(self.manager.flush(timeout=5))
+
+        self.assertEqual(self.manager.turn_count_at_last_persist, 2)
+
+    def test_reads_do_not_wait_for_unrelated_writes(self):
+        """Test that retrieval runs while a write that does not touch the store is being applied."""
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow_snapshot():
+            started.set()
+            release.wait(5)
+
+        self.manager.write_pipeline.submit(slow_snapshot, key="auto_snapshot")
+        self.assertTrue(started.wait(5))
+
+        start_time = time.time()
+        self.manager.retrieve_relevant_memories("sister birthday", min_similarity=0.0)
+        self.manager.get_memory_stats()
+        self.assertLess(time.time() - start_time, 1.0)
+        self.assertEqual(self.manager.write_pipeline.pending, 1)
+
+        release.set()
+        self.assertTrue(self.manager.flush(timeout=5))
+
+    def test_failed_persist_is_retried(self):
+        """Test that turns whose background persist failed are queued again."""
+        original_add_memories = self.manager.long_term.add_memories
+        with patch.object(self.manager.long_term, "add_memories", side_effect=RuntimeError("disk full")):
+            self.manager.add_turn("user", "Remember that my sister's birthday is in March")
+            self.manager.add_turn("assistant", "Got it, your sister's birthday is in March")
+            self.assertTrue(self.manager.flush(timeout=5))
+        self.assertEqual(self.manager.turn_count_at_last_persist, 0)
+
+        with patch.object(self.manager.long_term, "add_memories", side_effect=original_add_memories):
+            self.manager.add_turn("user", "Thanks")
+            self.manager.add_turn("assistant", "You're welcome")
+            self.assertTrue(self.manager.flush(timeout=5))
+        self.assertEqual(self.manager.turn_count_at_last_persist, 4)
+        self.assertTrue(any("birthday" in entry["content"]
+                            for entry in self.manager.long_term.metadata["memories"].values()))
+
+    def test_reads_see_queued_writes(self):
+        """Test that retrieval waits for a persist that is still queued."""
+        self.manager.add_turn("user", "Remember that my sister's birthday is in March")
+        self.manager.add_turn("assistant", "Got it, your sister's birthday is in March")
+
+        memories = self.manager.retrieve_relevant_memories("sister birthday", min_similarity=0.0,
+                                                           apply_temporal_weighting=False)
+
+        self.assertTrue(any("birthday" in memory["content"] for memory in memories))
+        self.assertEqual(self.manager.write_pipeline.pending, 0)
+
+if __name__ == "__main__":
+    unittest.main()
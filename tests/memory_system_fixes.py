@@ -11,12 +11,12 @@ import logging
 import json
 import time
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List
 
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from memory import EnhancedMemoryManager, LongTermMemory, MemoryEncoder
+from memory import EnhancedMemoryManager, MemoryEncoder
 from config.config_loader import ConfigLoader
 
 # Set up logging
@@ -292,59 +292,14 @@ def fix_vector_database():
     """Fix vector database issues."""
     logger.info("Fixing vector database issues")
     
-    # Patch LongTermMemory._save_metadata to ensure proper persistence
-    original_save_metadata = LongTermMemory._save_metadata
-    
-    def patched_save_metadata(self, metadata=None) -> None:
-        """Patched _save_metadata method to ensure proper persistence."""
-        # Use provided metadata or instance metadata
-        metadata_to_save = metadata if metadata is not None else self.metadata
-        
-        # Update last_updated timestamp
-        metadata_to_save["last_updated"] = datetime.now().isoformat()
-        
-        # Save metadata to file
-        try:
-            with open(self.metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata_to_save, f, indent=2, default=str)
-            
-            logger.debug(f"Saved metadata with {len(metadata_to_save.get('memories', []))} memories")
-        except Exception as e:
-            logger.error(f"Error saving metadata: {e}")
-            
-            # Try to save to a backup location
-            backup_path = f"{self.metadata_path}.backup"
-            try:
-                with open(backup_path, 'w', encoding='utf-8') as f:
-                    json.dump(metadata_to_save, f, indent=2, default=str)
-                logger.info(f"Saved metadata to backup location: {backup_path}")
-            except Exception as backup_error:
-                logger.error(f"Error saving metadata to backup location: {backup_error}")
-    
-    # Apply the patch
-    LongTermMemory._save_metadata = patched_save_metadata
-    logger.info("Patched LongTermMemory._save_metadata to ensure proper persistence")
-    
-    # Patch LongTermMemory.add_memory to ensure proper persistence
-    original_add_memory = LongTermMemory.add_memory
-    
-    def patched_add_memory(self, content: str, source_type: str = "conversation", importance: float = 0.5, metadata: Optional[Dict[str, Any]] = None) -> str:
-        """Patched add_memory method to ensure proper persistence."""
-        # Call original method
-        memory_id = original_add_memory(self, content, source_type, importance, metadata)
-        
-        # Force metadata save
-        self._save_metadata()
-        
-        return memory_id
-    
-    # Apply the patch
-    LongTermMemory.add_memory = patched_add_memory
-    logger.info("Patched LongTermMemory.add_memory to ensure proper persistence")
+    # LongTermMemory persists metadata through an append-only journal with atomic
+    # snapshot compaction, so _save_metadata and add_memory no longer need patching
+    # (forcing a full metadata rewrite after every add would defeat the journal).
+    logger.info("LongTermMemory metadata is journaled; skipping persistence patches")
     
     return {
-        "save_metadata_patched": True,
-        "add_memory_patched": True
+        "save_metadata_patched": False,
+        "add_memory_patched": False
     }
 
 def fix_configuration():
@@ -0,0 +1,119 @@
+"""
+Tests for the background model registry.
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from utils.model_registry import ModelRegistry, LazyModel
+from memory.long_term import LongTermMemory
+from tests.memory.test_utils import StubEmbeddingModel
+
+class SlowModel:
+    """Model whose construction blocks until released."""
+
+    def __init__(self, release: threading.Event, value: str = "ready"):
+        release.wait(5)
+        self.value = value
+
+    def predict(self, text: str) -> str:
+        return f"{self.value}:{text}"
+
+class TestModelRegistry(unittest.TestCase):
+    """Test ModelRegistry functionality."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.ws = MagicMock()
+        self.registry = ModelRegistry(websocket_integration=self.ws)
+        self.addCleanup(self.registry.shutdown)
+
+    def test_loads_in_background_and_blocks_first_use(self):
+        """Test that load returns immediately and the first call waits for the model."""
+        release = threading.Event()
+
+        start_time = time.time()
+        model = self.registry.load("slow", lambda: SlowModel(release))
+        self.assertLess(time.time() - start_time, 1.0)
+        self.assertIsInstance(model, LazyModel)
+        self.assertFalse(self.registry.is_ready("slow"))
+
+        release.set()
+        self.assertEqual(model.predict("hi"), "ready:hi")
+        self.assertTrue(self.registry.is_ready("slow"))
+
+    def test_models_load_in_parallel(self):
+        """Test that two slow loaders overlap instead of running one after another."""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def loader(name):
+            barrier.wait()  # Only passes if both loaders run at the same time
+            return name
+
+        self.registry.load("a", lambda: loader("a"))
+        self.registry.load("b", lambda: loader("b"))
+
+        self.assertEqual(self.registry.wait_all(timeout=5), ["a", "b"])
+
+    def test_reports_load_timings(self):
+        """Test that each load is recorded and sent as a system_info event."""
+        self.registry.load("quick", lambda: "model")
+        self.registry.get("quick", timeout=5)
+
+        load_info = self.registry.get_load_times()["quick"]
+        self.assertEqual(load_info["status"], "ready")
+        self.assertGreaterEqual(load_info["load_time_ms"], 0)
+        self.ws.system_info.assert_called_once_with({"model_load": load_info})
+
+    def test_loader_errors_surface_on_use(self):
+        """Test that a failing loader raises when the model is used."""
+        def failing_loader():
+            raise RuntimeError("no weights")
+
+        model = self.registry.load("broken", failing_loader)
+
+        with self.assertRaises(RuntimeError):
+            model.predict("hi")
+        self.assertFalse(self.registry.is_ready("broken"))
+        self.assertEqual(self.registry.get_load_times()["broken"]["error"], "no weights")
+
+    def test_same_name_is_loaded_once(self):
+        """Test that registering a name twice reuses the first load."""
+        loader = MagicMock(return_value="model")
+        self.registry.load("shared", loader)
+        self.registry.load("shared", loader)
+        self.registry.wait_all(timeout=5)
+
+        loader.assert_called_once()
+
+class TestLongTermMemoryModelRegistry(unittest.TestCase):
+    """Test background loading of the embedding model."""
+
+    def test_embedding_model_loads_through_registry(self):
+        """Test that LongTermMemory starts without waiting for its embedding model."""
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir, ignore_errors=True)
+        release = threading.Event()
+
+        def slow_model(*args, **kwargs):
+            release.wait(5)
+            return StubEmbeddingModel(*args, **kwargs)
+
+        registry = ModelRegistry()
+        self.addCleanup(registry.shutdown)
+        with patch("memory.long_term.SentenceTransformer", side_effect=slow_model):
+            memory = LongTermMemory(storage_path=test_dir, vector_db_type="sqlite", model_registry=registry)
+            self.addCleanup(memory.close)
+
+            self.assertFalse(registry.is_ready("sentence_transformer:all-MiniLM-L6-v2:cpu"))
+            release.set()
+            memory_id = memory.add_memory("The user likes green tea")
+
+        self.assertEqual(memory.retrieve_memories("green tea", limit=1, min_similarity=0.0)[0]["id"], memory_id)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,5 +5,6 @@ This package contains various utility modules used throughout the Coda Lite syst
 """
 
 from .perf_tracker import PerfTracker, PerformanceMonitor
+from .model_registry import ModelRegistry, LazyModel
 
-__all__ = ["PerfTracker", "PerformanceMonitor"]
+__all__ = ["PerfTracker", "PerformanceMonitor", "ModelRegistry", "LazyModel"]
@@ -0,0 +1,230 @@
+"""
+Model registry for Coda Lite.
+
+This module provides a ModelRegistry that loads heavy models (speech recognition,
+sentence embeddings) on background threads in parallel, so that startup is not
+serialized behind each model load. Components receive a LazyModel proxy and only
+the first call that actually uses a model waits for it to finish loading.
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("coda.utils.model_registry")
+
+
+class LazyModel:
+    """
+    Proxy for a model that is loading in the background.
+
+    Attribute access blocks until the model is ready and is then forwarded to it,
+    so ``lazy.encode(...)`` behaves like ``model.encode(...)``.
+    """
+
+    def __init__(self, registry: "ModelRegistry", name: str):
+        """
+        Initialize the proxy.
+
+        Args:
+            registry: Registry loading the model
+            name: Registered model name
+        """
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._registry.get(self._name), attribute)
+
+    def __setattr__(self, attribute: str, value: Any) -> None:
+        setattr(self._registry.get(self._name), attribute, value)
+
+    def __repr__(self) -> str:
+        state = "ready" if self._registry.is_ready(self._name) else "loading"
+        return f"<LazyModel {self._name} ({state})>"
+
+
+class ModelRegistry:
+    """
+    Loads models on background threads and hands out readiness futures.
+
+    Responsibilities:
+    - Start model loaders in parallel on a shared thread pool
+    - Expose a Future per model and block only callers that need a model
+    - Record per-model load timings and report them as system_info events
+    """
+
+    def __init__(self,
+                 max_workers: int = 4,
+                 websocket_integration=None,
+                 on_loaded: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """
+        Initialize the model registry.
+
+        Args:
+            max_workers: Maximum number of models loading at the same time
+            websocket_integration: Optional WebSocket integration that receives a
+                system_info event when each model finishes loading
+            on_loaded: Optional callback called with (name, load_info) after each load
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-loader")
+        self.websocket_integration = websocket_integration
+        self.on_loaded = on_loaded
+        self.futures: Dict[str, Future] = {}
+        self.load_info: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+        logger.info(f"ModelRegistry initialized with {max_workers} loader threads")
+
+    def load(self, name: str, loader: Callable[[], Any]) -> LazyModel:
+        """
+        Start loading a model in the background.
+
+        Registering a name that is already loading or loaded reuses that model.
+
+        Args:
+            name: Unique model name (e.g. "whisper:base:cpu")
+            loader: Function that builds and returns the model
+
+        Returns:
+            LazyModel proxy for the model
+        """
+        with self.lock:
+            if name not in self.futures:
+                logger.info(f"Loading model {name} in the background")
+                self.futures[name] = self.executor.submit(self._run_loader, name, loader)
+        return LazyModel(self, name)
+
+    def _run_loader(self, name: str, loader: Callable[[], Any]) -> Any:
+        """Run a loader, recording its timing and reporting the result."""
+        start_time = time.time()
+        try:
+            model = loader()
+        except Exception as e:
+            self._record(name, start_time, "error", str(e))
+            logger.error(f"Failed to load model {name}: {e}")
+            raise
+
+        self._record(name, start_time, "ready")
+        return model
+
+    def _record(self, name: str, start_time: float, status: str, error: Optional[str] = None) -> None:
+        """Store load information and emit it."""
+        load_info = {
+            "model": name,
+            "status": status,
+            "load_time_ms": (time.time() - start_time) * 1000,
+            "thread": threading.current_thread().name
+        }
+        if error:
+            load_info["error"] = error
+
+        with self.lock:
+            self.load_info[name] = load_info
+
+        logger.info(f"Model {name} {status} after {load_info['load_time_ms']:.0f}ms")
+
+        if self.websocket_integration is not None:
+            try:
+                self.websocket_integration.system_info({"model_load": load_info})
+            except Exception as e:
+                logger.error(f"Error sending model load event for {name}: {e}")
+
+        if self.on_loaded is not None:
+            try:
+                self.on_loaded(name, load_info)
+            except Exception as e:
+                logger.error(f"Error in model load callback for {name}: {e}")
+
+    def future(self, name: str) -> Future:
+        """
+        Get the readiness future of a model.
+
+        Args:
+            name: Registered model name
+
+        Returns:
+            Future resolving to the loaded model
+
+        Raises:
+            KeyError: If no model is registered under the name
+        """
+        with self.lock:
+            return self.futures[name]
+
+    def get(self, name: str, timeout: Optional[float] = None) -> Any:
+        """
+        Get a model, waiting for it to finish loading if necessary.
+
+        Args:
+            name: Registered model name
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            The loaded model
+
+        Raises:
+            KeyError: If no model is registered under the name
+            Exception: Whatever the model's loader raised
+        """
+        future = self.future(name)
+        if not future.done():
+            logger.info(f"Waiting for model {name} to finish loading")
+        return future.result(timeout=timeout)
+
+    def is_ready(self, name: str) -> bool:
+        """
+        Check whether a model has loaded successfully.
+
+        Args:
+            name: Registered model name
+
+        Returns:
+            True if the model is loaded
+        """
+        with self.lock:
+            future = self.futures.get(name)
+        return future is not None and future.done() and future.exception() is None
+
+    def wait_all(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        Wait for every registered model to finish loading.
+
+        Args:
+            timeout: Maximum seconds to wait for each model
+
+        Returns:
+            Names of the models that loaded successfully
+        """
+        with self.lock:
+            names = list(self.futures)
+
+        ready = []
+        for name in names:
+            try:
+                self.get(name, timeout=timeout)
+                ready.append(name)
+            except Exception:
+                pass
+        return ready
+
+    def get_load_times(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get load information for every model that has finished loading.
+
+        Returns:
+            Dictionary mapping model name to its load information
+        """
+        with self.lock:
+            return {name: dict(info) for name, info in self.load_info.items()}
+
+    def shutdown(self, wait: bool = False) -> None:
+        """
+        Stop the loader threads.
+
+        Args:
+            wait: Whether to wait for loads in progress to finish
+        """
+        self.executor.shutdown(wait=wait)
@@ -63,6 +63,8 @@ class PerfTracker:
         self.session_start_time = time.time()
         self.component_timings = {}
         self.operation_counts = {}
+        self.counters = {}
+        self.counters_lock = threading.Lock()
 
         # System monitoring
         self.enable_system_monitoring = enable_system_monitoring
@@ -197,6 +199,34 @@ class PerfTracker:
                         "duration_seconds": duration
                     })
 
+    def increment_counter(self, component: str, counter: str, amount: int = 1) -> None:
+        """
+        Increment a named counter for a component (e.g., cache hits and misses).
+
+        Args:
+            component: The component name (e.g., "embedding_cache")
+            counter: The counter name (e.g., "hits")
+            amount: Amount to add
+        """
+        with self.counters_lock:
+            component_counters = self.counters.setdefault(component, {})
+            component_counters[counter] = component_counters.get(counter, 0) + amount
+
+    def get_counters(self, component: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get counter values.
+
+        Args:
+            component: The component name, or None for all components
+
+        Returns:
+            Dictionary mapping component to counter values (or the counters of one component)
+        """
+        with self.counters_lock:
+            if component:
+                return dict(self.counters.get(component, {}))
+            return {comp: dict(values) for comp, values in self.counters.items()}
+
     def get_duration(self, start_marker: str, end_marker: str) -> float:
         """
         Get the duration between two markers.
@@ -359,6 +389,8 @@ class PerfTracker:
         self.markers = {}
         self.component_timings = {}
         self.operation_counts = {}
+        with self.counters_lock:
+            self.counters = {}
         self.session_start_time = time.time()
         logger.info("Reset performance tracker")
 
@@ -348,6 +348,7 @@ class ComponentStatsEvent(BaseEvent):
 
     type: EventType = EventType.COMPONENT_STATS
     components: Dict[str, Dict[str, Dict[str, Any]]]
+    counters: Dict[str, Dict[str, int]] = Field(default_factory=dict)
 
 class ReplayEvent(BaseEvent):
     """Replay event containing recent important events."""
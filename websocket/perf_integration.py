@@ -111,7 +111,8 @@ class WebSocketPerfIntegration:
         self.server.push_event(
             EventType.COMPONENT_STATS,
             {
-                "components": stats
+                "components": stats,
+                "counters": self.perf_tracker.get_counters()
             }
         )
         